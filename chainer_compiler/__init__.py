@@ -1,5 +1,10 @@
+__version__ = '0.0.1'
+
 from chainer_compiler.chainer_compiler import compile  # noqa
 from chainer_compiler.chainer_compiler import compile_onnx  # noqa
 from chainer_compiler.chainer_compiler import export  # noqa
 from chainer_compiler.chainer_compiler import use_unified_memory_allocator  # noqa
 from chainer_compiler.chainer_compiler import use_chainerx_shared_allocator  # noqa
+from chainer_compiler.autotune import autotune_computation_order  # noqa
+from chainer_compiler.inference_session import InferenceSession  # noqa
+from chainer_compiler.profiler import Profiler  # noqa
@@ -0,0 +1,223 @@
+import concurrent.futures
+import copy
+import json
+import os
+import tempfile
+import time
+import warnings
+
+import chainer
+import chainer.functions as F
+
+from chainer_compiler import chainer_compiler
+from chainer_compiler import compile_cache
+
+
+# Fractions of the memory budget passed to policies which take their
+# own budget.
+_BUDGET_FRACTIONS = (1.0, 0.75, 0.5, 0.25)
+
+# Schedules found in this process keyed by cache keys. Used when there
+# is no cache directory.
+_schedules = {}
+
+
+def _candidates(memory_budget):
+    """Yields pairs of a computation order and compiler flags to try."""
+    yield None, {}
+    for fraction in _BUDGET_FRACTIONS:
+        budget_mb = max(1, int(memory_budget * fraction) // 1000000)
+        yield 'chen', {'chen_budget': budget_mb}
+        yield 'gttime', {'gt_budget': budget_mb}
+    # GT policy searches the minimum budget without `gt_budget`.
+    yield 'gtmem', {}
+
+
+def _estimate(onnx_bytes, computation_order, compiler_kwargs):
+    """Estimates the peak memory, all memory and flops of a training step."""
+    core = chainer_compiler._chainer_compiler_core
+    with chainer_compiler._compile_lock:
+        core.configure(**compiler_kwargs)
+        graph = core.load_from_bytes(onnx_bytes)
+        if computation_order is None:
+            fwd_graph, bwd_graph = graph.backward_to(
+                graph.input_names() + graph.param_names())
+        else:
+            fwd_graph, bwd_graph = graph.backward_to_with_order(
+                computation_order)
+        # The estimations also depend on the flags given to `configure`.
+        # Values retained for backward are inputs of `bwd_graph` so the
+        # peak of a step is the larger one of the two graphs.
+        return {
+            'peak_memory': max(fwd_graph.peak_memory_usage(),
+                               bwd_graph.peak_memory_usage()),
+            'all_memory': (fwd_graph.all_memory_usage() +
+                           bwd_graph.all_memory_usage()),
+            'flops': fwd_graph.flops() + bwd_graph.flops(),
+        }
+
+
+def _time_steps(model, onnx_bytes, translator, inputs, computation_order,
+                compiler_kwargs, num_runs):
+    """Returns the best time of a forward and backward step.
+
+    The steps train a copy of `model` so its parameters, gradients and
+    persistent values such as `avg_mean` of BatchNormalization are kept
+    intact. They run in a thread of their own since ChxVM draws dropout
+    masks from a random state of each thread, which must not be
+    consumed for the caller.
+    """
+    model = copy.deepcopy(model)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(
+            _run_steps, model, onnx_bytes, translator, inputs,
+            computation_order, compiler_kwargs, num_runs).result()
+
+
+def _run_steps(model, onnx_bytes, translator, inputs, computation_order,
+               compiler_kwargs, num_runs):
+    import onnx
+    xmodel = onnx.load_model_from_string(onnx_bytes)
+    compiled = chainer_compiler.CompiledModel(
+        model, xmodel, translator, computation_order=computation_order,
+        compiler_kwargs=compiler_kwargs)
+    del xmodel
+    best = None
+    with chainer.using_device(model.device):
+        # The first run is a warm-up.
+        for i in range(num_runs + 1):
+            compiled.cleargrads()
+            st = time.time()
+            ys = compiled(*inputs)
+            if not isinstance(ys, (list, tuple)):
+                ys = [ys]
+            loss = sum(F.sum(y) for y in ys)
+            loss.backward()
+            if chainer_compiler.cupy is not None:
+                chainer_compiler.cupy.cuda.Device().synchronize()
+            elapsed = time.time() - st
+            if i and (best is None or elapsed < best):
+                best = elapsed
+    return best
+
+
+def _schedule_path(cache_dir, key):
+    return os.path.join(cache_dir, key + '.computation_order.json')
+
+
+def _load_schedule(cache_dir, key):
+    if key in _schedules:
+        return _schedules[key]
+    if cache_dir is None:
+        return None
+    try:
+        with open(_schedule_path(cache_dir, key)) as f:
+            schedule = json.load(f)
+    except (OSError, ValueError):
+        return None
+    _schedules[key] = schedule
+    return schedule
+
+
+def _store_schedule(cache_dir, key, schedule):
+    _schedules[key] = schedule
+    if cache_dir is None:
+        return
+    compile_cache.make_cache_dir(cache_dir)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(schedule, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, _schedule_path(cache_dir, key))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def autotune_computation_order(model, inputs, memory_budget,
+                               translator='ch2o', compiler_kwargs=None,
+                               cache_dir=None, max_trials=3, num_runs=3):
+    """Finds the fastest computation order which fits `memory_budget`.
+
+    Candidates are the default order and the `chen`, `gttime` and `gtmem`
+    policies with budgets derived from `memory_budget`. Their memory
+    usage and flops are estimated by the compiler. Up to `max_trials`
+    candidates which fit the budget are compiled and timed for
+    `num_runs` training steps, preferring ones with fewer flops. If no
+    candidate fits, the one with the smallest estimated peak is chosen.
+
+    The result is stored in `cache_dir` (see `compile_cache`) and in
+    memory, keyed by the exported model without its weights, so later
+    calls and `compile(..., computation_order='auto')` reuse it.
+
+    Args:
+        model: A `chainer.Chain` to be compiled.
+        inputs: Example inputs of `model`.
+        memory_budget (int): The memory budget in bytes.
+        translator (str): The translator used to export `model`.
+        compiler_kwargs (dict): Flags of the compiler used for `model`.
+        cache_dir (str): The directory to store the result.
+        max_trials (int): The maximum number of candidates to time.
+        num_runs (int): The number of timed training steps.
+
+    Returns:
+        A dict with `computation_order` and `compiler_kwargs` to be passed
+        to `compile`, and estimated `peak_memory`, `all_memory`, `flops`
+        and measured `elapsed` of the chosen schedule.
+    """
+    cache_dir = compile_cache.get_cache_dir(cache_dir)
+    xmodel = chainer_compiler._export_proto(model, inputs, translator)
+    onnx_bytes = xmodel.SerializeToString()
+    chainer_compiler._strip_initializers(
+        xmodel, set(t.name for t in xmodel.graph.initializer))
+    key = compile_cache.compute_key(
+        xmodel.SerializeToString(), compiler_kwargs, None, translator,
+        memory_budget, 'computation_order')
+    del xmodel
+
+    schedule = _load_schedule(cache_dir, key)
+    if schedule is not None:
+        return schedule
+
+    candidates = []
+    for computation_order, kwargs in _candidates(memory_budget):
+        kwargs = dict(compiler_kwargs or {}, **kwargs)
+        try:
+            estimate = _estimate(onnx_bytes, computation_order, kwargs)
+        except Exception as e:
+            warnings.warn('Failed to estimate %s %s: %s' %
+                          (computation_order, kwargs, e))
+            continue
+        estimate['computation_order'] = computation_order
+        estimate['compiler_kwargs'] = kwargs
+        candidates.append(estimate)
+    if not candidates:
+        raise RuntimeError('No computation order is available')
+
+    fits = [c for c in candidates if c['peak_memory'] <= memory_budget]
+    if not fits:
+        warnings.warn('No computation order fits in %d bytes' %
+                      memory_budget)
+        fits = [min(candidates, key=lambda c: c['peak_memory'])]
+    fits.sort(key=lambda c: (c['flops'], c['peak_memory']))
+
+    best = None
+    for candidate in fits[:max_trials]:
+        try:
+            candidate['elapsed'] = _time_steps(
+                model, onnx_bytes, translator, inputs,
+                candidate['computation_order'],
+                candidate['compiler_kwargs'], num_runs)
+        except Exception as e:
+            warnings.warn('Failed to run %s %s: %s' %
+                          (candidate['computation_order'],
+                           candidate['compiler_kwargs'], e))
+            continue
+        if best is None or candidate['elapsed'] < best['elapsed']:
+            best = candidate
+    if best is None:
+        raise RuntimeError('No computation order could run')
+
+    _store_schedule(cache_dir, key, best)
+    return best
@@ -18,34 +18,36 @@ import types
 import chainer
 import numpy
 
-from chainer_compiler.ch2o.test_args import dprint
+from chainer_compiler.ch2o.test_args import dprint, dprint_enabled
 from chainer_compiler.ch2o.env import Env
 from chainer_compiler.ch2o.utils import new_tensor, new_sequence, clip_head, ValueReturn, istensor, totensor, make_graph
 from chainer_compiler.ch2o.links import Link2NodeClass
 from chainer_compiler.ch2o.funcs import Func, Func2NodeClass, Function_Concat, Function_Dummy, castto
 from chainer_compiler.ch2o.builtin_funcs import builtin_functions
 from chainer_compiler.ch2o.value import Value
+from chainer_compiler.source_cache import source_cache
 
 import builtins
 
 
-id2name_list = []
+# Names of links keyed by their ids.
+id2name_dict = {}
 
 
 def init_id2name(ch):
-    global id2name_list
-    id2name_list = []
+    global id2name_dict
+    id2name_dict = {}
     for k, v in ch.namedlinks():
         # print('add link',k,v,id(v))
-        id2name_list.append((id(v), k))
+        id2name_dict.setdefault(id(v), k)
 
 
 def id2name(nid):
     # print('nid',nid)
-    for k, v in id2name_list:
-        if k == nid:
-            return v
-    raise Exception("Not Found ID ", nid)
+    name = id2name_dict.get(nid)
+    if name is None:
+        raise Exception("Not Found ID ", nid)
+    return name
 
 
 def _value(v):
@@ -96,12 +98,17 @@ class Function_base(object):
             return v.value
 
 
+def parse_function(func):
+    # The result is cached by source_cache and must not be modified.
+    src = clip_head(inspect.getsource(func))
+    dprint(src)
+    return gast.ast_to_gast(ast.parse(src)).body[0]
+
+
 class User_Defined_Function(Function_base):
     def __init__(self, func):
         self.func = func
-        src = clip_head(inspect.getsource(func))
-        dprint(src)
-        self.ast = gast.ast_to_gast(ast.parse(src)).body[0]
+        self.ast = source_cache.get(func, parse_function)
         assert(isinstance(self.ast, gast.gast.FunctionDef))
 
     def call(self, args, kwargs, env):
@@ -112,9 +119,7 @@ class User_Defined_Function(Function_base):
 class User_Defined_Func_In_Link(Function_base):
     def __init__(self, ch, fn):
         self.ch = ch
-        src = clip_head(inspect.getsource(fn))
-        dprint(src)
-        self.ast = gast.ast_to_gast(ast.parse(src)).body[0]
+        self.ast = source_cache.get(fn, parse_function)
         assert(isinstance(self.ast, gast.gast.FunctionDef))
 
     def call(self, args, kwargs, env):
@@ -125,9 +130,7 @@ class User_Defined_Func_In_Link(Function_base):
 
 class User_Defined_Link(object):
     def __init__(self, ch, env):
-        src = clip_head(inspect.getsource(ch.forward))
-        dprint(src)
-        self.ast = gast.ast_to_gast(ast.parse(src)).body[0]
+        self.ast = source_cache.get(ch.forward, parse_function)
 
         self.call = User_Defined_Func_In_Link(ch, ch.forward).call
 
@@ -252,7 +255,10 @@ def _find_in_out(localenv, env):
         k = attr_id(var, key)
         out_attrs[k] = (value, (var, key))
 
-    for k in set(list(in_attrs.keys()) + list(out_attrs.keys())):
+    # Keep the order of first accesses so exports do not depend on hashes
+    # of the keys.
+    for k in list(in_attrs.keys()) + [k for k in out_attrs.keys()
+                                      if k not in in_attrs]:
         iv = in_attrs.get(k, None)
         ov, setattr_info = out_attrs.get(k, (None, None))
         in_out[k] = (iv, ov, setattr_info)
@@ -285,7 +291,10 @@ def eval_if(nast, env):
 
     then_in_out = _find_in_out(then_env, env)
     else_in_out = _find_in_out(else_env, env)
-    keys = set(list(then_in_out.keys()) + list(else_in_out.keys()))
+    # Variables used in then are followed by ones only in else, so the
+    # inputs and outputs of If do not depend on hashes of the names.
+    keys = list(then_in_out.keys()) + [k for k in else_in_out.keys()
+                                       if k not in then_in_out]
 
     input_values = []
     then_outputs = []
@@ -926,11 +935,8 @@ _eval_ast_depth = 0
 
 
 def eval_ast(nast, env):
-    for k, v in env.get_var_dict().items():
-        assert not isinstance(v, onnx.ValueInfoProto), '%s %s' % (k, v)
-
     global _eval_ast_depth
-    if not isinstance(nast, list):
+    if not isinstance(nast, list) and dprint_enabled():
         dprint('-' * _eval_ast_depth, gast.dump(nast), env.get_var_dict().keys())
 
     _eval_ast_depth += 1
@@ -1009,10 +1015,13 @@ def eval_ast_impl(nast, env):
         try:
             return env.get_var(nast.id)
         except NameError as ne:
-            if nast.id in dir(env.module):
-                return getattr(env.module, nast.id)
-            elif nast.id in dir(builtins):
-                return getattr(builtins, nast.id)
+            # Look up namespaces of modules instead of building `dir`.
+            namespace = vars(env.module)
+            if nast.id in namespace:
+                return namespace[nast.id]
+            namespace = vars(builtins)
+            if nast.id in namespace:
+                return namespace[nast.id]
             raise
     elif isinstance(nast, gast.Constant):
         return nast.value
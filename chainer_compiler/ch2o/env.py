@@ -2,7 +2,9 @@
 
 import collections
 import os
+import sys
 import traceback
+import weakref
 
 import numpy as np
 import onnx
@@ -13,22 +15,84 @@ from chainer_compiler.ch2o.utils import new_tensor, new_sequence
 
 from chainer_compiler.ch2o import value
 
+# How much of the Python stack is recorded into `doc_string` of ONNX
+# nodes. 'off' records nothing, 'cheap' records the innermost three
+# frames and 'full' records all frames with their source lines.
+PROVENANCE_MODES = ('off', 'cheap', 'full')
+
+_PROVENANCE_ENV = 'CHAINER_COMPILER_CH2O_PROVENANCE'
+
+# The mode set by `set_provenance`. `None` means it is read from the
+# environment variable when a node is added for the first time.
+_provenance = None
+
+
+def _check_provenance(mode, source):
+    if mode not in PROVENANCE_MODES:
+        raise ValueError('Invalid provenance mode %r from %s (expected one '
+                         'of %s)' % (mode, source, ', '.join(PROVENANCE_MODES)))
+    return mode
+
+
+def set_provenance(mode):
+    global _provenance
+    _provenance = _check_provenance(mode, 'set_provenance')
+
+
+def get_provenance():
+    global _provenance
+    if _provenance is None:
+        _provenance = _check_provenance(
+            os.getenv(_PROVENANCE_ENV, 'cheap'), _PROVENANCE_ENV)
+    return _provenance
+
+
+# TODO(hamaji): Use parsing context instead of CH2O codebase.
+_SKIP_NAMES = set(['_get_trace_str', 'addnode', 'calc', 'calc_seq',
+                   'totensor', 'to_tensor', 'to_sequence', 'to_value_info'])
+
+# Cache of 'name:filename' keyed by code objects. Entries are dropped
+# with their functions.
+_code_locations = weakref.WeakKeyDictionary()
+
+
+def _get_code_location(code):
+    location = _code_locations.get(code)
+    if location is None:
+        location = '%s:%s' % (code.co_name, os.path.basename(code.co_filename))
+        _code_locations[code] = location
+    return location
+
+
 def _get_trace_str():
-    # TODO(hamaji): Use parsing context instead of CH2O codebase.
-    skip_names = set(['_get_trace_str', 'addnode', 'calc', 'calc_seq',
-                      'totensor', 'to_tensor', 'to_sequence', 'to_value_info'])
+    provenance = get_provenance()
+    if provenance == 'off':
+        return ''
+
+    if provenance == 'full':
+        trace = []
+        for stack in reversed(traceback.extract_stack()):
+            if stack.name in _SKIP_NAMES:
+                continue
+            trace.append('%s:%s:%d %s' %
+                         (stack.name,
+                          os.path.basename(stack.filename),
+                          stack.lineno,
+                          stack.line))
+        return '\n'.join(trace)
+
     trace = []
-    for stack in reversed(traceback.extract_stack()):
-        if stack.name in skip_names:
-            continue
-        trace.append('%s:%s:%d' %
-                     (stack.name,
-                      os.path.basename(stack.filename),
-                      stack.lineno))
-        if len(trace) == 3:
-            break
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name not in _SKIP_NAMES:
+            trace.append('%s:%d' % (_get_code_location(code), frame.f_lineno))
+            if len(trace) == 3:
+                break
+        frame = frame.f_back
     return ' '.join(trace)
 
+
 class Env(object):
     def __init__(self, module):
         # Local variables keyed by their names. When a value is an
@@ -53,25 +117,37 @@ class Env(object):
         self.restore_funcs = []  # User定義Linkの初期化子を正常化させるやつ
         self.module = module
         self.outer_block = None
+        self._root = self
 
     def get_var(self, k):
         if k in self._vars:
             return self._vars[k]
 
-        if self.outer_block is None:
+        # Find the innermost block which has `k`, and then record it
+        # in the blocks between so they know it comes from outside.
+        blocks = [self]
+        block = self.outer_block
+        while block is not None and k not in block._vars:
+            blocks.append(block)
+            block = block.outer_block
+        if block is None:
             raise NameError("name '%s' is not defined" % k)
 
-        var = self.outer_block.get_var(k)
+        var = block._vars[k]
         if isinstance(var, value.Value):
             # Convert literals to tensors in outer scope.
-            var.to_value_info(self.outer_block)
-        self._vars[k] = var
+            var.to_value_info(block)
+        for b in blocks:
+            b._vars[k] = var
         return var
 
     def set_var(self, k, v):
+        assert not isinstance(v, onnx.ValueInfoProto), '%s %s' % (k, v)
         self._vars[k] = v
 
     def update_vars(self, d):
+        for k, v in d.items():
+            assert not isinstance(v, onnx.ValueInfoProto), '%s %s' % (k, v)
         self._vars.update(d)
 
     def pop_var(self, k):
@@ -88,14 +164,12 @@ class Env(object):
         return res
 
     def root(self):
-        env = self
-        while env.outer_block is not None:
-            env = env.outer_block
-        return env
+        return self._root
 
     def new_block(self):
         block = Env(self.module)
         block.outer_block = self
+        block._root = self._root
         return block
 
     def addnode(self, *args, **kwargs):
@@ -19,10 +19,21 @@ def get_test_args(args=None):
                         help='Show less messages.')
     parser.add_argument('--allow-unused-params', action='store_true',
                         help='Allow unused parameters.')
+    parser.add_argument('--external-data', action='store_true',
+                        help='Store weights in model.onnx.data which is '
+                        'memory-mapped by the runtime.')
+    parser.add_argument('--provenance', choices=['off', 'cheap', 'full'],
+                        default=None,
+                        help='How much of the Python stack is recorded '
+                        'into doc_string of ONNX nodes.')
     _args_cache = parser.parse_args(args=args)
     return _args_cache
 
 
+def dprint_enabled():
+    return _args_cache is not None and not get_test_args().quiet
+
+
 def dprint(*v):
-    if _args_cache is not None and not get_test_args().quiet:
+    if dprint_enabled():
         print(*v)
@@ -10,6 +10,8 @@ import types
 import numpy as np
 import chainer
 
+from chainer_compiler import external_data as external_data_
+from chainer_compiler.ch2o import env
 from chainer_compiler.ch2o.chainer2onnx import compile_model
 from chainer_compiler.ch2o.test_args import get_test_args
 from chainer_compiler.ch2o.test_args import dprint
@@ -109,11 +111,15 @@ _seen_subnames = set()
 
 def generate_testcase(model, orig_xs,
                       subname=None, output_dir=None,
-                      backprop=False, use_gpu=False):
+                      backprop=False, use_gpu=False,
+                      external_data=False):
     xs = copy.deepcopy(orig_xs)
     if output_dir is None:
         args = get_test_args()
         output_dir = args.output
+        external_data |= args.external_data
+        if args.provenance is not None:
+            env.set_provenance(args.provenance)
 
         if backprop:
             output_dir = output_dir + '_backprop'
@@ -192,5 +198,9 @@ def generate_testcase(model, orig_xs,
         outputs,
         os.path.join(output_dir, 'test_data_set_0'))
 
-    with open(os.path.join(output_dir, 'model.onnx'), 'wb') as fp:
-        fp.write(onnxmod.SerializeToString())
+    model_path = os.path.join(output_dir, 'model.onnx')
+    if external_data:
+        external_data_.save_model(onnxmod, model_path)
+    else:
+        with open(model_path, 'wb') as fp:
+            fp.write(onnxmod.SerializeToString())
@@ -1,8 +1,17 @@
 import chainer
 import chainerx
+import concurrent.futures
+import functools
+import numpy
+import onnx
 import os
 import sys
 import tempfile
+import threading
+
+from chainer_compiler import compile_cache
+from chainer_compiler import external_data
+from chainer_compiler import program_cache
 
 try:
     from chainer_compiler import _chainer_compiler_core
@@ -28,6 +37,11 @@ except ImportError:
     cupy = None
 
 
+# Compiler flags set by `configure` are global so compilations in
+# different threads must not interleave.
+_compile_lock = threading.Lock()
+
+
 def _is_array(v):
     return not isinstance(v, (list, tuple, range, dict))
 
@@ -74,86 +88,301 @@ def _unflatten(xs, tmpl, i=0):
     return type(tmpl)(o), i
 
 
+def _send(v, device):
+    """Returns the array of ChxVMVar `v` on `device`.
+
+    Arrays for CPU are NumPy views which share the memory with `v`.
+    """
+    if isinstance(device, chainer.backend.CpuDevice):
+        return v.numpy()
+    return device.send(v.array())
+
+
 def _from_var(v, device):
     if v.is_array():
-        return device.send(v.array())
+        return _send(v, device)
     return [_from_var(x, device) for x in v.sequence()]
 
 
+def _describe(xs, flat):
+    """Appends arrays in nested `xs` to `flat` and returns its structure.
+
+    The structure is `None` for an array, a pair of the type and the
+    length for a list or a tuple of arrays, and a pair of the type and a
+    tuple of structures of its elements otherwise.
+    """
+    if _is_array(xs):
+        flat.append(xs)
+        return None
+    for x in xs:
+        if not _is_array(x):
+            break
+    else:
+        flat.extend(xs)
+        return type(xs), len(xs)
+    return type(xs), tuple(_describe(x, flat) for x in xs)
+
+
+def _from_var_flat(v, device, flat):
+    """Same as `_from_var` but appends arrays to `flat`.
+
+    Returns the structure of the value as `_describe` does.
+    """
+    if v.is_array():
+        flat.append(_send(v, device))
+        return None
+    if isinstance(device, chainer.backend.CpuDevice):
+        seq = v.sequence()
+        if all(x.is_array() for x in seq):
+            flat.extend(x.numpy() for x in seq)
+            return list, len(seq)
+        return list, tuple(_from_var_flat(x, device, flat) for x in seq)
+    arrays = v.sequence_arrays()
+    if arrays is not None:
+        flat.extend(device.send(a) for a in arrays)
+        return list, len(arrays)
+    return list, tuple(_from_var_flat(x, device, flat) for x in v.sequence())
+
+
+def _structure_size(structure):
+    if structure is None:
+        return 1
+    elems = structure[1]
+    if isinstance(elems, int):
+        return elems
+    return sum(_structure_size(s) for s in elems)
+
+
+def _build(structure, flat, i):
+    """Builds a nested object of `structure` from `flat[i:]`."""
+    if structure is None:
+        return flat[i], i + 1
+    typ, elems = structure
+    if isinstance(elems, int):
+        o = flat[i:i + elems]
+        if type(o) is not typ:
+            o = typ(o)
+        return o, i + elems
+    o = []
+    for s in elems:
+        x, i = _build(s, flat, i)
+        o.append(x)
+    return typ(o), i
+
+
+class _StructurePlan(object):
+    """Flat indices of elements of a nested structure of arrays.
+
+    A plan is compiled once per structure (see `_describe`) so inputs and
+    outputs are marshalled without walking their templates on each call.
+    """
+
+    def __init__(self, structure):
+        elems = structure[1]
+        if isinstance(elems, int):
+            elems = (None,) * elems
+        self.size = 0
+        # Tuples of the start and stop indices in flat values and the
+        # structure of each element.
+        self.items = []
+        for s in elems:
+            n = _structure_size(s)
+            self.items.append((self.size, self.size + n, s))
+            self.size += n
+
+    def unflatten(self, flat):
+        assert len(flat) == self.size
+        return [flat[start] if s is None else _build(s, flat, start)[0]
+                for start, _, s in self.items]
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_plan(structure):
+    return _StructurePlan(structure)
+
+
+class _ParamBinder(object):
+    """Keeps parameters bound to a ChxVM as persistent inputs.
+
+    A parameter is converted to a ChxVMVar only when its array object
+    changes (e.g., by `to_device`). As the ChxVMVar shares memory with the
+    parameter, in-place updates by optimizers are seen by the ChxVM without
+    re-binding.
+    """
+
+    def __init__(self, chxvm, param_names):
+        self.chxvm = chxvm
+        self.param_names = param_names
+        self.bound_arrays = [None] * len(param_names)
+        self.bound_devices = [None] * len(param_names)
+        self.chainerx_device_name = None
+
+    def bind(self, param_values):
+        assert len(self.param_names) == len(param_values)
+        updated = {}
+        for i, (name, value) in enumerate(zip(self.param_names,
+                                               param_values)):
+            if value is self.bound_arrays[i]:
+                continue
+            v = chainer.backend.to_chx(value)
+            updated[name] = _chainer_compiler_core.value(v)
+            self.bound_arrays[i] = value
+            self.bound_devices[i] = v.device
+        if not updated:
+            return
+        devices = set(self.bound_devices)
+        assert len(devices) == 1, devices
+        self.chainerx_device_name = devices.pop()
+        self.chxvm.bind_inputs(updated)
+
+
+class _Program(object):
+    """A pair of forward and backward ChxVMs compiled from one graph."""
+
+    def __init__(self, entry, fwd, bwd):
+        self.fwd = fwd
+        self.bwd = bwd
+        self.fwd_output_names = entry['fwd_output_names']
+        self.bwd_input_names = entry['bwd_input_names']
+        self.bwd_output_names = entry['bwd_output_names']
+        self.param_binder = _ParamBinder(fwd, entry['param_names'])
+        self.nbytes = (len(entry.get('fwd_program', b'')) +
+                       len(entry.get('bwd_program', b'')))
+
+
+def _specialize_inputs(xmodel, input_names, signature):
+    """Sets shapes and dtypes of inputs in an ONNX model in place.
+
+    Types of other values are cleared as they were inferred from the
+    inputs at the export and may contradict the new shapes.
+    """
+    import numpy as np
+    from onnx import mapping
+    inputs = {i.name: i for i in xmodel.graph.input}
+    for name, sig in zip(input_names, signature):
+        if sig is None:
+            continue
+        shape, dtype = sig
+        tensor_type = inputs[name].type.tensor_type
+        tensor_type.elem_type = mapping.NP_TYPE_TO_TENSOR_TYPE[np.dtype(dtype)]
+        tensor_type.ClearField('shape')
+        for d in shape:
+            tensor_type.shape.dim.add().dim_value = d
+    del xmodel.graph.value_info[:]
+    for output in xmodel.graph.output:
+        output.type.tensor_type.ClearField('shape')
+
+
 class RunCompiledModel(chainer.function_node.FunctionNode):
 
-    def __init__(self, compiled_model, input_tmpl, runtime_kwargs):
+    def __init__(self, compiled_model, program, input_plan, runtime_kwargs):
         self.fwd_input_names = compiled_model.fwd_input_names
-        self.fwd_output_names = compiled_model.fwd_output_names
-        self.bwd_input_names = compiled_model.bwd_input_names
-        self.bwd_output_names = compiled_model.bwd_output_names
+        self.fwd_output_names = program.fwd_output_names
+        self.bwd_input_names = program.bwd_input_names
+        self.bwd_output_names = program.bwd_output_names
         self.param_names = compiled_model.param_names
-        self.fwd = compiled_model.fwd
-        self.bwd = compiled_model.bwd
+        self.param_binder = program.param_binder
+        self.fwd = program.fwd
+        self.bwd = program.bwd
         self.num_outputs = len(compiled_model.orig_output_names)
-        self.input_tmpl = input_tmpl
-        self.num_inputs = len(_flatten(input_tmpl))
+        self.input_plan = input_plan
+        self.num_inputs = input_plan.size
+        self.output_plan = None
         self.chainerx_device_name = None
         self.runtime_kwargs = runtime_kwargs
 
+    def _to_chx(self, v):
+        if isinstance(v, chainer.Variable):
+            v = v.array
+        v = chainer.backend.to_chx(v)
+        if self.chainerx_device_name is None:
+            self.chainerx_device_name = v.device
+        else:
+            assert self.chainerx_device_name == v.device
+        return v
+
+    def _to_value(self, v):
+        """Converts an array into a ChxVMVar.
+
+        NumPy arrays are wrapped without copying.
+        """
+        if isinstance(v, chainer.Variable):
+            v = v.array
+        if not isinstance(v, numpy.ndarray):
+            return _chainer_compiler_core.value(self._to_chx(v))
+        device = chainerx.get_device('native', 0)
+        if self.chainerx_device_name is None:
+            self.chainerx_device_name = device
+        else:
+            assert self.chainerx_device_name == device
+        return _chainer_compiler_core.value_from_numpy(v)
+
     def _to_var(self, v):
         if _is_array(v):
-            if isinstance(v, chainer.Variable):
-                v = v.array
-            v = chainer.backend.to_chx(v)
-            if self.chainerx_device_name is None:
-                self.chainerx_device_name = v.device
-            else:
-                assert self.chainerx_device_name == v.device
-            return _chainer_compiler_core.value(v)
+            return self._to_value(v)
         return _chainer_compiler_core.value([self._to_var(a) for a in v])
 
+    def _to_vars(self, plan, flat):
+        """Converts elements of `plan` in `flat` into ChxVMVars.
+
+        A list of device arrays is passed to the runtime by a single call
+        and a list of NumPy arrays is wrapped without copying.
+        """
+        core = _chainer_compiler_core
+        vs = []
+        for start, stop, s in plan.items:
+            if s is None:
+                vs.append(self._to_value(flat[start]))
+            elif isinstance(s[1], int):
+                xs = flat[start:stop]
+                if xs and all(isinstance(x, numpy.ndarray) for x in xs):
+                    vs.append(core.value([self._to_value(x) for x in xs]))
+                else:
+                    vs.append(core.sequence_value(
+                        [self._to_chx(x) for x in xs]))
+            else:
+                vs.append(self._to_var(_build(s, flat, start)[0]))
+        return vs
+
     def forward(self, args):
         flat_inputs = args[:self.num_inputs]
         param_values = args[self.num_inputs:]
         device = chainer.backend.get_device_from_array(*flat_inputs)
-        inputs, i = _unflatten(flat_inputs, self.input_tmpl)
-        assert i == len(flat_inputs)
 
-        entire_inputs = {}
-        assert len(self.fwd_input_names) == len(inputs)
-        for name, value in zip(self.fwd_input_names, inputs):
-            entire_inputs[name] = self._to_var(value)
-        assert len(self.param_names) == len(param_values)
-        for name, value in zip(self.param_names, param_values):
-            entire_inputs[name] = self._to_var(value)
+        assert len(self.fwd_input_names) == len(self.input_plan.items)
+        entire_inputs = dict(zip(self.fwd_input_names,
+                                 self._to_vars(self.input_plan, flat_inputs)))
+        # Parameters are passed as inputs bound to `self.fwd`.
+        self.param_binder.bind(param_values)
+        param_device_name = self.param_binder.chainerx_device_name
+        if self.chainerx_device_name is None:
+            self.chainerx_device_name = param_device_name
+        elif param_device_name is not None:
+            assert self.chainerx_device_name == param_device_name
 
         with chainer.using_device(self.chainerx_device_name):
             outputs = self.fwd.run(entire_inputs, **self.runtime_kwargs)
-        outputs_and_retained = []
-        for name in self.fwd_output_names:
-            outputs_and_retained.append(outputs[name])
-
-        self.retained = outputs_and_retained[self.num_outputs:]
-        # TODO(hamaji): Do not hold actual arrays.
-        self.nested_outputs = []
-        for output in outputs_and_retained[:self.num_outputs]:
-            self.nested_outputs.append(_from_var(output, device))
-        flat_outputs = _flatten(self.nested_outputs)
+
+        self.retained = [outputs[name]
+                         for name in self.fwd_output_names[self.num_outputs:]]
+        flat_outputs = []
+        structures = tuple(
+            _from_var_flat(outputs[name], device, flat_outputs)
+            for name in self.fwd_output_names[:self.num_outputs])
+        self.output_plan = _get_plan((list, structures))
         return tuple(flat_outputs)
 
     def unflatten_outputs(self, flat_outputs):
-        outputs, _ = _unflatten(flat_outputs, self.nested_outputs)
-        return outputs
+        return self.output_plan.unflatten(flat_outputs)
 
     def backward(self, indexes, flat_gys):
         device = chainer.backend.get_device_from_array(flat_gys[0].array)
-        gys, _ = _unflatten(flat_gys, self.nested_outputs)
-        gys = [self._to_var(gy) for gy in gys]
-        values = gys + self.retained
+        values = self._to_vars(self.output_plan, flat_gys) + self.retained
 
         del self.retained
-        del self.nested_outputs
 
-        inputs = {}
         assert len(self.bwd_input_names) == len(values)
-        for name, value in zip(self.bwd_input_names, values):
-            inputs[name] = value
+        inputs = dict(zip(self.bwd_input_names, values))
 
         state = self.bwd.prepare(inputs, **self.runtime_kwargs)
         del inputs
@@ -161,18 +390,22 @@ class RunCompiledModel(chainer.function_node.FunctionNode):
         with chainer.using_device(self.chainerx_device_name):
             outputs = self.bwd.run(state)
         gxs = []
-        assert len(self.input_tmpl) == len(self.fwd_input_names)
-        for name, tmpl in zip(self.fwd_input_names, self.input_tmpl):
-            grad_name = 'grad_out@' + name
-            if grad_name in outputs:
-                gx = _from_var(outputs[grad_name], device)
-                if _is_array(tmpl):
-                    gxs.append(gx)
-                else:
-                    assert len(gx) == len(tmpl)
-                    gxs.extend(_flatten_structured(gx, tmpl))
+        for name, (start, stop, s) in zip(self.fwd_input_names,
+                                          self.input_plan.items):
+            grad = outputs.get('grad_out@' + name)
+            if grad is None:
+                gxs.extend([None] * (stop - start))
+            elif s is None:
+                gxs.append(_send(grad, device))
+            elif isinstance(s[1], int):
+                num_gxs = len(gxs)
+                _from_var_flat(grad, device, gxs)
+                assert len(gxs) - num_gxs == stop - start
             else:
-                gxs.extend([None] * len(_flatten(tmpl)))
+                tmpl, _ = _build(s, [0] * (stop - start), 0)
+                gx = _from_var(grad, device)
+                assert len(gx) == len(tmpl)
+                gxs.extend(_flatten_structured(gx, tmpl))
 
         for name in self.param_names:
             grad_name = 'grad_out@' + name
@@ -186,39 +419,122 @@ class RunCompiledModel(chainer.function_node.FunctionNode):
         return gxs
 
 
-def export(model, inputs, filename=None, translator='onnx_chainer'):
+def _export_proto(model, inputs, translator):
     if translator == 'ch2o':
         from chainer_compiler import ch2o
-        xmodel = ch2o.compile_model(model, inputs)
-        if filename is None:
-            f = tempfile.NamedTemporaryFile(delete=False)
-        else:
-            f = open(filename, 'wb')
-        f.write(xmodel.SerializeToString())
-        f.close()
-        del xmodel
+        return ch2o.compile_model(model, inputs)
     elif translator == 'onnx_chainer':
         import onnx_chainer
-        if filename is None:
-            f = tempfile.NamedTemporaryFile(delete=False)
-        else:
-            f = open(filename, 'wb')
-        onnx_chainer.export(model, inputs, filename=f)
-        f.close()
+        return onnx_chainer.export(model, inputs)
     else:
         raise NotImplementedError('Unsupported translator:',
                                   translator)
 
+
+def export(model, inputs, filename=None, translator='onnx_chainer',
+           external_data=False):
+    xmodel = _export_proto(model, inputs, translator)
+    if filename is None:
+        f = tempfile.NamedTemporaryFile(delete=False)
+    else:
+        f = open(filename, 'wb')
+    if external_data:
+        # Weights go to `f.name + '.data'` which the runtime mmaps.
+        f.close()
+        from chainer_compiler import external_data as external_data_
+        external_data_.save_model(xmodel, f.name)
+    else:
+        f.write(xmodel.SerializeToString())
+        f.close()
+    del xmodel
+
     return f.name
 
 
+def _strip_initializers(xmodel, names):
+    """Removes initializers in `names` from an ONNX model in place.
+
+    The corresponding graph inputs are kept (or added) so the compiler still
+    sees them as inputs whose values are bound at runtime.
+    """
+    from onnx import helper
+    input_names = set(i.name for i in xmodel.graph.input)
+    kept = []
+    stripped = set()
+    for tensor in xmodel.graph.initializer:
+        if tensor.name not in names:
+            kept.append(tensor)
+            continue
+        if tensor.name not in input_names:
+            xmodel.graph.input.extend([helper.make_tensor_value_info(
+                tensor.name, tensor.data_type, tensor.dims)])
+        stripped.add(tensor.name)
+    del xmodel.graph.initializer[:]
+    xmodel.graph.initializer.extend(kept)
+    return stripped
+
+
+def _copy_fields(dst, src, skip):
+    """Copies fields of a protobuf message except the field `skip`."""
+    for field, value in src.ListFields():
+        if field.name == skip:
+            continue
+        if field.label == field.LABEL_REPEATED:
+            getattr(dst, field.name).extend(value)
+        elif field.message_type is not None:
+            getattr(dst, field.name).CopyFrom(value)
+        else:
+            setattr(dst, field.name, value)
+
+
+def _copy_without_weights(xmodel, names):
+    """Returns a copy of an ONNX model for `_strip_initializers`.
+
+    Initializers in `names` are copied without their data, so weights of
+    `xmodel` are not duplicated.
+    """
+    copied = onnx.ModelProto()
+    _copy_fields(copied, xmodel, skip='graph')
+    _copy_fields(copied.graph, xmodel.graph, skip='initializer')
+    for tensor in xmodel.graph.initializer:
+        if tensor.name in names:
+            copied.graph.initializer.extend([onnx.helper.make_tensor(
+                tensor.name, tensor.data_type, tensor.dims, [])])
+        else:
+            copied.graph.initializer.extend([tensor])
+    return copied
+
+
 class CompiledModel(chainer.Chain):
 
     def __init__(self, model, onnx_file, used_translator, dump_onnx=False,
                  computation_order=None,
                  compiler_kwargs=None,
                  runtime_kwargs=None,
-                 quiet_period=0):
+                 quiet_period=0,
+                 cache_dir=None,
+                 program_cache_size=0,
+                 program_cache_bytes=None,
+                 async_specialization=True,
+                 profiler=None,
+                 strip_in_place=False):
+        """Compiles `onnx_file` for `model`.
+
+        When `program_cache_size` is positive, programs specialized for
+        shapes and dtypes of inputs are compiled with shape inference and
+        kept in an LRU cache of at most `program_cache_size` programs
+        whose serialized size is at most `program_cache_bytes` in total.
+        A program for new input shapes is compiled in a background thread
+        if `async_specialization` is true, and the generic program runs
+        until it is ready. Callers with variable-length inputs should pad
+        them to a few buckets of shapes to make the cache effective.
+
+        `profiler` is a `profiler.Profiler` which samples runs of the
+        forward and backward programs.
+
+        If `strip_in_place` is true, initializers of parameters are
+        removed from an in-memory `onnx_file` itself instead of its copy.
+        """
         super(CompiledModel, self).__init__()
         with self.init_scope():
             self.mc = model
@@ -228,20 +544,189 @@ class CompiledModel(chainer.Chain):
         self.compiler_kwargs = compiler_kwargs
         self.runtime_kwargs = runtime_kwargs
         self.quiet_period = quiet_period
+        self.profiler = profiler
         self.num_iterations = 0
+        self.cache_dir = compile_cache.get_cache_dir(cache_dir)
+        self.strip_in_place = strip_in_place
 
         self.param_names = None
         self.param_values = None
+        self.program_cache = None
+        if program_cache_size > 0:
+            executor = None
+            if async_specialization:
+                executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1)
+            self.program_cache = program_cache.ProgramCache(
+                program_cache_size, program_cache_bytes, executor)
         # Propagate device from `model` before compiling it.
         self.to_device(model.device)
         self.compile(onnx_file)
 
     def compile(self, onnx_file):
+        """Compiles an ONNX model.
+
+        `onnx_file` is either a path to an ONNX file or an in-memory
+        `onnx.ModelProto`. For the latter, initializers of parameters which
+        are bound from `self.mc.namedparams()` are removed before the proto
+        is handed to the compiler, so weights are never serialized. They
+        are removed from a copy of the proto unless `strip_in_place`.
+        """
+        onnx_bytes = None
+        self.external_param_names = set()
+        if not isinstance(onnx_file, str):
+            # The gradient with computation order finds parameters by
+            # their initializers so we cannot strip them in that case.
+            if self.computation_order is None:
+                params = set(self._model_params())
+                if not self.strip_in_place:
+                    onnx_file = _copy_without_weights(onnx_file, params)
+                self.external_param_names = _strip_initializers(
+                    onnx_file, params)
+
+        # The model is kept to specialize it for input shapes later.
+        self._onnx_file = onnx_file if isinstance(onnx_file, str) else None
+        # Relative locations of external data are resolved from the
+        # directory of the ONNX file, or from the current directory for
+        # an in-memory model.
+        self._onnx_base_dir = None
+        if self._onnx_file is not None:
+            self._onnx_base_dir = os.path.dirname(os.path.abspath(onnx_file))
+        # The model refers to weights in external data files by their
+        # locations, so the files must be a part of cache keys. The
+        # specialized models refer to the same files.
+        self._external_data_files = None
+        if self.cache_dir is not None:
+            if self._onnx_file is None:
+                xmodel = onnx_file
+            else:
+                xmodel = onnx.load(onnx_file, load_external_data=False)
+            self._external_data_files = external_data.external_data_files(
+                xmodel, self._onnx_base_dir)
+            del xmodel
+        if self._onnx_file is None:
+            onnx_bytes = onnx_file.SerializeToString()
+        self._onnx_bytes = None
+        if self.program_cache is not None:
+            self._onnx_bytes = onnx_bytes
+
+        with _compile_lock:
+            entry, initializers, program = self._load_program(
+                onnx_file, onnx_bytes, skip_inference=True)
+        del onnx_bytes
+        self.program = program
+        self.fwd = program.fwd
+        self.bwd = program.bwd
+
+        self.orig_output_names = entry['orig_output_names']
+        self.fwd_input_names = entry['fwd_input_names']
+        self.fwd_output_names = entry['fwd_output_names']
+        self.bwd_input_names = entry['bwd_input_names']
+        self.bwd_output_names = entry['bwd_output_names']
+        self.param_names = entry['param_names']
+
+        params = self._model_params()
+        self.param_values = []
+        for name in self.param_names:
+            if name in params:
+                self.param_values.append(params[name])
+            elif name in initializers:
+                # Retrieve the initial value from ONNX initializer
+
+                # TODO(hamaji): Emit `Constant` in onnx-chainer so we will not
+                # need this branch.
+                array = self.device.send(initializers[name])
+                self.param_values.append(array)
+            else:
+                raise NotImplementedError('Initial value is uknown: ' + name)
+        self.param_binder = program.param_binder
+
+    def _load_program(self, onnx_file, onnx_bytes, skip_inference):
+        """Loads a program from the compile cache or compiles it.
+
+        `onnx_bytes` is the serialized ONNX model or `None` to load it
+        from `onnx_file`.
+        """
         if self.compiler_kwargs is not None:
             _chainer_compiler_core.configure(**self.compiler_kwargs)
 
-        graph = _chainer_compiler_core.load(onnx_file)
-        self.orig_output_names = graph.output_names()
+        cache = None
+        entry = None
+        if self.cache_dir is not None:
+            cache = compile_cache.CompileCache(self.cache_dir)
+            if onnx_bytes is None:
+                with open(onnx_file, 'rb') as f:
+                    key_bytes = f.read()
+            else:
+                key_bytes = onnx_bytes
+            extra = [self.used_translator]
+            if not skip_inference:
+                extra.append('specialized')
+            extra.append(self._external_data_files)
+            cache_key = compile_cache.compute_key(
+                key_bytes, self.compiler_kwargs, self.computation_order,
+                *extra)
+            del key_bytes
+            entry = cache.load(cache_key)
+
+        if entry is not None:
+            self._configure_compiler(skip_inference)
+            fwd = _chainer_compiler_core.load_chxvm(entry['fwd_program'])
+            bwd = _chainer_compiler_core.load_chxvm(entry['bwd_program'])
+            initializers = entry['initializers']
+        else:
+            if onnx_bytes is None:
+                graph = _chainer_compiler_core.load(onnx_file)
+            else:
+                graph = _chainer_compiler_core.load_from_bytes(
+                    onnx_bytes, self._onnx_base_dir or '')
+            entry, initializers, fwd, bwd = self._compile_graph(
+                graph, skip_inference,
+                serialize=cache is not None or not skip_inference)
+            if cache is not None:
+                entry['initializers'] = {
+                    name: chainerx.to_numpy(array)
+                    for name, array in initializers.items()}
+                cache.store(cache_key, entry)
+        return entry, initializers, _Program(entry, fwd, bwd)
+
+    def _specialize(self, signature):
+        """Compiles a program for inputs of `signature`."""
+        if self._onnx_bytes is not None:
+            xmodel = onnx.load_model_from_string(self._onnx_bytes)
+        else:
+            # Weights in external data files stay there and are mapped
+            # by the runtime.
+            xmodel = onnx.load(self._onnx_file, load_external_data=False)
+        _specialize_inputs(xmodel, self.fwd_input_names, signature)
+        onnx_bytes = xmodel.SerializeToString()
+        del xmodel
+        with _compile_lock:
+            entry, _, program = self._load_program(
+                None, onnx_bytes, skip_inference=False)
+        assert entry['param_names'] == self.param_names, (
+            entry['param_names'], self.param_names)
+        return program, program.nbytes
+
+    def _configure_compiler(self, skip_inference=True):
+        # TODO(hamaji): Revive shape inference for the generic program.
+        compiler_kwargs = {'skip_inference': skip_inference}
+        if self.compiler_kwargs is not None:
+            compiler_kwargs.update(self.compiler_kwargs)
+        _chainer_compiler_core.configure(**compiler_kwargs)
+
+    def _split_inputs(self, graph):
+        input_names = []
+        param_names = graph.param_names()
+        for name in graph.input_names():
+            if name in self.external_param_names:
+                param_names.append(name)
+            else:
+                input_names.append(name)
+        return input_names, param_names
+
+    def _compile_graph(self, graph, skip_inference, serialize):
+        orig_output_names = graph.output_names()
 
         if self.computation_order is None:
             fwd_graph, bwd_graph = graph.backward_to(
@@ -259,21 +744,40 @@ class CompiledModel(chainer.Chain):
                              bwd_graph.dump() +
                              '\n=== ^^^ backward ^^^ ===\n')
 
-        # TODO(hamaji): Revive shape inference.
-        compiler_kwargs = {'skip_inference': True}
-        if self.compiler_kwargs is not None:
-            compiler_kwargs.update(self.compiler_kwargs)
-        _chainer_compiler_core.configure(**compiler_kwargs)
+        self._configure_compiler(skip_inference)
 
         assert graph.input_names() == fwd_graph.input_names()
-        self.fwd_input_names = fwd_graph.input_names()
-        self.fwd_output_names = fwd_graph.output_names()
-        self.bwd_input_names = bwd_graph.input_names()
-        self.bwd_output_names = bwd_graph.output_names()
-        self.fwd = fwd_graph.compile(skip_scheduling)
-        self.bwd = bwd_graph.compile(skip_scheduling)
-        self.param_names = fwd_graph.param_names()
+        fwd_input_names, _ = self._split_inputs(fwd_graph)
+        entry = {
+            'orig_output_names': orig_output_names,
+            'fwd_input_names': fwd_input_names,
+            'fwd_output_names': fwd_graph.output_names(),
+            'bwd_input_names': bwd_graph.input_names(),
+            'bwd_output_names': bwd_graph.output_names(),
+        }
+        if serialize:
+            # Keep the serialized programs so they can be stored in the
+            # compile cache.
+            entry['fwd_program'] = fwd_graph.compile_to_program(
+                skip_scheduling)
+            entry['bwd_program'] = bwd_graph.compile_to_program(
+                skip_scheduling)
+            fwd = _chainer_compiler_core.load_chxvm(entry['fwd_program'])
+            bwd = _chainer_compiler_core.load_chxvm(entry['bwd_program'])
+        else:
+            fwd = fwd_graph.compile(skip_scheduling)
+            bwd = bwd_graph.compile(skip_scheduling)
+        _, entry['param_names'] = self._split_inputs(fwd_graph)
+
+        params = self._model_params()
+        initializers = {}
+        fwd_chxvm_vars = fwd_graph.params()
+        for name in entry['param_names']:
+            if name not in params and name in fwd_chxvm_vars:
+                initializers[name] = fwd_chxvm_vars[name].array()
+        return entry, initializers, fwd, bwd
 
+    def _model_params(self):
         if self.used_translator == 'ch2o':
             convert_rule = lambda key: key  # noqa
         elif self.used_translator == 'onnx_chainer':
@@ -291,34 +795,31 @@ class CompiledModel(chainer.Chain):
                 key = convert_rule(link_name + '/' + avg_name)
                 assert key not in params
                 params[key] = getattr(link, avg_name)
-
-        self.param_values = []
-        fwd_chxvm_vars = fwd_graph.params()
-        for name in self.param_names:
-            if name in params:
-                self.param_values.append(params[name])
-            elif name in fwd_chxvm_vars:
-                # Retrieve the initial value from ONNX initializer
-
-                # TODO(hamaji): Emit `Constant` in onnx-chainer so we will not
-                # need this branch.
-                array = fwd_chxvm_vars[name].array()
-                array = self.device.send(array)
-                self.param_values.append(array)
-            else:
-                raise NotImplementedError('Initial value is uknown: ' + name)
+        return params
 
     def forward(self, *args):
         inputs = list(args)
-        flat_inputs = _flatten(inputs)
+        flat_inputs = []
+        input_plan = _get_plan(_describe(inputs, flat_inputs))
 
         runtime_kwargs = {}
         if (self.runtime_kwargs is not None and
             self.num_iterations % (self.quiet_period + 1) == 0):
             runtime_kwargs.update(self.runtime_kwargs)
+        if self.profiler is not None:
+            runtime_kwargs.update(self.profiler.runtime_kwargs())
         self.num_iterations += 1
 
-        runner = RunCompiledModel(self, inputs, runtime_kwargs)
+        program = self.program
+        if self.program_cache is not None:
+            signature = program_cache.input_signature(inputs)
+            if signature is not None:
+                specialized = self.program_cache.lookup(
+                    signature, lambda: self._specialize(signature))
+                if specialized is not None:
+                    program = specialized
+
+        runner = RunCompiledModel(self, program, input_plan, runtime_kwargs)
         outputs = runner.apply(flat_inputs + self.param_values)
         outputs = runner.unflatten_outputs(outputs)
         outputs = outputs[:len(self.orig_output_names)]
@@ -327,10 +828,24 @@ class CompiledModel(chainer.Chain):
         return outputs
 
 
-def compile(model, inputs, translator='ch2o', **kwargs):
-    # Run translator internally
-    onnx_file = export(model, inputs, filename=None, translator=translator)
-    compiled_model = CompiledModel(model, onnx_file, translator, **kwargs)
+def compile(model, inputs, translator='ch2o', memory_budget=None, **kwargs):
+    if kwargs.get('computation_order') == 'auto':
+        # Use the fastest computation order within `memory_budget`,
+        # which is tuned only once.
+        from chainer_compiler import autotune
+        assert memory_budget is not None, 'memory_budget is required'
+        schedule = autotune.autotune_computation_order(
+            model, inputs, memory_budget, translator=translator,
+            compiler_kwargs=kwargs.get('compiler_kwargs'),
+            cache_dir=kwargs.get('cache_dir'))
+        kwargs['computation_order'] = schedule['computation_order']
+        kwargs['compiler_kwargs'] = schedule['compiler_kwargs']
+
+    # Run translator internally and pass the ONNX model without writing it
+    # to a file.
+    xmodel = _export_proto(model, inputs, translator)
+    compiled_model = CompiledModel(model, xmodel, translator,
+                                   strip_in_place=True, **kwargs)
     return compiled_model
 
 
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy
+
+
+# Bump this when the layout of cache entries changes.
+_CACHE_FORMAT_VERSION = 2
+
+_DEFAULT_CACHE_DIR_ENV = 'CHAINER_COMPILER_CACHE_DIR'
+
+# Keys of arrays in a cache file. Others are initializers.
+_METADATA_KEY = 'metadata'
+_BYTES_KEY_PREFIX = 'bytes_'
+_INITIALIZER_KEY_PREFIX = 'initializer_'
+
+# The hash of `_chainer_compiler_core` computed in this process.
+_build_id = None
+
+
+def get_cache_dir(cache_dir=None):
+    if cache_dir is not None:
+        return cache_dir
+    return os.getenv(_DEFAULT_CACHE_DIR_ENV, None)
+
+
+def make_cache_dir(cache_dir):
+    """Creates `cache_dir` readable only by the user if it is missing."""
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+
+
+def _hash_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_id():
+    """Returns the identity of the built `_chainer_compiler_core`.
+
+    Cached programs are valid only for the compiler and the runtime
+    which produced them, so the hash of the shared object is used. The
+    package version is used when the shared object is not available.
+    """
+    global _build_id
+    if _build_id is None:
+        import chainer_compiler
+        from chainer_compiler import chainer_compiler as cc
+        core = getattr(cc, '_chainer_compiler_core', None)
+        path = getattr(core, '__file__', None)
+        if path is None:
+            _build_id = 'version-' + chainer_compiler.__version__
+        else:
+            _build_id = _hash_file(path)
+    return _build_id
+
+
+def compute_key(onnx_bytes, compiler_kwargs, computation_order, *extra):
+    h = hashlib.sha256()
+    for k in [str(_CACHE_FORMAT_VERSION),
+              build_id(),
+              repr(sorted((compiler_kwargs or {}).items())),
+              repr(computation_order)] + [repr(e) for e in extra]:
+        h.update(k.encode('utf-8'))
+        h.update(b'\0')
+    h.update(onnx_bytes)
+    return h.hexdigest()
+
+
+def _encode(entry):
+    """Encodes an entry into a dict of NumPy arrays."""
+    arrays = {}
+    metadata = {'bytes': [], 'initializers': []}
+    for key, value in entry.items():
+        if key == 'initializers':
+            for i, (name, array) in enumerate(sorted(value.items())):
+                metadata['initializers'].append(name)
+                arrays[_INITIALIZER_KEY_PREFIX + str(i)] = array
+        elif isinstance(value, bytes):
+            metadata['bytes'].append(key)
+            arrays[_BYTES_KEY_PREFIX + key] = numpy.frombuffer(
+                value, dtype=numpy.uint8)
+        else:
+            metadata[key] = value
+    arrays[_METADATA_KEY] = numpy.frombuffer(
+        json.dumps(metadata).encode('utf-8'), dtype=numpy.uint8)
+    return arrays
+
+
+def _decode(arrays):
+    metadata = json.loads(arrays[_METADATA_KEY].tobytes().decode('utf-8'))
+    entry = {}
+    for key in metadata.pop('bytes'):
+        entry[key] = arrays[_BYTES_KEY_PREFIX + key].tobytes()
+    entry['initializers'] = {
+        name: arrays[_INITIALIZER_KEY_PREFIX + str(i)]
+        for i, name in enumerate(metadata.pop('initializers'))}
+    entry.update(metadata)
+    return entry
+
+
+class CompileCache(object):
+    """A content-addressed on-disk cache of compiled ChxVM programs.
+
+    Each entry is an uncompressed `.npz` archive which holds serialized
+    forward and backward ChxVM programs, initializers and JSON metadata
+    such as the name lists needed to bind inputs, outputs and
+    parameters. Entries are loaded without unpickling so a cache
+    directory shared with others cannot run code. Entries are written to
+    a temporary file first and renamed so concurrent workers never see
+    partial files.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.chxvm_cache')
+
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        # Any broken or incompatible entry is a cache miss.
+        try:
+            with numpy.load(path, allow_pickle=False) as arrays:
+                entry = _decode(arrays)
+        except Exception:
+            return None
+        if entry.get('format_version') != _CACHE_FORMAT_VERSION:
+            return None
+        return entry
+
+    def store(self, key, entry):
+        make_cache_dir(self.cache_dir)
+        entry = dict(entry)
+        entry['format_version'] = _CACHE_FORMAT_VERSION
+        arrays = _encode(entry)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                numpy.savez(f, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -17,10 +17,18 @@ from chainer_compiler.elichika.parser import functions_builtin
 from chainer_compiler.elichika.parser import functions_ndarray
 from chainer_compiler.elichika.parser import utils
 from chainer_compiler.elichika.parser import functions_onnx
+from chainer_compiler.elichika.parser import context
+from chainer_compiler.elichika.parser import graph_optimizer
 
 import numpy as np
+import ast
 import collections
+import gast
 import inspect
+import sys
+import threading
+import types
+import typing
 
 from chainer_compiler.elichika import onnx_converters as oc
 from chainer_compiler.elichika import links_builtin as lb
@@ -33,6 +41,7 @@ class ONNXModel:
         self.model = None
         self.inputs = []
         self.outputs = []
+        self.context = None  # type: context.ExportContext
 
 def validate_args(func, converter):
     if len(inspect.signature(func).parameters) != len(converter.expected_args):
@@ -43,125 +52,311 @@ def validate_args(func, converter):
                 print("Warning : Function argument {} didn't match while registering {}".format(func_arg, func.__name__))
 
 
-def compile_model(model, inputs) -> 'ONNXModel':
-
-    oc.f_converter.clear()
-    oc.chainer_l_converter.clear()
-
-    oc.chainer_l_converter[L.Linear] = lb.convert_onnx_chainer_linear
-    oc.chainer_l_converter[L.Convolution2D] = lb.convert_onnx_chainer_convolution2d
-    oc.chainer_l_converter[L.ConvolutionND] = lb.convert_onnx_chainer_convolutionnd
-    oc.chainer_l_converter[L.BatchNormalization] = lb.convert_onnx_chainer_batch_normalization
-    oc.chainer_l_converter[L.NStepLSTM] = lb.convert_onnx_chainer_NStepLSTM
-    oc.chainer_l_converter[L.NStepBiLSTM] = lb.convert_onnx_chainer_NStepBiLSTM
-    oc.chainer_l_converter[L.EmbedID] = lb.convert_onnx_chainer_EmbedID
-
-    oc.f_converter[F.relu] = fca.ConverterRelu()
-    oc.f_converter[F.elu] = fca.ConverterElu()
-    oc.f_converter[F.leaky_relu] = fca.ConverterLeakyRelu()
-    oc.f_converter[F.log_softmax] = fca.ConverterLogSoftmax()
-    oc.f_converter[F.selu] = fca.ConverterSelu()
-    oc.f_converter[F.softmax] = fca.ConverterSoftmax()
-    oc.f_converter[F.sigmoid] = fca.ConverterSigmoid()
-
-    oc.f_converter[F.pad_sequence] = fb.ConverterPadSequence()
-    oc.f_converter[F.softmax_cross_entropy] = fb.ConverterSoftmaxCrossEntropy()
-    oc.f_converter[F.average_pooling_2d] = fb.ConverterAveragePool2D()
-    oc.f_converter[F.unpooling_2d] = fb.ConverterUnpooling2D()
-
-    oc.f_converter[F.vstack] = fb.ConverterVstack()
-    oc.f_converter[F.hstack] = fb.ConverterHstack()
-    oc.f_converter[F.stack] = fb.ConverterStack()
-    oc.f_converter[F.separate] = fb.ConverterSeparate()
-    oc.f_converter[F.squeeze] =  fb.ConverterSqueeze()
+class ONNXConverterRegistry:
+    '''
+    Converters from functions and links into ONNX
+
+    The registry is built only once by get_onnx_converter_registry and
+    shared by all exports, so it must not be modified.
+    '''
+
+    def __init__(self, f_converter, chainer_l_converter):
+        self.f_converter = types.MappingProxyType(f_converter)
+        self.chainer_l_converter = types.MappingProxyType(chainer_l_converter)
+
+
+onnx_converter_registry = None
+onnx_converter_registry_lock = threading.Lock()
+
+
+def get_onnx_converter_registry() -> 'ONNXConverterRegistry':
+    global onnx_converter_registry
+    with onnx_converter_registry_lock:
+        if onnx_converter_registry is None:
+            onnx_converter_registry = build_onnx_converter_registry()
+        return onnx_converter_registry
+
+
+def build_onnx_converter_registry() -> 'ONNXConverterRegistry':
+    f_converter = {}
+    chainer_l_converter = {}
+
+    chainer_l_converter[L.Linear] = lb.convert_onnx_chainer_linear
+    chainer_l_converter[L.Convolution2D] = lb.convert_onnx_chainer_convolution2d
+    chainer_l_converter[L.ConvolutionND] = lb.convert_onnx_chainer_convolutionnd
+    chainer_l_converter[L.BatchNormalization] = lb.convert_onnx_chainer_batch_normalization
+    chainer_l_converter[L.NStepLSTM] = lb.convert_onnx_chainer_NStepLSTM
+    chainer_l_converter[L.NStepBiLSTM] = lb.convert_onnx_chainer_NStepBiLSTM
+    chainer_l_converter[L.EmbedID] = lb.convert_onnx_chainer_EmbedID
+
+    f_converter[F.relu] = fca.ConverterRelu()
+    f_converter[F.elu] = fca.ConverterElu()
+    f_converter[F.leaky_relu] = fca.ConverterLeakyRelu()
+    f_converter[F.log_softmax] = fca.ConverterLogSoftmax()
+    f_converter[F.selu] = fca.ConverterSelu()
+    f_converter[F.softmax] = fca.ConverterSoftmax()
+    f_converter[F.sigmoid] = fca.ConverterSigmoid()
+
+    f_converter[F.pad_sequence] = fb.ConverterPadSequence()
+    f_converter[F.softmax_cross_entropy] = fb.ConverterSoftmaxCrossEntropy()
+    f_converter[F.average_pooling_2d] = fb.ConverterAveragePool2D()
+    f_converter[F.unpooling_2d] = fb.ConverterUnpooling2D()
+
+    f_converter[F.vstack] = fb.ConverterVstack()
+    f_converter[F.hstack] = fb.ConverterHstack()
+    f_converter[F.stack] = fb.ConverterStack()
+    f_converter[F.separate] = fb.ConverterSeparate()
+    f_converter[F.squeeze] =  fb.ConverterSqueeze()
     
-    oc.f_converter[F.reshape] = fb.ConverterReshape()
-    oc.f_converter[F.split_axis] = fb.ConverterSplitAxis()
-    oc.f_converter[F.swapaxes] = fb.ConverterSwapaxes()
-    oc.f_converter[F.dropout] = fb.ConverterDropout()
-    oc.f_converter[F.matmul] = fb.ConverterMatMul()
-    oc.f_converter[F.concat] = fb.ConverterConcat()
-    oc.f_converter[F.max_pooling_2d] = fb.ConverterMaxPooling2D()
-    oc.f_converter[F.resize_images] = fb.ConverterResizeImages()
-    oc.f_converter[F.broadcast_to] = fb.ConverterBroadcastTo()
-    oc.f_converter[F.expand_dims] = fb.ConverterExpandDims()
-    oc.f_converter[F.local_response_normalization] = fb.ConverterResponseNormalization()
-    oc.f_converter[F.average] = fb.ConverterAverage()
-    oc.f_converter[F.sum] = fb.ConverterSum()
-    oc.f_converter[F.maximum] = fb.ConverterChainerMaximum()
-    oc.f_converter[F.minimum] = fb.ConverterChainerMinimum()
-    oc.f_converter[F.argmax] = fb.ConverterChainerArgMax()
-    oc.f_converter[F.argmin] = fb.ConverterChainerArgMin()
-    oc.f_converter[F.max] = fb.ConverterMax()
-    oc.f_converter[F.min] = fb.ConverterMin()
-    oc.f_converter[F.transpose] = fb.ConverterTranspose()
-
-    oc.f_converter[F.sin] = fb.ConverterChainerMathMisc('Sin')
-    oc.f_converter[F.sinh] = fb.ConverterChainerMathMisc('Sinh')
-    oc.f_converter[F.sign] = fb.ConverterChainerMathMisc('Sign')
-    oc.f_converter[F.cos] = fb.ConverterChainerMathMisc('Cos')
-    oc.f_converter[F.cosh] = fb.ConverterChainerMathMisc('Cosh')
-    oc.f_converter[F.tan] = fb.ConverterChainerMathMisc('Tan')
-    oc.f_converter[F.tanh] = fb.ConverterChainerMathMisc('Tanh')
-    oc.f_converter[F.arcsin] = fb.ConverterChainerMathMisc('Asin')
-    oc.f_converter[F.arccos] = fb.ConverterChainerMathMisc('Acos')
-    oc.f_converter[F.arctan] = fb.ConverterChainerMathMisc('Atan')
-    oc.f_converter[F.exp] = fb.ConverterChainerMathMisc('Exp')
-    oc.f_converter[F.log] = fb.ConverterChainerMathMisc('Log')
-    oc.f_converter[F.sqrt] = fb.ConverterChainerMathMisc('Sqrt')
-    #oc.f_converter[F.absolute] = fb.ConverterChainerMathMisc('Abs', arg_name='self')
-
-    oc.f_converter[functions_onnx.onnx_abs] = fb.ConverterChainerMathMisc('Abs', arg_name='x')
-
-    oc.f_converter[functions_ndarray.dummy_maximum] = fb.ConverterMaximum()
-    oc.f_converter[functions_ndarray.dummy_minimum] = fb.ConverterMinimum()
-    oc.f_converter[functions_ndarray.dummy_argmax] = fb.ConverterArgMax()
-    oc.f_converter[functions_ndarray.dummy_argmin] = fb.ConverterArgMin()
-    oc.f_converter[functions_ndarray.dummy_round] = fb.ConverterRound()
-    oc.f_converter[functions_ndarray.dummy_sqrt] = fb.ConverterSqrt()
-    oc.f_converter[functions_ndarray.dummy_stack] = fb.ConverterStack()
-    oc.f_converter[functions_ndarray.dummy_reshape] = fb.ConverterReshape()
-    oc.f_converter[functions_ndarray.dummy_transpose] = fb.ConverterTranspose()
-
-    oc.f_converter[F.clip] = fb.ConverterClip()
+    f_converter[F.reshape] = fb.ConverterReshape()
+    f_converter[F.split_axis] = fb.ConverterSplitAxis()
+    f_converter[F.swapaxes] = fb.ConverterSwapaxes()
+    f_converter[F.dropout] = fb.ConverterDropout()
+    f_converter[F.matmul] = fb.ConverterMatMul()
+    f_converter[F.concat] = fb.ConverterConcat()
+    f_converter[F.max_pooling_2d] = fb.ConverterMaxPooling2D()
+    f_converter[F.resize_images] = fb.ConverterResizeImages()
+    f_converter[F.broadcast_to] = fb.ConverterBroadcastTo()
+    f_converter[F.expand_dims] = fb.ConverterExpandDims()
+    f_converter[F.local_response_normalization] = fb.ConverterResponseNormalization()
+    f_converter[F.average] = fb.ConverterAverage()
+    f_converter[F.sum] = fb.ConverterSum()
+    f_converter[F.maximum] = fb.ConverterChainerMaximum()
+    f_converter[F.minimum] = fb.ConverterChainerMinimum()
+    f_converter[F.argmax] = fb.ConverterChainerArgMax()
+    f_converter[F.argmin] = fb.ConverterChainerArgMin()
+    f_converter[F.max] = fb.ConverterMax()
+    f_converter[F.min] = fb.ConverterMin()
+    f_converter[F.transpose] = fb.ConverterTranspose()
+
+    f_converter[F.sin] = fb.ConverterChainerMathMisc('Sin')
+    f_converter[F.sinh] = fb.ConverterChainerMathMisc('Sinh')
+    f_converter[F.sign] = fb.ConverterChainerMathMisc('Sign')
+    f_converter[F.cos] = fb.ConverterChainerMathMisc('Cos')
+    f_converter[F.cosh] = fb.ConverterChainerMathMisc('Cosh')
+    f_converter[F.tan] = fb.ConverterChainerMathMisc('Tan')
+    f_converter[F.tanh] = fb.ConverterChainerMathMisc('Tanh')
+    f_converter[F.arcsin] = fb.ConverterChainerMathMisc('Asin')
+    f_converter[F.arccos] = fb.ConverterChainerMathMisc('Acos')
+    f_converter[F.arctan] = fb.ConverterChainerMathMisc('Atan')
+    f_converter[F.exp] = fb.ConverterChainerMathMisc('Exp')
+    f_converter[F.log] = fb.ConverterChainerMathMisc('Log')
+    f_converter[F.sqrt] = fb.ConverterChainerMathMisc('Sqrt')
+    #f_converter[F.absolute] = fb.ConverterChainerMathMisc('Abs', arg_name='self')
+
+    f_converter[functions_onnx.onnx_abs] = fb.ConverterChainerMathMisc('Abs', arg_name='x')
+
+    f_converter[functions_ndarray.dummy_maximum] = fb.ConverterMaximum()
+    f_converter[functions_ndarray.dummy_minimum] = fb.ConverterMinimum()
+    f_converter[functions_ndarray.dummy_argmax] = fb.ConverterArgMax()
+    f_converter[functions_ndarray.dummy_argmin] = fb.ConverterArgMin()
+    f_converter[functions_ndarray.dummy_round] = fb.ConverterRound()
+    f_converter[functions_ndarray.dummy_sqrt] = fb.ConverterSqrt()
+    f_converter[functions_ndarray.dummy_stack] = fb.ConverterStack()
+    f_converter[functions_ndarray.dummy_reshape] = fb.ConverterReshape()
+    f_converter[functions_ndarray.dummy_transpose] = fb.ConverterTranspose()
+
+    f_converter[F.clip] = fb.ConverterClip()
 
     if int(chainer.__version__[0]) >= 6:
-        oc.f_converter[F.roi_max_pooling_2d] = fb.ConverterRoiMaxPooling2D()
-        oc.f_converter[F.roi_average_pooling_2d] = fb.ConverterRoiAveragePooling2D()
-        oc.f_converter[F.roi_max_align_2d] = fb.ConverterRoiMaxAlign2D()
+        f_converter[F.roi_max_pooling_2d] = fb.ConverterRoiMaxPooling2D()
+        f_converter[F.roi_average_pooling_2d] = fb.ConverterRoiAveragePooling2D()
+        f_converter[F.roi_max_align_2d] = fb.ConverterRoiMaxAlign2D()
 
-    oc.f_converter[F.roi_average_align_2d] = fb.ConverterRoiAverageAlign2D()
+    f_converter[F.roi_average_align_2d] = fb.ConverterRoiAverageAlign2D()
 
     # validate function args
-    for key, value in oc.f_converter.items():
+    for key, value in f_converter.items():
         validate_args(key, value)
 
-    # assign names
-    oc.assigned_names.clear()
-    oc.node2onnx_parameter.clear()
-    oc.value2onnx_parameter.clear()
+    return ONNXConverterRegistry(f_converter, chainer_l_converter)
+
+
+def infer_forward_type(model, inputs) -> 'TyArrow':
+    '''
+    Infers types of the arguments and the return value of model.forward
+    with elichika.typing
+
+    The first axis of the first array input is the variable
+    BATCH_DIM_PARAM unless it has a type hint, so axes derived from it
+    are distinguished from others of the same size.
+    '''
+    # elichika.typing depends on PyTorch, so it is imported only when it is used
+    from chainer_compiler.elichika.typing.type_inference import InferenceEngine
+    from chainer_compiler.elichika.typing import types
+    from chainer_compiler.elichika.typing import utils as typing_utils
+
+    code = utils.clip_head(inspect.getsource(model.forward))
+    tree = gast.ast_to_gast(ast.parse(code))
+    engine = InferenceEngine(module=sys.modules[model.forward.__module__])
+
+    type_hints = typing.get_type_hints(model.forward)
+    arg_names = [arg.id for arg in tree.body[0].args.args[1:]]
+    for name, input in zip(arg_names, inputs):
+        ty = types.type_of_value(input)
+        if isinstance(ty, types.TyTensor) and ty.ndim > 0:
+            if name not in type_hints:
+                shape = (BATCH_DIM_PARAM,) + tuple(
+                    e.value for e in ty.shape[1:])
+                type_hints[name] = types.TyTensor(ty.kind, ty.dtype, shape)
+            break
+
+    # the inference may generate random values
+    random_state = np.random.get_state()
+    try:
+        with typing_utils.suppress_warnings():
+            node2type = engine.infer_function_value_args(
+                tree.body[0], (model,) + tuple(inputs),
+                type_hints=type_hints)
+    finally:
+        np.random.set_state(random_state)
+    return node2type[tree.body[0]]
+
+
+# the name of the batch dimension in value_info of inputs and outputs
+BATCH_DIM_PARAM = 'batch'
+
+
+def set_tensor_type(value_info: 'onnx.ValueInfoProto', ty):
+    '''
+    Writes the dtype and the shape of TyTensor into value_info
+
+    Dimensions with concrete sizes become dim_value, ones named by type
+    hints become dim_param and unknown ones are left unset. Dimensions
+    derived from the batch axis of the inputs become BATCH_DIM_PARAM so
+    the model accepts other batch sizes.
+    '''
+    from chainer_compiler.elichika.typing.shape_elem import is_variable_ShapeElem
+    from chainer_compiler.elichika.typing.types import TyTensor
+
+    if not isinstance(ty, TyTensor):
+        return
+
+    tensor_type = onnx.TypeProto.Tensor()
+    tensor_type.elem_type = onnx.mapping.NP_TYPE_TO_TENSOR_TYPE[ty.dtype]
+    tensor_type.shape.SetInParent()
+    for elem in ty.shape:
+        dim = tensor_type.shape.dim.add()
+        if is_variable_ShapeElem(elem, BATCH_DIM_PARAM):
+            dim.dim_param = BATCH_DIM_PARAM
+        elif isinstance(elem.value, int):
+            dim.dim_value = elem.value
+        elif isinstance(elem.value, str):
+            dim.dim_param = elem.value
+
+    value_info.type.ClearField('value')
+    value_info.type.tensor_type.CopyFrom(tensor_type)
+
+
+def annotate_input_output_types(onnx_model: 'ONNXModel', model, inputs):
+    '''
+    Writes types inferred by elichika.typing into the inputs and the
+    outputs of the main graph
+
+    Types of intermediate values are derived from them by the shape
+    inference of the compiler. Dimensions derived from the first axis of
+    the first array input are written as BATCH_DIM_PARAM.
+    Nothing is written when elichika.typing does not support the model.
+    Other errors of elichika.typing are bugs and fail the export unless
+    `ignore_typing_errors` is set.
+    '''
+    config = onnx_model.context.config
+    show_warnings = config.show_warnings
+
+    try:
+        from chainer_compiler.elichika.typing import type_inference  # NOQA
+        from chainer_compiler.elichika.typing import types
+    except ImportError as e:
+        # elichika.typing depends on PyTorch
+        if show_warnings:
+            print('warning : types of inputs and outputs are not written '
+                  'since elichika.typing is not available ({})'.format(e))
+        return
+
+    unsupported_errors = (types.UnsupportedError, types.UnifyError,
+                          types.JoinError, types.MatchFail)
+    try:
+        forward_type = infer_forward_type(model, inputs)
+    except Exception as e:
+        # types are left undefined as well as intermediate values
+        if not (isinstance(e, unsupported_errors) or
+                config.ignore_typing_errors):
+            raise
+        if show_warnings:
+            print('warning : types of inputs and outputs are not written '
+                  'since elichika.typing failed ({}: {})'.format(
+                      type(e).__name__, e))
+        return
+
+    arg_types = forward_type.argty[1:]
+    ret_type = forward_type.retty
+    if len(onnx_model.outputs) == 1:
+        ret_types = [ret_type]
+    elif isinstance(ret_type, types.TyTuple) and ret_type.is_fixed_len:
+        ret_types = ret_type.get_tys()
+    else:
+        ret_types = []
+
+    graph = onnx_model.model.graph
+    value_infos = {}
+    for value_info in list(graph.input) + list(graph.output):
+        value_infos[value_info.name] = value_info
+
+    with onnx_model.context:
+        for value, ty in list(zip(onnx_model.inputs, arg_types)) + list(zip(onnx_model.outputs, ret_types)):
+            value_info = value_infos.get(oc.onnx_name(value))
+            if value_info is not None:
+                set_tensor_type(value_info, ty.deref())
+
 
-    inputs_, outputs_, graph_ = core.convert_model(model, inputs)
+def compile_model(model, inputs, **options) -> 'ONNXModel':
+    '''
+    Converts a model into ONNX
 
-    if graph_ is None:
-        return None
+    Each call has its own ExportContext so models can be exported from
+    multiple threads concurrently. The context is kept in the returned
+    ONNXModel to look up ONNX names of values. `options` override the
+    defaults in `config` for this export.
+    '''
+    with context.ExportContext(**options) as ctx:
+        registry = get_onnx_converter_registry()
+        ctx.f_converter = registry.f_converter
+        ctx.chainer_l_converter = registry.chainer_l_converter
 
-    oc.preprocess(graph_, True)
+        inputs_, outputs_, graph_ = core.convert_model(model, inputs)
 
-    generator = oc.ONNXGenerator()
-    model = generator.generate_model(
-        graph_.input_values, graph_.output_values, graph_, model)
+        if graph_ is None:
+            return None
+
+        if ctx.config.optimize_graph:
+            graph_optimizer.optimize(graph_)
+
+        oc.preprocess(graph_, True)
+
+        generator = oc.ONNXGenerator()
+        model_proto = generator.generate_model(
+            graph_.input_values, graph_.output_values, graph_, model)
 
     # check inputs
 
     onnx_model = ONNXModel()
-    onnx_model.model = model
+    onnx_model.model = model_proto
     onnx_model.inputs = graph_.input_values
     onnx_model.outputs = graph_.output_values
+    onnx_model.context = ctx
+
+    if ctx.config.infer_value_info:
+        annotate_input_output_types(onnx_model, model, inputs)
+
     return onnx_model
 
 
-def save_model(path: 'str', model: 'ModelProto'):
+def save_model(path: 'str', model: 'ModelProto', external_data=False):
+    if external_data:
+        # Note this moves weights out of `model`.
+        from chainer_compiler import external_data as external_data_
+        external_data_.save_model(model, path)
+        return
     with open(path, "wb") as f:
         f.write(model.SerializeToString())
 
@@ -24,7 +24,7 @@ from chainer_compiler.elichika import onnx_converters as oc
 
 def convert_onnx_chainer_linear(onnx_graph: 'ONNXGraph', node: 'nodes.NodeCall'):
     chainer_inst = node.func.owner.inst  # type: chainer.links.Linear
-    onnx_name = oc.node2onnx_parameter[node].onnx_name
+    onnx_name = oc.onnx_name(node)
 
     x = oc.ONNXValue(onnx_graph, node.args.get_value('x'))
     axes = oc.try_get_attribute(node.args.get_value('n_batch_axes'), node)
@@ -21,8 +21,8 @@ from chainer_compiler.elichika.parser import functions_ndarray
 from chainer_compiler.elichika.parser import functions_list
 from chainer_compiler.elichika.parser import functions_dict
 from chainer_compiler.elichika.parser import utils
-from chainer_compiler.elichika.parser import config
 from chainer_compiler.elichika.parser import links_builtin
+from chainer_compiler.elichika.parser import context
 
 import numpy as np
 import collections
@@ -102,9 +102,40 @@ class NodeParse:
                     self.args[k] = att
 
 
-assigned_names = []
-node2onnx_parameter = {}
-value2onnx_parameter = {}
+class NameAllocator:
+    """
+    Allocates unique ONNX names
+
+    A name which is already used is suffixed with '_1', '_2', ... The
+    last suffix is remembered for each base name so allocation does not
+    probe used names again.
+    """
+
+    def __init__(self):
+        self.names = set()
+        self.counters = {}
+
+    def reserve(self, name: 'str'):
+        self.names.add(name)
+
+    def allocate(self, base_name: 'str', first_name=None):
+        """
+        Returns `first_name` (`base_name` if None) if it is not used yet.
+        Otherwise `base_name` with the smallest unused suffix is returned.
+        """
+        if first_name is None:
+            first_name = base_name
+
+        key = (base_name, first_name)
+        ind = self.counters.get(key, 0)
+        name = first_name if ind == 0 else base_name + '_' + str(ind)
+        while name in self.names:
+            ind += 1
+            name = base_name + '_' + str(ind)
+
+        self.counters[key] = ind
+        self.names.add(name)
+        return name
 
 
 class NodeONNXParameter:
@@ -120,15 +151,14 @@ class ValueONNXParameter:
 
 
 def onnx_name(value):
+    ctx = context.get_context()
     if isinstance(value, values.Value):
-        return value2onnx_parameter[value].onnx_name
+        return ctx.value2onnx_parameter[value].onnx_name
     if isinstance(value, nodes.Node):
-        return node2onnx_parameter[value].onnx_name
+        return ctx.node2onnx_parameter[value].onnx_name
 
 
-def generate_onnx_value_name(value: 'values.Value', none_name=''):
-    base_name = ''
-
+def generate_onnx_value_name(names: 'NameAllocator', value: 'values.Value', none_name=''):
     base_name = value.name
     if value.generator != None:
         base_name = value.name + '_' + str(value.generator.lineprop)
@@ -136,73 +166,49 @@ def generate_onnx_value_name(value: 'values.Value', none_name=''):
     if base_name == '':
         base_name = none_name
 
-    ind = 0
-    name = base_name
-
-    if name == '':
-        name = 'noname'
-
-    while (name in assigned_names):
-        ind += 1
-        name = base_name + '_' + str(ind)
-
-    assigned_names.append(name)
-    return name
-
-
-def generate_onnx_node_name(node: 'nodes.Node'):
-    base_name = str(node)
-
-    ind = 0
-    name = base_name
-    while (name in assigned_names):
-        ind += 1
-        name = base_name + '_' + str(ind)
+    if base_name == '':
+        return names.allocate(base_name, 'noname')
 
-    assigned_names.append(name)
-    return name
+    return names.allocate(base_name)
 
 
-def generate_onnx_name(name: 'str'):
-    base_name = str(name)
+def generate_onnx_node_name(names: 'NameAllocator', node: 'nodes.Node'):
+    return names.allocate(str(node))
 
-    ind = 0
-    name = base_name
-    while (name in assigned_names):
-        ind += 1
-        name = base_name + '_' + str(ind)
 
-    assigned_names.append(name)
-    return name
+def generate_onnx_name(names: 'NameAllocator', name: 'str'):
+    return names.allocate(str(name))
 
 
-def assign_onnx_name_to_value(value: 'values.Value', none_name=''):
+def assign_onnx_name_to_value(names: 'NameAllocator', value: 'values.Value', none_name=''):
+    value2onnx_parameter = context.get_context().value2onnx_parameter
     if not value in value2onnx_parameter:
         value2onnx_parameter[value] = ValueONNXParameter(
-            generate_onnx_value_name(value, none_name), value)
+            generate_onnx_value_name(names, value, none_name), value)
 
 
-def assign_onnx_name(graph: 'graphs.Graph'):
+def assign_onnx_name(names: 'NameAllocator', graph: 'graphs.Graph'):
+    node2onnx_parameter = context.get_context().node2onnx_parameter
 
     for v in graph.input_values:
-        assign_onnx_name_to_value(v)
+        assign_onnx_name_to_value(names, v)
 
     for v in graph.output_values:
-        assign_onnx_name_to_value(v)
+        assign_onnx_name_to_value(names, v)
 
     for node in graph.nodes:
         for input in node.inputs:
-            assign_onnx_name_to_value(input)
+            assign_onnx_name_to_value(names, input)
 
         for output in node.outputs:
-            assign_onnx_name_to_value(output)
+            assign_onnx_name_to_value(names, output)
 
         if not node in node2onnx_parameter:
             node2onnx_parameter[node] = NodeONNXParameter(
-                generate_onnx_node_name(node), node)
+                generate_onnx_node_name(names, node), node)
 
         for subgraph in node.subgraphs:
-            assign_onnx_name(subgraph)
+            assign_onnx_name(names, subgraph)
 
 
 def preprocess(graph: 'graphs.Graph', isMain: 'bool'):
@@ -246,8 +252,54 @@ def preprocess(graph: 'graphs.Graph', isMain: 'bool'):
             preprocess(subgraph, False)
 
 
-chainer_l_converter = {}
-f_converter = {}
+def _collect_used_names(onnx_graph: 'onnx.GraphProto', used_names):
+    for output in onnx_graph.output:
+        used_names.add(output.name)
+
+    for node in onnx_graph.node:
+        used_names.update(node.input)
+        for attribute in node.attribute:
+            if attribute.HasField('g'):
+                _collect_used_names(attribute.g, used_names)
+            for subgraph in attribute.graphs:
+                _collect_used_names(subgraph, used_names)
+
+
+def _remove_constants(onnx_graph: 'onnx.GraphProto', used_names):
+    removed_names = set()
+    alive_nodes = []
+    for node in onnx_graph.node:
+        if node.op_type == 'Constant' and node.output[0] not in used_names:
+            removed_names.add(node.output[0])
+            continue
+
+        alive_nodes.append(node)
+        for attribute in node.attribute:
+            if attribute.HasField('g'):
+                _remove_constants(attribute.g, used_names)
+            for subgraph in attribute.graphs:
+                _remove_constants(subgraph, used_names)
+
+    if not removed_names:
+        return
+
+    value_infos = [v for v in onnx_graph.value_info if v.name not in removed_names]
+    del onnx_graph.node[:]
+    onnx_graph.node.extend(alive_nodes)
+    del onnx_graph.value_info[:]
+    onnx_graph.value_info.extend(value_infos)
+
+
+def remove_unused_constants(onnx_graph: 'onnx.GraphProto'):
+    '''
+    Removes Constant nodes whose outputs are not used in the graph and its subgraphs
+
+    Constants are generated for all constant values, including values
+    which are only used as attributes.
+    '''
+    used_names = set()
+    _collect_used_names(onnx_graph, used_names)
+    _remove_constants(onnx_graph, used_names)
 
 
 def convert_node_aug_assign(onnx_graph, node: 'nodes.NodeAugAssign'):
@@ -274,7 +326,7 @@ def convert_node_aug_assign(onnx_graph, node: 'nodes.NodeAugAssign'):
         seq_target = target.create_sequence()
         seq_value = value.create_sequence()
         onnx_graph.add_node(binops[node.binop], [seq_target, seq_value], [
-                            value2onnx_parameter[node.outputs[0]].onnx_name], None)
+                            onnx_name(node.outputs[0])], None)
 
     else:
         if node.binop == nodes.BinOpType.FloorDiv:
@@ -298,9 +350,9 @@ def convert_node_aug_assign(onnx_graph, node: 'nodes.NodeAugAssign'):
         else:
             onnx_node = oh.make_node(
                 binops[node.binop],
-                [value2onnx_parameter[node.target].onnx_name,
-                 value2onnx_parameter[node.value].onnx_name],
-                [value2onnx_parameter[node.outputs[0]].onnx_name])
+                [onnx_name(node.target),
+                 onnx_name(node.value)],
+                [onnx_name(node.outputs[0])])
             onnx_graph.nodes.append(onnx_node)
 
 
@@ -326,7 +378,7 @@ def convert_node_bin_op(onnx_graph, node: 'nodes.NodeBinOp'):
         seq_left = left.create_sequence()
         seq_right = right.create_sequence()
         onnx_graph.add_node(binops[node.binop], [seq_left, seq_right], [
-                            value2onnx_parameter[node.outputs[0]].onnx_name], None)
+                            onnx_name(node.outputs[0])], None)
     elif isinstance(node.left, values.StrValue):
         # Constant propagation, string concatenation, etc.
         pass
@@ -352,15 +404,15 @@ def convert_node_bin_op(onnx_graph, node: 'nodes.NodeBinOp'):
         else:
             onnx_node = oh.make_node(
                 binops[node.binop],
-                [value2onnx_parameter[node.left].onnx_name, value2onnx_parameter[node.right].onnx_name],
-                [value2onnx_parameter[node.outputs[0]].onnx_name])
+                [onnx_name(node.left), onnx_name(node.right)],
+                [onnx_name(node.outputs[0])])
 
             onnx_graph.nodes.append(onnx_node)
 
 def convert_node_call(onnx_graph, node: 'nodes.NodeCall'):
 
     if node.func.base_func is not None:
-        f_converter[node.func.base_func](onnx_graph, node)
+        context.get_context().f_converter[node.func.base_func](onnx_graph, node)
         return
 
     if isinstance(node.func, functions_list.AppendFunction):
@@ -390,11 +442,11 @@ def convert_node_call(onnx_graph, node: 'nodes.NodeCall'):
     if isinstance(node.func, functions_ndarray.NDArrayShapeFunction):
         # shape
         op_shape_temp = onnx_graph.new_empty_tensor(
-            ['TODO'], np.int32, value2onnx_parameter[node.outputs[0]].onnx_name + '/ShapeTemp')
+            ['TODO'], np.int32, onnx_name(node.outputs[0]) + '/ShapeTemp')
 
         onnx_node = oh.make_node(
             "Shape",
-            [value2onnx_parameter[node.inputs[0]].onnx_name],
+            [onnx_name(node.inputs[0])],
             [op_shape_temp.name],
             str(node.lineprop))
 
@@ -403,7 +455,7 @@ def convert_node_call(onnx_graph, node: 'nodes.NodeCall'):
         onnx_node = oh.make_node(
             "SplitToSequence",
             [op_shape_temp.name],
-            [value2onnx_parameter[node.outputs[0]].onnx_name],
+            [onnx_name(node.outputs[0])],
             str(node.lineprop),
             keepdims=False)
 
@@ -527,7 +579,7 @@ def convert_node_call(onnx_graph, node: 'nodes.NodeCall'):
 
     if isinstance(node.func, links_builtin.ChainerLinkFunction):
         original_inst = node.func.owner.inst
-        chainer_l_converter[type(original_inst)](onnx_graph, node)
+        context.get_context().chainer_l_converter[type(original_inst)](onnx_graph, node)
 
 
 def convert_node_multiary_op(onnx_graph, node: 'nodes.NodeMultiaryOp'):
@@ -545,7 +597,7 @@ def convert_node_multiary_op(onnx_graph, node: 'nodes.NodeMultiaryOp'):
         temp = ONNXValue(onnx_graph, np.array(True).dtype, [node, '/temp%d' % idx])
         onnx_graph.add_node(
             op,
-            [temp_prev.name, value2onnx_parameter[value_].onnx_name],
+            [temp_prev.name, onnx_name(value_)],
             [temp.name],
             str(node.lineprop))
         temp_prev = temp
@@ -553,7 +605,7 @@ def convert_node_multiary_op(onnx_graph, node: 'nodes.NodeMultiaryOp'):
     onnx_graph.add_node(
         "Identity",
         [temp_prev.name],
-        [value2onnx_parameter[node.outputs[0]].onnx_name],
+        [onnx_name(node.outputs[0])],
         str(node.lineprop))
 
 
@@ -564,8 +616,8 @@ def convert_node_unary_op(onnx_graph, node: 'nodes.NodeUnaryOp'):
                           node, '/Zero'])
         onnx_node = oh.make_node(
             'Add',
-            [zero_.name, value2onnx_parameter[node.operand].onnx_name],
-            [value2onnx_parameter[node.outputs[0]].onnx_name])
+            [zero_.name, onnx_name(node.operand)],
+            [onnx_name(node.outputs[0])])
         onnx_graph.nodes.append(onnx_node)
 
     elif node.unaryop == nodes.UnaryOpType.USub:
@@ -573,15 +625,15 @@ def convert_node_unary_op(onnx_graph, node: 'nodes.NodeUnaryOp'):
                           node, '/Zero'])
         onnx_node = oh.make_node(
             'Sub',
-            [zero_.name, value2onnx_parameter[node.operand].onnx_name],
-            [value2onnx_parameter[node.outputs[0]].onnx_name])
+            [zero_.name, onnx_name(node.operand)],
+            [onnx_name(node.outputs[0])])
         onnx_graph.nodes.append(onnx_node)
 
     elif node.unaryop == nodes.UnaryOpType.Not:
         onnx_node = oh.make_node(
             'Not',
-            [value2onnx_parameter[node.operand].onnx_name],
-            [value2onnx_parameter[node.outputs[0]].onnx_name])
+            [onnx_name(node.operand)],
+            [onnx_name(node.outputs[0])])
         onnx_graph.nodes.append(onnx_node)
 
     else:
@@ -674,9 +726,9 @@ class ONNXValue:
             if(isinstance(name, list)):
                 for n in name:
                     if isinstance(n, values.Value):
-                        name_ += value2onnx_parameter[n].onnx_name
+                        name_ += onnx_name(n)
                     if isinstance(n, nodes.Node):
-                        name_ += node2onnx_parameter[n].onnx_name
+                        name_ += onnx_name(n)
                     if isinstance(n, ONNXValue):
                         name_ += n.name
                     elif n is None:
@@ -687,7 +739,7 @@ class ONNXValue:
             if(isinstance(name, str)):
                 name_ = name
 
-            name_ = generate_onnx_name(name_)
+            name_ = generate_onnx_name(onnx_graph.generator.names, name_)
 
             return name_
 
@@ -845,7 +897,7 @@ class ONNXGraph:
         it is for inputting and outputting
         '''
 
-        name = value2onnx_parameter[value].onnx_name
+        name = onnx_name(value)
 
         if isinstance(value, values.TensorValue):
             dtype = value.dtype
@@ -885,7 +937,7 @@ class ONNXGraph:
                     return self.new_empty_tensor(None, dtype, name)
                 if isinstance(value.internal_value, float):
 
-                    if config.float_restrict:
+                    if context.get_config().float_restrict:
                         dtype = np.array(value.internal_value).dtype
                     else:
                         dtype = np.float32
@@ -938,7 +990,7 @@ class ONNXGraph:
         it is for constant input
         '''
 
-        if not config.float_restrict:
+        if not context.get_config().float_restrict:
             if ndarray_.dtype == np.float64:
                 ndarray_ = ndarray_.astype(np.float32)
 
@@ -965,7 +1017,7 @@ class ONNXGraph:
             assert value.has_constant_value()
             arr = np.array(value.get_constant_value())
 
-            if not config.float_restrict:
+            if not context.get_config().float_restrict:
                 if arr.dtype == np.float64:
                     arr = arr.astype(np.float32)
 
@@ -1000,7 +1052,7 @@ class ONNXGraph:
             elif isinstance(input, ONNXValue):
                 inputs_.append(input.name)
             elif isinstance(input, values.Value):
-                inputs_.append(value2onnx_parameter[input].onnx_name)
+                inputs_.append(onnx_name(input))
             else:
                 assert(False)
 
@@ -1012,7 +1064,7 @@ class ONNXGraph:
             elif isinstance(output, ONNXValue):
                 outputs_.append(output.name)
             elif isinstance(output, values.Value):
-                outputs_.append(value2onnx_parameter[output].onnx_name)
+                outputs_.append(onnx_name(output))
             elif output is None:
                 o = ONNXValue(self, np.float32, [
                               name, '/', optype, '/Output'], is_constant=False)
@@ -1028,10 +1080,10 @@ class ONNXGraph:
 
     def get_value_name(self, value):
         if isinstance(value, values.Value):
-            return value2onnx_parameter[value].onnx_name
+            return onnx_name(value)
 
         if isinstance(value, nodes.Node):
-            return node2onnx_parameter[value].onnx_name
+            return onnx_name(value)
 
         if id(value) in self.generator.param2name.keys():
             return self.generator.param2name[id(value)]
@@ -1044,7 +1096,7 @@ class ONNXGraph:
         for x in input:
             if isinstance(x, values.Value):
                 self.input_tensor.append(
-                    self.generator.onnx_tensors[value2onnx_parameter[x].onnx_name])
+                    self.generator.onnx_tensors[onnx_name(x)])
             elif isinstance(x, ONNXValue):
                 self.input_tensor.append(x.tensor)
             else:
@@ -1056,7 +1108,7 @@ class ONNXGraph:
         for x in output:
             if isinstance(x, values.Value):
                 self.output_tensor.append(
-                    self.generator.onnx_tensors[value2onnx_parameter[x].onnx_name])
+                    self.generator.onnx_tensors[onnx_name(x)])
             elif isinstance(x, ONNXValue):
                 self.output_tensor.append(x.tensor)
             else:
@@ -1093,13 +1145,14 @@ class ONNXGenerator:
         self.initializers = {}
         self.onnx_tensors = {}
         self.param2name = {}
+        self.names = NameAllocator()
 
     def generate_graph(self, inputs, outputs, graph: 'graphs.Graph', parent: 'ONNXGraph', isMain=False):
         onnx_graph = ONNXGraph(self, parent)
 
         def generate_tensors(values_):
             for value_ in values_:
-                if (value2onnx_parameter[value_].onnx_name in self.onnx_tensors.keys()):
+                if (onnx_name(value_) in self.onnx_tensors.keys()):
                     continue
 
                 if value_.is_dummy_value:
@@ -1115,13 +1168,13 @@ class ONNXGenerator:
                     elif isinstance(value_, values.BoolValue):
                         dtype = np.bool
 
-                    if not config.float_restrict:
+                    if not context.get_config().float_restrict:
                         if dtype == np.float64:
                             dtype = np.float32
 
                     arr = np.array(0, dtype=dtype)
 
-                    tensor = onnx_graph.new_constant_with_np(arr, value2onnx_parameter[value_].onnx_name)
+                    tensor = onnx_graph.new_constant_with_np(arr, onnx_name(value_))
                 elif value_.generator is not None or not value_.has_constant_value():
                     tensor = onnx_graph.new_empty_tensor_with_value(value_)
                 else:
@@ -1145,8 +1198,8 @@ class ONNXGenerator:
                 node_ = node  # type: nodes.Copy
                 onnx_node = oh.make_node(
                     'Identity',
-                    [value2onnx_parameter[node_.value].onnx_name],
-                    [value2onnx_parameter[node.outputs[0]].onnx_name])
+                    [onnx_name(node_.value)],
+                    [onnx_name(node.outputs[0])])
 
                 onnx_graph.nodes.append(onnx_node)
 
@@ -1194,7 +1247,7 @@ class ONNXGenerator:
                     assert node.outputs[0].has_constant_value()
                     t = onnx_graph.new_empty_tensor_with_value(node.outputs[0])
                     tensor = numpy_helper.from_array(np.array(node.outputs[0].internal_value, dtype=np.bool),
-                        name=value2onnx_parameter[node.outputs[0]].onnx_name)
+                        name=onnx_name(node.outputs[0]))
 
                     onnx_node = oh.make_node(
                         'Constant', [], [t.name], value=tensor)
@@ -1202,16 +1255,16 @@ class ONNXGenerator:
                 else:
                     if op_not:
                         op_not_temp = onnx_graph.new_empty_tensor(
-                            ['TODO'], np.bool, value2onnx_parameter[node.outputs[0]].onnx_name + '/NotTemp')
+                            ['TODO'], np.bool, onnx_name(node.outputs[0]) + '/NotTemp')
                         onnx_node1 = oh.make_node(op_str, [
-                                                value2onnx_parameter[node_.left].onnx_name, value2onnx_parameter[node_.right].onnx_name], [op_not_temp.name])
+                                                onnx_name(node_.left), onnx_name(node_.right)], [op_not_temp.name])
                         onnx_node2 = oh.make_node('Not', [op_not_temp.name], [
-                                                value2onnx_parameter[node.outputs[0]].onnx_name])
+                                                onnx_name(node.outputs[0])])
                         onnx_graph.nodes.append(onnx_node1)
                         onnx_graph.nodes.append(onnx_node2)
                     else:
-                        onnx_node = oh.make_node(op_str, [value2onnx_parameter[node_.left].onnx_name, value2onnx_parameter[node_.right].onnx_name], [
-                                                value2onnx_parameter[node.outputs[0]].onnx_name])
+                        onnx_node = oh.make_node(op_str, [onnx_name(node_.left), onnx_name(node_.right)], [
+                                                onnx_name(node.outputs[0])])
                         onnx_graph.nodes.append(onnx_node)
 
             if isinstance(node, nodes.NodeGetItem):
@@ -1221,17 +1274,17 @@ class ONNXGenerator:
                     if isinstance(node_.target, values.ListValue) or isinstance(node_.target, values.TupleValue) or isinstance(node_.target, values.RangeValue):
                         onnx_node = oh.make_node(
                             'SequenceAt',
-                            [value2onnx_parameter[node_.target].onnx_name,
-                                value2onnx_parameter[node_.indexes[0]].onnx_name],
-                            [value2onnx_parameter[node.outputs[0]].onnx_name])
+                            [onnx_name(node_.target),
+                                onnx_name(node_.indexes[0])],
+                            [onnx_name(node.outputs[0])])
                         onnx_graph.nodes.append(onnx_node)
 
                     else:
                         onnx_node = oh.make_node(
                             'ChainerGetItem',
-                            [value2onnx_parameter[node_.target].onnx_name,
-                                value2onnx_parameter[node_.indexes[0]].onnx_name],
-                            [value2onnx_parameter[node.outputs[0]].onnx_name],
+                            [onnx_name(node_.target),
+                                onnx_name(node_.indexes[0])],
+                            [onnx_name(node.outputs[0])],
                             slice_specs=[1])
                         onnx_graph.nodes.append(onnx_node)
                 else:
@@ -1239,13 +1292,13 @@ class ONNXGenerator:
                     slice_specs = []
 
                     for index in node_.indexes:
-                        indices.append(value2onnx_parameter[index].onnx_name)
+                        indices.append(onnx_name(index))
                         slice_specs.append(1)
 
                     onnx_node = oh.make_node(
                         'ChainerGetItem',
-                        [value2onnx_parameter[node_.target].onnx_name] + indices,
-                        [value2onnx_parameter[node.outputs[0]].onnx_name],
+                        [onnx_name(node_.target)] + indices,
+                        [onnx_name(node.outputs[0])],
                         slice_specs=slice_specs)
                     onnx_graph.nodes.append(onnx_node)
 
@@ -1256,19 +1309,19 @@ class ONNXGenerator:
                     if isinstance(node_.target, values.ListValue) or isinstance(node_.target, values.TupleValue) or isinstance(node_.target, values.RangeValue):
                         onnx_node = oh.make_node(
                             'ChainerSequenceUpdate',
-                            [value2onnx_parameter[node_.target].onnx_name,
-                                value2onnx_parameter[node_.indexes[0]].onnx_name,
-                                value2onnx_parameter[node_.revision].onnx_name],
-                            [value2onnx_parameter[node.outputs[0]].onnx_name])
+                            [onnx_name(node_.target),
+                                onnx_name(node_.indexes[0]),
+                                onnx_name(node_.revision)],
+                            [onnx_name(node.outputs[0])])
                         onnx_graph.nodes.append(onnx_node)
 
                     else:
                         onnx_node = oh.make_node(
                             'ChainerSetItem',
-                            [value2onnx_parameter[node_.target].onnx_name,
-                             value2onnx_parameter[node_.indexes[0]].onnx_name,
-                             value2onnx_parameter[node_.revision].onnx_name],
-                            [value2onnx_parameter[node.outputs[0]].onnx_name],
+                            [onnx_name(node_.target),
+                             onnx_name(node_.indexes[0]),
+                             onnx_name(node_.revision)],
+                            [onnx_name(node.outputs[0])],
                             slice_specs=[1])
                         onnx_graph.nodes.append(onnx_node)
                 else:
@@ -1276,13 +1329,13 @@ class ONNXGenerator:
                     slice_specs = []
 
                     for index in node_.indexes:
-                        indices.append(value2onnx_parameter[index].onnx_name)
+                        indices.append(onnx_name(index))
                         slice_specs.append(1)
 
                     onnx_node = oh.make_node(
                         'ChainerSetItem',
-                        [value2onnx_parameter[node_.target].onnx_name] + indices + [value2onnx_parameter[node_.revision].onnx_name],
-                        [value2onnx_parameter[node.outputs[0]].onnx_name],
+                        [onnx_name(node_.target)] + indices + [onnx_name(node_.revision)],
+                        [onnx_name(node.outputs[0])],
                         slice_specs=slice_specs)
                     onnx_graph.nodes.append(onnx_node)
 
@@ -1292,19 +1345,19 @@ class ONNXGenerator:
                 indices = []
 
                 for index in node_.indices:
-                    indices.append(value2onnx_parameter[index].onnx_name)
+                    indices.append(onnx_name(index))
 
                 if isinstance(node_.target, values.ListValue) or isinstance(node_.target, values.TupleValue):
                     onnx_node = oh.make_node(
                         'ChainerSequenceGetSlice',
-                        [value2onnx_parameter[node_.target].onnx_name] + indices,
-                        [value2onnx_parameter[node.outputs[0]].onnx_name])
+                        [onnx_name(node_.target)] + indices,
+                        [onnx_name(node.outputs[0])])
                     onnx_graph.nodes.append(onnx_node)
                 else:
                     onnx_node = oh.make_node(
                         'ChainerGetItem',
-                        [value2onnx_parameter[node_.target].onnx_name] + indices,
-                        [value2onnx_parameter[node.outputs[0]].onnx_name],
+                        [onnx_name(node_.target)] + indices,
+                        [onnx_name(node.outputs[0])],
                         slice_specs=node_.slice_specs)
                     onnx_graph.nodes.append(onnx_node)
 
@@ -1321,9 +1374,9 @@ class ONNXGenerator:
 
                 onnx_node = oh.make_node(
                     'If',
-                    [value2onnx_parameter[node_.cond].onnx_name] +
-                    [value2onnx_parameter[x].onnx_name for x in node.input_values],
-                    [value2onnx_parameter[x].onnx_name for x in node.outputs],
+                    [onnx_name(node_.cond)] +
+                    [onnx_name(x) for x in node.input_values],
+                    [onnx_name(x) for x in node.outputs],
                     then_branch=true_graph,
                     else_branch=false_graph)
 
@@ -1334,11 +1387,11 @@ class ONNXGenerator:
 
                 # get length of sequence
                 v_len = ONNXValue(onnx_graph, np.array(0).dtype, [
-                                  value2onnx_parameter[node_.iter_value].onnx_name, '/Len'])
+                                  onnx_name(node_.iter_value), '/Len'])
 
                 onnx_node = onnx_graph.add_node(
                     'ChainerGenericLen',
-                    [value2onnx_parameter[node_.iter_value].onnx_name],
+                    [onnx_name(node_.iter_value)],
                     [v_len],
                     str(node.lineprop))
 
@@ -1347,7 +1400,7 @@ class ONNXGenerator:
 
                 t = onnx_graph.new_empty_tensor_with_value(node_.exit_cond)
                 tensor = numpy_helper.from_array(np.array(True, dtype=np.bool),
-                    name=value2onnx_parameter[node_.exit_cond].onnx_name)
+                    name=onnx_name(node_.exit_cond))
 
                 onnx_node = oh.make_node(
                     'Constant', [], [t.name], value=tensor)
@@ -1356,9 +1409,9 @@ class ONNXGenerator:
                 # for
                 onnx_node = onnx_graph.add_node(
                     'Loop',
-                    [v_len, value2onnx_parameter[node_.exit_cond].onnx_name, value2onnx_parameter[node_.iter_value].onnx_name] +
-                    [value2onnx_parameter[x].onnx_name for x in node.input_values],
-                    [value2onnx_parameter[x].onnx_name for x in node.outputs],
+                    [v_len, onnx_name(node_.exit_cond), onnx_name(node_.iter_value)] +
+                    [onnx_name(x) for x in node.input_values],
+                    [onnx_name(x) for x in node.outputs],
                     str(node.lineprop),
                     body=body_graph)
 
@@ -1369,16 +1422,16 @@ class ONNXGenerator:
                 if isinstance(node_.iter_value, values.ListValue) or isinstance(node_.iter_value, values.TupleValue) or isinstance(node_.iter_value, values.RangeValue):
                     onnx_node = oh.make_node(
                         'SequenceAt',
-                        [value2onnx_parameter[node_.iter_value].onnx_name,
-                            value2onnx_parameter[node_.counter_value].onnx_name],
-                        [value2onnx_parameter[node_.outputs[0]].onnx_name])
+                        [onnx_name(node_.iter_value),
+                            onnx_name(node_.counter_value)],
+                        [onnx_name(node_.outputs[0])])
                     onnx_graph.nodes.append(onnx_node)
                 else:
                     onnx_node = oh.make_node(
                         'ChainerGetItem',
-                        [value2onnx_parameter[node_.iter_value].onnx_name,
-                            value2onnx_parameter[node_.counter_value].onnx_name],
-                        [value2onnx_parameter[node_.outputs[0]].onnx_name],
+                        [onnx_name(node_.iter_value),
+                            onnx_name(node_.counter_value)],
+                        [onnx_name(node_.outputs[0])],
                         slice_specs=[1])
                     onnx_graph.nodes.append(onnx_node)
 
@@ -1387,11 +1440,11 @@ class ONNXGenerator:
 
                 # get length of sequence
                 tensor_len = ONNXValue(onnx_graph, np.array(0).dtype, [
-                                       value2onnx_parameter[node_.iter_value].onnx_name, '/Len'])
+                                       onnx_name(node_.iter_value), '/Len'])
 
                 onnx_graph.add_node(
                     'ChainerGenericLen',
-                    [value2onnx_parameter[node_.iter_value].onnx_name],
+                    [onnx_name(node_.iter_value)],
                     [tensor_len],
                     str(node.lineprop))
 
@@ -1400,9 +1453,9 @@ class ONNXGenerator:
 
                 onnx_node = oh.make_node(
                     'Loop',
-                    [tensor_len.name] + [""] + [value2onnx_parameter[node_.iter_value].onnx_name] +
-                    [value2onnx_parameter[x].onnx_name for x in node.input_values],
-                    [value2onnx_parameter[x].onnx_name for x in node.outputs],
+                    [tensor_len.name] + [""] + [onnx_name(node_.iter_value)] +
+                    [onnx_name(x) for x in node.input_values],
+                    [onnx_name(x) for x in node.outputs],
                     body=body_graph)
 
                 onnx_graph.nodes.append(onnx_node)
@@ -1414,8 +1467,8 @@ class ONNXGenerator:
                     if isinstance(node_.value, values.ListValue) or isinstance(node_.value, values.TupleValue):
                         onnx_node = oh.make_node(
                             "Identity",
-                            [value2onnx_parameter[node.inputs[0]].onnx_name],
-                            [value2onnx_parameter[node.outputs[0]].onnx_name],
+                            [onnx_name(node.inputs[0])],
+                            [onnx_name(node.outputs[0])],
                             str(node.lineprop))
 
                         onnx_graph.nodes.append(onnx_node)
@@ -1423,8 +1476,8 @@ class ONNXGenerator:
                     elif isinstance(node_.value, values.TensorValue):
                         onnx_node = oh.make_node(
                             "SplitToSequence",
-                            [value2onnx_parameter[node.inputs[0]].onnx_name],
-                            [value2onnx_parameter[node.outputs[0]].onnx_name],
+                            [onnx_name(node.inputs[0])],
+                            [onnx_name(node.outputs[0])],
                             str(node.lineprop),
                             keepdims=False)
 
@@ -1441,8 +1494,8 @@ class ONNXGenerator:
                 if node_.classtype == 'range':
                     onnx_node = oh.make_node(
                         "ChainerSequenceRange",
-                        [value2onnx_parameter[input].onnx_name for input in node.inputs],
-                        [value2onnx_parameter[node.outputs[0]].onnx_name],
+                        [onnx_name(input) for input in node.inputs],
+                        [onnx_name(node.outputs[0])],
                         str(node.lineprop))
 
                     onnx_graph.nodes.append(onnx_node)
@@ -1478,8 +1531,7 @@ class ONNXGenerator:
                                 axis=0,
                                 new_axis=True)
                         else:
-                            casting_name = value2onnx_parameter[node.outputs[0]
-                                                                ].onnx_name + '/Cast'
+                            casting_name = onnx_name(node.outputs[0]) + '/Cast'
                             onnx_node = onnx_graph.add_node(
                                 "ConcatFromSequence",
                                 [value],
@@ -1552,16 +1604,16 @@ class ONNXGenerator:
                 if node_.classtype == 'Tuple':
                     onnx_node = oh.make_node(
                         "SequenceConstruct",
-                        [value2onnx_parameter[x].onnx_name for x in node.args],
-                        [value2onnx_parameter[node.outputs[0]].onnx_name],
+                        [onnx_name(x) for x in node.args],
+                        [onnx_name(node.outputs[0])],
                         str(node.lineprop))
                     onnx_graph.nodes.append(onnx_node)
 
                 if node_.classtype == 'List':
                     onnx_node = oh.make_node(
                         "SequenceConstruct",
-                        [value2onnx_parameter[x].onnx_name for x in node.args],
-                        [value2onnx_parameter[node.outputs[0]].onnx_name],
+                        [onnx_name(x) for x in node.args],
+                        [onnx_name(node.outputs[0])],
                         str(node.lineprop))
                     onnx_graph.nodes.append(onnx_node)
 
@@ -1577,12 +1629,15 @@ class ONNXGenerator:
                            for n, p in model.namedparams()}
 
         for p, n in self.param2name.items():
-            assigned_names.append(n)
+            self.names.reserve(n)
 
         # assign onnx name
-        assign_onnx_name(graph)
+        assign_onnx_name(self.names, graph)
 
         graph_ = self.generate_graph(inputs, outputs, graph, None, True)
+        if context.get_config().optimize_graph:
+            remove_unused_constants(graph_)
+
         onnx_model = oh.make_model(
             graph_, producer_name="elichika", producer_version="0.1")
         return onnx_model
@@ -0,0 +1,465 @@
+import copy
+import inspect
+
+import chainer
+import numpy as np
+
+from chainer_compiler.elichika.parser import context
+from chainer_compiler.elichika.parser import functions
+from chainer_compiler.elichika.parser import nodes
+from chainer_compiler.elichika.parser import utils
+from chainer_compiler.elichika.parser import values
+
+
+def _get_copyable_nodes():
+    # nodes which can be copied into other calls
+    # (nodes is not loaded yet when this module is imported)
+    return (
+        nodes.NodeCall,
+        nodes.NodeBinOp,
+        nodes.NodeUnaryOp,
+        nodes.NodeMultiaryOp,
+        nodes.NodeCompare,
+        nodes.NodeGetItem,
+        nodes.NodeSlice,
+        nodes.NodeGenerate,
+        nodes.NodeConvert,
+        nodes.NodeLen,
+        nodes.NodeAssign,
+        nodes.NodeReturn,
+    )
+
+
+# attributes of nodes which are not values used by the node
+_ignored_node_attributes = ('outputs', 'subgraphs', 'lineprop', 'func',
+                            'attribute_args', 'targets', 'objects')
+
+_ignored_link_attributes = ('name', '_children', '_params', '_persistent')
+
+
+class CallTemplate:
+    '''
+    Nodes generated by a call of a user defined function
+
+    A call of the same function with the same key generates the same
+    nodes except for the arguments and links of `self`, so the nodes
+    are copied instead of evaluating the function again.
+    Constants created in the call are copied for each call and other
+    constants (ex. default arguments) are shared by calls.
+    '''
+
+    def __init__(self, args, instances, constants, nodes, ret):
+        self.args = args  # type: List[values.Value]
+        self.instances = instances  # type: Dict[values.Instance, str]
+        self.constants = constants  # type: List[values.Value]
+        self.nodes = nodes  # type: List[nodes.Node]
+        self.ret = ret  # type: values.Value
+
+
+def _attribute_key(attr):
+    if attr is None or isinstance(attr, (bool, int, float, str, np.generic, np.dtype)):
+        return (type(attr), attr)
+
+    if isinstance(attr, (list, tuple)):
+        return (type(attr), tuple(_attribute_key(a) for a in attr))
+
+    if isinstance(attr, (set, frozenset)):
+        return (type(attr), tuple(sorted(repr(a) for a in attr)))
+
+    if isinstance(attr, dict):
+        return (type(attr), tuple(sorted((repr(k), _attribute_key(v)) for k, v in attr.items())))
+
+    if isinstance(attr, chainer.Variable):
+        attr = attr.array
+
+    if isinstance(attr, np.ndarray):
+        # values of arrays are never used while evaluating
+        return (np.ndarray, attr.shape, attr.dtype)
+
+    if inspect.isfunction(attr) or inspect.isbuiltin(attr) or inspect.isclass(attr) or inspect.ismodule(attr) or isinstance(attr, np.ufunc):
+        return attr
+
+    # unknown objects are compared by identity
+    return (type(attr), id(attr))
+
+
+def _link_key(link: 'chainer.Link'):
+    children = getattr(link, '_children', ())
+    key = [type(link)]
+
+    for name, attr in sorted(vars(link).items()):
+        if name in _ignored_link_attributes:
+            continue
+
+        if isinstance(link, chainer.Chain) and name in children:
+            key.append((name, _link_key(attr)))
+        elif isinstance(attr, chainer.Link):
+            key.append((name, type(attr), id(attr)))
+        else:
+            key.append((name, _attribute_key(attr)))
+
+    if isinstance(link, chainer.ChainList):
+        key.append(tuple(_link_key(child) for child in children))
+
+    return tuple(key)
+
+
+def _value_key(value: 'values.Value'):
+    if isinstance(value, values.TensorValue):
+        if value.has_constant_value():
+            return None
+        return (values.TensorValue, tuple(value.shape), value.dtype)
+
+    if isinstance(value, (values.NumberValue, values.StrValue, values.BoolValue)):
+        return (type(value), value.internal_value, value.dtype)
+
+    if isinstance(value, values.NoneValue):
+        return (values.NoneValue,)
+
+    return None
+
+
+def get_templates() -> 'Dict[tuple, CallTemplate]':
+    return context.get_context().call_templates
+
+
+def get_self_link(self_obj: 'values.Object'):
+    if self_obj is None:
+        return None
+
+    value = self_obj.get_value()
+    if isinstance(value, values.Instance) and isinstance(value.inst, chainer.Link):
+        return value.inst
+
+    return None
+
+
+def get_key(func: 'functions.UserDefinedFunction', self_obj: 'values.Object', args: 'functions.FunctionArgInput', context_: 'functions.VEvalContext'):
+    '''
+    Returns a key of a call, or None if the call cannot be memoized
+    '''
+    # fields which are touched in branches must be recorded
+    if context.get_context().histories:
+        return None
+
+    key = [getattr(func.inst, '__func__', func.inst), tuple(sorted(context_.flags.items()))]
+
+    if self_obj is not None:
+        link = get_self_link(self_obj)
+        if link is None:
+            return None
+        key.append(_link_key(link))
+
+    arg_values = []
+    for obj in args.inputs:
+        if not isinstance(obj, values.Object):
+            return None
+        value = obj.get_value()
+
+        if obj is self_obj:
+            key.append(None)
+            arg_values.append(value)
+            continue
+
+        value_key = _value_key(value)
+        if value_key is None:
+            return None
+
+        # the same value may be passed as some arguments
+        alias = next((i for i, v in enumerate(arg_values) if v is value), None)
+        key.append((value_key, alias))
+        arg_values.append(value)
+
+    return tuple(key)
+
+
+class _Copier:
+    def __init__(self, mapping):
+        self.mapping = mapping  # type: Dict[values.Value, values.Value]
+
+    def copy_value(self, value):
+        ret = copy.copy(value)
+        ret.id = utils.get_guid()
+        ret.generator = None
+        if isinstance(value, (values.TupleValue, values.ListValue)) and value.internal_value is not None:
+            ret.internal_value = [self.copy_object(o) for o in value.internal_value]
+        return ret
+
+    def copy_object(self, obj):
+        if obj is None:
+            return None
+
+        value = self.mapping.get(obj.get_value(), obj.get_value())
+        if value is obj.get_value():
+            return obj
+
+        ret = values.Object(value)
+        ret.name = obj.name
+        return ret
+
+    def copy_attr(self, attr):
+        if isinstance(attr, values.Value):
+            return self.mapping.get(attr, attr)
+
+        if isinstance(attr, list):
+            return [self.copy_attr(a) for a in attr]
+
+        if isinstance(attr, functions.FunctionArgValueInput):
+            ret = functions.FunctionArgValueInput()
+            ret.inputs = self.copy_attr(attr.inputs)
+            ret.keywords = {k: self.copy_attr(v) for k, v in attr.keywords.items()}
+            return ret
+
+        return attr
+
+    def copy_node(self, node):
+        ret = copy.copy(node)
+
+        for name, attr in vars(node).items():
+            if name in _ignored_node_attributes:
+                continue
+            setattr(ret, name, self.copy_attr(attr))
+
+        if isinstance(node, nodes.NodeCall):
+            owner = getattr(node.func, 'owner', None)
+            if owner is not None and self.mapping.get(owner, owner) is not owner:
+                ret.func = copy.copy(node.func)
+                ret.func.owner = self.mapping[owner]
+            ret.attribute_args = nodes.make_attribute(self.copy_attr(node.args))
+
+        outputs = []
+        for output in node.outputs:
+            self.mapping[output] = self.copy_value(output)
+            outputs.append(self.mapping[output])
+
+        ret.outputs = []
+        ret.subgraphs = []
+        ret.set_outputs(outputs)
+        return ret
+
+
+def _collect_values(attr, ret):
+    if isinstance(attr, values.Value):
+        ret.append(attr)
+    elif isinstance(attr, list):
+        for a in attr:
+            _collect_values(a, ret)
+    elif isinstance(attr, functions.FunctionArgValueInput):
+        _collect_values(attr.inputs, ret)
+        _collect_values(list(attr.keywords.values()), ret)
+
+
+def _get_used_values(node):
+    ret = []
+    for name, attr in vars(node).items():
+        if name not in _ignored_node_attributes:
+            _collect_values(attr, ret)
+    return ret
+
+
+def _is_constant(value):
+    if value.generator is not None:
+        return False
+
+    if isinstance(value, values.NoneValue):
+        return True
+
+    if isinstance(value, (values.NumberValue, values.StrValue, values.BoolValue)):
+        return value.has_constant_value()
+
+    if isinstance(value, values.TupleValue):
+        return value.has_constant_value() and all(
+            o is not None and _is_constant(o.get_value()) for o in value.internal_value)
+
+    return False
+
+
+def _get_attributes(obj: 'values.Object'):
+    collection = obj.get_field().collection
+    return {key: (att.obj, att.obj.get_value()) for key, att in collection.attributes.items() if att.has_obj()}
+
+
+def _is_modified(obj: 'values.Object', attributes, visited):
+    '''
+    Returns whether attributes of `obj` or objects in them are revised
+    '''
+    if obj in visited:
+        return False
+    visited.add(obj)
+
+    collection = obj.get_field().collection
+    for key, att in collection.attributes.items():
+        if not att.has_obj():
+            continue
+
+        state = (att.obj, att.obj.get_value())
+        old_state = attributes.get(key)
+        if old_state is not None and all(a is b for a, b in zip(state, old_state)):
+            continue
+
+        # predefined attributes which are loaded in the call
+        inputs = collection.inputs.get(att)
+        if inputs is None and not isinstance(state[1], (values.Instance, values.FuncValue, values.ModuleValue)):
+            return True
+        if inputs is not None and not all(a is b for a, b in zip(state, inputs)):
+            return True
+
+        if isinstance(state[1], values.Instance) and _is_modified(att.obj, {}, visited):
+            return True
+
+    return False
+
+
+class Recorder:
+    '''
+    Records nodes which a call adds into a graph
+    '''
+
+    def __init__(self, graph: 'graphs.Graph', self_obj: 'values.Object', args: 'functions.FunctionArgInput'):
+        self.graph = graph
+        self.head = graph.nodes[0] if graph.nodes else None
+        self.count = len(graph.nodes)
+        self.root_head = graph.root_graph.nodes[0] if graph.root_graph.nodes else None
+        self.root_count = len(graph.root_graph.nodes)
+
+        # values whose id is less than it are created before the call
+        self.first_id = context.get_context().guid
+
+        # revising attributes doesn't add nodes, so it cannot be copied
+        self.attributes = {}
+        for obj in [self_obj] + args.inputs:
+            if obj is not None:
+                self.attributes[obj] = _get_attributes(obj)
+
+    def get_nodes(self):
+        graph = self.graph
+        root_graph = graph.root_graph
+
+        # nodes added to the head of graphs are not recorded
+        if (graph.nodes[0] if graph.nodes else None) is not self.head:
+            return None
+
+        if root_graph is not graph:
+            if len(root_graph.nodes) != self.root_count:
+                return None
+            if (root_graph.nodes[0] if root_graph.nodes else None) is not self.root_head:
+                return None
+
+        return graph.nodes[self.count:]
+
+    def record(self, self_obj: 'values.Object', args: 'functions.FunctionArgInput', ret) -> 'CallTemplate':
+        '''
+        Returns a template of the recorded call, or None if the call
+        cannot be copied
+        '''
+        # functions_list depends on functions, which depends on this module
+        from chainer_compiler.elichika.parser import functions_list
+
+        recorded_nodes = self.get_nodes()
+        if recorded_nodes is None:
+            return None
+
+        visited = set()
+        for obj, attributes in self.attributes.items():
+            if _is_modified(obj, attributes, visited):
+                return None
+
+        arg_values = [o.get_value() for o in args.inputs]
+        mapping = {v: v for v in arg_values}
+
+        link = get_self_link(self_obj)
+        link_paths = {}
+        if link is not None:
+            link_paths = {id(l): path for path, l in link.namedlinks(skipself=True)}
+
+        copyable_nodes = _get_copyable_nodes()
+        instances = {}
+        constants = []
+        copier = _Copier(mapping)
+        for node in recorded_nodes:
+            if not isinstance(node, copyable_nodes) or node.subgraphs:
+                return None
+
+            if isinstance(node, nodes.NodeCall) and isinstance(node.func, functions_list.AppendFunction):
+                return None
+
+            for value in _get_used_values(node):
+                if value in mapping:
+                    continue
+
+                if _is_constant(value):
+                    if value.id < self.first_id:
+                        mapping[value] = value
+                    else:
+                        mapping[value] = copier.copy_value(value)
+                        constants.append(mapping[value])
+                    continue
+
+                if isinstance(value, values.Instance) and id(value.inst) in link_paths:
+                    instances[value] = link_paths[id(value.inst)]
+                    mapping[value] = value
+                    continue
+
+                return None
+
+            # links are called with themselves as inputs
+            owner = getattr(node.func, 'owner', None) if isinstance(node, nodes.NodeCall) else None
+            if owner is not None and owner not in mapping:
+                return None
+
+            for output in node.outputs:
+                mapping[output] = output
+
+        template_nodes = [copier.copy_node(node) for node in recorded_nodes]
+
+        ret_value = None
+        if ret is not None:
+            ret_obj = utils.try_get_obj(ret, 'return', utils.LineProperty())
+            if ret_obj is None:
+                return None
+            ret_value = ret_obj.get_value()
+            if ret_value not in mapping:
+                if not _is_constant(ret_value):
+                    return None
+                mapping[ret_value] = copier.copy_value(ret_value)
+                constants.append(mapping[ret_value])
+            ret_value = mapping[ret_value]
+
+        return CallTemplate(arg_values, instances, constants, template_nodes, ret_value)
+
+
+def replay(template: 'CallTemplate', self_obj: 'values.Object', args: 'functions.FunctionArgInput', graph: 'graphs.Graph'):
+    '''
+    Adds nodes of `template` into `graph` for a call with `args` and
+    returns the returned value of the call
+    '''
+    # same as assigning arguments to a field of the function
+    for name, obj in args.keywords.items():
+        obj.name = utils.create_obj_value_name_with_attribute(name, obj.name)
+        obj.get_value().name = utils.create_obj_value_name_with_attribute(name, obj.get_value().name)
+
+    arg_values = [o.get_value() for o in args.inputs]
+    mapping = dict(zip(template.args, arg_values))
+    copier = _Copier(mapping)
+
+    if template.instances:
+        links = dict(get_self_link(self_obj).namedlinks(skipself=True))
+        for instance, path in template.instances.items():
+            copied = copier.copy_value(instance)
+            copied.inst = links[path]
+            mapping[instance] = copied
+
+    for constant in template.constants:
+        mapping[constant] = copier.copy_value(constant)
+
+    for node in template.nodes:
+        graph.add_node(copier.copy_node(node))
+
+    if template.ret is None:
+        return None
+
+    for arg, obj in zip(template.args, args.inputs):
+        if arg is template.ret:
+            return obj
+
+    return values.Object(copier.copy_attr(template.ret))
@@ -1,13 +1,67 @@
 import sys
 import logging
 
+# Options below are defaults of exports. Each ExportContext takes a copy
+# of them when it is created so that changing them does not affect
+# exports running in other threads. Code outside of any ExportContext
+# reads them directly.
+
 # whether it shows warnings while compiling
 show_warnings = True
 
 # whether float64 isn't regarded as float32
 float_restrict = False
 
+# whether nodes of a call are copied from a former call with the same
+# arguments and attributes instead of evaluating the function again
+memoize_calls = True
+
+# whether types inferred by elichika.typing for a call of a user defined
+# function are copied from a former call with the same argument types
+memoize_type_inference = True
+
+# whether contexts of ast (dispatched functions and line properties) are
+# created once and reused when the same ast is evaluated again
+cache_ast_contexts = True
+
+# whether constants are folded and unused nodes are removed before
+# a graph is converted into ONNX
+optimize_graph = True
+
+# whether types of inputs and outputs inferred by elichika.typing are written into value_info
+infer_value_info = True
+
+# whether internal errors of elichika.typing (e.g., AssertionError) leave
+# value_info untyped instead of failing the export
+ignore_typing_errors = False
+
 # registerd module are ignored while parsing
 disabled_modules = set()
 disabled_modules.add(logging)
 disabled_modules.add(sys)
+
+
+_OPTIONS = ('show_warnings', 'float_restrict', 'memoize_calls',
+            'memoize_type_inference', 'cache_ast_contexts', 'optimize_graph',
+            'infer_value_info', 'ignore_typing_errors', 'disabled_modules')
+
+
+class Config:
+    """
+    Options of an export
+
+    Options are copied from the defaults of this module and overridden by
+    `options`.
+    """
+
+    def __init__(self, **options):
+        module = sys.modules[__name__]
+        for name in _OPTIONS:
+            value = getattr(module, name)
+            if isinstance(value, set):
+                value = set(value)
+            setattr(self, name, value)
+        for name, value in options.items():
+            if name not in _OPTIONS:
+                raise TypeError('Unknown option: {}'.format(name))
+            setattr(self, name, value)
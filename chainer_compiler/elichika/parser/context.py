@@ -0,0 +1,97 @@
+import threading
+
+from chainer_compiler.elichika.parser import config
+
+
+# assigners of predefined attributes of values, registered when modules
+# of builtin functions are imported
+_predefined_value_assigners = []  # type: List[PredefinedValueAssigner]
+
+
+def register_predefined_value_assigner(assigner):
+    _predefined_value_assigners.append(assigner)
+
+
+class ExportContext:
+    """
+    Holds the state of an export
+
+    All state which was shared by module globals during an export lives
+    here so exports in different threads never interfere each other.
+    A context is activated by `with`. Code which runs outside of any
+    `with` block uses a default context of the current thread, which
+    reads options and assigners from the module globals.
+
+    `options` override the defaults in `config` for this export.
+
+    Example:
+        with ExportContext(optimize_graph=False):
+            onnx_model = compile_model(model, inputs)
+    """
+
+    def __init__(self, **options):
+        self.config = config.Config(**options)
+        self.predefined_value_assigners = list(_predefined_value_assigners)
+
+        # parser
+        self.histories = []  # type: List[History]
+        self.guid = 0
+
+        # hashable function. key is python function, value is FuncValue
+        self.function_converters = {}
+
+        # unhashable function. key is str, value is FuncValue
+        self.builtin_function_converters = {}
+
+        # an array of convertter from python instance into Value
+        # first argument is module, second argument is python instance
+        self.instance_converters = []
+
+        # values of this export generated from converters shared by exports
+        self.function_values = {}  # type: Dict[FuncValue, FuncValue]
+        self.module_objects = {}  # type: Dict[module, Object]
+
+        # templates of calls of user defined functions. None if a call
+        # cannot be copied
+        self.call_templates = {}  # type: Dict[tuple, CallTemplate]
+
+        # onnx
+        self.f_converter = {}
+        self.chainer_l_converter = {}
+        self.value2onnx_parameter = {}
+        self.node2onnx_parameter = {}
+
+    def get_guid(self):
+        id = self.guid
+        self.guid += 1
+        return id
+
+    def __enter__(self):
+        _get_stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        popped = _get_stack().pop()
+        assert popped is self
+
+
+_local = threading.local()
+
+
+def _get_stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        default = ExportContext()
+        default.config = config
+        default.predefined_value_assigners = _predefined_value_assigners
+        stack = [default]
+        _local.stack = stack
+    return stack
+
+
+def get_context() -> 'ExportContext':
+    return _get_stack()[-1]
+
+
+def get_config() -> 'config.Config':
+    return _get_stack()[-1].config
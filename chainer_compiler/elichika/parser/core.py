@@ -6,7 +6,8 @@ from chainer.backends import cuda
 import inspect
 import weakref
 import sys
-from chainer_compiler.elichika.parser import config
+import threading
+import types
 from chainer_compiler.elichika.parser import nodes
 from chainer_compiler.elichika.parser import vevaluator
 from chainer_compiler.elichika.parser import values
@@ -21,6 +22,7 @@ from chainer_compiler.elichika.parser.graphs import Graph
 from chainer_compiler.elichika.parser import flags
 from chainer_compiler.elichika.parser import custom_functions
 from chainer_compiler.elichika.parser import functions_onnx
+from chainer_compiler.elichika.parser import context
 
 import numpy as np
 import six
@@ -35,14 +37,38 @@ def get_module_name(target_module, parent_module):
     return ''
 
 
-def convert_model(model: 'chainer.Chain', args=[]):
-    # reset values
-    values.reset_field_and_attributes()
-    utils.reset_guid()
+class ConverterRegistry:
+    '''
+    Converters from Python objects into values
+
+    The registry is built only once by get_converter_registry and shared
+    by all exports, so it must not be modified.
+    '''
+
+    def __init__(self, function_converters, builtin_function_converters, instance_converters):
+        self.function_converters = types.MappingProxyType(function_converters)
+        self.builtin_function_converters = types.MappingProxyType(builtin_function_converters)
+        self.instance_converters = tuple(instance_converters)
+
+
+converter_registry = None
+converter_registry_lock = threading.Lock()
+
+
+def get_converter_registry() -> 'ConverterRegistry':
+    global converter_registry
+    with converter_registry_lock:
+        if converter_registry is None:
+            # values in the registry must not consume guids of an export
+            with context.ExportContext():
+                converter_registry = build_converter_registry()
+        return converter_registry
 
-    values.function_converters.clear()
-    values.builtin_function_converters.clear()
-    values.instance_converters.clear()
+
+def build_converter_registry() -> 'ConverterRegistry':
+    function_converters = {}
+    builtin_function_converters = {}
+    instance_converters = []
 
     def instance_converter(m, i):
         if links_builtin.is_builtin_chainer_link(i):
@@ -58,7 +84,7 @@ def convert_model(model: 'chainer.Chain', args=[]):
 
         return None
 
-    values.instance_converters.append(instance_converter)
+    instance_converters.append(instance_converter)
 
     custom_functions_module = values.Object(values.ModuleValue(custom_functions))
 
@@ -67,11 +93,11 @@ def convert_model(model: 'chainer.Chain', args=[]):
     def ret_same(funcArgs):
         return functions.generate_value_with_same_type(funcArgs.keywords['x'].get_value())
 
-    values.function_converters[functions_onnx.onnx_abs] = values.FuncValue(functions_builtin.ChainerFunction(functions_onnx.onnx_abs, ret_value_func=ret_same), None, module=functions_onnx_module)
+    function_converters[functions_onnx.onnx_abs] = values.FuncValue(functions_builtin.ChainerFunction(functions_onnx.onnx_abs, ret_value_func=ret_same), None, module=functions_onnx_module)
 
     # chainer
     c_variable = values.FuncValue(functions_ndarray.NDArrayFunction(), None)
-    values.function_converters[chainer.Variable] = c_variable
+    function_converters[chainer.Variable] = c_variable
 
     # chainer.functions
     def add_chainer_function(func, ret_value_func = None):
@@ -82,7 +108,7 @@ def convert_model(model: 'chainer.Chain', args=[]):
             f = values.FuncValue(
                 functions_builtin.ChainerFunction(func, ret_value_func=ret_value_func), None)
 
-        values.function_converters[func] = f
+        function_converters[func] = f
 
     def ret_tuple(funcArgs = None):
         ret = values.TupleValue()
@@ -92,7 +118,7 @@ def convert_model(model: 'chainer.Chain', args=[]):
     # register unsupported functions to show error when unsupported functions are called
     for f in F.__dict__.items():
         if inspect.isfunction(f[1]):
-            values.function_converters[f[1]] = values.FuncValue(functions.UnimplementedFunction(f[1]), None)
+            function_converters[f[1]] = values.FuncValue(functions.UnimplementedFunction(f[1]), None)
 
     # activation
     add_chainer_function(F.elu)
@@ -133,7 +159,7 @@ def convert_model(model: 'chainer.Chain', args=[]):
     add_chainer_function(F.max)
     add_chainer_function(F.min)
 
-    values.function_converters[F.absolute] = values.FuncValue(functions.UserDefinedFunction(custom_functions.chainer_absolute), None, module=custom_functions_module)
+    function_converters[F.absolute] = values.FuncValue(functions.UserDefinedFunction(custom_functions.chainer_absolute), None, module=custom_functions_module)
 
     add_chainer_function(F.sin)
     add_chainer_function(F.sinh)
@@ -151,10 +177,10 @@ def convert_model(model: 'chainer.Chain', args=[]):
 
     add_chainer_function(F.clip)
 
-    values.function_converters[F.argmax] = values.FuncValue(functions_builtin.ChainerArgminmaxFunction(F.argmax), None)
-    values.function_converters[F.argmin] = values.FuncValue(functions_builtin.ChainerArgminmaxFunction(F.argmin), None)
+    function_converters[F.argmax] = values.FuncValue(functions_builtin.ChainerArgminmaxFunction(F.argmax), None)
+    function_converters[F.argmin] = values.FuncValue(functions_builtin.ChainerArgminmaxFunction(F.argmin), None)
 
-    values.function_converters[F.clipped_relu] = values.FuncValue(functions.UserDefinedFunction(custom_functions.chainer_clipped_relu), None, module=custom_functions_module)
+    function_converters[F.clipped_relu] = values.FuncValue(functions.UserDefinedFunction(custom_functions.chainer_clipped_relu), None, module=custom_functions_module)
 
     if int(chainer.__version__[0]) >= 6:
         add_chainer_function(F.roi_max_pooling_2d)
@@ -182,67 +208,81 @@ def convert_model(model: 'chainer.Chain', args=[]):
     f_int32 = values.FuncValue(functions_ndarray.NDArrayInt32(), None)
     f_float32 = values.FuncValue(functions_ndarray.NDArrayFloat32(), None)
 
-    values.function_converters[np.array] = f_array
-    values.function_converters[np.zeros] = f_zeros
-    values.function_converters[np.full] = f_full
-    values.function_converters[np.ceil] = f_ceil
-    values.function_converters[np.cumsum] = f_cumsum
-    values.function_converters[np.int32] = f_int32
-    values.function_converters[np.float32] = f_float32
-    values.function_converters[np.maximum] = f_maximum
-    values.function_converters[np.minimum] = f_minimum
-    values.function_converters[np.argmax] = f_argmax
-    values.function_converters[np.argmin] = f_argmin
-    values.function_converters[np.round] = f_round
-    values.function_converters[np.sqrt] = f_sqrt
-    values.function_converters[np.stack] = f_stack
-    values.function_converters[np.reshape] = f_reshape
-    values.function_converters[np.transpose] = f_transpose
+    function_converters[np.array] = f_array
+    function_converters[np.zeros] = f_zeros
+    function_converters[np.full] = f_full
+    function_converters[np.ceil] = f_ceil
+    function_converters[np.cumsum] = f_cumsum
+    function_converters[np.int32] = f_int32
+    function_converters[np.float32] = f_float32
+    function_converters[np.maximum] = f_maximum
+    function_converters[np.minimum] = f_minimum
+    function_converters[np.argmax] = f_argmax
+    function_converters[np.argmin] = f_argmin
+    function_converters[np.round] = f_round
+    function_converters[np.sqrt] = f_sqrt
+    function_converters[np.stack] = f_stack
+    function_converters[np.reshape] = f_reshape
+    function_converters[np.transpose] = f_transpose
 
-    values.function_converters[np.clip] = values.FuncValue(functions.UserDefinedFunction(custom_functions.numpy_clip), None, module=custom_functions_module)
-    values.function_converters[np.absolute] = values.FuncValue(functions.UserDefinedFunction(custom_functions.numpy_absolute), None, module=custom_functions_module)
+    function_converters[np.clip] = values.FuncValue(functions.UserDefinedFunction(custom_functions.numpy_clip), None, module=custom_functions_module)
+    function_converters[np.absolute] = values.FuncValue(functions.UserDefinedFunction(custom_functions.numpy_absolute), None, module=custom_functions_module)
 
-    values.function_converters[custom_functions.check_attribute_value] = values.FuncValue(functions.CheckAttributeValueFunction(), None, module=custom_functions_module)
+    function_converters[custom_functions.check_attribute_value] = values.FuncValue(functions.CheckAttributeValueFunction(), None, module=custom_functions_module)
 
-    values.function_converters[custom_functions.check_attribute_scalar] = values.FuncValue(functions.CheckAttributeScalarFunction(), None, module=custom_functions_module)
+    function_converters[custom_functions.check_attribute_scalar] = values.FuncValue(functions.CheckAttributeScalarFunction(), None, module=custom_functions_module)
 
-    values.builtin_function_converters['abs'] = values.FuncValue(functions.UserDefinedFunction(custom_functions.builtin_absolute), None, module=custom_functions_module)
+    builtin_function_converters['abs'] = values.FuncValue(functions.UserDefinedFunction(custom_functions.builtin_absolute), None, module=custom_functions_module)
 
     m_range = values.FuncValue(functions_builtin.RangeFunction(), None)
-    values.builtin_function_converters['range'] = m_range
+    builtin_function_converters['range'] = m_range
 
     m_len = values.FuncValue(functions_builtin.LenFunction(), None)
-    values.builtin_function_converters['len'] = m_len
+    builtin_function_converters['len'] = m_len
 
-    values.function_converters[six.moves.range] = m_range
+    function_converters[six.moves.range] = m_range
 
     m_list = values.FuncValue(functions_builtin.ListFunction(), None)
-    values.builtin_function_converters['list'] = m_list
+    builtin_function_converters['list'] = m_list
 
     m_print = values.FuncValue(functions_builtin.PrintFunction(), None)
-    values.builtin_function_converters['print'] = m_print
+    builtin_function_converters['print'] = m_print
 
     m_getattr = values.FuncValue(functions_builtin.GetAttrFunction(), None)
-    values.builtin_function_converters['getattr'] = m_getattr
+    builtin_function_converters['getattr'] = m_getattr
 
     m_hasattr = values.FuncValue(functions_builtin.HasAttrFunction(), None)
-    values.builtin_function_converters['hasattr'] = m_hasattr
+    builtin_function_converters['hasattr'] = m_hasattr
 
     m_to_gpu = values.FuncValue(functions_builtin.CopyFunction(cuda.to_gpu), None)
-    values.function_converters[cuda.to_gpu] = m_to_gpu
+    function_converters[cuda.to_gpu] = m_to_gpu
 
     m_to_cpu = values.FuncValue(functions_builtin.CopyFunction(cuda.to_cpu), None)
-    values.function_converters[cuda.to_cpu] = m_to_cpu
+    function_converters[cuda.to_cpu] = m_to_cpu
 
     # generate VEvalFlag functions
     def add_veval_flag_function(name:'str', func):
         f = values.FuncValue(functions_builtin.VEvalContextFunction(func), None)
-        values.builtin_function_converters[name] = f
+        builtin_function_converters[name] = f
 
     add_veval_flag_function('eval_as_written_target', flags.eval_as_written_target)
     add_veval_flag_function('ignore_branch', flags.ignore_branch)
     add_veval_flag_function('for_unroll', flags.for_unroll)
 
+    return ConverterRegistry(function_converters, builtin_function_converters, instance_converters)
+
+
+def convert_model(model: 'chainer.Chain', args=[]):
+    # reset values
+    values.reset_field_and_attributes()
+    utils.reset_guid()
+
+    registry = get_converter_registry()
+    ctx = context.get_context()
+    ctx.function_converters = registry.function_converters
+    ctx.builtin_function_converters = registry.builtin_function_converters
+    ctx.instance_converters = registry.instance_converters
+
     # generate default module
     default_module = values.Object(values.ModuleValue(sys.modules[model.__module__]))
 
@@ -291,7 +331,7 @@ def convert_model(model: 'chainer.Chain', args=[]):
             return value.get_obj().get_value()
 
     if ret is None or isinstance(ret, values.NoneValue):
-        if config.show_warnings:
+        if context.get_config().show_warnings:
             print('Failed to compile. output is None.')
         return (value_args, None, graph)
 
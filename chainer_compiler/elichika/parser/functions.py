@@ -4,6 +4,7 @@ import chainer.functions as F
 import chainer.links as L
 import inspect
 import ast
+import copy
 import gast
 import weakref
 from enum import Enum
@@ -16,8 +17,10 @@ from chainer_compiler.elichika.parser import values
 from chainer_compiler.elichika.parser import functions
 from chainer_compiler.elichika.parser import utils
 from chainer_compiler.elichika.parser import core
-from chainer_compiler.elichika.parser import config
+from chainer_compiler.elichika.parser.context import get_config
 from chainer_compiler.elichika.parser import canonicalizer
+from chainer_compiler.elichika.parser import call_memo
+from chainer_compiler.source_cache import source_cache
 
 
 def generate_copied_value(value: 'values.Value'):
@@ -68,7 +71,7 @@ def generate_copied_value(value: 'values.Value'):
         copied.vtype = value.vtype
         return copied
 
-    if config.show_warnings:
+    if get_config().show_warnings:
         print('Unknown type {} is copied'.format(value))
 
     return values.Value()
@@ -369,6 +372,25 @@ class FunctionBase():
         return None
 
 
+def parse_function(func):
+    '''
+    Parses a function into its line number and a canonicalized gast
+
+    The result is cached by source_cache, so it must not be modified.
+    '''
+    lineno = inspect.getsourcelines(func)[1]
+
+    if (func.__name__ == (lambda: None).__name__):
+        original_code = utils.lambda_source(func)
+        code = 'return ' + original_code[re.search('lambda.*?:', original_code).end():]
+        return lineno, gast.ast_to_gast(ast.parse(code))
+
+    original_code = inspect.getsource(func)
+    code = utils.clip_head(original_code)
+    ast_ = gast.ast_to_gast(ast.parse(code)).body[0]
+    return lineno, canonicalizer.Canonicalizer().visit(ast_)
+
+
 class UserDefinedClassConstructorFunction(FunctionBase):
     def __init__(self, classinfo):
         super().__init__()
@@ -381,23 +403,11 @@ class UserDefinedClassConstructorFunction(FunctionBase):
         self.inst = func
         self.name = func.__name__
         self.filename = inspect.getfile(func)
-
-        sourcelines = inspect.getsourcelines(func)
-        if sourcelines is None or len(sourcelines) < 1:
-            utils.print_warning('Failed to parase {}'.format(classinfo), utils.LineProperty())
-            return
-
-        self.lineno = sourcelines[1]
+        self.lineno, self.ast = source_cache.get(func, parse_function)
         self.classinfo = classinfo
 
-        original_code = inspect.getsource(func)
-        code = utils.clip_head(original_code)
-
         self.args.analyze_args(func)
 
-        ast_ = gast.ast_to_gast(ast.parse(code)).body[0]
-        self.ast = canonicalizer.Canonicalizer().visit(ast_)
-
     def vcall(self, module: 'values.Field', graph: 'graphs.Graph', inst: 'values.Object', args: 'FunctionArgInput',
               context: 'VEvalContext' = None, line=-1):
         ret = values.Object(values.UserDefinedInstance(
@@ -413,7 +423,7 @@ class UserDefinedClassConstructorFunction(FunctionBase):
         for k, v in funcArgs.keywords.items():
             func_field.get_field().get_attribute(k, from_module=False).revise(v)
 
-        astc = vevaluator.AstContext(self.ast.body, self.lineno - 1, filename=self.filename)
+        astc = vevaluator.get_body_context(self.ast, self.lineno - 1, filename=self.filename)
         vevaluator.veval_ast(astc, func_field, graph, context)
 
         # dispose because of exit from function
@@ -429,20 +439,9 @@ class UserDefinedFunction(FunctionBase):
         self.inst = func
         self.name = func.__name__
         self.filename = inspect.getfile(func)
-        sourcelines = inspect.getsourcelines(func)
-        self.lineno = sourcelines[1]
+        self.lineno, self.ast = source_cache.get(func, parse_function)
         self.args.analyze_args(func)
 
-        if (func.__name__ == (lambda: None).__name__):
-            original_code = utils.lambda_source(func)
-            code = 'return ' + original_code[re.search('lambda.*?:', original_code).end():]
-            self.ast = gast.ast_to_gast(ast.parse(code))
-        else:
-            original_code = inspect.getsource(func)
-            code = utils.clip_head(original_code)
-            ast_ = gast.ast_to_gast(ast.parse(code)).body[0]
-            self.ast = canonicalizer.Canonicalizer().visit(ast_)
-
     def vcall(self, module: 'values.Field', graph: 'graphs.Graph', inst: 'values.Object', args: 'FunctionArgInput',
               context: 'VEvalContext' = None, line=-1):
 
@@ -458,12 +457,25 @@ class UserDefinedFunction(FunctionBase):
             # add args
             funcArgs = self.args.merge_inputs(inst, args)
 
+            # copy nodes of the same call instead of evaluating it again
+            call_templates = call_memo.get_templates()
+            key = None
+            if get_config().memoize_calls:
+                key = call_memo.get_key(self, inst, funcArgs, context)
+            if key is not None and call_templates.get(key) is not None:
+                return call_memo.replay(call_templates[key], inst, funcArgs, graph)
+            if key is not None and key not in call_templates:
+                recorder = call_memo.Recorder(graph, inst, funcArgs)
+
             for k, v in funcArgs.keywords.items():
                 func_field.get_field().get_attribute(k, from_module=False).revise(utils.try_get_obj(v, self.name, utils.LineProperty()))
 
-            astc = vevaluator.AstContext(self.ast.body, self.lineno - 1, filename=self.filename)
+            astc = vevaluator.get_body_context(self.ast, self.lineno - 1, filename=self.filename)
             ret = vevaluator.veval_ast(astc, func_field, graph, context)
 
+            if key is not None and key not in call_templates:
+                call_templates[key] = recorder.record(inst, funcArgs, ret)
+
             # dispose because of exit from function
             func_field.dispose()
 
@@ -492,9 +504,12 @@ class UserDefinedFunctionFromAst(FunctionBase):
         self.name = astc.gast.name if isinstance(astc.nast, gast.FunctionDef) else (lambda: None).__name__
         self.args = args
         self.func_field = func_field
-        if isinstance(astc.nast, gast.Lambda):
-            astc.nast.body = gast.Return(value=astc.nast.body) # Add return to the body
         self.ast = astc.nast
+        if isinstance(astc.nast, gast.Lambda):
+            # Add return to the body. The tree is copied because it is
+            # evaluated again when the enclosing function is called again.
+            self.ast = copy.copy(astc.nast)
+            self.ast.body = gast.Return(value=astc.nast.body)
         self.filename = astc.filename
         self.lineno = astc.lineno
 
@@ -508,7 +523,7 @@ class UserDefinedFunctionFromAst(FunctionBase):
         for k, v in funcArgs.keywords.items():
             self.func_field.get_field().get_attribute(k, from_module=False).revise(utils.try_get_obj(v, self.name, utils.LineProperty()))
 
-        astc = vevaluator.AstContext(self.ast.body, self.lineno - 1, filename=self.filename)
+        astc = vevaluator.get_body_context(self.ast, self.lineno - 1, filename=self.filename)
         ret = vevaluator.veval_ast(astc, self.func_field, graph, context)
 
         # dispose because of exit from function
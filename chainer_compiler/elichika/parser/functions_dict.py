@@ -3,6 +3,7 @@ from chainer_compiler.elichika.parser import values
 from chainer_compiler.elichika.parser import functions
 from chainer_compiler.elichika.parser import graphs
 from chainer_compiler.elichika.parser import utils
+from chainer_compiler.elichika.parser import context
 
 import chainer
 import chainer.functions as F
@@ -89,4 +90,4 @@ class Assigner(values.PredefinedValueAssigner):
             values.FuncValue(ValuesFunction(), target, None))
         target.attributes.get_attribute('values').revise(values_func)
 
-values.predefined_value_assigners.append(Assigner())
\ No newline at end of file
+context.register_predefined_value_assigner(Assigner())
\ No newline at end of file
@@ -0,0 +1,558 @@
+import numpy as np
+
+from chainer_compiler.elichika.parser import context
+from chainer_compiler.elichika.parser import functions
+from chainer_compiler.elichika.parser import functions_builtin
+from chainer_compiler.elichika.parser import functions_dict
+from chainer_compiler.elichika.parser import functions_ndarray
+from chainer_compiler.elichika.parser import nodes
+from chainer_compiler.elichika.parser import values
+
+# nodes which can be removed if their outputs are not used
+_pure_nodes = (
+    nodes.NodeCopy,
+    nodes.NodeAssign,
+    nodes.NodeBinOp,
+    nodes.NodeUnaryOp,
+    nodes.NodeMultiaryOp,
+    nodes.NodeCompare,
+    nodes.NodeGetItem,
+    nodes.NodeSlice,
+    nodes.NodeForGenerator,
+    nodes.NodeGenerate,
+    nodes.NodeConvert,
+    nodes.NodeLen,
+)
+
+# functions which can be removed if their outputs are not used
+_pure_functions = (
+    functions_builtin.ChainerFunction,
+    functions_builtin.ChainerArgminmaxFunction,
+    functions_builtin.CopyFunction,
+    functions_builtin.RangeFunction,
+    functions_builtin.LenFunction,
+    functions_builtin.ListFunction,
+    functions_dict.KeysFunction,
+    functions_dict.ValuesFunction,
+    functions_ndarray.NDArrayFunction,
+    functions_ndarray.NDArrayZerosFunction,
+    functions_ndarray.NDArrayFullFunction,
+    functions_ndarray.NDArrayCeilFunction,
+    functions_ndarray.NDArrayCumsumFunction,
+    functions_ndarray.NDArrayShapeFunction,
+    functions_ndarray.NDArraySizeFunction,
+    functions_ndarray.NDArrayChainerFunction,
+    functions_ndarray.NDarrayArgminmaxFunction,
+    functions_ndarray.NDarrayRoundFunction,
+    functions_ndarray.NDarraySqrtFunction,
+    functions_ndarray.NDarrayStackFunction,
+    functions_ndarray.NDarrayReshapeFunction,
+    functions_ndarray.NDarrayTransposeFunction,
+)
+
+# nodes which don't generate any ONNX node by themselves
+_structural_nodes = (
+    nodes.NodeInput,
+    nodes.NodeInvalid,
+    nodes.NodeReturn,
+)
+
+# attributes of nodes which are not values used by the node
+_ignored_node_attributes = ('outputs', 'subgraphs', 'lineprop', 'func')
+
+_binops = {
+    nodes.BinOpType.Add: lambda l, r: l + r,
+    nodes.BinOpType.Sub: lambda l, r: l - r,
+    nodes.BinOpType.Mul: lambda l, r: l * r,
+    nodes.BinOpType.Div: lambda l, r: l / r,
+    nodes.BinOpType.FloorDiv: lambda l, r: np.floor(l / r),
+}
+
+
+def _iter_graphs(graph: 'graphs.Graph'):
+    yield graph
+    for node in graph.nodes:
+        for subgraph in node.subgraphs:
+            yield from _iter_graphs(subgraph)
+
+
+def _get_graph_inputs(graph: 'graphs.Graph'):
+    ret = set()
+    for graph_ in _iter_graphs(graph):
+        ret.update(graph_.input_values)
+    return ret
+
+
+def _collect_values(attr, ret: 'List[values.Value]', visited):
+    if isinstance(attr, values.Object):
+        attr = attr.get_value()
+
+    if isinstance(attr, values.Value):
+        ret.append(attr)
+
+        # elements of containers are also used
+        if id(attr) in visited:
+            return
+        visited.add(id(attr))
+
+        if isinstance(attr, (values.TupleValue, values.ListValue)) and attr.internal_value is not None:
+            for v in attr.internal_value:
+                _collect_values(v, ret, visited)
+        elif isinstance(attr, values.DictValue):
+            collection = attr.internal_values.collection
+            while collection is not None:
+                for att in collection.attributes.values():
+                    if att.has_obj():
+                        _collect_values(att.get_obj(), ret, visited)
+                collection = collection.parent
+
+    elif isinstance(attr, (list, tuple)):
+        for v in attr:
+            _collect_values(v, ret, visited)
+
+    elif isinstance(attr, dict):
+        for v in attr.values():
+            _collect_values(v, ret, visited)
+
+    elif isinstance(attr, functions.FunctionArgValueInput):
+        _collect_values(attr.inputs, ret, visited)
+        _collect_values(attr.keywords, ret, visited)
+
+
+def get_used_values(node: 'nodes.Node') -> 'List[values.Value]':
+    '''
+    Returns values which are used by `node` (not including its subgraphs)
+    '''
+    ret = []
+    visited = set()
+    _collect_values(node.inputs, ret, visited)
+    for name, attr in vars(node).items():
+        if name not in _ignored_node_attributes:
+            _collect_values(attr, ret, visited)
+    return ret
+
+
+def get_all_used_values(graph: 'graphs.Graph') -> 'Set[values.Value]':
+    '''
+    Returns values which are used by nodes in `graph` and its subgraphs
+    '''
+    ret = set()
+    for graph_ in _iter_graphs(graph):
+        ret.update(graph_.output_values)
+        for node in graph_.nodes:
+            ret.update(get_used_values(node))
+    return ret
+
+
+class _Replacer:
+    def __init__(self, mapping: 'Dict[values.Value, values.Value]'):
+        self.mapping = mapping
+        self.visited = set()
+
+    def resolve(self, value):
+        while value in self.mapping:
+            value = self.mapping[value]
+        return value
+
+    def replace(self, attr):
+        if isinstance(attr, values.Object):
+            value = self.replace(attr.get_value())
+            if value is not attr.get_value():
+                # SubscriptObject adds SetItem if parents are updated
+                attr.revise(value, update_parent=False)
+            return attr
+
+        if isinstance(attr, values.Value):
+            attr = self.resolve(attr)
+            if id(attr) in self.visited:
+                return attr
+            self.visited.add(id(attr))
+
+            # containers may have replaced values
+            if isinstance(attr, (values.TupleValue, values.ListValue)) and attr.internal_value is not None:
+                attr.internal_value = [self.replace(v) for v in attr.internal_value]
+            return attr
+
+        if isinstance(attr, list):
+            return [self.replace(v) for v in attr]
+
+        if isinstance(attr, tuple):
+            return tuple(self.replace(v) for v in attr)
+
+        if isinstance(attr, dict):
+            return {k: self.replace(v) for k, v in attr.items()}
+
+        if isinstance(attr, functions.FunctionArgValueInput):
+            attr.inputs = self.replace(attr.inputs)
+            attr.keywords = self.replace(attr.keywords)
+            return attr
+
+        return attr
+
+    def replace_graph(self, graph: 'graphs.Graph'):
+        for graph_ in _iter_graphs(graph):
+            graph_.output_values = self.replace(graph_.output_values)
+            for node in graph_.nodes:
+                for name, attr in vars(node).items():
+                    if name not in _ignored_node_attributes:
+                        setattr(node, name, self.replace(attr))
+
+
+def replace_values(graph: 'graphs.Graph', mapping: 'Dict[values.Value, values.Value]'):
+    '''
+    Replaces values used in `graph` and its subgraphs with `mapping`
+    '''
+    if mapping:
+        _Replacer(mapping).replace_graph(graph)
+
+
+def _to_array(value: 'values.Value'):
+    # same as constants in ONNX
+    arr = np.array(value.internal_value)
+    if not context.get_config().float_restrict and arr.dtype == np.float64:
+        arr = arr.astype(np.float32)
+    return arr
+
+
+class ConstantFolder:
+    '''
+    Folds nodes whose inputs are constants into constants
+
+    It also inlines a branch of If whose condition is constant. Such If
+    is generated when one of branches is skipped while parsing.
+    '''
+
+    def __init__(self, graph: 'graphs.Graph'):
+        self.graph = graph
+        self.mapping = {}  # type: Dict[values.Value, values.Value]
+
+        # inputs of subgraphs are changed in each iteration
+        self.graph_inputs = _get_graph_inputs(graph)
+
+    def resolve(self, value):
+        while value in self.mapping:
+            value = self.mapping[value]
+        return value
+
+    def is_constant(self, value):
+        value = self.resolve(value)
+        return isinstance(value, (values.NumberValue, values.BoolValue, values.StrValue)) and \
+            value.generator is None and \
+            value.has_constant_value() and \
+            not value.is_dummy_value and \
+            value not in self.graph_inputs
+
+    def fold_bin_op(self, node: 'nodes.NodeBinOp'):
+        left = self.resolve(node.left)
+        right = self.resolve(node.right)
+        output = node.outputs[0]
+
+        if not isinstance(left, values.NumberValue) or not isinstance(right, values.NumberValue):
+            return False
+        if not isinstance(output, values.NumberValue) or node.binop not in _binops:
+            return False
+
+        left_ = _to_array(left)
+        right_ = _to_array(right)
+
+        # the type of results in ONNX is different from python
+        if left_.dtype != right_.dtype:
+            return False
+        if node.binop in (nodes.BinOpType.Div, nodes.BinOpType.FloorDiv) and left_.dtype.kind != 'f':
+            return False
+
+        output.internal_value = _binops[node.binop](left_, right_).item()
+        return True
+
+    def fold_unary_op(self, node: 'nodes.NodeUnaryOp'):
+        operand = self.resolve(node.operand)
+        output = node.outputs[0]
+
+        if node.unaryop == nodes.UnaryOpType.Not:
+            if not isinstance(operand, values.BoolValue) or not isinstance(output, values.BoolValue):
+                return False
+            output.internal_value = not operand.internal_value
+            return True
+
+        if not isinstance(operand, values.NumberValue) or not isinstance(output, values.NumberValue):
+            return False
+
+        # a float zero is added or subtracted in ONNX
+        operand_ = _to_array(operand)
+        if operand_.dtype.kind != 'f':
+            return False
+
+        if node.unaryop == nodes.UnaryOpType.UAdd:
+            output.internal_value = operand_.item()
+            return True
+        if node.unaryop == nodes.UnaryOpType.USub:
+            output.internal_value = (-operand_).item()
+            return True
+        return False
+
+    def fold_compare(self, node: 'nodes.NodeCompare'):
+        # compared while parsing
+        output = node.outputs[0]
+        if node.compare in (nodes.CompareType.In, nodes.CompareType.NotIn, nodes.CompareType.unknown):
+            return False
+        return isinstance(output, values.BoolValue) and output.has_constant_value()
+
+    def fold_multiary_op(self, node: 'nodes.NodeMultiaryOp'):
+        output = node.outputs[0]
+        operands = [self.resolve(v) for v in node.values_list]
+
+        if not isinstance(output, values.BoolValue):
+            return False
+        if not all(isinstance(v, values.BoolValue) for v in operands):
+            return False
+
+        if node.multiaryop == nodes.MultiaryOpType.And:
+            output.internal_value = all(v.internal_value for v in operands)
+            return True
+        if node.multiaryop == nodes.MultiaryOpType.Or:
+            output.internal_value = any(v.internal_value for v in operands)
+            return True
+        return False
+
+    def fold(self, node: 'nodes.Node'):
+        if len(node.outputs) != 1 or node.subgraphs:
+            return False
+
+        if not all(self.is_constant(v) for v in node.inputs):
+            return False
+
+        if isinstance(node, nodes.NodeBinOp):
+            return self.fold_bin_op(node)
+        if isinstance(node, nodes.NodeUnaryOp):
+            return self.fold_unary_op(node)
+        if isinstance(node, nodes.NodeCompare):
+            return self.fold_compare(node)
+        if isinstance(node, nodes.NodeMultiaryOp):
+            return self.fold_multiary_op(node)
+        return False
+
+    def get_taken_branch(self, node: 'nodes.NodeIf'):
+        cond = self.resolve(node.cond)
+        if not isinstance(cond, (values.BoolValue, values.NumberValue)) or not cond.has_constant_value():
+            return None
+
+        # same as skipping branches while parsing
+        if cond.internal_value == True:
+            return node.true_graph
+        if cond.internal_value == False:
+            return node.false_graph
+        return None
+
+    def inline(self, node: 'nodes.NodeIf', branch: 'graphs.Graph'):
+        # inputs of subgraphs in the branch cannot be replaced
+        nested_inputs = _get_graph_inputs(branch) - set(branch.input_values)
+        for input, branch_input in zip(node.input_values, branch.input_values):
+            if branch_input is not input:
+                if branch_input in nested_inputs:
+                    return None
+                self.mapping[branch_input] = input
+
+        # outputs of If may be used as inputs of subgraphs
+        copies = []
+        for output, branch_output in zip(node.outputs, branch.output_values):
+            copy = nodes.NodeCopy(branch_output, node.lineprop)
+            output.generator = None
+            copy.set_outputs([output])
+            copies.append(copy)
+
+        return branch.nodes + copies
+
+    def fold_graph(self, graph: 'graphs.Graph'):
+        folded_nodes = []
+        stack = list(reversed(graph.nodes))
+
+        while len(stack) > 0:
+            node = stack.pop()
+
+            if isinstance(node, nodes.NodeIf):
+                branch = self.get_taken_branch(node)
+                inlined_nodes = self.inline(node, branch) if branch is not None else None
+                if inlined_nodes is not None:
+                    stack.extend(reversed(inlined_nodes))
+                    continue
+
+            if self.fold(node):
+                node.outputs[0].generator = None
+                continue
+
+            for subgraph in node.subgraphs:
+                self.fold_graph(subgraph)
+
+            folded_nodes.append(node)
+
+        graph.nodes = folded_nodes
+
+    def run(self):
+        self.fold_graph(self.graph)
+        replace_values(self.graph, self.mapping)
+
+
+def fold_constants(graph: 'graphs.Graph'):
+    ConstantFolder(graph).run()
+
+
+class CopyPropagator:
+    '''
+    Replaces values which are same as other values
+
+    Values which are copied or passed through If and For are replaced
+    with their original values. Inputs of graphs are never replaced
+    because they are shared with values in outer graphs.
+    '''
+
+    def __init__(self, graph: 'graphs.Graph'):
+        self.graph = graph
+        self.mapping = {}  # type: Dict[values.Value, values.Value]
+        self.graph_inputs = _get_graph_inputs(graph)
+
+    def resolve(self, value):
+        while value in self.mapping:
+            value = self.mapping[value]
+        return value
+
+    def replace(self, value, original):
+        if value in self.graph_inputs:
+            return False
+        self.mapping[value] = original
+        return True
+
+    def get_used_values(self, graph: 'graphs.Graph'):
+        return set(self.resolve(v) for v in get_all_used_values(graph))
+
+    def propagate_if(self, node: 'nodes.NodeIf'):
+        true_graph = node.true_graph
+        false_graph = node.false_graph
+
+        # outputs which are inputs in both branches
+        for i in reversed(range(len(node.outputs))):
+            true_output = self.resolve(true_graph.output_values[i])
+            false_output = self.resolve(false_graph.output_values[i])
+            for j, input in enumerate(node.input_values):
+                if true_output is true_graph.input_values[j] and \
+                        false_output is false_graph.input_values[j]:
+                    if self.replace(node.outputs[i], input):
+                        node.outputs.pop(i)
+                        true_graph.output_values.pop(i)
+                        false_graph.output_values.pop(i)
+                    break
+
+        # inputs which are not used in both branches
+        true_used = self.get_used_values(true_graph)
+        false_used = self.get_used_values(false_graph)
+        for j in reversed(range(len(node.input_values))):
+            if true_graph.input_values[j] in true_used or false_graph.input_values[j] in false_used:
+                continue
+            node.input_values.pop(j)
+            true_graph.input_values.pop(j)
+            false_graph.input_values.pop(j)
+
+        node.inputs = [node.cond] + node.input_values
+
+    def propagate_for(self, node: 'nodes.NodeFor'):
+        body_graph = node.body_graph
+
+        # counter, condition and iterator are before loop carried values
+        input_offset = 3
+        output_offset = 2
+
+        for j in reversed(range(len(node.input_values))):
+            body_input = body_graph.input_values[input_offset + j]
+            body_output = self.resolve(body_graph.output_values[output_offset + j])
+            if body_input is not body_output:
+                continue
+
+            # not changed in the loop
+            if not self.replace(node.outputs[1 + j], node.input_values[j]):
+                continue
+
+            # remove the loop carried value if it is not used in the loop
+            output = body_graph.output_values.pop(output_offset + j)
+            if body_input in self.get_used_values(body_graph):
+                body_graph.output_values.insert(output_offset + j, output)
+                continue
+
+            node.input_values.pop(j)
+            node.outputs.pop(1 + j)
+            body_graph.input_values.pop(input_offset + j)
+
+        node.inputs = [node.iter_value] + node.input_values
+
+    def propagate_graph(self, graph: 'graphs.Graph'):
+        propagated_nodes = []
+        for node in graph.nodes:
+            for subgraph in node.subgraphs:
+                self.propagate_graph(subgraph)
+
+            if isinstance(node, nodes.NodeIf):
+                self.propagate_if(node)
+            elif isinstance(node, nodes.NodeFor):
+                self.propagate_for(node)
+            elif isinstance(node, nodes.NodeCopy):
+                if self.replace(node.outputs[0], node.value):
+                    continue
+
+            propagated_nodes.append(node)
+
+        graph.nodes = propagated_nodes
+
+    def run(self):
+        self.propagate_graph(self.graph)
+        replace_values(self.graph, self.mapping)
+
+
+def propagate_copies(graph: 'graphs.Graph'):
+    CopyPropagator(graph).run()
+
+
+def _has_side_effects(node: 'nodes.Node'):
+    if isinstance(node, _pure_nodes + _structural_nodes):
+        return False
+
+    if isinstance(node, nodes.NodeCall):
+        return not isinstance(node.func, _pure_functions)
+
+    if isinstance(node, (nodes.NodeIf, nodes.NodeFor, nodes.NodeListcomp)):
+        return any(_has_side_effects(n) for g in node.subgraphs for n in g.nodes)
+
+    return True
+
+
+def _eliminate_dead_nodes(graph: 'graphs.Graph', used):
+    used.update(graph.output_values)
+
+    alive_nodes = []
+    for node in reversed(graph.nodes):
+        if not isinstance(node, _structural_nodes) and \
+                not any(o in used for o in node.outputs) and \
+                not _has_side_effects(node):
+            continue
+
+        for subgraph in node.subgraphs:
+            _eliminate_dead_nodes(subgraph, used)
+
+        used.update(get_used_values(node))
+        alive_nodes.append(node)
+
+    alive_nodes.reverse()
+    graph.nodes = alive_nodes
+
+
+def eliminate_dead_nodes(graph: 'graphs.Graph'):
+    '''
+    Removes nodes whose outputs are not used and which have no side effects
+    '''
+    _eliminate_dead_nodes(graph, set())
+
+
+def optimize(graph: 'graphs.Graph'):
+    '''
+    Optimizes a graph generated by vevaluator before it is converted into ONNX
+    '''
+    fold_constants(graph)
+    propagate_copies(graph)
+    eliminate_dead_nodes(graph)
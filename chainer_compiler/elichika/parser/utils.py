@@ -1,12 +1,10 @@
 import os
 import numpy as np
-from chainer_compiler.elichika.parser import config
+from chainer_compiler.elichika.parser import context
 from chainer_compiler.elichika.parser import values
 import inspect
 import re
 
-current_id = 0
-
 slice_int_max = 2 ** 31 - 1
 
 dtype_float32 = np.array(1.0, dtype=np.float32).dtype
@@ -14,15 +12,11 @@ dtype_float64 = np.array(1.0, dtype=np.float64).dtype
 dtype_int = np.array(1.0, dtype=np.int).dtype
 
 def get_guid():
-    global current_id
-    id = current_id
-    current_id += 1
-    return id
+    return context.get_context().get_guid()
 
 
 def reset_guid():
-    global current_id
-    current_id = 0
+    context.get_context().guid = 0
 
 def print_warning(s, lineprop):
     print('warning : {} in {}'.format(s, lineprop))
@@ -31,7 +25,7 @@ def print_error(s, lineprop):
     print('error : {} in {}'.format(s, lineprop))
 
 def is_disabled_module(m):
-    return m in config.disabled_modules
+    return m in context.get_config().disabled_modules
 
 def str_2_dtype(str_dtype):
     if str_dtype == 'q':
@@ -109,7 +103,7 @@ def try_get_value(value, name, lineprop, is_none_allowed = False) -> 'values.Val
         return None
 
     if isinstance(value, values.NoneValue) and not is_none_allowed:
-        if config.show_warnings:
+        if context.get_config().show_warnings:
             print('Value {} is none. in {}'.format(name, lineprop))
         return None
 
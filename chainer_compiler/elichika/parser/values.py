@@ -10,33 +10,18 @@ import gast
 import inspect
 import six
 import types
-import weakref
 from chainer_compiler.elichika.parser import vevaluator
 from chainer_compiler.elichika.parser import core
 from chainer_compiler.elichika.parser import nodes
 from chainer_compiler.elichika.parser import functions
 from chainer_compiler.elichika.parser import utils
-from chainer_compiler.elichika.parser import config
 from chainer_compiler.elichika.parser import flags
+from chainer_compiler.elichika.parser import context
 
 from chainer_compiler.elichika.parser.functions import FunctionBase, UserDefinedFunction
 
-fields = []
-histories = []
-
-# hashable function. key is python function, value is FuncValue
-function_converters = {}
-
-# unhashable function. key is str, value is FuncValue
-builtin_function_converters = {}
-
-# an array of convertter from python instance into Value
-# first argument is module, second argument is python instance
-instance_converters = []
-
 # assign predefined values
-predefined_value_assigners = [] # type: List[PredefinedValueAssigner]
-
+# assigners are registered by context.register_predefined_value_assigner
 class PredefinedValueAssigner:
     def __init__(self):
         self.target_type = None # type: type
@@ -45,7 +30,7 @@ class PredefinedValueAssigner:
         return
 
 def apply_predefined_value_assigners(target_type : 'type', target : 'Object'):
-    for assigner in predefined_value_assigners:
+    for assigner in context.get_context().predefined_value_assigners:
         if assigner.target_type != target_type:
             continue
         assigner.assign(target)
@@ -59,49 +44,51 @@ def create_ref_value_name_with_constant(value):
     return '@C_Unknown'
 
 def reset_field_and_attributes():
-    global fields
-    fields = []
-    histories.clear()
+    ctx = context.get_context()
+    ctx.histories.clear()
+
 
+class History:
+    '''
+    A branch which is being evaluated
 
-def register_field(field: 'Field'):
-    fields.append(weakref.ref(field))
+    Fields are brought into a history lazily when they are touched
+    during it, so entering and leaving a history only costs the number
+    of touched fields.
+    '''
+
+    def __init__(self, history_id: 'str'):
+        self.id = history_id
+        self.fields = {}  # type: Dict[Field, None]
+
+    def get_touched_fields(self) -> 'List[Field]':
+        # in the order of creation of fields
+        fields = [f for f in self.fields.keys() if f.histories and f.histories[-1] is self]
+        fields.sort(key=lambda f: f.id)
+        return fields
 
-def unregister_field(field: 'Field'):
-    global fields
-    fields = [f for f in fields if f() != field]
 
 def push_history(history_id: 'str'):
-    histories.append(history_id)
-    for field in fields:
-        o = field()
-        if o is not None:
-            o.push_history(history_id)
+    context.get_context().histories.append(History(history_id))
 
 
 def pop_history():
-    histories.pop()
-    for field in fields:
-        o = field()
-        if o is not None:
-            o.pop_history()
+    history = context.get_context().histories.pop()
+    for field in history.get_touched_fields():
+        field.pop_history()
 
 
 def get_inputs() -> 'List[FieldInput]':
     ret = []
-    for field in fields:
-        o = field()
-        if o is not None:
-            ret += o.get_inputs()
+    for field in context.get_context().histories[-1].get_touched_fields():
+        ret += field.get_inputs()
     return ret
 
 
 def get_outputs() -> 'List[FieldOutput]':
     ret = []
-    for field in fields:
-        o = field()
-        if o is not None:
-            ret += o.get_outputs()
+    for field in context.get_context().histories[-1].get_touched_fields():
+        ret += field.get_outputs()
     return ret
 
 
@@ -117,18 +104,45 @@ def compare(value1, value2):
             return False
 
 
+def instantiate_function_value(func: 'FuncValue') -> 'FuncValue':
+    '''
+    Returns a FuncValue of the current export for a FuncValue of the
+    converter registry
+
+    Values in the registry are shared by all exports, so names assigned
+    during an export must be given to values owned by the export.
+    '''
+    ctx = context.get_context()
+    ret = ctx.function_values.get(func)
+    if ret is not None:
+        return ret
+
+    module = None
+    if func.module is not None:
+        internal_module = func.module.get_value().internal_module
+        module = ctx.module_objects.get(internal_module)
+        if module is None:
+            module = Object(ModuleValue(internal_module))
+            ctx.module_objects[internal_module] = module
+
+    ret = FuncValue(func.func, func.obj, module=module)
+    ctx.function_values[func] = ret
+    return ret
+
+
 def parse_instance(default_module, name, instance, self_instance=None, from_member = False, root_graph : 'graphs.Graph' = None) -> "Object":
 
-    for converter in instance_converters:
+    ctx = context.get_context()
+    for converter in ctx.instance_converters:
         ret = converter(default_module, instance)
         if ret is not None:
             return Object(ret)
 
     #if inspect.ismethod(instance) or inspect.isfunction(instance) or isinstance(instance, np.ufunc):
     if isinstance(instance, collections.Hashable):
-        if instance in function_converters.keys():
-            func = function_converters[instance]
-            return Object(func)
+        if instance in ctx.function_converters.keys():
+            func = ctx.function_converters[instance]
+            return Object(instantiate_function_value(func))
 
     # need to check whether is value bool before check whether is value int
     if isinstance(instance, bool):
@@ -389,25 +403,35 @@ class FieldAttributeCollection():
 class Field():
     def __init__(self):
         self.collection = FieldAttributeCollection('', None)
-        histories_ = histories.copy()
-        histories_.reverse()
 
-        for history in histories_:
-            collection = FieldAttributeCollection(history, self.collection)
-            self.collection = collection
+        # histories which self.collection corresponds to
+        self.histories = []  # type: List[History]
+        self.is_disposed = False
 
         self.module = None
         self.id = utils.get_guid()
 
-        register_field(self)
-
     def dispose(self):
         '''
         dispose this field because of exit function
         don't touch after dispose
         '''
         self.collection = FieldAttributeCollection('', None)
-        unregister_field(self)
+        self.histories = []
+        self.is_disposed = True
+
+    def update_histories(self):
+        '''
+        bring this field into histories which are entered after the field was touched last
+        '''
+        if self.is_disposed:
+            return
+
+        histories = context.get_context().histories
+        for history in histories[len(self.histories):]:
+            self.collection = FieldAttributeCollection(history.id, self.collection)
+            self.histories.append(history)
+            history.fields[self] = None
 
     def set_module(self, module):
         self.module = module
@@ -416,6 +440,7 @@ class Field():
         return self
 
     def has_attribute(self, key) -> 'Boolean':
+        # collections of histories which are not brought yet are empty
         c = self.collection
 
         while c is not None:
@@ -426,9 +451,11 @@ class Field():
         return False
 
     def try_get_attribute(self, key : 'str') -> 'Attribute':
+        self.update_histories()
         return self.collection.try_get_attribute(key)
 
     def get_attribute(self, key: 'str', root_graph : 'graphs.Graph' = None, from_module=False) -> 'Attribute':
+        self.update_histories()
         attribute = self.collection.try_get_attribute(key)
 
         if attribute is not None:
@@ -446,16 +473,10 @@ class Field():
         self.collection.attributes[key] = attribute
         return attribute
 
-    def push_history(self, history_id: 'str'):
-        collection = FieldAttributeCollection(history_id, self.collection)
-        self.collection = collection
-
     def pop_history(self):
         self.collection.pop_history()
         self.collection = self.collection.parent
-
-        if self.collection is None:
-            self.collection = FieldAttributeCollection('', None)
+        self.histories.pop()
 
     def get_inputs(self):
         return self.collection.get_inputs()
@@ -464,6 +485,7 @@ class Field():
         return self.collection.get_outputs()
 
     def set_predefined_obj(self, key, obj):
+        self.update_histories()
         collections = []
         c = self.collection
 
@@ -585,7 +607,7 @@ class SubscriptObject(Object):
             if subscript_value.has_constant_value():
                 subscripts = [utils.try_get_value(x, 'subscript', -1) for x in subscript_value.get_constant_value()]
             else:
-                if config.show_warnings:
+                if context.get_config().show_warnings:
                     assert False, "This subscript is not supported."
 
         else:
@@ -683,7 +705,7 @@ class NumberValue(Value):
         if self.internal_value is not None:
             self.dtype = np.array(self.internal_value).dtype
 
-        if not config.float_restrict and self.dtype == np.float64:
+        if not context.get_config().float_restrict and self.dtype == np.float64:
             self.dtype = np.float32
 
     def is_not_none_or_any_value(self):
@@ -963,7 +985,7 @@ class TensorValue(Value):
         if self.internal_value is not None:
             self.dtype = np.array(self.internal_value).dtype
 
-        if not config.float_restrict and self.dtype == np.float64:
+        if not context.get_config().float_restrict and self.dtype == np.float64:
             self.dtype = np.float32
 
     def is_not_none_or_any_value(self):
@@ -1016,8 +1038,9 @@ class ModuleValue(Value):
             members_dict[member[0]] = member[1]
 
         if not (name in members_dict.keys()):
+            builtin_function_converters = context.get_context().builtin_function_converters
             if name in builtin_function_converters.keys():
-                v = Object(builtin_function_converters[name])
+                v = Object(instantiate_function_value(builtin_function_converters[name]))
                 return v
             return None
 
@@ -1030,7 +1053,7 @@ class ModuleValue(Value):
                 dummy_flags_members_dict[member[0]] = member[1]
 
         if name in dummy_flags_members_dict.keys():
-            v = Object(builtin_function_converters[name])
+            v = Object(instantiate_function_value(context.get_context().builtin_function_converters[name]))
             return v
 
         v = parse_instance(inst, name, attr_v, None)
@@ -1,17 +1,23 @@
 from chainer_compiler.elichika.parser import nodes
 from chainer_compiler.elichika.parser import values
 from chainer_compiler.elichika.parser import functions
-from chainer_compiler.elichika.parser import config
+from chainer_compiler.elichika.parser import context
 from chainer_compiler.elichika.parser import utils
 
 import numpy as np
+import threading
 
 # pair op, left, right and result
 binop_type_table = []
 
 is_initialized = False
+initialize_lock = threading.Lock()
 
 def initialize_lazy():
+    with initialize_lock:
+        initialize_lazy_locked()
+
+def initialize_lazy_locked():
     global is_initialized
     if is_initialized:
         return
@@ -109,7 +115,7 @@ def veval(op: 'nodes.BinOpType', left: 'values.Value', right: 'values.Value', li
         left_type = left.dtype
         right_type = right.dtype
 
-        if not config.float_restrict:
+        if not context.get_config().float_restrict:
             if left_type == utils.dtype_float64:
                 left_type = utils.dtype_float32
             if right_type == utils.dtype_float64:
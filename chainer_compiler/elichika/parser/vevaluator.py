@@ -5,9 +5,11 @@ import inspect
 import ast, gast
 import itertools
 import numbers
+import threading
+import weakref
 from contextlib import ExitStack
 
-from chainer_compiler.elichika.parser import config
+from chainer_compiler.elichika.parser.context import get_config
 from chainer_compiler.elichika.parser import nodes
 from chainer_compiler.elichika.parser import values
 from chainer_compiler.elichika.parser import functions
@@ -57,15 +59,50 @@ class AstContext:
         if hasattr(self.nast, 'lineno'):
             self.lineno = self.nast.lineno + self.lineno_offset
 
+        # precomputed to evaluate the same ast repeatedly
+        self.lineprop = utils.LineProperty(self.lineno, self.filename)
+        self.veval = get_veval_func(self.nast)
+        self.children = {}
+
     def c(self, value) -> 'AstContext':
         """
         get AstContext including value
         """
-        return AstContext(value, self.lineno_offset, filename=self.filename)
+        if not get_config().cache_ast_contexts:
+            return AstContext(value, self.lineno_offset, filename=self.filename)
+
+        # ast is not modified, so contexts of children are reused
+        ret = self.children.get(id(value))
+        if ret is None:
+            ret = AstContext(value, self.lineno_offset, filename=self.filename)
+            self.children[id(value)] = ret
+        return ret
+
+
+# contexts of bodies of functions, which are shared by calls
+_body_contexts = weakref.WeakKeyDictionary()
+_body_contexts_lock = threading.Lock()
+
+def get_body_context(nast, lineno_offset : 'int', filename : 'str' = '') -> 'AstContext':
+    """
+    get AstContext of the body of a function
+
+    The context is created once for each function and reused by all calls
+    of the function, so the ast is not dispatched again.
+    """
+    if not get_config().cache_ast_contexts:
+        return AstContext(nast.body, lineno_offset, filename=filename)
+
+    key = (lineno_offset, filename)
+    with _body_contexts_lock:
+        contexts = _body_contexts.setdefault(nast, {})
+        if key not in contexts:
+            contexts[key] = AstContext(nast.body, lineno_offset, filename=filename)
+        return contexts[key]
 
 def veval_ast_attribute(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None) -> 'Attribute':
     assert(isinstance(astc.nast, gast.gast.Attribute))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     from_module = True
     if context is not None and context._eval_as_written_target:
@@ -107,13 +144,13 @@ def veval_ast_attribute(astc : 'AstContext', local_field : 'values.Field', graph
 
 def veval_ast_assign(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
     assert(isinstance(astc.nast, gast.gast.Assign))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     value = veval_ast(astc.c(astc.nast.value), local_field, graph, context)
     value_obj = utils.try_get_obj(value, 'assign', lineprop)
 
     if value is None:
-        if config.show_warnings:
+        if get_config().show_warnings:
             print('It is possible that assiging value is invalid in L.{}'.format(astc.lineno))
         return None
 
@@ -150,7 +187,7 @@ def veval_ast_name(astc : 'AstContext', local_field : 'values.Field', graph : 'G
 
 def veval_ast_call(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None) -> 'Attribute':
     assert(isinstance(astc.nast, gast.gast.Call))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     func = veval_ast(astc.c(astc.nast.func), local_field, graph, context)
     if func == None or not func.has_obj():
@@ -170,7 +207,7 @@ def veval_ast_call(astc : 'AstContext', local_field : 'values.Field', graph : 'G
         arg_ = veval_ast(astc.c(keyword.value), local_field, graph, context)
         finput.keywords[keyword.arg] = utils.try_get_obj(arg_, 'call', lineprop)
 
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     # check arguments
     for o in finput.inputs:
@@ -192,21 +229,21 @@ def veval_ast_call(astc : 'AstContext', local_field : 'values.Field', graph : 'G
             return ret
 
     
-    if config.show_warnings:
+    if get_config().show_warnings:
         print('Unknown function is called in L.{}'.format(astc.lineno))
     return None
 
     
 def veval_ast_return(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None) -> 'None':
     assert(isinstance(astc.nast, gast.gast.Return))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     value = veval_ast(astc.c(astc.nast.value), local_field, graph, context)
     value_obj = utils.try_get_obj(value, 'return', lineprop)
     value_value = utils.try_get_value(value, 'return', lineprop)
 
     if value_value is None:
-        if config.show_warnings:
+        if get_config().show_warnings:
             print('Returned values are not found. in L.{}'.format(astc.lineno))
         return None
 
@@ -216,7 +253,7 @@ def veval_ast_return(astc : 'AstContext', local_field : 'values.Field', graph :
 
 def veval_ast_if(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
     assert(isinstance(astc.nast, gast.gast.If))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     # if condition
     test = veval_ast(astc.c(astc.nast.test), local_field, graph, context)
@@ -451,7 +488,7 @@ def veval_ast_if(astc : 'AstContext', local_field : 'values.Field', graph : 'Gra
 
 def veval_ast_aug_assign(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
     assert(isinstance(astc.nast, gast.gast.AugAssign))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     target = veval_ast(astc.c(astc.nast.target), local_field, graph, context)
     value = veval_ast(astc.c(astc.nast.value), local_field, graph, context)
@@ -494,7 +531,7 @@ def veval_ast_subscript(astc : 'AstContext', local_field : 'values.Field', graph
     Ex. x[1], x[y,z]
     '''
     assert(isinstance(astc.nast, gast.gast.Subscript))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     def veval_with_default(nast, default_value):
         if nast is None:
@@ -549,7 +586,7 @@ def veval_ast_subscript(astc : 'AstContext', local_field : 'values.Field', graph
                     values_ = [utils.try_get_value(x, 'subscript', lineprop) for x in slice_value.get_constant_value()]
                     node = nodes.NodeGetItem(value_value, values_, line=lineprop)
                 else:
-                    if config.show_warnings:
+                    if get_config().show_warnings:
                         print('This subscript is not supported. in L.{}'.format(astc.lineno))
                     node = nodes.NodeInvalid(line=lineprop)
             else:
@@ -628,7 +665,7 @@ def veval_ast_listcomp(astc : 'AstContext', local_field : 'values.Field', graph
     [elt for target in iter]
     '''
     assert(isinstance(astc.nast, gast.gast.ListComp))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     listcomp_guid = str(utils.get_guid())
     listcomp_id = 'listcomp_' + listcomp_guid
@@ -651,7 +688,7 @@ def veval_ast_listcomp(astc : 'AstContext', local_field : 'values.Field', graph
     if isinstance(generator.target, gast.gast.Name):
         target_name = generator.target.id
     else:
-        if config.show_warnings:
+        if get_config().show_warnings:
             print('This for is not supported. in L.{}'.format(astc.lineno))
         return None
 
@@ -676,7 +713,7 @@ def veval_ast_listcomp(astc : 'AstContext', local_field : 'values.Field', graph
     target_obj = iter_value.get_iterator()
     if target_obj is None:
         target_obj = values.Object(values.UnknownValue())
-        if config.show_warnings:
+        if get_config().show_warnings:
             print('unknown iteratable type in L.{}'.format(lineprop))
     target_value = target_obj.get_value()
 
@@ -785,7 +822,7 @@ def veval_ast_bin_op(astc : 'AstContext', local_field : 'values.Field', graph :
     Ex. a + b, b // c, etc
     """
     assert(isinstance(astc.nast, gast.gast.BinOp))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     left = veval_ast(astc.c(astc.nast.left), local_field, graph, context)
     right = veval_ast(astc.c(astc.nast.right), local_field, graph, context)
@@ -825,7 +862,7 @@ def veval_ast_bool_op(astc : 'AstContext', local_field : 'values.Field', graph :
     Ex. x and y
     """
     assert(isinstance(astc.nast, gast.gast.BoolOp))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     multiaryop = nodes.MultiaryOpType.Unknown
     if isinstance(astc.nast.op, gast.And):
@@ -850,7 +887,7 @@ def veval_ast_unary_op(astc : 'AstContext', local_field : 'values.Field', graph
     Ex. -xx
     """
     assert(isinstance(astc.nast, gast.gast.UnaryOp))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     unaryop = nodes.UnaryOpType.Unknown
     if isinstance(astc.nast.op, gast.UAdd):
@@ -879,7 +916,7 @@ def veval_ast_compare(astc : 'AstContext', local_field : 'values.Field', graph :
     Ex. a >= b, a != b, a is b, etc
     """
     assert(isinstance(astc.nast, gast.gast.Compare))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     left = veval_ast(astc.c(astc.nast.left), local_field, graph, context)
     right = veval_ast(astc.c(astc.nast.comparators[0]), local_field, graph, context)
@@ -949,7 +986,7 @@ def veval_ast_num(astc : 'AstContext', local_field : 'values.Field', graph : 'Gr
     '''
     assert(isinstance(astc.nast, gast.gast.Constant))
     assert(isinstance(astc.nast.value, numbers.Number))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
     value = values.NumberValue(astc.nast.value)
     ret = values.Object(value)
 
@@ -964,7 +1001,7 @@ def veval_ast_str(astc : 'AstContext', local_field : 'values.Field', graph : 'Gr
     '''
     assert(isinstance(astc.nast, gast.gast.Constant))
     assert(isinstance(astc.nast.value, str))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
     value = values.StrValue(astc.nast.value)
     ret = values.Object(value)
 
@@ -978,7 +1015,7 @@ def veval_ast_name_constant(astc : 'AstContext', local_field : 'values.Field', g
     Ex. True
     '''
     assert(isinstance(astc.nast, gast.gast.Constant))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
     ret = None
     if astc.nast.value == True:
         ret = values.Object(values.BoolValue(True))
@@ -997,7 +1034,7 @@ def veval_ast_name_constant(astc : 'AstContext', local_field : 'values.Field', g
 
 def veval_ast_tuple(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
     assert(isinstance(astc.nast, gast.gast.Tuple))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     if context is not None and context._eval_as_written_target:
         vs = []
@@ -1035,7 +1072,7 @@ def veval_ast_list(astc : 'AstContext', local_field : 'values.Field', graph : 'G
     Ex. [],[x,y,z]
     TODO : Initializer
     '''
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     elts = []
     for elt in astc.nast.elts:
@@ -1052,7 +1089,7 @@ def veval_ast_list(astc : 'AstContext', local_field : 'values.Field', graph : 'G
 
 def veval_ast_dict(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
     assert(isinstance(astc.nast, gast.gast.Dict))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     keys = []
     elts = []
@@ -1076,7 +1113,7 @@ def veval_ast_for_unroll(astc : 'AstContext', target_name, iter_ : 'values.ListV
     with unroll
     '''
     assert(isinstance(astc.nast, gast.gast.For))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     for element in iter_.get_constant_value():
         local_field.get_attribute(target_name).revise(element)
@@ -1090,7 +1127,7 @@ def veval_ast_for(astc : 'AstContext', local_field : 'values.Field', graph : 'Gr
         ...
     '''
     assert(isinstance(astc.nast, gast.gast.For))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     # for target in iter:
     iter_ = veval_ast(astc.c(astc.nast.iter), local_field, graph, context)
@@ -1102,7 +1139,7 @@ def veval_ast_for(astc : 'AstContext', local_field : 'values.Field', graph : 'Gr
     if isinstance(astc.nast.target, gast.gast.Name):
         target_name = astc.nast.target.id
     else:
-        if config.show_warnings:
+        if get_config().show_warnings:
             print('This for is not supported. in L.{}'.format(astc.lineno))
         return None
 
@@ -1139,7 +1176,7 @@ def veval_ast_for(astc : 'AstContext', local_field : 'values.Field', graph : 'Gr
     target_obj = input_iter_value.get_iterator()
     if target_obj is None:
         target_obj = values.Object(values.UnknownValue())
-        if config.show_warnings:
+        if get_config().show_warnings:
             print('unknown iteratable type in L.{}'.format(astc.lineno))
     target_value = target_obj.get_value()
     
@@ -1258,7 +1295,7 @@ def veval_ast_break(astc : 'AstContext', local_field : 'values.Field', graph : '
 
 def veval_ast_with(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
     assert(isinstance(astc.nast, gast.gast.With))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     from_module = True
     if context is not None and context._eval_as_written_target:
@@ -1289,7 +1326,7 @@ def veval_ast_with(astc : 'AstContext', local_field : 'values.Field', graph : 'G
 
 def veval_ast_withitem(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
     assert(isinstance(astc.nast, gast.gast.withitem))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     from_module = True
     if context is not None and context._eval_as_written_target:
@@ -1305,7 +1342,7 @@ def veval_ast_withitem(astc : 'AstContext', local_field : 'values.Field', graph
         value_obj = utils.try_get_obj(value_obj, 'withitem', lineprop)
 
     if value is None:
-        if config.show_warnings:
+        if get_config().show_warnings:
             print('It is possible that one of those withitem is invalid in L.{}'.format(astc.lineno))
         return None
 
@@ -1327,7 +1364,7 @@ def veval_ast_lambda(astc : 'AstContext', local_field : 'values.Field', graph :
     Note: kwonly_args are not supported
     '''
     assert(isinstance(astc.nast, gast.gast.Lambda))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     lambda_id = 'lambda_' + str(utils.get_guid())
     values.push_history(lambda_id)
@@ -1339,7 +1376,7 @@ def veval_ast_lambda(astc : 'AstContext', local_field : 'values.Field', graph :
 
 def veval_ast_arguments(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
     assert(isinstance(astc.nast, gast.gast.arguments))
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
+    lineprop = astc.lineprop
 
     ret = functions.FunctionArgCollection()
 
@@ -1361,120 +1398,79 @@ def veval_ast_arguments(astc : 'AstContext', local_field : 'values.Field', graph
 
     return ret
 
-def veval_ast(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
-    lineprop = utils.LineProperty(astc.lineno, astc.filename)
-    if context is None:
-        context = functions.VEvalContext()
-
-    if isinstance(astc.nast, list):
-        ret = None
-        for nast_ in astc.nast:
-            ret = veval_ast(AstContext(nast_, astc.lineno_offset, filename=astc.filename), local_field, graph, context)
-            if ret is not None:
-                break
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Assign):
-        veval_ast_assign(astc, local_field, graph, context)
-        return None
-
-    elif isinstance(astc.nast, gast.gast.Attribute):
-        ret = veval_ast_attribute(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Call):
-        ret = veval_ast_call(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.BinOp):
-        ret = veval_ast_bin_op(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.UnaryOp):
-        ret = veval_ast_unary_op(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Compare):
-        ret = veval_ast_compare(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Return):
-        ret = veval_ast_return(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Name):
-        ret = veval_ast_name(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.AugAssign):
-        veval_ast_aug_assign(astc, local_field, graph, context)
-
-    elif isinstance(astc.nast, gast.gast.Expr):
-        veval_ast_expr(astc, local_field, graph, context)
-
-    elif isinstance(astc.nast, gast.gast.Subscript):
-        return veval_ast_subscript(astc, local_field, graph, context)
-
-    elif isinstance(astc.nast, gast.gast.ListComp):
-        return veval_ast_listcomp(astc, local_field, graph, context)
-
-    elif isinstance(astc.nast, gast.gast.If):
-        veval_ast_if(astc, local_field, graph, context)
-        return None
+def veval_ast_body(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
+    assert(isinstance(astc.nast, list))
+    ret = None
+    for nast_ in astc.nast:
+        ret = veval_ast(astc.c(nast_), local_field, graph, context)
+        if ret is not None:
+            break
+    return ret
 
-    elif isinstance(astc.nast, gast.gast.Constant) and (type(astc.nast.value) == bool or astc.nast.value is None):
+def veval_ast_constant(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
+    assert(isinstance(astc.nast, gast.gast.Constant))
+    if type(astc.nast.value) == bool or astc.nast.value is None:
         return veval_ast_name_constant(astc, local_field, graph, context)
 
-    elif isinstance(astc.nast, gast.gast.Constant) and isinstance(astc.nast.value, numbers.Number):
+    if isinstance(astc.nast.value, numbers.Number):
         return veval_ast_num(astc, local_field, graph, context)
 
-    elif isinstance(astc.nast, gast.gast.Constant) and isinstance(astc.nast.value, str):
+    if isinstance(astc.nast.value, str):
         return veval_ast_str(astc, local_field, graph, context)
 
-    elif isinstance(astc.nast, gast.gast.Tuple):
-        ret = veval_ast_tuple(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.List):
-        ret = veval_ast_list(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.For):
-        veval_ast_for(astc, local_field, graph, context)
-        return None
-
-    elif isinstance(astc.nast, gast.gast.Continue):
-        veval_ast_continue(astc, local_field, graph, context)
-        return None
-
-    elif isinstance(astc.nast, gast.gast.Break):
-        veval_ast_break(astc, local_field, graph, context)
-        return None
+    return veval_ast_unknown(astc, local_field, graph, context)
 
-    elif isinstance(astc.nast, gast.gast.BoolOp):
-        ret = veval_ast_bool_op(astc, local_field, graph, context)
-        return ret
+def veval_ast_unknown(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
+    if get_config().show_warnings:
+        print('Unknown ast is found : {} in {}'.format(astc.nast, astc.lineprop))
+    return None
 
-    elif isinstance(astc.nast, gast.gast.With):
-        veval_ast_with(astc, local_field, graph, context)
+def statement(veval_func):
+    """
+    make a function which evaluates a statement and returns None
+    """
+    def veval_statement(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
+        veval_func(astc, local_field, graph, context)
         return None
+    return veval_statement
+
+veval_funcs = {
+    list: veval_ast_body,
+    gast.gast.Assign: statement(veval_ast_assign),
+    gast.gast.Attribute: veval_ast_attribute,
+    gast.gast.Call: veval_ast_call,
+    gast.gast.BinOp: veval_ast_bin_op,
+    gast.gast.UnaryOp: veval_ast_unary_op,
+    gast.gast.Compare: veval_ast_compare,
+    gast.gast.Return: veval_ast_return,
+    gast.gast.Name: veval_ast_name,
+    gast.gast.AugAssign: statement(veval_ast_aug_assign),
+    gast.gast.Expr: statement(veval_ast_expr),
+    gast.gast.Subscript: veval_ast_subscript,
+    gast.gast.ListComp: veval_ast_listcomp,
+    gast.gast.If: statement(veval_ast_if),
+    gast.gast.Constant: veval_ast_constant,
+    gast.gast.Tuple: veval_ast_tuple,
+    gast.gast.List: veval_ast_list,
+    gast.gast.For: statement(veval_ast_for),
+    gast.gast.Continue: statement(veval_ast_continue),
+    gast.gast.Break: statement(veval_ast_break),
+    gast.gast.BoolOp: veval_ast_bool_op,
+    gast.gast.With: statement(veval_ast_with),
+    gast.gast.withitem: veval_ast_withitem,
+    gast.gast.Dict: veval_ast_dict,
+    gast.gast.Lambda: veval_ast_lambda,
+    gast.gast.arguments: veval_ast_arguments,
+}
+
+def get_veval_func(nast):
+    """
+    get a function to evaluate nast
+    """
+    return veval_funcs.get(type(nast), veval_ast_unknown)
 
-    elif isinstance(astc.nast, gast.gast.withitem):
-        ret = veval_ast_withitem(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Dict):
-        ret = veval_ast_dict(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.Lambda):
-        ret = veval_ast_lambda(astc, local_field, graph, context)
-        return ret
-
-    elif isinstance(astc.nast, gast.gast.arguments):
-        ret = veval_ast_arguments(astc, local_field, graph, context)
-        return ret
+def veval_ast(astc : 'AstContext', local_field : 'values.Field', graph : 'Graph', context : 'functions.VEvalContext' = None):
+    if context is None:
+        context = functions.VEvalContext()
 
-    else:
-        if config.show_warnings:
-            print('Unknown ast is found : {} in {}'.format(astc.nast,lineprop))
+    return astc.veval(astc, local_field, graph, context)
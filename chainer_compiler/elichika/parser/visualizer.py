@@ -1,4 +1,3 @@
-
 from graphviz import Digraph
 from chainer_compiler.elichika.parser.core import convert_model, Graph
 from chainer_compiler.elichika.parser.nodes import Node
@@ -8,122 +7,92 @@ def get_valids(list_):
     return [l for l in list_ if l is not None]
 
 
-node_id = 0
-node2id = {}
-node_ref_count = {}
-
-value_id = 0
-value2id = {}
-
-graph_id = 0
-
-
-def reset():
-    global node_id
-    global node2id
-    global node_ref_count
-
-    global value_id
-    global value2id
-
-    global graph_id
-
-    node_id = 0
-    node2id = {}
-    node_ref_count = {}
-
-    value_id = 0
-    value2id = {}
-
-    graph_id = 0
-
+class Visualizer:
+    """
+    Holds ids of a visualization
 
-def assign_id(graph: 'Graph'):
-    global node_id
-    global node2id
-    global value_id
-    global value2id
+    Each call of `visualize` has its own Visualizer so graphs can be
+    visualized from multiple threads concurrently.
+    """
 
-    for node in graph.nodes:
-        node2id[node] = 'node_' + str(node_id)
-        node_id += 1
+    def __init__(self):
+        self.node_id = 0
+        self.node2id = {}
+        self.node_ref_count = {}
 
-        for input in node.inputs:
-            value2id[input] = 'value_' + str(value_id)
-            value_id += 1
+        self.value_id = 0
+        self.value2id = {}
 
-        for subgraph in node.subgraphs:
-            assign_id(subgraph)
+        self.graph_id = 0
 
+    def assign_id(self, graph: 'Graph'):
+        for node in graph.nodes:
+            self.node2id[node] = 'node_' + str(self.node_id)
+            self.node_id += 1
 
-def count_ref(graph: 'Graph'):
-    global node_ref_count
+            for input in node.inputs:
+                self.value2id[input] = 'value_' + str(self.value_id)
+                self.value_id += 1
 
-    for node in graph.nodes:
-        for input in get_valids(node.inputs):
-            if input.generator is not None:
-                if input.generator in node_ref_count:
-                    node_ref_count[input.generator] += 1
-                else:
-                    node_ref_count[input.generator] = 1
+            for subgraph in node.subgraphs:
+                self.assign_id(subgraph)
 
-        for subgraph in node.subgraphs:
-            count_ref(subgraph)
+    def count_ref(self, graph: 'Graph'):
+        for node in graph.nodes:
+            for input in get_valids(node.inputs):
+                if input.generator is not None:
+                    if input.generator in self.node_ref_count:
+                        self.node_ref_count[input.generator] += 1
+                    else:
+                        self.node_ref_count[input.generator] = 1
 
+            for subgraph in node.subgraphs:
+                self.count_ref(subgraph)
 
-def visit_edge(parent_dot, graph: 'Graph', is_unused_node_ignored):
-    global graph_id
+    def visit_edge(self, parent_dot, graph: 'Graph', is_unused_node_ignored):
+        node2id = self.node2id
+        value2id = self.value2id
 
-    with parent_dot.subgraph(name='cluster_' + str(graph_id)) as dot:
-        graph_id += 1
-        dot.attr(label=graph.name)
+        with parent_dot.subgraph(name='cluster_' + str(self.graph_id)) as dot:
+            self.graph_id += 1
+            dot.attr(label=graph.name)
 
-        for node in graph.nodes:
+            for node in graph.nodes:
 
-            # ignore
-            if is_unused_node_ignored:
-                if len(node.inputs) == 0 and not (node in node_ref_count):
-                    continue
+                # ignore
+                if is_unused_node_ignored:
+                    if len(node.inputs) == 0 and not (node in self.node_ref_count):
+                        continue
 
-            dot.node(node2id[node], str(node))
+                dot.node(node2id[node], str(node))
 
-            for input in node.inputs:
-                if str(input) != "":
-                    dot.edge(value2id[input], node2id[node])
+                for input in node.inputs:
+                    if str(input) != "":
+                        dot.edge(value2id[input], node2id[node])
 
-                    if input.generator is not None and input.generator in node2id.keys():
-                        dot.edge(node2id[input.generator], value2id[input])
-                else:
-                    if input.generator is not None and input.generator in node2id.keys():
-                        dot.edge(node2id[input.generator], node2id[node])
+                        if input.generator is not None and input.generator in node2id.keys():
+                            dot.edge(node2id[input.generator], value2id[input])
+                    else:
+                        if input.generator is not None and input.generator in node2id.keys():
+                            dot.edge(node2id[input.generator], node2id[node])
 
-            for subgraph in node.subgraphs:
-                visit_edge(parent_dot, subgraph, is_unused_node_ignored)
+                for subgraph in node.subgraphs:
+                    self.visit_edge(parent_dot, subgraph, is_unused_node_ignored)
 
 
 def visualize(path: 'str', graph: 'Graph', is_unused_node_ignored=True):
-    global node_id
-    global node2id
-    global value_id
-    global value2id
-    global graph_id
-
-    reset()
+    visualizer = Visualizer()
 
     dot = Digraph(comment='Graph')
 
-    graph_id = 0
-    node_id = 0
-    node2id = {}
-
-    assign_id(graph)
+    visualizer.assign_id(graph)
 
-    count_ref(graph)
+    visualizer.count_ref(graph)
 
-    for k, v in value2id.items():
+    for k, v in visualizer.value2id.items():
         if str(k) != "":
             dot.node(v, str(k), shape='diamond')
 
-    visit_edge(dot, graph, is_unused_node_ignored)
+    visualizer.visit_edge(dot, graph, is_unused_node_ignored)
 
     dot.render(path)
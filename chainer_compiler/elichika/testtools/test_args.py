@@ -19,6 +19,9 @@ def get_test_args(args=None):
                         help='Show less messages.')
     parser.add_argument('--allow-unused-params', action='store_true',
                         help='Allow unused parameters.')
+    parser.add_argument('--external-data', action='store_true',
+                        help='Store weights in model.onnx.data which is '
+                        'memory-mapped by the runtime.')
     _args_cache = parser.parse_args(args=args)
     return _args_cache
 
@@ -5,12 +5,14 @@ import copy
 import glob
 import os
 import shutil
+import threading
 import types
 
 import numpy as np
 
 import chainer
 
+from chainer_compiler import external_data as external_data_
 from chainer_compiler.elichika.chainer2onnx import compile_model
 from chainer_compiler.elichika.onnx_converters import onnx_name
 
@@ -73,11 +75,7 @@ def dump_test_inputs_outputs(inputs, outputs, gradients, test_data_dir):
     for typ, values in [('input', inputs),
                         ('output', outputs),
                         ('gradient', gradients)]:
-        for i, (value_info, value) in enumerate(values):
-            if typ == 'gradient':
-                name = value_info.name
-            else:
-                name = onnx_name(value_info)
+        for i, (name, value) in enumerate(values):
             if isinstance(value, list):
                 assert value
                 digits = len(str(len(value)))
@@ -109,32 +107,40 @@ def dump_test_inputs_outputs(inputs, outputs, gradients, test_data_dir):
                 #value_info.CopyFrom(vi)
 
 
-_seen_subnames = set()
+# (backprop, subname) pairs generated for each output directory. A test
+# script generates its subnames in several exports so they are not in
+# ExportContext.
+_seen_subnames = collections.defaultdict(set)
+_seen_subnames_lock = threading.Lock()
 
 
 def reset_test_generator(args):
-    _seen_subnames.clear()
+    with _seen_subnames_lock:
+        _seen_subnames.clear()
     get_test_args(args)
 
 
 def generate_testcase(model_or_model_gen, orig_xs,
                       subname=None, output_dir=None,
-                      backprop=False):
+                      backprop=False, external_data=False):
     xs = copy.deepcopy(orig_xs)
     if output_dir is None:
         args = get_test_args()
         output_dir = args.output
+        external_data |= args.external_data
 
         if backprop:
             output_dir = output_dir + '_backprop'
 
-        if not _seen_subnames:
-            # Remove all related directories to renamed tests.
-            for d in [output_dir] + glob.glob(output_dir + '_*'):
-                if os.path.isdir(d):
-                    shutil.rmtree(d)
-        assert (backprop, subname) not in _seen_subnames
-        _seen_subnames.add((backprop, subname))
+        with _seen_subnames_lock:
+            seen = _seen_subnames[args.output]
+            if not seen:
+                # Remove all related directories to renamed tests.
+                for d in [output_dir] + glob.glob(output_dir + '_*'):
+                    if os.path.isdir(d):
+                        shutil.rmtree(d)
+            assert (backprop, subname) not in seen
+            seen.add((backprop, subname))
         if subname is not None:
             output_dir = output_dir + '_' + subname
     else:
@@ -166,32 +172,35 @@ def generate_testcase(model_or_model_gen, orig_xs,
 
         for name, param in sorted(model.namedparams()):
             bp_name = 'param' + name.replace('/', '_')
-            vi = onnx.helper.make_tensor_value_info(
-                bp_name, onnx.TensorProto.FLOAT, ())
-            gradients.append((vi, param.grad))
+            gradients.append((bp_name, param.grad))
 
     model = get_model()
     for name, param in model.namedparams():
         param.array = params[name]
 
     onnxmod = compile_model(model, xs)
-    input_tensors = onnxmod.inputs
-    output_tensors = onnxmod.outputs
+    with onnxmod.context:
+        input_names = [onnx_name(v) for v in onnxmod.inputs]
+        output_names = [onnx_name(v) for v in onnxmod.outputs]
 
-    if len(output_tensors) < len(chainer_out):
-        assert len(output_tensors) == 1
+    if len(output_names) < len(chainer_out):
+        assert len(output_names) == 1
         chainer_out = [np.array(chainer_out)]
-    assert len(output_tensors) == len(chainer_out)
+    assert len(output_names) == len(chainer_out)
 
-    outputs = list(zip(output_tensors, chainer_out))
+    outputs = list(zip(output_names, chainer_out))
 
     xs = list(map(lambda x: _validate_inout(x), orig_xs))
 
     dump_test_inputs_outputs(
-        list(zip(input_tensors, xs)),
+        list(zip(input_names, xs)),
         outputs,
         gradients,
         os.path.join(output_dir, 'test_data_set_0'))
 
-    with open(os.path.join(output_dir, 'model.onnx'), 'wb') as fp:
-        fp.write(onnxmod.model.SerializeToString())
+    model_path = os.path.join(output_dir, 'model.onnx')
+    if external_data:
+        external_data_.save_model(onnxmod.model, model_path)
+    else:
+        with open(model_path, 'wb') as fp:
+            fp.write(onnxmod.model.SerializeToString())
@@ -1,5 +1,7 @@
-from   chainer.utils import type_check
+from   fractions import Fraction
 import math
+import numbers
+import weakref
 
 from   chainer_compiler.elichika.typing import utils
 
@@ -9,6 +11,7 @@ __all__ = [ 'ShapeElem'
           , 'is_incomplete_shape'
           , 'copy_ShapeElem'
           , 'size_of_ShapeElem'
+          , 'is_variable_ShapeElem'
           , 'unify_shape'
           , 'join_shape'
           , 'is_subshape'
@@ -17,141 +20,351 @@ __all__ = [ 'ShapeElem'
           ]
 
 
+# ============================ Symbolic expressions ============================
+# A symbolic value of ShapeElem is a polynomial in normal form, whose atoms
+# are variables (names given via type hints) and opaque terms such as floor
+# division and ceil. Expressions are interned: equal expressions are the same
+# object, so that they are compared in O(1) and are never simplified again.
+
+_interned = weakref.WeakValueDictionary()
+
+def _intern(cls, key):
+    try:
+        return _interned[cls, key]
+    except KeyError:
+        pass
+    expr = cls(key)
+    _interned[cls, key] = expr
+    return expr
+
+
+class _Expr():
+    __slots__ = ('key', 'size', 'is_int', 'priority', 'string', '__weakref__')
+
+    def __str__(self):
+        return self.string
+
+    def __repr__(self):
+        return self.string
+
+    # expressions are immutable
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (_intern, (self.__class__, self.key))
+
+
+def _paren(expr, priority):
+    if expr.priority < priority:
+        return "({})".format(expr)
+    return expr.string
+
+
+class _Var(_Expr):
+    # key: name
+    __slots__ = ()
+
+    def __init__(self, key):
+        self.key = key
+        self.size = 1
+        self.is_int = True
+        self.priority = 7
+        self.string = key
+
+
+class _Op(_Expr):
+    # key: (symbol, operands), operands are _Poly
+    __slots__ = ()
+
+    def __init__(self, key):
+        symbol, args = key
+        self.key = key
+        self.size = sum(arg.size for arg in args)
+        if len(args) == 2:
+            lhs, rhs = args
+            self.is_int = symbol != '/' and lhs.is_int and rhs.is_int
+            self.priority = 5
+            self.string = "{} {} {}".format(
+                    _paren(lhs, 5), symbol, _paren(rhs, 6))
+        else:
+            term, = args
+            self.is_int = symbol != 'abs' or term.is_int
+            self.priority = 7
+            self.string = "{}({})".format(symbol, term)
+
+
+def _is_integral(coeff):
+    return isinstance(coeff, int) or \
+            (isinstance(coeff, Fraction) and coeff.denominator == 1)
+
+
+def _str_term(monomial, coeff):
+    # coeff > 0
+    if len(monomial) == 1 and coeff == 1:
+        return monomial[0].string
+    factors = [_paren(atom, 6) for atom in monomial]
+    if coeff != 1 or not factors:
+        factors.insert(0, str(coeff))
+    return " * ".join(factors)
+
+
+class _Poly(_Expr):
+    # key: ((monomial, type of coeff, coeff), ...) sorted by monomials,
+    # where a monomial is a tuple of atoms (_Var or _Op) sorted by strings.
+    # Types of coefficients are in the key since 1 == 1.0 == Fraction(1).
+    __slots__ = ('terms',)
+
+    def __init__(self, key):
+        self.key = key
+        self.terms = tuple((monomial, coeff) for monomial, _, coeff in key)
+        self.size = sum(atom.size
+                for monomial, _ in self.terms for atom in monomial)
+        self.is_int = all(_is_integral(coeff) and
+                all(atom.is_int for atom in monomial)
+                for monomial, coeff in self.terms)
+
+        if not self.terms:
+            self.priority = 7
+            self.string = "0"
+            return
+
+        denominator = 1
+        for _, coeff in self.terms:
+            if isinstance(coeff, Fraction):
+                denominator *= coeff.denominator // \
+                        math.gcd(denominator, coeff.denominator)
+        if denominator != 1:
+            # (b - 1) / 2 rather than b / 2 - 1 / 2
+            numerator = _mul(self, _const(denominator))
+            self.priority = 5
+            self.string = "{} / {}".format(_paren(numerator, 5), denominator)
+            return
+
+        (monomial, coeff), *rest = self.terms
+        s = _str_term(monomial, abs(coeff))
+        if coeff < 0:
+            s = "-" + s
+        for monomial, coeff in rest:
+            s += " {} {}".format("-" if coeff < 0 else "+",
+                    _str_term(monomial, abs(coeff)))
+        self.string = s
+
+        if rest or coeff < 0:
+            self.priority = 4
+        elif not monomial:
+            self.priority = 7
+        elif len(monomial) == 1 and coeff == 1:
+            self.priority = monomial[0].priority
+        else:
+            self.priority = 5
+
+    def is_const(self):
+        return not self.terms or \
+                (len(self.terms) == 1 and not self.terms[0][0])
+
+    def const(self):
+        # assumes self.is_const()
+        return self.terms[0][1] if self.terms else 0
+
+
+def _monomial_order(term):
+    monomial, _ = term
+    return (not monomial, [atom.string for atom in monomial])
+
+
+def _make_poly(terms):
+    # terms: monomial -> coeff
+    key = []
+    for monomial, coeff in sorted(terms.items(), key=_monomial_order):
+        if coeff == 0:
+            continue
+        if isinstance(coeff, Fraction) and coeff.denominator == 1:
+            coeff = coeff.numerator
+        key.append((monomial, type(coeff), coeff))
+    return _intern(_Poly, tuple(key))
+
+
+def _const(value):
+    return _make_poly({() : value})
+
+
+def _var(name):
+    return _make_poly({(_intern(_Var, name),) : 1})
+
+
+def _op(symbol, *args):
+    return _make_poly({(_intern(_Op, (symbol, args)),) : 1})
+
+
+def _to_coeff(value):
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, (Fraction, float)):
+        return value
+    return float(value)
+
+
+def _add(lhs, rhs):
+    terms = dict(lhs.terms)
+    for monomial, coeff in rhs.terms:
+        terms[monomial] = terms.get(monomial, 0) + coeff
+    return _make_poly(terms)
+
+
+def _mul(lhs, rhs):
+    if lhs.is_const() and rhs.is_const():
+        return _const(lhs.const() * rhs.const())
+    terms = {}
+    for monomial1, coeff1 in lhs.terms:
+        for monomial2, coeff2 in rhs.terms:
+            monomial = tuple(sorted(monomial1 + monomial2,
+                key=lambda atom: atom.string))
+            terms[monomial] = terms.get(monomial, 0) + coeff1 * coeff2
+    return _make_poly(terms)
+
+
+def _neg(term):
+    return _make_poly({monomial : -coeff for monomial, coeff in term.terms})
+
+
+def _sub(lhs, rhs):
+    return _add(lhs, _neg(rhs))
+
+
+def _truediv(lhs, rhs):
+    if rhs.is_const():
+        c = rhs.const()
+        return _mul(lhs, _const(Fraction(1, c) if isinstance(c, int) else 1 / c))
+    return _op('/', lhs, rhs)
+
+
+def _is_divisible(term, n):
+    return all(isinstance(coeff, int) and coeff % n == 0
+            for _, coeff in term.terms)
+
+
+def _floordiv(lhs, rhs):
+    if lhs.is_const() and rhs.is_const():
+        return _const(lhs.const() // rhs.const())
+    if rhs.is_const() and isinstance(rhs.const(), int) and rhs.const() > 0 \
+            and lhs.is_int:
+        n = rhs.const()
+        if _is_divisible(lhs, n):
+            return _mul(lhs, _const(Fraction(1, n)))
+        # (x // a) // b = x // (a * b)
+        if len(lhs.terms) == 1:
+            (monomial, coeff), = lhs.terms
+            if coeff == 1 and len(monomial) == 1 and \
+                    isinstance(monomial[0], _Op) and monomial[0].key[0] == '//':
+                x, a = monomial[0].key[1]
+                if a.is_const() and isinstance(a.const(), int) and a.const() > 0:
+                    return _floordiv(x, _const(a.const() * n))
+    return _op('//', lhs, rhs)
+
+
+def _mod(lhs, rhs):
+    if lhs.is_const() and rhs.is_const():
+        return _const(lhs.const() % rhs.const())
+    if rhs.is_const() and isinstance(rhs.const(), int) and rhs.const() > 0 \
+            and lhs.is_int and _is_divisible(lhs, rhs.const()):
+        return _const(0)
+    return _op('%', lhs, rhs)
+
+
+def _round(symbol, func):
+    def f(term):
+        if term.is_const():
+            return _const(func(term.const()))
+        if term.is_int:
+            return term
+        return _op(symbol, term)
+    return f
+
+
+def _abs(term):
+    if term.is_const():
+        return _const(abs(term.const()))
+    return _op('abs', term)
+
+
 unaryops = {
-        '-'    : (6, lambda x: -x),
-        'ceil' : (6, math.ceil),
-        'abs'  : (6, abs),
-        'floor' : (6, math.floor),
+        '-'     : (lambda x: -x, _neg),
+        'ceil'  : (math.ceil, _round('ceil', math.ceil)),
+        'abs'   : (abs, _abs),
+        'floor' : (math.floor, _round('floor', math.floor)),
         }
 
 binops = {
-        '+'  : (4, lambda x, y: x + y),
-        '-'  : (4, lambda x, y: x - y),
-        '*'  : (5, lambda x, y: x * y),
-        '/'  : (5, lambda x, y: x / y),
-        '//' : (5, lambda x, y: x // y),
-        '%'  : (5, lambda x, y: x % y),
+        '+'  : (lambda x, y: x + y, _add),
+        '-'  : (lambda x, y: x - y, _sub),
+        '*'  : (lambda x, y: x * y, _mul),
+        '/'  : (lambda x, y: x / y, _truediv),
+        '//' : (lambda x, y: x // y, _floordiv),
+        '%'  : (lambda x, y: x % y, _mod),
         }
 
 def _flip(func):
     return (lambda x, y: func(y, x))
 
 def _make_unaryop(term, symbol):
-    priority, func = unaryops[symbol]
+    func, expr_func = unaryops[symbol]
 
     if term.value is None:
         return term
-    expr = type_check.UnaryOperator(priority, term.expr, symbol, func)
-    return ShapeElem(func(term.value), expr=expr)
+    if term.expr is None:
+        return ShapeElem(func(term.value))
+    return ShapeElem(func(term.value), expr=expr_func(term.expr))
+
+def _is_const(x):
+    if isinstance(x, ShapeElem):
+        return x.expr is None
+    return True
+
+def _to_expr(x):
+    if isinstance(x, ShapeElem):
+        return x.expr if x.expr is not None else _const(_to_coeff(x.value))
+    return _const(_to_coeff(x))
 
 def _make_binop(lhs, rhs, symbol):
-    priority, func = binops[symbol]
+    func, expr_func = binops[symbol]
 
     if not isinstance(rhs, ShapeElem):
         if lhs.value is None:
             return ShapeElem(None)
-        expr = type_check.BinaryOperator(
-                priority, lhs.expr, type_check.Constant(rhs), symbol, func)
-        return ShapeElem(func(lhs.value, rhs), expr=expr)
-
-    if not isinstance(lhs, ShapeElem):
+        value = func(lhs.value, rhs)
+    elif not isinstance(lhs, ShapeElem):
         if rhs.value is None:
             return ShapeElem(None)
-        expr = type_check.BinaryOperator(
-                priority, type_check.Constant(lhs), rhs.expr, symbol, func)
-        return ShapeElem(func(lhs, rhs.value), expr=expr)
-
-    if lhs.value is None or rhs.value is None:
-        return ShapeElem(None)
-    expr = type_check.BinaryOperator(
-            priority, lhs.expr, rhs.expr, symbol, func)
-    return ShapeElem(func(lhs.value, rhs.value), expr=expr)
-
-
-def _make_binop_expr(lhs_expr, rhs_expr, symbol):
-    priority, func = binops[symbol]
-    return type_check.BinaryOperator(
-            priority, lhs_expr, rhs_expr, symbol, func)
-
-def _try_eval(expr):
-    try:
-        return expr.eval()
-    except Exception:
-        return None
-
-
-def simplify(expr):
-    n = _try_eval(expr)
-    if n is not None:
-        return type_check.Constant(n)
-
-    if isinstance(expr, type_check.BinaryOperator):
-        rhs_value = _try_eval(expr.rhs)
-        if rhs_value is not None:
-            if (expr.exp == '+' or expr.exp == '-') and rhs_value == 0:
-                return simplify(expr.lhs)
-
-            if expr.exp == '+' and rhs_value < 0:
-                expr_rhs = type_check.Constant(- rhs_value)
-                return simplify(_make_binop_expr(expr.lhs, expr_rhs, '-'))
-
-            if expr.exp == '-' and rhs_value < 0:
-                expr_rhs = type_check.Constant(- rhs_value)
-                return simplify(_make_binop_expr(expr.lhs, expr_rhs, '+'))
-
-            if (expr.exp == '*' or expr.exp == '/' or expr.exp == '//') and rhs_value == 1:
-                return simplify(expr.lhs)
-
-        lhs_value = _try_eval(expr.lhs)
-        if lhs_value is not None:
-            if expr.exp == '+' and lhs_value == 0:
-                return simplify(expr.rhs)
-
-        if isinstance(expr.lhs, type_check.BinaryOperator) and \
-                expr.lhs.priority == expr.priority:
-            if expr.lhs.exp == '+' or expr.lhs.exp == '*':
-                expr_exp = expr.exp
-            elif expr.lhs.exp == '-':
-                if expr.exp == '+':
-                    expr_exp = '-'
-                else:
-                    expr_exp = '+'
-            else:
-                assert False
-
-            _, expr_func = binops[expr_exp]
-            expr_rhs = type_check.BinaryOperator(expr.priority,
-                    expr.lhs.rhs, expr.rhs, expr_exp, expr_func)
-            expr_rhs = simplify(expr_rhs)
-            if isinstance(expr_rhs, type_check.Constant):
-                return simplify(type_check.BinaryOperator(expr.lhs.priority,
-                    expr.lhs.lhs, expr_rhs, expr.lhs.exp, expr.lhs.func))
-
-        expr.lhs = simplify(expr.lhs)
-        expr.rhs = simplify(expr.rhs)
+        value = func(lhs, rhs.value)
+    else:
+        if lhs.value is None or rhs.value is None:
+            return ShapeElem(None)
+        value = func(lhs.value, rhs.value)
 
-    # if isinstance(expr, type_check.UnaryOperator):
-    #     expr.term = simplify(expr.term)
-    return expr
+    if _is_const(lhs) and _is_const(rhs) or \
+            not isinstance(lhs, (ShapeElem, numbers.Real)) or \
+            not isinstance(rhs, (ShapeElem, numbers.Real)):
+        return ShapeElem(value)
+    return ShapeElem(value, expr=expr_func(_to_expr(lhs), _to_expr(rhs)))
 
 
 class ShapeElem():
     def __init__(self, value_or_name, expr=None):
         assert type(value_or_name) in [int, float, str, type(None)]
-        if isinstance(value_or_name, str):
-            # name (given via type hints)
-            self.value = value_or_name
+        self.value = value_or_name
+        # symbolic expression of the value, or None if it is a constant or
+        # a name (given via type hints)
+        if expr is None or expr.is_const():
             self.expr = None
         else:
-            # value
-            self.value = value_or_name
-            if expr is None:
-                self.expr = type_check.Constant(value_or_name)
-            else:
-                self.expr = simplify(expr)
+            self.expr = expr
 
     def __str__(self):
-        if isinstance(self.expr, type_check.Constant):
+        if self.expr is None:
             return str(self.value)
         return "{} ({})".format(self.value, self.expr)
 
@@ -241,17 +454,21 @@ def copy_ShapeElem(e):
 
 
 def size_of_ShapeElem(e):
-    if isinstance(e.expr, type_check.BinaryOperator):
-        return size_of_ShapeElem(e.lhs) + size_of_ShapeElem(e.rhs)
-    if isinstance(e.expr, type_check.UnaryOperator):
-        return size_of_ShapeElem(e.term)
-    if isinstance(e.expr, type_check.Variable):
-        return 1
-    return 0
+    # number of variables in the expression
+    if e.expr is None:
+        return 0
+    return e.expr.size
+
+
+def is_variable_ShapeElem(e, name):
+    # whether the value is the variable `name` given via type hints
+    return e.expr is _var(name)
 
 
 def unify_shape(shape1, shape2):
     for e1, e2 in zip(shape1, shape2):
+        if e1 is e2:
+            continue
         if e1.value != e2.value:
             e1.value = e2.value = None
     return shape1
@@ -261,7 +478,11 @@ def join_shape(shape1, shape2):
     ret = [None for _ in shape1]
     for i, (e1, e2) in enumerate(zip(shape1, shape2)):
         if e1.value == e2.value:
-            ret[i] = e1.value
+            # expressions are interned, so that they are compared by identity
+            if e1.expr is e2.expr and e1.value is not None:
+                ret[i] = copy_ShapeElem(e1)
+            else:
+                ret[i] = e1.value
     return ret
 
 
@@ -273,7 +494,7 @@ def is_subshape(shape1, shape2):
 
 def apply_subst_shapeElem(subst, e):
     if e.value in subst.keys():
-        return ShapeElem(subst[e.value], expr=type_check.Variable(None, e.value))
+        return ShapeElem(subst[e.value], expr=_var(e.value))
     return e
 
 
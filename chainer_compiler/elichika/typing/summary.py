@@ -0,0 +1,392 @@
+import collections
+import gast
+import inspect
+
+import chainer
+import numpy as np
+import torch
+import torch.nn as nn
+
+from   chainer_compiler.elichika.typing             import types
+from   chainer_compiler.elichika.typing.types       import *
+from   chainer_compiler.elichika.typing.shape_elem  import *
+
+# Summaries of user-defined functions
+#
+# Inferring the body of a function again with the same argument types gives
+# the same types except for fresh type variables and the links of arguments,
+# so the result of the first inference is copied into later call sites.
+
+class NotMemoizable(Exception):
+    pass
+
+
+# attributes which differ between otherwise identical links
+_ignored_link_attributes = ('name',)
+
+
+def _is_link(obj):
+    return isinstance(obj, (chainer.Link, nn.Module))
+
+
+class _KeyBuilder():
+    def __init__(self, table, identical_links=False):
+        self.table = table
+        # whether links are compared by identity instead of their attributes
+        self.identical_links = identical_links
+        # links and modules reachable from the arguments, in visiting order
+        self.instances = []
+        # type objects, shape elements and links which are already visited
+        # id -> index (the same object may appear at several places)
+        self.visited = {}
+
+    def shared_key(self, obj):
+        if id(obj) in self.visited:
+            return ('shared', self.visited[id(obj)])
+        self.visited[id(obj)] = len(self.visited)
+        return None
+
+    def type_key(self, ty):
+        if isinstance(ty, TyVar):
+            if not ty.is_set:
+                # its type may be decided by the function
+                raise NotMemoizable
+            ty = ty.deref()
+
+        key = self.shared_key(ty)
+        if key is not None:
+            return key
+
+        if isinstance(ty, TyNone):
+            return (TyNone,)
+        if isinstance(ty, TyNum):
+            return (TyNum, ty.kind, type(ty.value), ty.value)
+        if isinstance(ty, TyString):
+            return (TyString, ty.value)
+        if isinstance(ty, TyArrow):
+            return (TyArrow, tuple(self.type_key(t) for t in ty.argty),
+                    self.type_key(ty.retty))
+        if isinstance(ty, TyList):
+            return (TyList, self.type_key(ty.ty))
+        if isinstance(ty, TyTuple):
+            if isinstance(ty._ty, list):
+                return (TyTuple, ty.is_fixed_len,
+                        tuple(self.type_key(t) for t in ty._ty))
+            return (TyTuple, ty.is_fixed_len, self.type_key(ty._ty))
+        if isinstance(ty, TyDict):
+            return (TyDict, self.type_key(ty.keyty), self.type_key(ty.valty))
+        if isinstance(ty, TyUserDefinedClass):
+            return (TyUserDefinedClass, ty.name, self.value_key(ty.instance))
+        if isinstance(ty, TyOptional):
+            return (TyOptional, self.type_key(ty.ty))
+        if isinstance(ty, TyDType):
+            return (TyDType, ty.t)
+        if isinstance(ty, TyTensor):
+            return (TyTensor, ty.kind, ty.dtype,
+                    tuple(self.shape_elem_key(e) for e in ty.shape))
+        raise NotMemoizable
+
+    def shape_elem_key(self, e):
+        key = self.shared_key(e)
+        if key is not None:
+            return key
+        # symbolic expressions are interned and compared by identity
+        return (ShapeElem, type(e.value), e.value, e.expr)
+
+    def value_key(self, value):
+        if value is None or isinstance(value,
+                (bool, int, float, str, np.generic, np.dtype, torch.dtype)):
+            return (type(value), value)
+        if isinstance(value, (list, tuple)):
+            return (type(value), tuple(self.value_key(v) for v in value))
+        if isinstance(value, (set, frozenset)):
+            return (type(value), tuple(sorted(repr(v) for v in value)))
+        if isinstance(value, dict):
+            # the order of items matters (ex. nn.Sequential)
+            return (type(value), tuple((repr(k), self.value_key(v))
+                for k, v in value.items()))
+        if isinstance(value, chainer.Variable):
+            value = value.array
+            if value is None:
+                return (chainer.Variable, None)
+        if isinstance(value, np.ndarray):
+            # values of arrays are never used by the inference
+            return (np.ndarray, value.shape, value.dtype)
+        if isinstance(value, torch.Tensor):
+            return (type(value), tuple(value.shape), value.dtype)
+        if _is_link(value):
+            return self.link_key(value)
+        if inspect.isfunction(value) or inspect.isbuiltin(value) or \
+                inspect.isclass(value) or inspect.ismodule(value) or \
+                isinstance(value, np.ufunc):
+            return value
+
+        # unknown objects are compared by identity
+        return (type(value), id(value))
+
+    def link_key(self, link):
+        key = self.shared_key(link)
+        if key is not None:
+            return key
+        if self.identical_links:
+            return (type(link), id(link))
+
+        # keys of links are computed once in an inference
+        if id(link) not in self.table.link_keys:
+            builder = _KeyBuilder(self.table)
+            builder.shared_key(link)
+            key = builder.attributes_key(link)
+            self.table.link_keys[id(link)] = (key, builder.instances)
+
+        key, links = self.table.link_keys[id(link)]
+        if any(id(l) in self.visited for l in links[1:]):
+            # a part of the link is shared with other arguments
+            return self.attributes_key(link)
+        for l in links[1:]:
+            self.shared_key(l)
+        self.instances.extend(links)
+        return key
+
+    def attributes_key(self, link):
+        self.instances.append(link)
+        ignored = _ignored_link_attributes \
+                if isinstance(link, chainer.Link) else ()
+        key = [type(link)]
+        for name, attr in sorted(vars(link).items(), key=lambda item: item[0]):
+            if name not in ignored:
+                key.append((name, self.value_key(attr)))
+        return tuple(key)
+
+
+def _fields_of(ty):
+    return [(name, value) for name, value in vars(ty).items()
+            if name != 'instance']
+
+
+class _Copier():
+    def __init__(self, memo, instances, var_range, var_base):
+        # id of original -> copy
+        self.memo = memo
+        # id of original link -> link
+        self.instances = instances
+        # type variables created while inferring the function
+        self.var_range = var_range
+        self.var_base = var_base
+
+    def copy_ty(self, ty):
+        if id(ty) in self.memo:
+            return self.memo[id(ty)]
+
+        # shallow copy without copy.copy, which is slow
+        ret = ty.__class__.__new__(ty.__class__)
+        ret.__dict__.update(ty.__dict__)
+        self.memo[id(ty)] = ret
+        if isinstance(ty, ShapeElem):
+            return ret
+
+        for name, value in _fields_of(ty):
+            if isinstance(value, (TyObj, ShapeElem, list, tuple)):
+                setattr(ret, name, self.copy_field(value))
+        if isinstance(ty, TyVar):
+            start, end = self.var_range
+            if not start <= ty.i < end:
+                # created outside the function and not passed as an argument
+                raise NotMemoizable
+            ret.i = self.var_base + ty.i - start
+        if isinstance(ty, TyUserDefinedClass):
+            ret.instance = self.instances.get(id(ty.instance), ty.instance)
+        return ret
+
+    def copy_field(self, value):
+        if isinstance(value, (TyObj, ShapeElem)):
+            return self.copy_ty(value)
+        if isinstance(value, list):
+            return [self.copy_field(v) for v in value]
+        if isinstance(value, tuple):
+            return tuple([self.copy_field(v) for v in value])
+        return value
+
+
+def _deref(ty):
+    # TyTuple.deref replaces elements in place
+    if isinstance(ty, TyVar):
+        return ty.deref()
+    return ty
+
+
+def _bind(memo, old, new):
+    # old and new have the same key
+    if id(old) in memo:
+        return
+    memo[id(old)] = new
+    if isinstance(old, ShapeElem):
+        return
+
+    old, new = _deref(old), _deref(new)
+    memo[id(old)] = new
+    for (_, old_value), (_, new_value) in zip(_fields_of(old), _fields_of(new)):
+        _bind_field(memo, old_value, new_value)
+
+
+def _bind_field(memo, old, new):
+    if isinstance(old, (TyObj, ShapeElem)):
+        _bind(memo, old, new)
+    elif isinstance(old, (list, tuple)):
+        for o, n in zip(old, new):
+            _bind_field(memo, o, n)
+
+
+def _copy_node(node, memo):
+    # copy.deepcopy is much slower
+    ret = node.__class__.__new__(node.__class__)
+    ret.__dict__.update(node.__dict__)
+    memo[id(node)] = ret
+    for name in node._fields:
+        value = getattr(node, name, None)
+        if isinstance(value, gast.AST):
+            setattr(ret, name, _copy_node(value, memo))
+        elif isinstance(value, list):
+            setattr(ret, name, [_copy_node(v, memo) if isinstance(v, gast.AST)
+                else v for v in value])
+    return ret
+
+
+def _func_nodes_of(func_node, subroutine_node):
+    return [func_node] + [f for fs in subroutine_node.values() for f in fs]
+
+
+def _is_stateful(node):
+    # assignments to attributes change attribute_tyenv of the call, and
+    # ignored attributes of links are not a part of keys
+    if isinstance(node, gast.Attribute):
+        return isinstance(node.ctx, gast.Store) or \
+                node.attr in _ignored_link_attributes
+    return isinstance(node, gast.Name) and node.id == 'setattr'
+
+
+class FunctionSummary():
+    def __init__(self, ty_args, instances, func_node, nodetype,
+            subroutine_node, var_range):
+        self.ty_args = ty_args  # List[TyObj]
+        self.instances = instances  # List[object]
+        self.func_node = func_node  # gast.FunctionDef
+        self.nodetype = nodetype  # List[Tuple[gast.AST, TyObj]]
+        self.subroutine_node = subroutine_node  # List[Tuple[gast.Call, List[gast.FunctionDef]]]
+        self.var_range = var_range  # Tuple[int, int]
+
+    def instantiate(self, ty_args, instances):
+        # Returns the annotation of a new call with the arguments
+        memo = {}
+        for old, new in zip(self.ty_args, ty_args):
+            _bind(memo, old, new)
+        start, end = self.var_range
+        copier = _Copier(memo,
+                {id(o): n for o, n in zip(self.instances, instances)},
+                self.var_range, types.var_counter)
+        types.var_counter += end - start
+
+        ast_memo = {}
+        func_node = _copy_node(self.func_node, ast_memo)
+        for _, fs in self.subroutine_node:
+            for f in fs:
+                _copy_node(f, ast_memo)
+
+        nodetype = {}
+        for node, ty in self.nodetype:
+            nodetype[ast_memo[id(node)]] = copier.copy_ty(ty)
+        subroutine_node = collections.OrderedDict()
+        for node, fs in self.subroutine_node:
+            subroutine_node[ast_memo[id(node)]] = [ast_memo[id(f)] for f in fs]
+        return func_node, nodetype, subroutine_node
+
+
+class SummaryTable():
+    def __init__(self):
+        # (code, argument types) -> FunctionSummary or None (not memoizable)
+        self.summaries = {}
+        # keys of calls which are inferred once
+        self.inferred = set()
+        # functions which are called at least once
+        self.called = set()
+        # id of link -> (key, links reachable from the link)
+        self.link_keys = {}
+
+    def _make_key(self, func, ty_args, identical_links=False):
+        builder = _KeyBuilder(self, identical_links)
+        try:
+            arg_keys = tuple(builder.type_key(t) for t in ty_args)
+        except NotMemoizable:
+            return None, None
+        return (func.__code__, func.__module__, arg_keys), builder.instances
+
+    def make_key(self, func, ty_args):
+        # Returns a key of a call and links reachable from the arguments,
+        # or (None, None) if the call cannot be memoized
+        code = getattr(func, '__code__', None)
+        if code is None:
+            return None, None
+        if code not in self.called:
+            # most functions (ex. forward of models) are called only once
+            self.called.add(code)
+            return None, None
+        return self._make_key(func, ty_args)
+
+    def get(self, key):
+        return self.summaries.get(key)
+
+    def record(self, key, instances, func, ty_args):
+        # Returns a recorder of a call which is not found in the table
+        if key is None or key in self.summaries:
+            return None
+        if key not in self.inferred:
+            # only calls inferred twice are recorded
+            self.inferred.add(key)
+            return None
+        return Recorder(self, key, instances, func, ty_args)
+
+
+class Recorder():
+    def __init__(self, table, key, instances, func, ty_args):
+        self.table = table
+        self.key = key
+        self.instances = instances
+        self.func = func
+        self.ty_args = ty_args
+        self.var_start = types.var_counter
+        # arguments may be modified by unification
+        self.arg_key, _ = table._make_key(func, ty_args, identical_links=True)
+
+    def finish(self, func_node, tc):
+        self.table.summaries[self.key] = self.summarize(func_node, tc)
+
+    def summarize(self, func_node, tc):
+        # Returns a summary of a call inferred by tc, or None if later calls
+        # have to be inferred again
+        arg_key, _ = self.table._make_key(self.func, self.ty_args,
+                identical_links=True)
+        if arg_key != self.arg_key:
+            return None
+
+        nodes = set()
+        for f in _func_nodes_of(func_node, tc.subroutine_node):
+            for n in gast.walk(f):
+                if _is_stateful(n):
+                    return None
+                nodes.add(id(n))
+        if any(id(node) not in nodes for node in tc.nodetype.keys()):
+            return None
+
+        # copy types so that unification after the call doesn't change them
+        var_range = (self.var_start, types.var_counter)
+        copier = _Copier({}, {}, (0, types.var_counter), 0)
+        try:
+            ty_args = [copier.copy_ty(t) for t in self.ty_args]
+            copier.var_range = var_range
+            copier.var_base = self.var_start
+            nodetype = [(n, copier.copy_ty(t)) for n, t in tc.nodetype.items()]
+        except NotMemoizable:
+            return None
+
+        subroutine_node = [(n, list(fs)) for n, fs in tc.subroutine_node.items()]
+        return FunctionSummary(ty_args, self.instances, func_node, nodetype,
+                subroutine_node, var_range)
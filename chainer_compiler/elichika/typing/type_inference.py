@@ -1,5 +1,6 @@
 import ast
 import collections
+import collections.abc
 import inspect
 import gast
 import numbers
@@ -7,7 +8,9 @@ import sys
 import types
 import typing
 
+from   chainer_compiler.elichika.parser              import context
 from   chainer_compiler.elichika.parser.utils       import clip_head
+from   chainer_compiler.elichika.typing             import summary
 from   chainer_compiler.elichika.typing.types       import *
 from   chainer_compiler.elichika.typing.shape_elem  import *
 from   chainer_compiler.elichika.typing             import utils
@@ -35,17 +38,82 @@ def debug(sth):
     print("[{} {}] {}".format(frame.f_code.co_name, frame.f_lineno, sth))
 
 
-def copy_tyenv(tyenv):
-    new_tyenv = {}
-    for name, ty in tyenv.items():
-        new_tyenv[name] = copy_ty(ty)
-    return new_tyenv
+class TypeEnvironment(collections.abc.MutableMapping):
+    # Type environment of a block, chained to the environment of the enclosing
+    # block. An entry of the parent is copied into the local scope only when
+    # it is accessed for the first time, so that creating a child is O(1) and
+    # the child can be joined into the parent by looking only at the local scope.
+    # Entries of the parent must not be changed while the child is in use.
+    def __init__(self, parent=None):
+        self.parent = parent
+        # entries assigned in this block, or copied from the parent
+        self.local = {}
+
+    def __getitem__(self, key):
+        try:
+            return self.local[key]
+        except KeyError:
+            if self.parent is None:
+                raise
+        ty = copy_ty(self.parent[key])
+        self.local[key] = ty
+        return ty
+
+    def __setitem__(self, key, ty):
+        self.local[key] = ty
+
+    def __delitem__(self, key):
+        if self.parent is not None and key in self.parent:
+            raise KeyError("cannot delete {} of the enclosing block".format(key))
+        del self.local[key]
+
+    def __contains__(self, key):
+        return key in self.local or \
+                (self.parent is not None and key in self.parent)
+
+    def __iter__(self):
+        yield from self.local
+        if self.parent is not None:
+            for key in self.parent:
+                if key not in self.local:
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def changed_keys(self):
+        # keys whose entries may differ from the parent
+        return self.local.keys()
+
+
+def join_tyenv(tyenv, block_tyenv):
+    # tyenv: environment of the enclosing block of block_tyenv
+    for key in list(block_tyenv.changed_keys()):
+        ty = block_tyenv[key]
+        if key in tyenv:
+            tyenv[key] = join(ty, tyenv[key])
+        else:
+            tyenv[key] = ty
+
+
+def join_tyenvs(tyenv, tyenv1, tyenv2):
+    # tyenv1, tyenv2: environments of the two branches enclosed by tyenv
+    keys = list(tyenv1.changed_keys())
+    keys += [key for key in tyenv2.changed_keys()
+            if key not in tyenv1.changed_keys()]
+    for key in keys:
+        if key in tyenv1 and key in tyenv2:
+            tyenv[key] = join(tyenv1[key], tyenv2[key])
+        elif key in tyenv1:
+            tyenv[key] = tyenv1[key]
+        else:
+            tyenv[key] = tyenv2[key]
 
 
 def copy_InferenceEngine(tc):
     new_tc = InferenceEngine(
             tyenv=tc.tyenv, attribute_tyenv=tc.attribute_tyenv,
-            is_debug=tc.is_debug, module=tc.module)
+            is_debug=tc.is_debug, module=tc.module, summaries=tc.summaries)
     return new_tc
 
 
@@ -84,6 +152,8 @@ def call_function(table, func, node, ty_args, ty_kwargs):
 
 
 def call_callable(table, obj, node, ty_args, ty_kwargs):
+    if type(obj) not in table:
+        raise UnsupportedError(type(obj).__name__)
     inference_logic = table[type(obj)]
     try:
         ty_ret = inference_logic(obj, ty_args, ty_kwargs)
@@ -113,15 +183,15 @@ func_to_ignore = [logging.info]
 # ==============================================================================
 
 class InferenceEngine():
-    def __init__(self, tyenv=None, attribute_tyenv=None, is_debug=False, module=None):
+    def __init__(self, tyenv=None, attribute_tyenv=None, is_debug=False, module=None,
+            summaries=None):
         # type environments for local objects
         # string -> TyObj
-        self.tyenv = {} if tyenv is None else copy_tyenv(tyenv)
+        self.tyenv = TypeEnvironment(tyenv)
 
         # type environments for model attributes
         # (object, str) -> TyObj
-        self.attribute_tyenv = {} if attribute_tyenv is None \
-                else copy_tyenv(attribute_tyenv)
+        self.attribute_tyenv = TypeEnvironment(attribute_tyenv)
 
         # annotation to input AST
         # Node -> TyObj
@@ -134,6 +204,10 @@ class InferenceEngine():
         # Node (Call) -> Node (FunctionDef)
         self.subroutine_node = collections.OrderedDict()
 
+        # summaries of user-defined functions, shared by engines of an inference
+        self.summaries = summary.SummaryTable() if summaries is None \
+                else summaries
+
 
     def dump_tyenv(self):
         if not self.is_debug:
@@ -180,6 +254,7 @@ class InferenceEngine():
                 tc1.tyenv[x.id] = TyNone()
                 tc2.tyenv[x.id] = self.tyenv[x.id].ty
             elif isinstance(self.tyenv[x.id], TyNone):
+                tc1.tyenv[x.id] = TyNone()
                 tc2.tyenv[x.id] = TyVar()
             else:
                 tc1.tyenv[x.id] = TyNone()
@@ -190,6 +265,7 @@ class InferenceEngine():
                 tc2.attribute_tyenv[(obj, x.attr)] = \
                         self.attribute_tyenv[(obj, x.attr)].ty
             elif isinstance(self.attribute_tyenv[(obj, x.attr)], TyNone):
+                tc1.attribute_tyenv[(obj, x.attr)] = TyNone()
                 tc2.attribute_tyenv[(obj, x.attr)] = TyVar()
             else:
                 tc1.attribute_tyenv[(obj, x.attr)] = TyNone()
@@ -235,7 +311,7 @@ class InferenceEngine():
 
         for ty in ty_args:
             if isinstance(ty, TyUserDefinedClass):
-                for attr, val in ty.instance.__dict__.items():
+                for attr, val in getattr(ty.instance, '__dict__', {}).items():
                     self.attribute_tyenv[(ty.instance, attr)] = \
                             type_of_value(val)
 
@@ -257,19 +333,9 @@ class InferenceEngine():
         for stmt in stmts:
             ty_ret = tc.infer_stmt(stmt)
 
-        # unify the intersection of 2 tyenvs and update local tyenv
-        for name, ty in tc.tyenv.items():
-            if name in self.tyenv.keys():
-                self.tyenv[name] = join(ty, self.tyenv[name])
-            else:
-                self.tyenv[name] = ty
-
-        for (obj, name), ty in tc.attribute_tyenv.items():
-            if (obj, name) in self.attribute_tyenv.keys():
-                self.attribute_tyenv[(obj, name)] = \
-                        join(ty, self.attribute_tyenv[(obj, name)])
-            else:
-                self.attribute_tyenv[(obj, name)] = ty
+        # join the entries changed in the block into local tyenv
+        join_tyenv(self.tyenv, tc.tyenv)
+        join_tyenv(self.attribute_tyenv, tc.attribute_tyenv)
 
         unify(ty_ret, TyNone())
         return TyNone()
@@ -281,27 +347,9 @@ class InferenceEngine():
         for stmt in stmts2:
             ty_ret2 = tc2.infer_stmt(stmt)
 
-        # unify the intersection of 2 tyenvs and update local tyenv
-        for name, ty in tc1.tyenv.items():
-            if name in tc2.tyenv.keys():
-                self.tyenv[name] = join(ty, tc2.tyenv[name])
-            else:
-                self.tyenv[name] = ty
-        for name, ty in tc2.tyenv.items():
-            if name in tc1.tyenv.keys():
-                continue
-            self.tyenv[name] = ty
-
-        for (obj, name), ty in tc1.attribute_tyenv.items():
-            if (obj, name) in tc2.attribute_tyenv.keys():
-                self.attribute_tyenv[(obj, name)] = \
-                        join(ty, tc2.attribute_tyenv[(obj, name)])
-            else:
-                self.attribute_tyenv[(obj, name)] = ty
-        for (obj, name), ty in tc2.attribute_tyenv.items():
-            if (obj, name) in tc1.attribute_tyenv.keys():
-                continue
-            self.attribute_tyenv[(obj, name)] = ty
+        # join the entries changed in either of the blocks and update local tyenv
+        join_tyenvs(self.tyenv, tc1.tyenv, tc2.tyenv)
+        join_tyenvs(self.attribute_tyenv, tc1.attribute_tyenv, tc2.attribute_tyenv)
 
         return join(ty_ret1, ty_ret2)
 
@@ -348,7 +396,14 @@ class InferenceEngine():
         if isinstance(func, (types.FunctionType, types.MethodType)):
             func_body = func
 
+            if func.__name__ == '<lambda>':
+                raise UnsupportedError("lambda")
+
             if isinstance(node.func, gast.Attribute):
+                if not isinstance(func, types.MethodType):
+                    # functions of modules without inference rules, or
+                    # functions stored in attributes
+                    raise UnsupportedError(func.__qualname__)
                 ty_self = self.nodetype[node.func.value]
                 ty_args = [ty_self] + ty_args
 
@@ -358,26 +413,44 @@ class InferenceEngine():
                 func_body = func.forward
             else:
                 func_body = func.__call__
+            if not inspect.isroutine(func_body) or \
+                    inspect.isbuiltin(func_body):
+                raise UnsupportedError(type(func).__name__)
 
             ty_self = type_of_value(func)
             ty_args = [ty_self] + ty_args
 
-        code = clip_head(inspect.getsource(func_body))
-        # FunctionDef of called subroutine
-        func_node = gast.ast_to_gast(ast.parse(code)).body[0]
+        key, instances = None, None
+        if context.get_config().memoize_type_inference and not self.is_debug:
+            key, instances = self.summaries.make_key(func_body, ty_args)
+
+        if self.summaries.get(key) is not None:
+            # the same function was called with the same argument types
+            func_node, nodetype, subroutine_node = \
+                    self.summaries.get(key).instantiate(ty_args, instances)
+        else:
+            recorder = self.summaries.record(key, instances, func_body, ty_args)
+            code = clip_head(inspect.getsource(func_body))
+            # FunctionDef of called subroutine
+            func_node = gast.ast_to_gast(ast.parse(code)).body[0]
+            tc = InferenceEngine(is_debug=self.is_debug,
+                    module=sys.modules[func.__module__],
+                    summaries=self.summaries)
+            tc.infer_function(func_node, ty_args,
+                    type_hints=typing.get_type_hints(func_body))
+            nodetype, subroutine_node = tc.nodetype, tc.subroutine_node
+            if recorder is not None:
+                recorder.finish(func_node, tc)
+
         if node not in self.subroutine_node.keys():
             self.subroutine_node[node] = [func_node]
         else:
             self.subroutine_node[node].append(func_node)
-        tc = InferenceEngine(is_debug=self.is_debug,
-                module=sys.modules[func.__module__])
-        tc.infer_function(func_node, ty_args,
-                type_hints=typing.get_type_hints(func_body))
 
         # copy nodetype and subroutine_node from subroutine
-        utils.add_dict(self.nodetype, tc.nodetype)
-        utils.add_dict(self.subroutine_node, tc.subroutine_node)
-        return tc.nodetype[func_node].retty
+        utils.add_dict(self.nodetype, nodetype)
+        utils.add_dict(self.subroutine_node, subroutine_node)
+        return nodetype[func_node].retty
 
 
     # ================================ mod =====================================
@@ -435,7 +508,8 @@ class InferenceEngine():
         elif isinstance(node, gast.Pass):
             self.nodetype[node] = TyNone()
 
-        assert node in self.nodetype.keys(), type(node).__name__
+        if node not in self.nodetype.keys():
+            raise UnsupportedError(type(node).__name__)
         return self.nodetype[node]
 
 
@@ -627,8 +701,8 @@ class InferenceEngine():
             elts_ty = [self.infer_expr(e) for e in node.elts]
             self.nodetype[node] = TyTuple(elts_ty)
 
-        assert node in self.nodetype.keys() and \
-                self.nodetype[node] is not None, type(node).__name__
+        if self.nodetype.get(node) is None:
+            raise UnsupportedError(type(node).__name__)
         if self.is_debug:
             self.dump_one_node(node)
         return self.nodetype[node]
@@ -738,7 +812,7 @@ class InferenceEngine():
             if hasattr(self.module, node.id):
                 return getattr(self.module, node.id), None
 
-        assert False, gast.dump(node)
+        raise UnsupportedError(gast.dump(node))
 
 
     def infer_Call(self, node):
@@ -785,12 +859,17 @@ class InferenceEngine():
             return logic(ty_obj)
 
         if isinstance(ty_obj, TyUserDefinedClass):
-            # x: value of existing instance
-            x = getattr(ty_obj.instance, node.attr)
-
             if (ty_obj.instance, node.attr) in self.attribute_tyenv.keys():
                 return self.attribute_tyenv[(ty_obj.instance, node.attr)]
 
+            # types of attributes assigned in called functions are not
+            # propagated to the caller yet
+            if not hasattr(ty_obj.instance, node.attr):
+                raise UnsupportedError(
+                    "attribute {} assigned in a callee".format(node.attr))
+
+            # x: value of existing instance
+            x = getattr(ty_obj.instance, node.attr)
             return type_of_value(x)
 
         if isinstance(ty_obj, TyDType):
@@ -810,7 +889,7 @@ class InferenceEngine():
                 return ty_obj.ty
             if isinstance(node.slice, gast.Slice):
                 return ty_obj
-            assert False, "ExtSlice for lists is not supported"
+            raise UnsupportedError("ExtSlice for lists")
 
         if isinstance(ty_obj, TyTuple):
             self.infer_slice(node.slice)
@@ -829,7 +908,7 @@ class InferenceEngine():
                 return ty_obj.get()
             if isinstance(node.slice, gast.Slice):
                 return TyTuple(ty_obj.get())
-            assert False, "ExtSlice for tuples is not supported"
+            raise UnsupportedError("ExtSlice for tuples")
 
         if isinstance(ty_obj, TyDict):
             self.infer_slice(node.slice, ty_obj.keyty)
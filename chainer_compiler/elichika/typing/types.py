@@ -20,6 +20,7 @@ __all__ = [ 'TyObj', 'TyNone', 'TyNum', 'TyBool', 'TyInt', 'TyFloat'
           , 'copy_ty'
           , 'unify', 'UnifyError', 'join', 'JoinError', 'joins', 'is_subtype'
           , 'match_types', 'MatchFail', 'apply_subst'
+          , 'UnsupportedError'
           ]
 
 
@@ -539,6 +540,13 @@ def dtype_to_tyobj(dtype):
 
 # ==============================================================================
 
+# raised on code which the inference does not support yet
+class UnsupportedError(Exception):
+    def __init__(self, what):
+        self.msg = "UnsupportedError: {} is not supported".format(what)
+        super().__init__(self.msg)
+
+
 class UnifyError(Exception):
     def __init__(self, ty1, ty2):
         self.msg = "UnifyError: {} and {} are not unifiable".format(ty1, ty2)
@@ -1,11 +1,29 @@
 import ast
+import contextlib
 import gast
 import numbers
+import threading
+
+
+_local = threading.local()
 
 
 def print_warning(msg):
+    if getattr(_local, 'suppress_warnings', False):
+        return
     print("\x1b[33m[WARNING] " + msg + "\x1b[39m")
 
+
+@contextlib.contextmanager
+def suppress_warnings():
+    # only for the current thread
+    old = getattr(_local, 'suppress_warnings', False)
+    _local.suppress_warnings = True
+    try:
+        yield
+    finally:
+        _local.suppress_warnings = old
+
 # ============================== Display utils =================================
 
 def intercalate(strings, sep):
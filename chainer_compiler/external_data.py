@@ -0,0 +1,114 @@
+import os
+
+import onnx
+
+
+DEFAULT_ALIGNMENT = 4096
+DEFAULT_SIZE_THRESHOLD = 1024
+
+
+def _align(offset, alignment):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _iter_tensors(xgraph):
+    for tensor in xgraph.initializer:
+        yield tensor
+    for node in xgraph.node:
+        for attr in node.attribute:
+            if attr.HasField('t'):
+                yield attr.t
+            for tensor in attr.tensors:
+                yield tensor
+            if attr.HasField('g'):
+                yield from _iter_tensors(attr.g)
+            for graph in attr.graphs:
+                yield from _iter_tensors(graph)
+
+
+def _set_external_data(tensor, location, offset, length):
+    del tensor.external_data[:]
+    for key, value in [('location', location),
+                       ('offset', str(offset)),
+                       ('length', str(length))]:
+        entry = tensor.external_data.add()
+        entry.key = key
+        entry.value = value
+    tensor.data_location = onnx.TensorProto.EXTERNAL
+
+
+def convert_to_external_data(xmodel, data_path, location=None,
+                             size_threshold=DEFAULT_SIZE_THRESHOLD,
+                             alignment=DEFAULT_ALIGNMENT):
+    """Moves tensor data of an ONNX model into an external data file.
+
+    Raw data of tensors whose size is at least `size_threshold` bytes
+    are written to `data_path` and removed from `xmodel` one by one, so
+    at most one copy of the weights is alive. Every tensor starts at an
+    offset aligned to `alignment` bytes so the runtime can memory-map
+    the file and use the data in place.
+
+    Args:
+        xmodel: An `onnx.ModelProto`, modified in place.
+        data_path: The path of the external data file.
+        location: The location recorded in `xmodel`, relative to the
+            directory of the ONNX file. Defaults to the basename of
+            `data_path`.
+        size_threshold: Smaller tensors are kept in `xmodel`.
+        alignment: The alignment of tensor data in bytes.
+    """
+    if location is None:
+        location = os.path.basename(data_path)
+    tensors = [t for t in _iter_tensors(xmodel.graph)
+               if t.HasField('raw_data') and len(t.raw_data) >= size_threshold]
+    if not tensors:
+        return
+    offset = 0
+    with open(data_path, 'wb') as f:
+        for tensor in tensors:
+            offset = _align(offset, alignment)
+            f.seek(offset)
+            length = f.write(tensor.raw_data)
+            _set_external_data(tensor, location, offset, length)
+            tensor.ClearField('raw_data')
+            offset += length
+        # Pad the file so the last tensor can be mapped as a whole page.
+        f.truncate(_align(offset, alignment))
+
+
+def save_model(xmodel, path, size_threshold=DEFAULT_SIZE_THRESHOLD,
+               alignment=DEFAULT_ALIGNMENT):
+    """Saves an ONNX model with its weights in an external data file.
+
+    The weights are stored in `path + '.data'` next to the ONNX file,
+    which is not created when there are no large tensors.
+    Note `xmodel` is modified in place.
+    """
+    convert_to_external_data(xmodel, path + '.data',
+                             size_threshold=size_threshold,
+                             alignment=alignment)
+    with open(path, 'wb') as f:
+        f.write(xmodel.SerializeToString())
+
+
+def external_data_files(xmodel, base_dir=None):
+    """Returns the external data files which `xmodel` refers to.
+
+    Each file is a tuple of its absolute path, its size and its mtime in
+    nanoseconds, which identifies the weights of `xmodel` without
+    reading them. Relative locations are resolved from `base_dir`, or
+    from the current directory when it is `None`.
+    """
+    locations = set()
+    for tensor in _iter_tensors(xmodel.graph):
+        if tensor.data_location != onnx.TensorProto.EXTERNAL:
+            continue
+        for entry in tensor.external_data:
+            if entry.key == 'location':
+                locations.add(entry.value)
+    files = []
+    for location in sorted(locations):
+        path = os.path.abspath(os.path.join(base_dir or '', location))
+        st = os.stat(path)
+        files.append((path, st.st_size, st.st_mtime_ns))
+    return files
@@ -0,0 +1,250 @@
+import concurrent.futures
+import queue
+import threading
+import time
+
+import chainer
+import chainerx
+
+from chainer_compiler import chainer_compiler
+
+
+class _Request(object):
+
+    def __init__(self, inputs, batch_size, device, signature):
+        self.inputs = inputs
+        self.batch_size = batch_size
+        self.device = device
+        # Only requests with the same signature are batched together.
+        self.signature = signature
+        self.future = concurrent.futures.Future()
+
+
+class InferenceSession(object):
+    """Serves inference requests by running them in dynamic batches.
+
+    Requests submitted from multiple threads are queued and coalesced by a
+    worker thread into a batch of up to `max_batch_size` samples. The
+    worker waits at most `timeout` seconds for more requests after the
+    first one arrives. Inputs of the batched requests are concatenated
+    along `batch_axis`, the ChxVM runs once and its outputs are split back
+    per request along their declared batch axes.
+
+    Only requests whose inputs have the same dtypes and the same shapes
+    except for the batch axis are batched together. When a batch of
+    multiple requests fails, its requests are retried one by one so only
+    the failing ones get the error.
+
+    The compiled model must not depend on the batch size. Inputs which are
+    bound to `chxvm` (e.g., by `from_onnx`) are shared by all requests.
+
+    Args:
+        chxvm: A compiled ChxVM.
+        input_names (list of str): Names of the inputs each request gives.
+        output_names (list of str): Names of the outputs to be returned.
+        max_batch_size (int): The maximum number of samples in a batch.
+        timeout (float): Seconds to wait for requests to fill a batch.
+        batch_axis (int): The axis along which inputs are concatenated.
+        output_batch_axes (dict): A dict from output names to the axes
+            along which they are split, or `None` for outputs which do
+            not have the batch axis (e.g., ones reduced over the batch)
+            and are returned whole to every request. Outputs not in the
+            dict are split along `batch_axis`.
+        runtime_kwargs (dict): Keyword arguments passed to `ChxVM.run`.
+    """
+
+    def __init__(self, chxvm, input_names, output_names,
+                 max_batch_size=8, timeout=0.005, batch_axis=0,
+                 output_batch_axes=None, runtime_kwargs=None):
+        assert max_batch_size > 0
+        self.chxvm = chxvm
+        self.input_names = list(input_names)
+        self.output_names = list(output_names)
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self.batch_axis = batch_axis
+        output_batch_axes = dict(output_batch_axes or {})
+        for name in output_batch_axes:
+            if name not in self.output_names:
+                raise ValueError('Unknown output: %s' % name)
+        self.output_batch_axes = [output_batch_axes.get(name, batch_axis)
+                                  for name in self.output_names]
+        # The shapes of batched inputs differ from the exported ones.
+        self.runtime_kwargs = {'check_types': False}
+        if runtime_kwargs is not None:
+            self.runtime_kwargs.update(runtime_kwargs)
+
+        self._queue = queue.Queue()
+        self._pending = None
+        # Guards `_closed` so no request is enqueued after the sentinel.
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._serve, daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def from_onnx(cls, onnx_file, **kwargs):
+        """Creates a session from an ONNX file with bound initializers."""
+        graph = chainer_compiler._chainer_compiler_core.load(onnx_file)
+        input_names = graph.input_names()
+        output_names = graph.output_names()
+        params = graph.params()
+        chxvm = graph.compile()
+        chxvm.bind_inputs(params)
+        return cls(chxvm, input_names, output_names, **kwargs)
+
+    def submit(self, inputs):
+        """Submits a request and returns a `concurrent.futures.Future`.
+
+        Args:
+            inputs: A list of arrays in the order of `input_names` or a dict
+                from input names to arrays. All arrays must have the same
+                size along `batch_axis`.
+
+        Returns:
+            A future whose result is a dict from output names to arrays on
+            the device of the inputs.
+
+        Raises:
+            ValueError: If the inputs of the request are invalid. Other
+                requests are not affected.
+        """
+        if isinstance(inputs, dict):
+            missing = [name for name in self.input_names
+                       if name not in inputs]
+            if missing:
+                raise ValueError('Missing inputs: %s' % missing)
+            inputs = [inputs[name] for name in self.input_names]
+        if len(inputs) != len(self.input_names):
+            raise ValueError('Expected %d inputs but got %d' %
+                             (len(self.input_names), len(inputs)))
+        device = chainer.backend.get_device_from_array(inputs[0])
+        inputs = [chainer.backend.to_chx(x) for x in inputs]
+        for x in inputs:
+            if x.ndim <= self.batch_axis:
+                raise ValueError('Input of shape %s has no batch axis %d' %
+                                 (x.shape, self.batch_axis))
+        batch_size = inputs[0].shape[self.batch_axis]
+        if any(x.shape[self.batch_axis] != batch_size for x in inputs):
+            raise ValueError('Inconsistent batch sizes: %s' %
+                             [x.shape for x in inputs])
+        if batch_size > self.max_batch_size:
+            raise ValueError('Batch size %d exceeds max_batch_size %d' %
+                             (batch_size, self.max_batch_size))
+        signature = tuple(
+            (x.shape[:self.batch_axis] + x.shape[self.batch_axis + 1:],
+             x.dtype, x.device) for x in inputs)
+        request = _Request(inputs, batch_size, device, signature)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('InferenceSession is already closed')
+            self._queue.put(request)
+        return request.future
+
+    def run(self, inputs):
+        """Runs a request and blocks until its outputs are ready."""
+        return self.submit(inputs).result()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _next_batch(self):
+        if self._pending is not None:
+            first, self._pending = self._pending, None
+        else:
+            first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        batch_size = first.batch_size
+        deadline = time.monotonic() + self.timeout
+        while batch_size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    request = self._queue.get(timeout=remaining)
+                else:
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Put the sentinel back so the loop stops after this batch.
+                self._queue.put(None)
+                break
+            if (batch_size + request.batch_size > self.max_batch_size or
+                    request.signature != first.signature):
+                self._pending = request
+                break
+            batch.append(request)
+            batch_size += request.batch_size
+        return batch
+
+    def _serve(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            batch = [r for r in batch
+                     if r.future.set_running_or_notify_cancel()]
+            if batch:
+                self._run_requests(batch)
+
+    def _run_requests(self, batch):
+        try:
+            outputs = self._run_batch(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # Find the failing requests by running them one by one.
+            for request in batch:
+                self._run_requests([request])
+            return
+        for request, output in zip(batch, outputs):
+            request.future.set_result(output)
+
+    def _run_batch(self, batch):
+        inputs = {}
+        for i, name in enumerate(self.input_names):
+            xs = [request.inputs[i] for request in batch]
+            if len(xs) == 1:
+                x = xs[0]
+            else:
+                x = chainerx.concatenate(xs, axis=self.batch_axis)
+            inputs[name] = chainer_compiler._chainer_compiler_core.value(x)
+
+        with chainer.using_device(batch[0].inputs[0].device):
+            outputs = self.chxvm.run(inputs, **self.runtime_kwargs)
+
+        total = sum(request.batch_size for request in batch)
+        results = [{} for _ in batch]
+        for name, axis in zip(self.output_names, self.output_batch_axes):
+            y = outputs[name].array()
+            if axis is not None and (y.ndim <= axis or
+                                     y.shape[axis] != total):
+                raise ValueError(
+                    'Output %s of shape %s does not have the batch size %d '
+                    'at axis %d' % (name, y.shape, total, axis))
+            start = 0
+            for request, result in zip(batch, results):
+                if axis is not None:
+                    index = [slice(None)] * y.ndim
+                    index[axis] = slice(start, start + request.batch_size)
+                    out = y[tuple(index)]
+                else:
+                    # Outputs without the batch axis are shared.
+                    out = y
+                result[name] = request.device.send(out)
+                start += request.batch_size
+        return results
@@ -0,0 +1,213 @@
+import collections
+import random
+
+from chainer_compiler import chainer_compiler
+
+
+_DEFAULT_CAPACITY = 100000
+
+# The maximum number of times kept for percentiles of an op type or a
+# node. Times beyond this are sampled uniformly.
+_MAX_SAMPLES = 1000
+
+# The maximum number of distinct output shapes kept for an op type or a
+# node. Shapes beyond this are not kept.
+_MAX_OUTPUT_SHAPES = 100
+
+
+def _percentile(sorted_values, q):
+    """Returns the `q`-th percentile of sorted values by nearest rank."""
+    if not sorted_values:
+        return 0.0
+    index = int(round(q / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+class OpStats(object):
+    """Aggregated statistics of an op type or a node.
+
+    Percentiles are computed from a reservoir of at most `_MAX_SAMPLES`
+    times and at most `_MAX_OUTPUT_SHAPES` distinct output shapes are
+    kept, so the memory usage is bounded for long runs with
+    variable-length inputs.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.total_bytes = 0
+        self.times = []
+        self.output_shapes = set()
+        self._rng = random.Random(0)
+
+    def add(self, event):
+        self.count += 1
+        self.total_time += event['time']
+        self.total_bytes += event['bytes']
+        if len(self.times) < _MAX_SAMPLES:
+            self.times.append(event['time'])
+        else:
+            i = self._rng.randrange(self.count)
+            if i < _MAX_SAMPLES:
+                self.times[i] = event['time']
+        if len(self.output_shapes) < _MAX_OUTPUT_SHAPES:
+            self.output_shapes.add(tuple(event['output_shapes']))
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        return _percentile(sorted(self.times), q)
+
+
+class ProfileSummary(object):
+    """Per-op-type and per-node statistics of profiled ChxVM runs.
+
+    Nodes are keyed by a tuple of the program counter, the op type and
+    the debug info of the ChxVM instruction, so nodes of different
+    programs (e.g., forward and backward ones) may share a key when they
+    have the same program counter and op.
+    """
+
+    def __init__(self, events=()):
+        self.by_op = collections.defaultdict(OpStats)
+        self.by_node = collections.defaultdict(OpStats)
+        self.num_runs = 0
+        self._last_run = None
+        self.add_events(events)
+
+    def add_events(self, events):
+        for event in events:
+            self.by_op[event['op']].add(event)
+            key = (event['pc'], event['op'], event['node'])
+            self.by_node[key].add(event)
+            # The runtime records events of a run contiguously in the
+            # increasing order of run ids.
+            if self._last_run is None or event['run'] > self._last_run:
+                self.num_runs += 1
+                self._last_run = event['run']
+
+    @property
+    def total_time(self):
+        return sum(stats.total_time for stats in self.by_op.values())
+
+    def _stats(self, by):
+        if by == 'op':
+            return self.by_op
+        elif by == 'node':
+            return self.by_node
+        raise ValueError('Unknown key of profile: %s' % by)
+
+    def table(self, by='op', percentiles=(50, 90, 99), limit=None):
+        """Returns a text table of statistics sorted by the total time.
+
+        Args:
+            by (str): 'op' to aggregate by op types or 'node' by nodes.
+            percentiles: Percentiles of time shown in the table.
+            limit (int): The maximum number of rows.
+        """
+        stats = sorted(self._stats(by).items(),
+                       key=lambda kv: -kv[1].total_time)
+        if limit is not None:
+            stats = stats[:limit]
+        header = ['%-40s' % by, '%8s' % 'count', '%10s' % 'total(ms)',
+                  '%9s' % 'mean(us)']
+        header += ['%9s' % ('p%d(us)' % q) for q in percentiles]
+        header.append('%12s' % 'bytes')
+        lines = [' '.join(header)]
+        for key, st in stats:
+            if by == 'node':
+                key = '%d:%s %s' % key
+            row = ['%-40s' % key[:40], '%8d' % st.count,
+                   '%10.3f' % (st.total_time * 1e3),
+                   '%9.1f' % (st.mean_time * 1e6)]
+            row += ['%9.1f' % (st.percentile(q) * 1e6) for q in percentiles]
+            row.append('%12d' % st.total_bytes)
+            lines.append(' '.join(row))
+        return '\n'.join(lines)
+
+    def diff(self, base, by='op'):
+        """Compares mean times with `base`.
+
+        Returns:
+            A list of tuples of a key, the mean time in `base`, the mean
+            time in this summary and their ratio, sorted by the
+            difference of total times per run. Keys missing in either
+            side have zero times and a ratio of `None`.
+        """
+        stats = self._stats(by)
+        base_stats = base._stats(by)
+        rows = []
+        for key in set(stats) | set(base_stats):
+            base_mean = base_stats[key].mean_time if key in base_stats else 0
+            mean = stats[key].mean_time if key in stats else 0
+            base_total = (base_stats[key].total_time / max(base.num_runs, 1)
+                          if key in base_stats else 0)
+            total = (stats[key].total_time / max(self.num_runs, 1)
+                     if key in stats else 0)
+            ratio = mean / base_mean if base_mean and mean else None
+            rows.append((total - base_total, key, base_mean, mean, ratio))
+        rows.sort(key=lambda row: -abs(row[0]))
+        return [row[1:] for row in rows]
+
+    def diff_table(self, base, by='op', limit=None):
+        rows = self.diff(base, by=by)
+        if limit is not None:
+            rows = rows[:limit]
+        lines = ['%-40s %10s %10s %8s' % (by, 'base(us)', 'new(us)', 'ratio')]
+        for key, base_mean, mean, ratio in rows:
+            if by == 'node':
+                key = '%d:%s %s' % key
+            lines.append('%-40s %10.1f %10.1f %8s' % (
+                key[:40], base_mean * 1e6, mean * 1e6,
+                '-' if ratio is None else '%.3f' % ratio))
+        return '\n'.join(lines)
+
+
+class Profiler(object):
+    """Samples ChxVM runs of a `CompiledModel` and aggregates their ops.
+
+    Every `interval`-th call of the model is profiled. Events of
+    profiled runs are stored in a ring buffer of `capacity` events in
+    the runtime, which drops the oldest ones when it is full, so the
+    profiler can be left enabled with a large `interval`. Call `summary`
+    to aggregate the events recorded so far.
+
+    Times are wall times of ops on the host. Ops run on GPUs are
+    asynchronous so their times do not include kernel execution.
+
+    Args:
+        interval (int): Profile one of `interval` calls.
+        capacity (int): The maximum number of events kept in the buffer.
+    """
+
+    def __init__(self, interval=1, capacity=_DEFAULT_CAPACITY):
+        assert interval > 0
+        self.interval = interval
+        self.profile = chainer_compiler._chainer_compiler_core.ChxVMProfile(
+            capacity)
+        self.num_calls = 0
+        self._summary = ProfileSummary()
+
+    def runtime_kwargs(self):
+        """Returns runtime arguments to profile the next call, if any."""
+        sampled = self.num_calls % self.interval == 0
+        self.num_calls += 1
+        if not sampled:
+            return {}
+        return {'profile': self.profile}
+
+    @property
+    def num_dropped(self):
+        return self.profile.num_dropped
+
+    def summary(self):
+        """Returns a `ProfileSummary` of all events recorded so far."""
+        self._summary.add_events(self.profile.take_events())
+        return self._summary
+
+    def reset(self):
+        """Discards recorded events."""
+        self.profile.take_events()
+        self._summary = ProfileSummary()
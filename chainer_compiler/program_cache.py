@@ -0,0 +1,141 @@
+import collections
+import threading
+import warnings
+
+
+def input_signature(inputs):
+    """Returns a hashable signature of shapes and dtypes of `inputs`.
+
+    `inputs` is the list of top-level inputs given to a compiled model.
+    Each array is mapped to a pair of its shape and dtype. Sequences
+    cannot be specialized and are mapped to `None`. If no input is an
+    array, this returns `None`.
+    """
+    signature = []
+    for x in inputs:
+        if isinstance(x, (list, tuple, range, dict)):
+            signature.append(None)
+        else:
+            signature.append((tuple(x.shape), x.dtype.str))
+    if all(s is None for s in signature):
+        return None
+    return tuple(signature)
+
+
+class ProgramCache(object):
+    """An LRU cache of programs specialized for input signatures.
+
+    A program is compiled by `compile_fn` given to `lookup` on the first
+    sight of a signature. When an `executor` (e.g., a
+    `concurrent.futures.ThreadPoolExecutor`) is given, the compilation
+    runs in it and `lookup` returns `None` until it finishes so the
+    caller can fall back to a generic program. Signatures whose
+    compilation failed or whose program alone exceeds `max_bytes` are
+    remembered and never compiled again.
+
+    The least recently used programs are evicted when there are more
+    than `max_entries` programs or their total size exceeds
+    `max_bytes`. At most `max_entries` programs are compiled at once,
+    and `lookup` returns `None` for new signatures beyond that.
+
+    `lookup` may be called from multiple threads. A signature is
+    compiled only once, and other threads looking it up get `None`
+    while it is being compiled.
+
+    Args:
+        max_entries (int): The maximum number of programs.
+        max_bytes (int): The maximum total size of programs in bytes,
+            or `None` for no limit.
+        executor: An executor which compiles programs, or `None` to
+            compile them synchronously in `lookup`.
+    """
+
+    def __init__(self, max_entries, max_bytes=None, executor=None):
+        assert max_entries > 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.executor = executor
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Pairs of a program and its size keyed by signatures, from the
+        # least recently used one.
+        self._entries = collections.OrderedDict()
+        # Signatures being compiled.
+        self._pending = set()
+        self._rejected = set()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def num_pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def lookup(self, key, compile_fn):
+        """Returns the program for `key` or `None` if it is not ready.
+
+        `compile_fn` takes no arguments and returns a pair of a compiled
+        program and its size in bytes.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            if key in self._rejected or key in self._pending:
+                return None
+            if len(self._pending) >= self.max_entries:
+                return None
+            self._pending.add(key)
+
+        if self.executor is None:
+            return self._compile(key, compile_fn)
+        try:
+            # The program is added to the cache when it is compiled.
+            self.executor.submit(self._compile, key, compile_fn)
+        except Exception:
+            with self._lock:
+                self._pending.discard(key)
+            raise
+        return None
+
+    def _compile(self, key, compile_fn):
+        try:
+            program, nbytes = compile_fn()
+        except Exception as e:
+            warnings.warn('Failed to compile a program for %s: %s' % (key, e))
+            with self._lock:
+                self._pending.discard(key)
+                self._rejected.add(key)
+            return None
+
+        with self._lock:
+            self._pending.discard(key)
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                self._rejected.add(key)
+                return program
+            self._entries[key] = (program, nbytes)
+            self.nbytes += nbytes
+            self._evict()
+        return program
+
+    def _evict(self):
+        while self._entries and (
+                len(self._entries) > self.max_entries or
+                (self.max_bytes is not None and
+                 self.nbytes > self.max_bytes)):
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.nbytes -= nbytes
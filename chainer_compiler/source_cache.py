@@ -0,0 +1,67 @@
+import collections
+import linecache
+import threading
+
+
+_DEFAULT_MAX_SIZE = 1024
+
+
+class SourceCache(object):
+    """An LRU cache of parsed source code of Python functions.
+
+    Entries are keyed by the code object of a function, the hash of the
+    source file which defines it and the parser, so an edited file is
+    parsed again. At most `max_size` entries are kept.
+
+    Parsed trees are shared by all users of an entry, so they must not
+    be modified.
+    """
+
+    def __init__(self, max_size=_DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, func, parse):
+        """Returns `parse(func)` and caches it.
+
+        Args:
+            func: A function or a method whose source code is parsed.
+            parse: A function which parses the source code of `func`.
+        """
+        code = getattr(func, '__code__', None)
+        if code is None:
+            return parse(func)
+        # Same as `inspect.getsource`, reload the file if it was modified.
+        linecache.checkcache(code.co_filename)
+        lines = linecache.getlines(code.co_filename)
+        key = (code, hash(''.join(lines)), parse)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        ret = parse(func)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = ret
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return ret
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+source_cache = SourceCache()
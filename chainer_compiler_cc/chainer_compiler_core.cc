@@ -2,11 +2,15 @@
 
 #include <compiler/onnx.h>
 
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
 #include <chainerx/array.h>
 #include <chainerx/array_body.h>
+#include <chainerx/context.h>
+#include <chainerx/native/native_backend.h>
+#include <chainerx/routines/creation.h>
 
 #include <common/log.h>
 #include <common/protoutil.h>
@@ -22,10 +26,12 @@
 #include <compiler/model.h>
 #include <compiler/passes.h>
 #include <compiler/subgraph_canonicalizer.h>
+#include <compiler/tensor.h>
 #include <runtime/chainerx_util.h>
 #include <runtime/chrome_tracing.h>
 #include <runtime/chxvm.h>
 #include <runtime/chxvm.pb.h>
+#include <runtime/chxvm_profile.h>
 #include <runtime/chxvm_state.h>
 #include <runtime/chxvm_var.h>
 #include <runtime/meminfo.h>
@@ -39,9 +45,19 @@ namespace {
 
 typedef std::shared_ptr<chainerx::internal::ArrayBody> ArrayBodyPtr;
 typedef std::shared_ptr<runtime::ChxVMVar> VarPtr;
+typedef std::shared_ptr<runtime::ChxVMProfile> ProfilePtr;
 
 std::shared_ptr<Graph> LoadGraph(const std::string& onnx_path) {
     onnx::ModelProto xmodel(LoadLargeProto<onnx::ModelProto>(onnx_path));
+    ResolveExternalData(onnx_path, &xmodel);
+    return std::make_shared<Graph>(OpsetList(xmodel.opset_import().begin(), xmodel.opset_import().end()), xmodel.graph());
+}
+
+std::shared_ptr<Graph> LoadGraphFromBytes(const std::string& serialized, const std::string& base_dir) {
+    onnx::ModelProto xmodel(ParseLargeProto<onnx::ModelProto>(serialized));
+    if (!base_dir.empty()) {
+        ResolveExternalDataInDir(base_dir, &xmodel);
+    }
     return std::make_shared<Graph>(OpsetList(xmodel.opset_import().begin(), xmodel.opset_import().end()), xmodel.graph());
 }
 
@@ -60,12 +76,35 @@ void Configure(
 #include "chainer_compiler_cc/apply_cxx_args.inc"
 }
 
-std::shared_ptr<runtime::ChxVM> Compile(const std::shared_ptr<Graph>& graph, bool skip_scheduling) {
+void EmitProgram(const std::shared_ptr<Graph>& graph, bool skip_scheduling, runtime::ChxVMProgramProto* chxvm_prog) {
     constexpr bool kBackprop = false;
     RunDefaultPasses(graph.get(), kBackprop, skip_scheduling);
-    runtime::ChxVMProgramProto chxvm_prog;
     constexpr bool kDumpValueNames = false;
-    chxvm::Emit(*graph, &chxvm_prog, kDumpValueNames);
+    chxvm::Emit(*graph, chxvm_prog, kDumpValueNames);
+}
+
+// Compilation does not touch Python objects so it runs without the GIL
+// to let other threads run while a program is compiled in background.
+std::shared_ptr<runtime::ChxVM> Compile(const std::shared_ptr<Graph>& graph, bool skip_scheduling) {
+    py::gil_scoped_release release;
+    runtime::ChxVMProgramProto chxvm_prog;
+    EmitProgram(graph, skip_scheduling, &chxvm_prog);
+    return std::make_shared<runtime::ChxVM>(chxvm_prog);
+}
+
+py::bytes CompileToProgram(const std::shared_ptr<Graph>& graph, bool skip_scheduling) {
+    std::string serialized;
+    {
+        py::gil_scoped_release release;
+        runtime::ChxVMProgramProto chxvm_prog;
+        EmitProgram(graph, skip_scheduling, &chxvm_prog);
+        CHECK(chxvm_prog.SerializeToString(&serialized));
+    }
+    return py::bytes(serialized);
+}
+
+std::shared_ptr<runtime::ChxVM> LoadChxVM(const std::string& serialized) {
+    runtime::ChxVMProgramProto chxvm_prog(ParseLargeProto<runtime::ChxVMProgramProto>(serialized));
     return std::make_shared<runtime::ChxVM>(chxvm_prog);
 }
 
@@ -109,6 +148,7 @@ std::pair<std::shared_ptr<Graph>, std::shared_ptr<Graph>> GenerateBackward(const
 
 std::pair<std::shared_ptr<Graph>, std::shared_ptr<Graph>> GenerateBackwardTo(
         const std::shared_ptr<Graph>& graph, const std::vector<std::string>& param_names) {
+    py::gil_scoped_release release;
     auto backprop = std::make_shared<Graph>(graph->opset_imports(), graph->name() + "_backprop");
     RunDefaultPassesBeforeGradient(graph.get());
     GenerateGradientNodesTo(graph.get(), backprop.get(), param_names);
@@ -117,6 +157,7 @@ std::pair<std::shared_ptr<Graph>, std::shared_ptr<Graph>> GenerateBackwardTo(
 
 std::pair<std::shared_ptr<Graph>, std::shared_ptr<Graph>> GenerateBackwardToWithOrder(
         const std::shared_ptr<Graph>& graph, const std::string& computation_order) {
+    py::gil_scoped_release release;
     auto backprop = std::make_shared<Graph>(graph->opset_imports(), graph->name() + "_backprop");
     RunDefaultPassesBeforeGradient(graph.get());
     auto orders = GetComputationOrder(*graph.get(), computation_order);
@@ -148,6 +189,7 @@ void InitGraph(py::module& m) {
     py::class_<Graph, std::shared_ptr<Graph>> c{m, "Graph"};
     c.def("params", &LoadParams, "Load parameters of a model");
     c.def("compile", &Compile, "Compile a model", "skip_scheduling"_a = false);
+    c.def("compile_to_program", &CompileToProgram, "Compile a model into a serialized ChxVM program", "skip_scheduling"_a = false);
     c.def("input_names", &GetInputNames, "Names of inputs");
     c.def("param_names", &GetParamNames, "Names of params");
     c.def("output_names", &GetOutputNames, "Names of outputs");
@@ -174,7 +216,8 @@ runtime::ChxVMOptions CreateOptions(
         int64_t base_memory_usage,
         const std::string& chrome_tracing,
         const std::string& dump_outputs_dir,
-        const std::map<std::string, py::function>& custom_funcs) {
+        const std::map<std::string, py::function>& custom_funcs,
+        const ProfilePtr& profile) {
     runtime::ChxVMOptions chxvm_opts;
     if (trace) chxvm_opts.trace_level = 1;
     if (verbose) chxvm_opts.trace_level = 2;
@@ -191,11 +234,14 @@ runtime::ChxVMOptions CreateOptions(
         chxvm_opts.chrome_tracing = new runtime::ChromeTracingEmitter();
     }
     chxvm_opts.dump_outputs_dir = dump_outputs_dir;
+    chxvm_opts.profile = profile;
 
     for (const auto& p : custom_funcs) {
         const std::string& name = p.first;
         py::object py_func = p.second;
         auto func = [name, py_func](const std::vector<chainerx::Array>& inputs) {
+            // ChxVM runs without the GIL.
+            py::gil_scoped_acquire acquire;
             py::list py_inputs;
             for (const chainerx::Array& input : inputs) {
                 py_inputs.append(chainerx::internal::GetArrayBody(input));
@@ -231,7 +277,8 @@ std::shared_ptr<runtime::ChxVMState> Prepare(
         int64_t base_memory_usage,
         const std::string& chrome_tracing,
         const std::string& dump_outputs_dir,
-        const std::map<std::string, py::function>& custom_funcs) {
+        const std::map<std::string, py::function>& custom_funcs,
+        const ProfilePtr& profile) {
     runtime::ChxVMOptions chxvm_opts = CreateOptions(
             trace,
             verbose,
@@ -243,7 +290,8 @@ std::shared_ptr<runtime::ChxVMState> Prepare(
             base_memory_usage,
             chrome_tracing,
             dump_outputs_dir,
-            custom_funcs);
+            custom_funcs,
+            profile);
 
     std::shared_ptr<runtime::ChxVMState> state(chxvm->Prepare(inputs, chxvm_opts));
     return state;
@@ -262,7 +310,8 @@ std::map<std::string, VarPtr> Run(
         int64_t base_memory_usage,
         const std::string& chrome_tracing,
         const std::string& dump_outputs_dir,
-        const std::map<std::string, py::function>& custom_funcs) {
+        const std::map<std::string, py::function>& custom_funcs,
+        const ProfilePtr& profile) {
     runtime::ChxVMOptions chxvm_opts = CreateOptions(
             trace,
             verbose,
@@ -274,9 +323,19 @@ std::map<std::string, VarPtr> Run(
             base_memory_usage,
             chrome_tracing,
             dump_outputs_dir,
-            custom_funcs);
-
-    runtime::InOuts outputs(chxvm->Run(inputs, chxvm_opts));
+            custom_funcs,
+            profile);
+
+    // Inputs are converted and outputs are released with the GIL held as
+    // they may refer to Python objects. Only the execution runs without
+    // the GIL so other Python threads can run models concurrently.
+    std::unique_ptr<runtime::ChxVMState> state(chxvm->Prepare(inputs, chxvm_opts));
+    {
+        py::gil_scoped_release release;
+        chxvm->Run(state.get());
+    }
+    runtime::InOuts outputs(state->GetOutputs());
+    state.reset();
 
     if (chxvm_opts.chrome_tracing) {
         chxvm_opts.chrome_tracing->Emit(chrome_tracing);
@@ -285,7 +344,10 @@ std::map<std::string, VarPtr> Run(
 }
 
 std::map<std::string, VarPtr> RunState(const std::shared_ptr<runtime::ChxVM>& chxvm, const std::shared_ptr<runtime::ChxVMState>& state) {
-    chxvm->Run(state.get());
+    {
+        py::gil_scoped_release release;
+        chxvm->Run(state.get());
+    }
     // TODO(hamaji): Revive this.
 #if 0
     const runtime::ChxVMOptions& chxvm_opts = state->options();
@@ -296,6 +358,10 @@ std::map<std::string, VarPtr> RunState(const std::shared_ptr<runtime::ChxVM>& ch
     return state->GetOutputs();
 }
 
+void BindInputs(const std::shared_ptr<runtime::ChxVM>& chxvm, const std::map<std::string, VarPtr>& inputs) {
+    chxvm->BindInputs(inputs);
+}
+
 void InitChxVM(py::module& m) {
     py::class_<runtime::ChxVM, std::shared_ptr<runtime::ChxVM>> c{m, "ChxVM"};
     // TODO(hamaji): Expose ChxVMOptions to Python.
@@ -313,7 +379,8 @@ void InitChxVM(py::module& m) {
           "base_memory_usage"_a = -1,
           "chrome_tracing"_a = "",
           "dump_outputs_dir"_a = "",
-          "custom_funcs"_a = py::dict());
+          "custom_funcs"_a = py::dict(),
+          "profile"_a = nullptr);
     c.def("run",
           &Run,
           "Run the model",
@@ -328,14 +395,45 @@ void InitChxVM(py::module& m) {
           "base_memory_usage"_a = -1,
           "chrome_tracing"_a = "",
           "dump_outputs_dir"_a = "",
-          "custom_funcs"_a = py::dict());
+          "custom_funcs"_a = py::dict(),
+          "profile"_a = nullptr);
     c.def("run", &RunState, "Run the model", "state"_a);
+    c.def("bind_inputs", &BindInputs, "Bind inputs which are passed to all subsequent runs (e.g., parameters)", "inputs"_a);
 }
 
 void InitChxVMState(py::module& m) {
     py::class_<runtime::ChxVMState, std::shared_ptr<runtime::ChxVMState>> c{m, "ChxVMState"};
 }
 
+py::list TakeProfileEvents(const ProfilePtr& profile) {
+    py::list events;
+    for (const runtime::ChxVMProfileEvent& e : profile->TakeEvents()) {
+        py::dict event;
+        event["run"] = e.run_id;
+        event["pc"] = e.pc;
+        event["op"] = e.name;
+        event["node"] = e.debug_info;
+        event["start"] = e.start_ns * 1e-9;
+        event["time"] = e.duration_ns * 1e-9;
+        event["bytes"] = e.bytes;
+        py::list shapes;
+        for (const std::vector<int64_t>& shape : e.output_shapes) {
+            shapes.append(py::tuple(py::cast(shape)));
+        }
+        event["output_shapes"] = shapes;
+        events.append(event);
+    }
+    return events;
+}
+
+void InitChxVMProfile(py::module& m) {
+    py::class_<runtime::ChxVMProfile, ProfilePtr> c{m, "ChxVMProfile"};
+    c.def(py::init<size_t>(), "Create a ring buffer of profile events", "capacity"_a);
+    c.def("take_events", &TakeProfileEvents, "Take recorded events as a list of dicts");
+    c.def_property_readonly("capacity", &runtime::ChxVMProfile::capacity);
+    c.def_property_readonly("num_dropped", &runtime::ChxVMProfile::num_dropped);
+}
+
 bool IsArray(const VarPtr& v) {
     return v->IsArray();
 }
@@ -356,12 +454,314 @@ std::vector<VarPtr> GetSequence(const VarPtr& v) {
     return out;
 }
 
+py::object GetSequenceArrays(const VarPtr& v) {
+    const runtime::ChxVMSequence& seq = *v->GetSequence();
+    py::list out(seq.size());
+    for (size_t i = 0; i < seq.size(); ++i) {
+        if (!seq[i].IsArray()) {
+            return py::none();
+        }
+        out[i] = py::cast(chainerx::internal::GetArrayBody(seq[i].GetArray()));
+    }
+    return std::move(out);
+}
+
+// Zero-copy interchange with NumPy and DLPack.
+
+// The minimal subset of DLPack ABI (https://github.com/dmlc/dlpack)
+// which is needed to exchange tensors. dlpack.h is available only when
+// TVM is enabled so the structs are defined here.
+namespace dlpack {
+
+enum DLDeviceType {
+    kDLCPU = 1,
+    kDLGPU = 2,
+};
+
+struct DLContext {
+    DLDeviceType device_type;
+    int device_id;
+};
+
+enum DLDataTypeCode {
+    kDLInt = 0U,
+    kDLUInt = 1U,
+    kDLFloat = 2U,
+    // Added in DLPack v0.8. Older producers use kDLUInt for bool.
+    kDLBool = 6U,
+};
+
+struct DLDataType {
+    uint8_t code;
+    uint8_t bits;
+    uint16_t lanes;
+};
+
+struct DLTensor {
+    void* data;
+    DLContext ctx;
+    int ndim;
+    DLDataType dtype;
+    int64_t* shape;
+    int64_t* strides;
+    uint64_t byte_offset;
+};
+
+struct DLManagedTensor {
+    DLTensor dl_tensor;
+    void* manager_ctx;
+    void (*deleter)(DLManagedTensor* self);
+};
+
+}  // namespace dlpack
+
+const char kDLTensorCapsuleName[] = "dltensor";
+const char kUsedDLTensorCapsuleName[] = "used_dltensor";
+
+const chainerx::Array& GetNativeArray(const runtime::ChxVMVar& v) {
+    const chainerx::Array& a = v.GetArray();
+    if (!runtime::IsNativeDevice(&a.device())) {
+        throw py::value_error("ChxVMVar is not on a native device: " + a.device().name());
+    }
+    return a;
+}
+
+py::dtype GetNumpyDtype(chainerx::Dtype dtype) {
+    return py::dtype(chainerx::GetDtypeName(dtype));
+}
+
+std::vector<ssize_t> GetStrides(const chainerx::Array& a) {
+    return std::vector<ssize_t>(a.strides().begin(), a.strides().end());
+}
+
+// Returns a NumPy array which shares the memory with `v`. The base of
+// the array owns a copy of the chainerx::Array rather than `v`, whose
+// value may be replaced (e.g., by GetScalar or GetShape) while the
+// array is alive.
+py::array ToNumpy(const VarPtr& v) {
+    const chainerx::Array& a = GetNativeArray(*v);
+    py::capsule base(new chainerx::Array(a), [](void* p) { delete static_cast<chainerx::Array*>(p); });
+    return py::array(
+            GetNumpyDtype(a.dtype()),
+            std::vector<ssize_t>(a.shape().begin(), a.shape().end()),
+            GetStrides(a),
+            static_cast<char*>(a.raw_data()) + a.offset(),
+            base);
+}
+
+// Implements `numpy.asarray` for ChxVMVars.
+py::array ToNumpyWithDtype(const VarPtr& v, py::object dtype) {
+    py::array a = ToNumpy(v);
+    if (dtype.is_none()) {
+        return a;
+    }
+    return a.attr("astype")(dtype, "copy"_a = false).cast<py::array>();
+}
+
+// Wraps a NumPy array as a ChxVMVar on the native device without
+// copying. The array must not be modified while the ChxVMVar is used.
+// Read-only, misaligned and negatively strided arrays are copied.
+VarPtr CreateValueFromNumpy(py::array a) {
+    if (!a.dtype().attr("isnative").cast<bool>()) {
+        throw py::value_error("Non-native byte order is not supported");
+    }
+    const chainerx::Dtype dtype = chainerx::GetDtype(a.dtype().attr("name").cast<std::string>());
+    bool in_place = a.writeable() && reinterpret_cast<uintptr_t>(a.data()) % a.itemsize() == 0;
+    for (ssize_t i = 0; i < a.ndim(); ++i) {
+        in_place &= a.strides(i) >= 0;
+    }
+    if (!in_place) {
+        a = a.attr("copy")().cast<py::array>();
+    }
+
+    chainerx::Shape shape(a.shape(), a.shape() + a.ndim());
+    chainerx::Strides strides(a.strides(), a.strides() + a.ndim());
+    // The Python object is released with the GIL held, whichever thread
+    // drops the last reference of the data.
+    py::object* base = new py::object(a);
+    std::shared_ptr<void> data(a.mutable_data(), [base](void*) {
+        py::gil_scoped_acquire gil;
+        delete base;
+    });
+    chainerx::Array array(chainerx::FromData(shape, dtype, data, strides, 0 /* offset */, chainerx::GetNativeBackend().GetDevice(0)));
+    return std::make_shared<runtime::ChxVMVar>(array);
+}
+
+dlpack::DLDataType GetDLDataType(chainerx::Dtype dtype) {
+    switch (dtype) {
+        case chainerx::Dtype::kBool:
+            // DLPack consumers such as CuPy and PyTorch use 8 bits for bool.
+            return dlpack::DLDataType{dlpack::kDLUInt, 8, 1};
+        case chainerx::Dtype::kInt8:
+            return dlpack::DLDataType{dlpack::kDLInt, 8, 1};
+        case chainerx::Dtype::kInt16:
+            return dlpack::DLDataType{dlpack::kDLInt, 16, 1};
+        case chainerx::Dtype::kInt32:
+            return dlpack::DLDataType{dlpack::kDLInt, 32, 1};
+        case chainerx::Dtype::kInt64:
+            return dlpack::DLDataType{dlpack::kDLInt, 64, 1};
+        case chainerx::Dtype::kUInt8:
+            return dlpack::DLDataType{dlpack::kDLUInt, 8, 1};
+        case chainerx::Dtype::kFloat16:
+            return dlpack::DLDataType{dlpack::kDLFloat, 16, 1};
+        case chainerx::Dtype::kFloat32:
+            return dlpack::DLDataType{dlpack::kDLFloat, 32, 1};
+        case chainerx::Dtype::kFloat64:
+            return dlpack::DLDataType{dlpack::kDLFloat, 64, 1};
+        default:
+            throw py::value_error("Unsupported dtype for DLPack: " + std::string(chainerx::GetDtypeName(dtype)));
+    }
+}
+
+chainerx::Dtype GetDtype(dlpack::DLDataType dtype) {
+    switch (dtype.lanes == 1 ? dtype.code : -1) {
+        case dlpack::kDLInt:
+            switch (dtype.bits) {
+                case 8:
+                    return chainerx::Dtype::kInt8;
+                case 16:
+                    return chainerx::Dtype::kInt16;
+                case 32:
+                    return chainerx::Dtype::kInt32;
+                case 64:
+                    return chainerx::Dtype::kInt64;
+            }
+            break;
+        case dlpack::kDLUInt:
+            switch (dtype.bits) {
+                case 1:
+                    return chainerx::Dtype::kBool;
+                case 8:
+                    return chainerx::Dtype::kUInt8;
+            }
+            break;
+        case dlpack::kDLBool:
+            if (dtype.bits == 8) {
+                return chainerx::Dtype::kBool;
+            }
+            break;
+        case dlpack::kDLFloat:
+            switch (dtype.bits) {
+                case 16:
+                    return chainerx::Dtype::kFloat16;
+                case 32:
+                    return chainerx::Dtype::kFloat32;
+                case 64:
+                    return chainerx::Dtype::kFloat64;
+            }
+            break;
+    }
+    throw py::value_error(
+            "Unsupported DLPack dtype: code=" + std::to_string(dtype.code) + " bits=" + std::to_string(dtype.bits) +
+            " lanes=" + std::to_string(dtype.lanes));
+}
+
+// Owns the array and the shape and strides referred by a DLTensor.
+struct DLPackContext {
+    explicit DLPackContext(const chainerx::Array& a) : array(a) {
+    }
+
+    chainerx::Array array;
+    std::vector<int64_t> shape;
+    std::vector<int64_t> strides;
+    dlpack::DLManagedTensor tensor;
+};
+
+void DeleteDLPackContext(dlpack::DLManagedTensor* self) {
+    delete static_cast<DLPackContext*>(self->manager_ctx);
+}
+
+// Exports `v` as a DLPack capsule which shares the memory with `v`.
+py::capsule ToDLPack(const VarPtr& v) {
+    const chainerx::Array& a = v->GetArray();
+    std::unique_ptr<DLPackContext> ctx(new DLPackContext(a));
+    const int64_t item_size = a.GetItemSize();
+    ctx->shape.assign(a.shape().begin(), a.shape().end());
+    for (int64_t stride : a.strides()) {
+        if (stride % item_size != 0) {
+            throw py::value_error("Strides must be multiples of the item size for DLPack");
+        }
+        ctx->strides.push_back(stride / item_size);
+    }
+
+    dlpack::DLTensor& t = ctx->tensor.dl_tensor;
+    t.data = a.raw_data();
+    if (runtime::IsCudaDevice(&a.device())) {
+        t.ctx = dlpack::DLContext{dlpack::kDLGPU, a.device().index()};
+    } else if (runtime::IsNativeDevice(&a.device())) {
+        t.ctx = dlpack::DLContext{dlpack::kDLCPU, 0};
+    } else {
+        throw py::value_error("Unsupported ChainerX device for DLPack: " + a.device().name());
+    }
+    t.ndim = a.ndim();
+    t.dtype = GetDLDataType(a.dtype());
+    t.shape = ctx->shape.data();
+    t.strides = ctx->strides.data();
+    t.byte_offset = a.offset();
+    ctx->tensor.manager_ctx = ctx.get();
+    ctx->tensor.deleter = &DeleteDLPackContext;
+
+    dlpack::DLManagedTensor* tensor = &ctx.release()->tensor;
+    return py::capsule(tensor, kDLTensorCapsuleName, [](PyObject* o) {
+        // Capsules which are not consumed own the tensor.
+        if (PyCapsule_IsValid(o, kDLTensorCapsuleName)) {
+            auto* tensor = static_cast<dlpack::DLManagedTensor*>(PyCapsule_GetPointer(o, kDLTensorCapsuleName));
+            tensor->deleter(tensor);
+        }
+    });
+}
+
+// Imports a DLPack capsule (e.g., `cupy.ndarray.toDlpack()`) as a
+// ChxVMVar without copying. The capsule can be consumed only once.
+VarPtr CreateValueFromDLPack(py::capsule capsule) {
+    if (!PyCapsule_IsValid(capsule.ptr(), kDLTensorCapsuleName)) {
+        throw py::value_error("Not a DLPack capsule or already consumed");
+    }
+    auto* tensor = static_cast<dlpack::DLManagedTensor*>(PyCapsule_GetPointer(capsule.ptr(), kDLTensorCapsuleName));
+    const dlpack::DLTensor& t = tensor->dl_tensor;
+    if (t.ctx.device_type != dlpack::kDLCPU && t.ctx.device_type != dlpack::kDLGPU) {
+        throw py::value_error("Unsupported DLPack device type: " + std::to_string(t.ctx.device_type));
+    }
+    const chainerx::Dtype dtype = GetDtype(t.dtype);
+    PyCapsule_SetName(capsule.ptr(), kUsedDLTensorCapsuleName);
+
+    // Producers may release Python objects in their deleters.
+    std::shared_ptr<void> data(t.data, [tensor](void*) {
+        py::gil_scoped_acquire gil;
+        if (tensor->deleter) tensor->deleter(tensor);
+    });
+
+    const int64_t item_size = chainerx::GetItemSize(dtype);
+    chainerx::Shape shape(t.shape, t.shape + t.ndim);
+    chainerx::Strides strides(shape, dtype);
+    if (t.strides) {
+        std::vector<int64_t> byte_strides;
+        for (int i = 0; i < t.ndim; ++i) byte_strides.push_back(t.strides[i] * item_size);
+        strides = chainerx::Strides(byte_strides.begin(), byte_strides.end());
+    }
+
+    chainerx::Device* device = nullptr;
+    if (t.ctx.device_type == dlpack::kDLGPU) {
+        device = &chainerx::GetDefaultContext().GetDevice("cuda:" + std::to_string(t.ctx.device_id));
+    } else {
+        device = &chainerx::GetNativeBackend().GetDevice(0);
+    }
+    chainerx::Array array(chainerx::FromData(shape, dtype, data, strides, t.byte_offset, *device));
+    return std::make_shared<runtime::ChxVMVar>(array);
+}
+
 void InitChxVMVar(py::module& m) {
     py::class_<runtime::ChxVMVar, VarPtr> c{m, "ChxVMVar"};
     c.def("is_array", &IsArray, "Check if the ChxVMVar is an array");
     c.def("is_sequence", &IsSequence, "Check if the ChxVMVar is a sequence");
     c.def("array", &GetArray, "Get an array from a ChxVMVar");
     c.def("sequence", &GetSequence, "Get a array from a ChxVMVar");
+    c.def("sequence_arrays",
+          &GetSequenceArrays,
+          "Get arrays in a sequence ChxVMVar at once, or None if it has a non-array element");
+    c.def("numpy", &ToNumpy, "Get a NumPy array which shares the memory with a ChxVMVar on a native device");
+    c.def("to_dlpack", &ToDLPack, "Export an array ChxVMVar as a DLPack capsule without copying");
+    c.def("__array__", &ToNumpyWithDtype, "dtype"_a = py::none());
     c.def("__str__", [](const VarPtr& v) { return "var(" + v->DebugString() + ")"; });
 }
 
@@ -376,6 +776,13 @@ VarPtr CreateValueFromSequence(const std::vector<VarPtr>& seq) {
     return std::make_shared<runtime::ChxVMVar>(out);
 }
 
+VarPtr CreateSequenceFromArrays(const std::vector<ArrayBodyPtr>& arrays) {
+    auto out = std::make_shared<runtime::ChxVMSequence>();
+    out->reserve(arrays.size());
+    for (const ArrayBodyPtr& a : arrays) out->emplace_back(chainerx::Array(a));
+    return std::make_shared<runtime::ChxVMVar>(out);
+}
+
 void InitializeMemoryMonitoring(const std::string device_spec) {
     chainerx::Device* device = &chainerx::GetDefaultContext().GetDevice(device_spec);
     runtime::InitializeMemoryMonitoring(device);
@@ -396,12 +803,23 @@ PYBIND11_MODULE(_chainer_compiler_core, m) {  // NOLINT
 
     InitChxVMState(m);
 
+    InitChxVMProfile(m);
+
     m.def("load", &LoadGraph, "Load an ONNX model");
+    m.def("load_from_bytes",
+          &LoadGraphFromBytes,
+          "Load an ONNX model from serialized bytes. Relative locations of external data are resolved from base_dir",
+          "serialized"_a,
+          "base_dir"_a = "");
+    m.def("load_chxvm", &LoadChxVM, "Load a ChxVM from a serialized ChxVM program");
     m.def("configure", &Configure, "Configure global variables in chainer compiler",
 #include "chainer_compiler_cc/pybind_args.inc"
     );
     m.def("value", &CreateValueFromArray, "Create an ChxVMVar from a ChainerX Array");
     m.def("value", &CreateValueFromSequence, "Create an ChxVMVar from a sequence of ChxVMVars");
+    m.def("sequence_value", &CreateSequenceFromArrays, "Create a sequence ChxVMVar from a list of ChainerX Arrays");
+    m.def("value_from_numpy", &CreateValueFromNumpy, "Create an ChxVMVar which shares the memory with a NumPy array");
+    m.def("value_from_dlpack", &CreateValueFromDLPack, "Create an ChxVMVar from a DLPack capsule without copying");
 
     m.def("initialize_memory_monitoring", &InitializeMemoryMonitoring, "Initialize function hooks to monitor memory usage");
     m.def("get_peak_memory", &runtime::GetPeakMemory, "Output peak memory usage observed by function hooks");
@@ -31,3 +31,13 @@ Proto LoadLargeProto(const std::string& filename) {
     CHECK(proto.ParseFromCodedStream(&cis)) << "failed to parse " << filename;
     return proto;
 }
+
+template <class Proto>
+Proto ParseLargeProto(const std::string& serialized) {
+    Proto proto;
+    ::google::protobuf::io::ArrayInputStream ais(serialized.data(), serialized.size());
+    ::google::protobuf::io::CodedInputStream cis(&ais);
+    cis.SetTotalBytesLimit(std::numeric_limits<int>::max(), std::numeric_limits<int>::max());
+    CHECK(proto.ParseFromCodedStream(&cis)) << "failed to parse a serialized proto";
+    return proto;
+}
@@ -54,4 +54,6 @@ bool HasSuffix(const std::string& str, const std::string& suffix);
 
 std::string Basename(const std::string& str);
 
+std::string Dirname(const std::string& str);
+
 }  // namespace chainer_compiler
@@ -1,13 +1,26 @@
 #include "compiler/tensor.h"
 
+#ifndef _WIN32
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+#include <cerrno>
 #include <cstdint>
 #include <cstdlib>
 #include <cstring>
+#include <fstream>
+#include <map>
+#include <mutex>
 #include <sstream>
 
+#include <chainerx/native/native_backend.h>
 #include <chainerx/routines/creation.h>
 
 #include <common/log.h>
+#include <common/strutil.h>
 #include <compiler/serializer_util.h>
 #include <runtime/chainerx_util.h>
 
@@ -81,6 +94,104 @@ void DumpDataToRepeated(const Tensor& t, ::google::protobuf::RepeatedField<To>*
     DumpDataToRepeated<To, To>(t, a);
 }
 
+#ifndef _WIN32
+
+// A read-only view of a whole file. Pages are copied on write so
+// arrays backed by the mapping never modify the file.
+class MappedFile {
+public:
+    explicit MappedFile(const std::string& filename) {
+        int fd = open(filename.c_str(), O_RDONLY);
+        CHECK_LE(0, fd) << "Failed to open " << filename << ": " << strerror(errno);
+        struct stat st;
+        CHECK_EQ(0, fstat(fd, &st)) << "Failed to stat " << filename << ": " << strerror(errno);
+        size_ = st.st_size;
+        if (size_) {
+            data_ = mmap(nullptr, size_, PROT_READ | PROT_WRITE, MAP_PRIVATE, fd, 0);
+            CHECK_NE(MAP_FAILED, data_) << "Failed to mmap " << filename << ": " << strerror(errno);
+        }
+        close(fd);
+    }
+
+    ~MappedFile() {
+        if (size_) munmap(data_, size_);
+    }
+
+    MappedFile(const MappedFile&) = delete;
+    MappedFile& operator=(const MappedFile&) = delete;
+
+    char* data() const {
+        return static_cast<char*>(data_);
+    }
+
+    int64_t size() const {
+        return size_;
+    }
+
+private:
+    void* data_{nullptr};
+    int64_t size_{0};
+};
+
+// Tensors in a file share a single mapping, which is unmapped after
+// all arrays backed by it are gone.
+std::shared_ptr<MappedFile> MapFile(const std::string& filename) {
+    static std::mutex mu;
+    static std::map<std::string, std::weak_ptr<MappedFile>> files;
+    std::lock_guard<std::mutex> lock(mu);
+    std::weak_ptr<MappedFile>& file = files[filename];
+    std::shared_ptr<MappedFile> mapped = file.lock();
+    if (!mapped) {
+        mapped = std::make_shared<MappedFile>(filename);
+        file = mapped;
+    }
+    return mapped;
+}
+
+#endif  // _WIN32
+
+chainerx::Array ExternalDataToArray(onnx::TensorProto const& xtensor, Dtype dtype, chainerx::Shape shape) {
+    std::string location;
+    int64_t offset = 0;
+    int64_t length = -1;
+    for (const onnx::StringStringEntryProto& entry : xtensor.external_data()) {
+        if (entry.key() == "location") {
+            location = entry.value();
+        } else if (entry.key() == "offset") {
+            offset = std::stoll(entry.value());
+        } else if (entry.key() == "length") {
+            length = std::stoll(entry.value());
+        }
+    }
+    CHECK(!location.empty()) << "No location of external data: " << xtensor.name();
+
+    const int64_t nbytes = shape.GetTotalSize() * dtype.SizeOf();
+    if (length >= 0) {
+        CHECK_EQ(nbytes, length) << "Size mismatch of external data: " << xtensor.name();
+    }
+
+#ifdef _WIN32
+    std::ifstream ifs(location, std::ios::binary);
+    CHECK(ifs) << "Failed to open " << location;
+    std::string buf(nbytes, '\0');
+    ifs.seekg(offset);
+    CHECK(ifs.read(&buf[0], nbytes)) << "Failed to read external data: " << xtensor.name();
+    return runtime::MakeHostArray(dtype.chx(), std::move(shape), buf.data());
+#else
+    std::shared_ptr<MappedFile> file = MapFile(location);
+    CHECK_LE(offset + nbytes, file->size()) << "External data out of range: " << xtensor.name();
+    char* ptr = file->data() + offset;
+    if (reinterpret_cast<uintptr_t>(ptr) % dtype.SizeOf() != 0) {
+        // ChainerX cannot use misaligned data in place.
+        return runtime::MakeHostArray(dtype.chx(), std::move(shape), ptr);
+    }
+    // The array shares the ownership of the mapping.
+    std::shared_ptr<void> data(file, ptr);
+    return chainerx::FromData(
+            shape, dtype.chx(), data, absl::nullopt /* strides */, 0 /* offset */, chainerx::GetNativeBackend().GetDevice(0));
+#endif
+}
+
 absl::variant<chainerx::Array, std::vector<std::string>> TensorProtoToArray(onnx::TensorProto const& xtensor) {
     CHECK(!xtensor.has_segment()) << "Segmented TensorProto not supported";
 
@@ -92,6 +203,10 @@ absl::variant<chainerx::Array, std::vector<std::string>> TensorProtoToArray(onnx
         return std::vector<std::string>(xtensor.string_data().begin(), xtensor.string_data().end());
     }
 
+    if (xtensor.data_location() == onnx::TensorProto::EXTERNAL) {
+        return ExternalDataToArray(xtensor, dtype, std::move(shape));
+    }
+
     if (xtensor.has_raw_data()) {
         CHECK_EQ(0, xtensor.float_data_size());
         CHECK_EQ(0, xtensor.int32_data_size());
@@ -143,8 +258,45 @@ absl::variant<chainerx::Array, std::vector<std::string>> TensorProtoToArray(onnx
     }
 }
 
+void ResolveExternalDataLocations(const std::string& dir, onnx::GraphProto* xgraph);
+
+void ResolveExternalDataLocations(const std::string& dir, onnx::TensorProto* xtensor) {
+    if (xtensor->data_location() != onnx::TensorProto::EXTERNAL) return;
+    for (onnx::StringStringEntryProto& entry : *xtensor->mutable_external_data()) {
+        if (entry.key() == "location" && !HasPrefix(entry.value(), "/")) {
+            entry.set_value(StrCat(dir, '/', entry.value()));
+        }
+    }
+}
+
+void ResolveExternalDataLocations(const std::string& dir, onnx::GraphProto* xgraph) {
+    for (onnx::TensorProto& xtensor : *xgraph->mutable_initializer()) {
+        ResolveExternalDataLocations(dir, &xtensor);
+    }
+    for (onnx::NodeProto& xnode : *xgraph->mutable_node()) {
+        for (onnx::AttributeProto& xattr : *xnode.mutable_attribute()) {
+            if (xattr.has_t()) ResolveExternalDataLocations(dir, xattr.mutable_t());
+            for (onnx::TensorProto& xtensor : *xattr.mutable_tensors()) {
+                ResolveExternalDataLocations(dir, &xtensor);
+            }
+            if (xattr.has_g()) ResolveExternalDataLocations(dir, xattr.mutable_g());
+            for (onnx::GraphProto& xsubgraph : *xattr.mutable_graphs()) {
+                ResolveExternalDataLocations(dir, &xsubgraph);
+            }
+        }
+    }
+}
+
 }  // namespace
 
+void ResolveExternalData(const std::string& onnx_path, onnx::ModelProto* xmodel) {
+    ResolveExternalDataInDir(Dirname(onnx_path), xmodel);
+}
+
+void ResolveExternalDataInDir(const std::string& dir, onnx::ModelProto* xmodel) {
+    ResolveExternalDataLocations(dir, xmodel->mutable_graph());
+}
+
 Tensor::Tensor(const onnx::TensorProto& xtensor)
     : data_(TensorProtoToArray(xtensor)), name_(xtensor.name()), doc_string_(xtensor.doc_string()) {
 }
@@ -64,4 +64,13 @@ private:
     std::string doc_string_;
 };
 
+// Rewrites relative locations of tensors stored in external data files
+// of `xmodel` loaded from `onnx_path` so they can be found from any
+// working directory. Such tensors are memory-mapped on load.
+void ResolveExternalData(const std::string& onnx_path, onnx::ModelProto* xmodel);
+
+// Same as above, but relative locations are resolved from `dir`. Used
+// for models which are not loaded from files.
+void ResolveExternalDataInDir(const std::string& dir, onnx::ModelProto* xmodel);
+
 }  // namespace chainer_compiler
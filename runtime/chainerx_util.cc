@@ -127,7 +127,8 @@ chainerx::Array PadSequence(const std::vector<chainerx::Array>& inputs, int64_t
 namespace {
 
 uint32_t xorshift() {
-    static uint32_t y = 2463534242;
+    // Each thread has its own state so concurrent runs never race.
+    thread_local uint32_t y = 2463534242;
     y = y ^ (y << 13);
     y = y ^ (y >> 17);
     return y = y ^ (y << 15);
@@ -1,5 +1,6 @@
 #include "runtime/chxvm.h"
 
+#include <chrono>
 #include <iomanip>
 #include <numeric>
 #include <sstream>
@@ -16,6 +17,7 @@
 #include <runtime/chrome_tracing.h>
 #include <runtime/chxvm.pb.h>
 #include <runtime/chxvm_op.h>
+#include <runtime/chxvm_profile.h>
 #include <runtime/chxvm_state.h>
 #include <runtime/meminfo.h>
 #include <runtime/npy.h>
@@ -91,6 +93,34 @@ void DumpOutput(ChxVMState* st, const ChxVMOp* op, const std::string& output_dir
     }
 }
 
+int64_t ElapsedNs(std::chrono::steady_clock::time_point start, std::chrono::steady_clock::time_point end) {
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(end - start).count();
+}
+
+void AddProfileEvent(
+        ChxVMState* st,
+        const ChxVMOp* op,
+        int64_t run_id,
+        int pc,
+        int64_t start_ns,
+        int64_t duration_ns,
+        std::vector<ChxVMProfileEvent>* events) {
+    ChxVMProfileEvent event{run_id, pc, op->name(), op->debug_info(), start_ns, duration_ns, 0, {}};
+    for (int id : op->instruction().outputs()) {
+        if (id <= 0) {
+            continue;
+        }
+        absl::optional<ChxVMVar*> var = st->GetOptionalVar(id);
+        if (!var.has_value() || !(*var)->IsArray()) {
+            continue;
+        }
+        const chainerx::Array& a = (*var)->GetArray();
+        event.bytes += a.GetNBytes();
+        event.output_shapes.emplace_back(a.shape().begin(), a.shape().end());
+    }
+    events->push_back(std::move(event));
+}
+
 }  // namespace
 
 ChxVMOptions::ChxVMOptions() {
@@ -137,7 +167,30 @@ void ChxVM::Init() {
     }
 }
 
-std::unique_ptr<ChxVMState> ChxVM::Prepare(const InOuts& program_inputs, const ChxVMOptions& options) {
+void ChxVM::BindInputs(const InOuts& inputs) {
+    std::lock_guard<std::mutex> lock(bound_inputs_mu_);
+    for (const auto& p : inputs) {
+        bound_inputs_[p.first] = p.second;
+    }
+}
+
+InOuts ChxVM::bound_inputs() const {
+    std::lock_guard<std::mutex> lock(bound_inputs_mu_);
+    return bound_inputs_;
+}
+
+std::unique_ptr<ChxVMState> ChxVM::Prepare(const InOuts& given_inputs, const ChxVMOptions& options) {
+    // Take a snapshot so `BindInputs` from another thread does not affect
+    // this run.
+    InOuts merged_inputs = bound_inputs();
+    const bool has_bound_inputs = !merged_inputs.empty();
+    if (has_bound_inputs) {
+        for (const auto& p : given_inputs) {
+            merged_inputs[p.first] = p.second;
+        }
+    }
+    const InOuts& program_inputs = has_bound_inputs ? merged_inputs : given_inputs;
+
     for (const std::unique_ptr<ChxVMInputDesc>& input : input_descs_) {
         auto found = program_inputs.find(input->name);
         CHECK(found != program_inputs.end()) << "Input '" << input->name << "' not found";
@@ -170,12 +223,28 @@ void ChxVM::Run(ChxVMState* state) {
     const ChxVMOptions& options = state->options();
     int64_t peak_used_mbs = 0, peak_total_mbs = 0;
 
+    // Events are recorded locally and added to the profile at once so
+    // concurrent runs do not contend for it.
+    ChxVMProfile* profile = options.profile.get();
+    int64_t run_id = profile ? profile->StartRun() : 0;
+    std::vector<ChxVMProfileEvent> profile_events;
+    std::chrono::steady_clock::time_point run_start;
+    if (profile) {
+        profile_events.reserve(program_.size());
+        run_start = std::chrono::steady_clock::now();
+    }
+
     while (true) {
         int pc = state->pc();
         if (pc >= program_.size()) break;
 
         ChxVMOp* op = program_[pc].get();
 
+        std::chrono::steady_clock::time_point op_start;
+        if (profile) {
+            op_start = std::chrono::steady_clock::now();
+        }
+
         {
             ChromeTracingEmitter::ScopedEvent se(options.chrome_tracing, "ChxVM", op->name(), pc, op->instruction().flops());
 #ifdef CHAINER_COMPILER_ENABLE_NVTX
@@ -196,6 +265,12 @@ void ChxVM::Run(ChxVMState* state) {
 #endif
         }
 
+        if (profile) {
+            std::chrono::steady_clock::time_point op_end = std::chrono::steady_clock::now();
+            AddProfileEvent(
+                    state, op, run_id, pc, ElapsedNs(run_start, op_start), ElapsedNs(op_start, op_end), &profile_events);
+        }
+
         state->set_pc(state->pc() + 1);
 
         if (options.check_types) {
@@ -233,6 +308,10 @@ void ChxVM::Run(ChxVMState* state) {
         report = StrCat(report, " Peak monitored by Chx hook=", InMbs(GetPeakMemory()), "MB)");
         std::cerr << report << std::endl;
     }
+
+    if (profile) {
+        profile->AddEvents(&profile_events);
+    }
 }
 
 }  // namespace runtime
@@ -3,6 +3,7 @@
 #include <cstdint>
 #include <functional>
 #include <memory>
+#include <mutex>
 #include <string>
 #include <utility>
 #include <vector>
@@ -20,6 +21,7 @@ namespace runtime {
 
 class ChromeTracingEmitter;
 class ChxVMOp;
+class ChxVMProfile;
 class ChxVMState;
 class ChxVMVar;
 
@@ -56,6 +58,9 @@ public:
 
     ChromeTracingEmitter* chrome_tracing{nullptr};
 
+    // Records per-op events of runs when set.
+    std::shared_ptr<ChxVMProfile> profile;
+
     std::string dump_outputs_dir;
 
     std::map<std::string, CustomOpFunc> custom_op_funcs;
@@ -74,6 +79,14 @@ public:
     InOuts Run(const InOuts& program_inputs, const ChxVMOptions& options);
     void Run(ChxVMState* state);
 
+    // Binds inputs which will be passed to all subsequent runs in
+    // addition to `program_inputs`. This is useful for parameters which
+    // are shared by all runs. Inputs passed to `Prepare` or `Run` take
+    // precedence over bound ones with the same name.
+    void BindInputs(const InOuts& inputs);
+
+    InOuts bound_inputs() const;
+
     int num_variables() const {
         return num_variables_;
     }
@@ -85,6 +98,11 @@ private:
     std::vector<std::unique_ptr<ChxVMOp>> program_;
     std::vector<std::unique_ptr<ChxVMInputDesc>> input_descs_;
     int num_variables_;
+    // `Run` may be called concurrently from multiple threads, each with
+    // its own `ChxVMState`. Bound inputs are the only state of ChxVM
+    // which can be updated after `Init`.
+    mutable std::mutex bound_inputs_mu_;
+    InOuts bound_inputs_;
 };
 
 }  // namespace runtime
@@ -0,0 +1,42 @@
+#include "runtime/chxvm_profile.h"
+
+#include <iterator>
+
+#include <common/log.h>
+
+namespace chainer_compiler {
+namespace runtime {
+
+ChxVMProfile::ChxVMProfile(size_t capacity) : capacity_(capacity) {
+    CHECK_LT(0UL, capacity);
+}
+
+int64_t ChxVMProfile::StartRun() {
+    std::lock_guard<std::mutex> lock(mu_);
+    return num_runs_++;
+}
+
+void ChxVMProfile::AddEvents(std::vector<ChxVMProfileEvent>* events) {
+    std::lock_guard<std::mutex> lock(mu_);
+    events_.insert(events_.end(), std::make_move_iterator(events->begin()), std::make_move_iterator(events->end()));
+    events->clear();
+    while (events_.size() > capacity_) {
+        events_.pop_front();
+        ++num_dropped_;
+    }
+}
+
+std::vector<ChxVMProfileEvent> ChxVMProfile::TakeEvents() {
+    std::lock_guard<std::mutex> lock(mu_);
+    std::vector<ChxVMProfileEvent> events(std::make_move_iterator(events_.begin()), std::make_move_iterator(events_.end()));
+    events_.clear();
+    return events;
+}
+
+int64_t ChxVMProfile::num_dropped() const {
+    std::lock_guard<std::mutex> lock(mu_);
+    return num_dropped_;
+}
+
+}  // namespace runtime
+}  // namespace chainer_compiler
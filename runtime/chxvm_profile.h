@@ -0,0 +1,59 @@
+#pragma once
+
+#include <stdint.h>
+
+#include <deque>
+#include <mutex>
+#include <string>
+#include <vector>
+
+namespace chainer_compiler {
+namespace runtime {
+
+// A record of an execution of a ChxVM op.
+struct ChxVMProfileEvent {
+    // The sequence number of the `ChxVM::Run` which ran the op.
+    int64_t run_id;
+    int pc;
+    std::string name;
+    std::string debug_info;
+    // Nanoseconds from the start of the run.
+    int64_t start_ns;
+    int64_t duration_ns;
+    // The total size of output arrays.
+    int64_t bytes;
+    std::vector<std::vector<int64_t>> output_shapes;
+};
+
+// A ring buffer of profile events shared by ChxVM runs, possibly in
+// different threads. Each run records its events locally and appends
+// them at its end. When more than `capacity` events are recorded, the
+// oldest ones are dropped.
+class ChxVMProfile {
+public:
+    explicit ChxVMProfile(size_t capacity);
+
+    // Returns a new ID for a run.
+    int64_t StartRun();
+
+    void AddEvents(std::vector<ChxVMProfileEvent>* events);
+
+    // Returns the recorded events in order and clears them.
+    std::vector<ChxVMProfileEvent> TakeEvents();
+
+    int64_t num_dropped() const;
+
+    size_t capacity() const {
+        return capacity_;
+    }
+
+private:
+    const size_t capacity_;
+    mutable std::mutex mu_;
+    std::deque<ChxVMProfileEvent> events_;
+    int64_t num_runs_{0};
+    int64_t num_dropped_{0};
+};
+
+}  // namespace runtime
+}  // namespace chainer_compiler
@@ -2,6 +2,7 @@
 
 #include <map>
 #include <sstream>
+#include <utility>
 
 #include <absl/types/optional.h>
 
@@ -57,7 +58,7 @@ public:
     InferenceEngine::InferencePlugin plugin;
     InferenceEngine::CNNNetwork network;
     InferenceEngine::ExecutableNetwork executable_network;
-    std::vector<chainerx::Array> output_arrays;
+    std::vector<std::pair<chainerx::Shape, chainerx::Dtype>> output_types;
 };
 
 #endif
@@ -93,8 +94,7 @@ void DldtOp::InitImpl() {
         chainerx::Dtype dtype = GetDtype(data->precision);
         chainerx::Shape shape(type.shape().begin(), type.shape().end());
         CHECK_EQ(chainerx::Shape(data->dims.rbegin(), data->dims.rend()), shape);
-        chainerx::Array array = chainerx::Empty(shape, dtype);
-        impl_->output_arrays.push_back(array);
+        impl_->output_types.emplace_back(shape, dtype);
     }
 #endif
 }
@@ -147,7 +147,10 @@ std::vector<chainerx::Array> DldtOp::RunImpl(chainer_compiler::runtime::ChxVMSta
     for (size_t i = 0; i < output_names.size(); ++i) {
         const std::string& output_name = output_names[i];
         InferenceEngine::Blob::Ptr output = infer_request.GetBlob(output_name);
-        const chainerx::Array& output_array = impl_->output_arrays[i];
+        // Outputs are allocated for each run so concurrent runs do not
+        // share them.
+        const auto& output_type = impl_->output_types[i];
+        chainerx::Array output_array = chainerx::Empty(output_type.first, output_type.second);
         memcpy(RawStartPtr(output_array), output->buffer(), output_array.GetNBytes());
         chainerx::Dtype dtype = static_cast<chainerx::Dtype>(inst_.output_types(i).dtype());
         if (output_array.dtype() != dtype) {
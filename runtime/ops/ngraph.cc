@@ -1,5 +1,6 @@
 #if CHAINER_COMPILER_ENABLE_NGRAPH
 
+#include <mutex>
 #include <sstream>
 
 #include <chainerx/routines/creation.h>
@@ -67,8 +68,8 @@ public:
     std::shared_ptr<ngraph::Function> func;
     std::shared_ptr<ngraph::runtime::Backend> backend;
     std::shared_ptr<ngraph::runtime::Executable> handle;
-    std::vector<std::shared_ptr<ngraph::runtime::Tensor>> result_tensors;
-    std::vector<chainerx::Array> outputs;
+    // nGraph executables are not guaranteed to be reentrant.
+    std::mutex call_mu;
 };
 
 #endif
@@ -95,14 +96,6 @@ void NGraphOp::InitImpl() {
 
     impl_->handle = impl_->backend->compile(impl_->func);
 
-    auto results = impl_->func->get_results();
-    for (const std::shared_ptr<ngraph::op::Result>& result : impl_->func->get_results()) {
-        chainerx::Dtype dtype = GetDtype(result->get_element_type());
-        chainerx::Shape shape = GetShape(result->get_shape());
-        chainerx::Array array = chainerx::Empty(shape, dtype);
-        impl_->result_tensors.push_back(impl_->backend->create_tensor(result->get_element_type(), result->get_shape(), RawStartPtr(array)));
-        impl_->outputs.push_back(array);
-    }
 #endif
 }
 
@@ -132,9 +125,24 @@ std::vector<chainerx::Array> NGraphOp::RunImpl(chainer_compiler::runtime::ChxVMS
         arg_tensors.at(i) = t;
     }
 
-    impl_->handle->call_with_validate(impl_->result_tensors, arg_tensors);
+    // Outputs are allocated for each run so concurrent runs do not share
+    // them.
+    std::vector<chainerx::Array> outputs;
+    std::vector<std::shared_ptr<ngraph::runtime::Tensor>> result_tensors;
+    for (const std::shared_ptr<ngraph::op::Result>& result : impl_->func->get_results()) {
+        chainerx::Dtype dtype = GetDtype(result->get_element_type());
+        chainerx::Shape shape = GetShape(result->get_shape());
+        chainerx::Array array = chainerx::Empty(shape, dtype);
+        result_tensors.push_back(impl_->backend->create_tensor(result->get_element_type(), result->get_shape(), RawStartPtr(array)));
+        outputs.push_back(array);
+    }
+
+    {
+        std::lock_guard<std::mutex> lock(impl_->call_mu);
+        impl_->handle->call_with_validate(result_tensors, arg_tensors);
+    }
 
-    return impl_->outputs;
+    return outputs;
 
 #else
     CHECK(false) << "Set -DCHAINER_COMPILER_NGRAPH_DIR";
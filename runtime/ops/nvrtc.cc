@@ -1,4 +1,5 @@
 #include <map>
+#include <mutex>
 
 #include <chainerx/array.h>
 #include <chainerx/routines/creation.h>
@@ -38,6 +39,7 @@ void check_cuda(CUresult status, const char* msg, int lineno) {
 
 #define CHECK_CUDA(expr) check_cuda(expr, #expr, __LINE__)
 
+// Must be called with the lock in `CompileAndLoad` held.
 char* Compile(const std::string& name, const std::string& code) {
     static std::map<const std::string, char*> cache;
     auto found = cache.find(code);
@@ -68,6 +70,9 @@ char* Compile(const std::string& name, const std::string& code) {
 }
 
 CUfunction CompileAndLoad(const std::string& name, const std::string& code) {
+    // Kernels may be compiled from multiple threads running ChxVM.
+    static std::mutex mu;
+    std::lock_guard<std::mutex> lock(mu);
     static std::map<const std::string, CUfunction> cache;
     auto found = cache.find(code);
     if (found != cache.end()) return found->second;
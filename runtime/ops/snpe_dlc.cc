@@ -1,6 +1,7 @@
 #if CHAINER_COMPILER_ENABLE_SNPE
 
 #include <memory>
+#include <mutex>
 #include <unordered_map>
 
 #include <zdl/DlContainer/IDlContainer.hpp>
@@ -24,6 +25,9 @@ namespace runtime {
 
 namespace {
 
+// Guards the caches below and executions of the cached SNPE objects,
+// which are not reentrant, as ChxVM may run from multiple threads.
+std::mutex cache_mu;
 std::unordered_map<std::string, std::shared_ptr<zdl::DlContainer::IDlContainer>> dlc_cache;
 std::unordered_map<std::string, std::shared_ptr<zdl::SNPE::SNPE>> snpe_cache;
 zdl::DlSystem::Runtime_t snpe_runtime_type = zdl::DlSystem::Runtime_t::UNSET;
@@ -43,6 +47,8 @@ void SnpeDlcOp::InitImpl() {
 std::vector<chainerx::Array> SnpeDlcOp::RunImpl(
         chainer_compiler::runtime::ChxVMState* st, const std::vector<chainerx::Array>& orig_inputs) {
 #if CHAINER_COMPILER_ENABLE_SNPE
+    std::lock_guard<std::mutex> lock(cache_mu);
+
     // Load dlc file
     auto dlc_it = dlc_cache.find(model_data);
     if (dlc_it == dlc_cache.end()) {
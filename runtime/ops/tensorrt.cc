@@ -2,6 +2,8 @@
 
 #include <map>
 #include <string>
+#include <utility>
+#include <vector>
 
 #include <NvInfer.h>
 #include <NvOnnxParser.h>
@@ -104,7 +106,7 @@ class TensorRTOp::TensorRTImpl {
 public:
     Logger logger;
     std::shared_ptr<nvinfer1::ICudaEngine> engine;
-    std::vector<chainerx::Array> outputs;
+    std::vector<std::pair<chainerx::Shape, chainerx::Dtype>> output_types;
     std::vector<size_t> binding_indices;
 };
 
@@ -174,8 +176,7 @@ void TensorRTOp::InitImpl() {
         nvinfer1::ITensor* tensor = network->getOutput(i);
         chainerx::Dtype dtype = GetDtype(tensor->getType());
         chainerx::Shape shape = GetShape(batch_size, tensor->getDimensions());
-        chainerx::Array array = chainerx::Empty(shape, dtype);
-        impl_->outputs.push_back(array);
+        impl_->output_types.emplace_back(shape, dtype);
         CHECK(name_to_index.emplace(tensor->getName(), name_to_index.size()).second) << tensor->getName();
 #if 0
         std::cerr << tensor->getName() << ' ' << dtype << ' ' << shape << std::endl;
@@ -211,6 +212,13 @@ std::vector<chainerx::Array> TensorRTOp::RunImpl(
         inputs[i] = chainerx::AsContiguous(input);
     }
 
+    // Outputs are allocated for each run so concurrent runs do not share
+    // them.
+    std::vector<chainerx::Array> outputs;
+    for (const auto& p : impl_->output_types) {
+        outputs.push_back(chainerx::Empty(p.first, p.second));
+    }
+
     auto context = UniquePtr<nvinfer1::IExecutionContext>(impl_->engine->createExecutionContext());
     CHECK(context);
 
@@ -218,7 +226,7 @@ std::vector<chainerx::Array> TensorRTOp::RunImpl(
     for (const chainerx::Array& a : inputs) {
         inouts.push_back(RawStartPtr(a));
     }
-    for (const chainerx::Array& a : impl_->outputs) {
+    for (const chainerx::Array& a : outputs) {
         inouts.push_back(RawStartPtr(a));
     }
 
@@ -230,7 +238,7 @@ std::vector<chainerx::Array> TensorRTOp::RunImpl(
     const bool status = context->execute(batch_size, &bindings[0]);
     CHECK(status);
 
-    return impl_->outputs;
+    return outputs;
 
 #else
     CHECK(false) << "Set -DCHAINER_COMPILER_ENABLE_TENSORRT";
@@ -90,7 +90,6 @@ tvm::runtime::PackedFunc LoadPackedFunc(const std::string& dso_filename, const s
 class TVMOp::TVMImpl {
 public:
     tvm::runtime::PackedFunc fn;
-    std::vector<chainerx::Array> outputs;
 };
 
 #endif
@@ -123,12 +122,12 @@ std::vector<chainerx::Array> TVMOp::RunImpl(chainer_compiler::runtime::ChxVMStat
         inputs[i] = chainerx::AsContiguous(input);
     }
 
-    if (impl_->outputs.empty()) {
-        for (int i = 0; i < num_outputs; ++i) {
-            impl_->outputs.push_back(chainerx::Empty(chainerx::Shape(output_shape), dtype, device));
-        }
+    // Outputs are allocated for each run so concurrent runs do not share
+    // them.
+    std::vector<chainerx::Array> outputs;
+    for (int i = 0; i < num_outputs; ++i) {
+        outputs.push_back(chainerx::Empty(chainerx::Shape(output_shape), dtype, device));
     }
-    const std::vector<chainerx::Array>& outputs = impl_->outputs;
 
     size_t num_args = outputs.size() + orig_inputs.size();
     DLTensor tensors[num_args];
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+#
+# Measures the time ch2o takes to export models in
+# testcases/ch2o_tests/model.
+#
+# Example usage:
+#
+# $ python3 scripts/bench_ch2o_testcases.py -I 3
+# $ python3 scripts/bench_ch2o_testcases.py MLP_with_loss EspNet_E2E
+
+import argparse
+import collections
+import os
+import runpy
+import sys
+import tempfile
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, 'scripts'))
+
+from chainer_compiler.ch2o import test_args  # noqa
+from chainer_compiler.ch2o import testcasegen  # noqa
+import ch2o_tests  # noqa
+
+
+_compile_model = testcasegen.compile_model
+_elapsed = []
+
+
+def timed_compile_model(*args, **kwargs):
+    st = time.time()
+    ret = _compile_model(*args, **kwargs)
+    _elapsed.append(time.time() - st)
+    return ret
+
+
+def export(name, out_dir):
+    """Generates testcases of `name` and returns the time of exports."""
+    py = os.path.join('testcases', 'ch2o_tests', 'model', name + '.py')
+    # Testcases read their output directory from the command line.
+    saved_argv = sys.argv
+    sys.argv = [py, out_dir, '--quiet']
+    test_args._args_cache = None
+    testcasegen._seen_subnames.clear()
+    del _elapsed[:]
+    try:
+        runpy.run_path(py, run_name='__main__')
+    finally:
+        sys.argv = saved_argv
+    return sum(_elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark ch2o export of model testcases')
+    parser.add_argument('models', nargs='*',
+                        help='Names of testcases (default: all models)')
+    parser.add_argument('--iterations', '-I', type=int, default=3)
+    args = parser.parse_args()
+
+    names = [name for name in ch2o_tests.MODEL_TESTS
+             if name in args.models or not args.models]
+
+    os.chdir(project_root)
+    testcasegen.compile_model = timed_compile_model
+    elapsed = collections.defaultdict(list)
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i in range(args.iterations):
+                for name in names:
+                    out_dir = os.path.join(tmpdir, name)
+                    elapsed[name].append(export(name, out_dir))
+    finally:
+        testcasegen.compile_model = _compile_model
+
+    print('%-20s %10s %10s' % ('model', 'best', 'average'))
+    total = 0
+    for name in names:
+        best = min(elapsed[name])
+        total += best
+        print('%-20s %9.3fs %9.3fs' %
+              (name, best, sum(elapsed[name]) / len(elapsed[name])))
+    print('%-20s %9.3fs' % ('total', total))
+
+
+if __name__ == '__main__':
+    main()
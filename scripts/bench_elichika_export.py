@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+#
+# Measures the time elichika takes to export models into ONNX.
+#
+# Without `--testcases`, EspNet E2E is exported. With `--testcases`,
+# models in testcases/elichika_tests are exported with and without
+# cached AST contexts.
+#
+# Example usage:
+#
+# $ python3 scripts/bench_elichika_export.py --recipe test -I 3
+# $ python3 scripts/bench_elichika_export.py --profile
+# $ python3 scripts/bench_elichika_export.py --testcases -I 3
+# $ python3 scripts/bench_elichika_export.py --testcases MLP EspNet_E2E
+
+import argparse
+import collections
+import cProfile
+import importlib
+import os
+import pstats
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, 'scripts'))
+
+from chainer_compiler.elichika import chainer2onnx  # noqa
+from chainer_compiler.elichika.testtools import testcasegen  # noqa
+from testcases.elichika_tests.model import EspNet_E2E  # noqa
+import elichika_tests  # noqa
+
+
+def bench_espnet(args):
+    np.random.seed(42)
+    recipe = getattr(EspNet_E2E, args.recipe + '_recipe')
+    (idim, odim, e2e_args), (xs, ilens, ys) = recipe()
+    model = EspNet_E2E.E2E(idim, odim, e2e_args)
+    inputs = [xs, ilens, ys]
+
+    elapsed = []
+    for i in range(args.iterations):
+        profiler = None
+        if args.profile and i == args.iterations - 1:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        st = time.time()
+        chainer2onnx.compile_model(model, inputs)
+        elapsed.append(time.time() - st)
+        if profiler is not None:
+            profiler.disable()
+        print('Export #%d: %.3f sec' % (i, elapsed[-1]))
+
+    print('Best: %.3f sec Average: %.3f sec' %
+          (min(elapsed), sum(elapsed) / len(elapsed)))
+
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(30)
+
+
+def export_testcase(gen, out_dir, cache_ast_contexts):
+    """Generates testcases of `gen` and returns the time of exports."""
+    elapsed = []
+    compile_model = testcasegen.compile_model
+
+    def timed_compile_model(*args, **kwargs):
+        st = time.time()
+        ret = compile_model(*args, cache_ast_contexts=cache_ast_contexts,
+                            **kwargs)
+        elapsed.append(time.time() - st)
+        return ret
+
+    py = os.path.join('testcases', 'elichika_tests', gen.dirname, gen.filename)
+    module = importlib.import_module(py.replace('/', '.'))
+    testcasegen.reset_test_generator([out_dir, '--quiet'])
+    testcasegen.compile_model = timed_compile_model
+    try:
+        module.main()
+    finally:
+        testcasegen.compile_model = compile_model
+    return sum(elapsed)
+
+
+def bench_testcases(args):
+    gens = [gen for gen in elichika_tests.TESTS
+            if gen.filename in args.models or
+            (not args.models and gen.category in ('model', 'chainercv_model_resnet'))]
+
+    os.chdir(project_root)
+    modes = collections.OrderedDict([('uncached', False), ('cached', True)])
+    elapsed = collections.defaultdict(list)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for i in range(args.iterations):
+            # alternate modes so both see the same warm caches
+            for mode, cache_ast_contexts in modes.items():
+                for gen in gens:
+                    out_dir = os.path.join(tmpdir, gen.filename)
+                    elapsed[mode, gen.filename].append(
+                        export_testcase(gen, out_dir, cache_ast_contexts))
+
+    print('%-20s %10s %10s %8s' % ('model', 'uncached', 'cached', 'speedup'))
+    totals = collections.defaultdict(float)
+    for gen in gens:
+        best = {mode: min(elapsed[mode, gen.filename]) for mode in modes}
+        for mode in modes:
+            totals[mode] += best[mode]
+        print('%-20s %9.3fs %9.3fs %7.2fx' %
+              (gen.filename, best['uncached'], best['cached'],
+               best['uncached'] / best['cached']))
+    print('%-20s %9.3fs %9.3fs %7.2fx' %
+          ('total', totals['uncached'], totals['cached'],
+           totals['uncached'] / totals['cached']))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark elichika export')
+    parser.add_argument('models', nargs='*',
+                        help='Names of testcases for --testcases '
+                        '(default: all models)')
+    parser.add_argument('--testcases', action='store_true',
+                        help='Export testcases in testcases/elichika_tests '
+                        'with and without cached AST contexts')
+    parser.add_argument('--recipe', default='test',
+                        choices=['test', 'csj_small', 'librispeech_small'])
+    parser.add_argument('--iterations', '-I', type=int, default=3)
+    parser.add_argument('--profile', action='store_true',
+                        help='Show the profile of the last export')
+    args = parser.parse_args()
+
+    if args.models and not args.testcases:
+        parser.error('models can be specified only with --testcases')
+
+    if args.testcases:
+        bench_testcases(args)
+    else:
+        bench_espnet(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import chainer
+import chainer.functions as F
+import chainer.links as L
+
+
+# Models which call the same functions and links repeatedly. They are
+# used to test memoization of calls and of type inference.
+
+
+def apply(link, x):
+    return link(x)
+
+
+class Block(chainer.Chain):
+    def __init__(self, n, scale):
+        super(Block, self).__init__()
+        self.scale = scale
+        with self.init_scope():
+            self.l1 = L.Linear(n, n)
+            self.l2 = L.Linear(n, n)
+
+    def forward(self, x):
+        h = F.relu(apply(self.l1, x))
+        return apply(self.l2, h) * self.scale + x
+
+
+class Stateful(chainer.Chain):
+    def __init__(self):
+        super(Stateful, self).__init__()
+        with self.init_scope():
+            self.l = L.Linear(5, 5)
+
+    def forward(self, x):
+        h = self.l(x)
+        self.h = h
+        return h
+
+
+class Blocks(chainer.Chain):
+    """
+    Blocks with the same scales, a block with an int scale and
+    stateful links, in this order
+    """
+
+    def __init__(self):
+        super(Blocks, self).__init__()
+        with self.init_scope():
+            self.b1 = Block(5, 2.0)
+            self.b2 = Block(5, 2.0)
+            self.b3 = Block(5, 3)
+            self.b4 = Block(5, 2.0)
+            self.b5 = Block(5, 2.0)
+            self.s1 = Stateful()
+            self.s2 = Stateful()
+            self.s3 = Stateful()
+
+    def forward(self, x):
+        x = self.b1(x)
+        x = self.b2(x)
+        x = self.b3(x)
+        x = self.b4(x)
+        x = self.b5(x)
+        x = self.s1(x)
+        x = self.s2(x)
+        return self.s3(x)
+
+
+class Stateful2(chainer.Chain):
+    """
+    Stateful links whose states are read after both are called
+    """
+
+    def __init__(self):
+        super(Stateful2, self).__init__()
+        with self.init_scope():
+            self.a = Stateful()
+            self.b = Stateful()
+
+    def forward(self, x):
+        y = self.a(x)
+        z = self.b(x)
+        return y + z + self.a.h + self.b.h
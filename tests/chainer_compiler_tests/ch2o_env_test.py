@@ -0,0 +1,87 @@
+import os
+import traceback
+
+import chainer
+import chainer.functions as F
+import chainer.links as L
+import numpy as np
+import pytest
+
+from chainer_compiler.ch2o import env
+from chainer_compiler.ch2o.chainer2onnx import compile_model
+
+
+class MLP(chainer.Chain):
+    def __init__(self):
+        super(MLP, self).__init__()
+        with self.init_scope():
+            self.l1 = L.Linear(None, 4)
+            self.l2 = L.Linear(None, 3)
+
+    def forward(self, x):
+        h = F.relu(self.l1(x))
+        if h.shape[0] > 1:
+            h = self.l2(h)
+        return F.softmax(h)
+
+
+def _get_trace_str():
+    # The implementation before provenance modes were added.
+    trace = []
+    for stack in reversed(traceback.extract_stack()):
+        if stack.name in env._SKIP_NAMES:
+            continue
+        trace.append('%s:%s:%d' %
+                     (stack.name,
+                      os.path.basename(stack.filename),
+                      stack.lineno))
+        if len(trace) == 3:
+            break
+    return ' '.join(trace)
+
+
+def _doc_strings():
+    x = np.random.rand(2, 5).astype(np.float32)
+    onnx_model = compile_model(MLP(), [x])
+    return [n.doc_string for n in onnx_model.graph.node]
+
+
+@pytest.fixture
+def provenance():
+    saved = env._provenance
+    yield
+    env._provenance = saved
+
+
+def test_cheap_provenance_matches_traceback(provenance, monkeypatch):
+    env.set_provenance('cheap')
+    actual = _doc_strings()
+    monkeypatch.setattr(env, '_get_trace_str', _get_trace_str)
+    expected = _doc_strings()
+    assert actual
+    assert all(actual)
+    assert expected == actual
+
+
+def test_off_and_full_provenance(provenance):
+    env.set_provenance('off')
+    assert all(d == '' for d in _doc_strings())
+    env.set_provenance('full')
+    for doc_string in _doc_strings():
+        assert '_doc_strings:ch2o_env_test.py:' in doc_string
+
+
+@pytest.mark.parametrize('mode', env.PROVENANCE_MODES)
+def test_provenance_from_environment(provenance, monkeypatch, mode):
+    monkeypatch.setenv('CHAINER_COMPILER_CH2O_PROVENANCE', mode)
+    env._provenance = None
+    assert env.get_provenance() == mode
+
+
+def test_invalid_provenance(provenance, monkeypatch):
+    monkeypatch.setenv('CHAINER_COMPILER_CH2O_PROVENANCE', 'everything')
+    env._provenance = None
+    with pytest.raises(ValueError):
+        env.get_provenance()
+    with pytest.raises(ValueError):
+        env.set_provenance('everything')
@@ -1,3 +1,4 @@
+import concurrent.futures
 import os
 import sys
 
@@ -5,6 +6,7 @@ import chainerx
 import chainerx.testing
 import numpy as np
 import onnx
+import pytest
 
 project_root = os.path.dirname(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -48,6 +50,28 @@ def test_inference():
     assert 'op_type: "ChainerLinear"' in graph.dump()
 
 
+def test_inference_multithreaded():
+    graph = _chainer_compiler_core.load('out/ch2o_node_Linear/model.onnx')
+    params = graph.params()
+    input_names = graph.input_names()
+    output_names = graph.output_names()
+
+    chxvm = graph.compile()
+    chxvm.bind_inputs(params)
+
+    def run(i):
+        t1 = aranges(5, 7) + i
+        inputs = {input_names[0]: _chainer_compiler_core.value(t1)}
+        outputs = chxvm.run(inputs)
+        y1 = (chainerx.dot(t1, params['/l1/W'].array().T) +
+              params['/l1/b'].array())
+        chainerx.testing.assert_allclose(
+            y1, outputs[output_names[0]].array())
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        list(executor.map(run, range(32)))
+
+
 def test_backprop():
     graph = _chainer_compiler_core.load('out/ch2o_node_Linear_backprop/model.onnx')
     params = graph.params()
@@ -141,3 +165,109 @@ def test_custom_op():
 
     chainerx.testing.assert_allclose(9, outputs['y'].array())
     chainerx.testing.assert_allclose(42, outputs['z'].array())
+
+
+def test_profile():
+    graph = _chainer_compiler_core.load('out/ch2o_node_Linear/model.onnx')
+    params = graph.params()
+    input_names = graph.input_names()
+
+    chxvm = graph.compile()
+    chxvm.bind_inputs(params)
+    inputs = {input_names[0]: _chainer_compiler_core.value(aranges(5, 7))}
+
+    profile = _chainer_compiler_core.ChxVMProfile(capacity=1000)
+    chxvm.run(inputs, profile=profile)
+    chxvm.run(inputs, profile=profile)
+    chxvm.run(inputs)
+    events = profile.take_events()
+    assert events
+    assert set(e['run'] for e in events) == {0, 1}
+    linear = [e for e in events if e['op'] == 'Linear']
+    assert len(linear) == 4
+    assert all(e['time'] >= 0 for e in linear)
+    shapes = sorted(e['output_shapes'][0] for e in linear[:2])
+    assert shapes == [(5, 3), (5, 7)]
+    assert sum(e['bytes'] for e in linear[:2]) == (5 * 3 + 5 * 7) * 4
+    assert profile.take_events() == []
+
+    # Old events are dropped when the buffer is full.
+    profile = _chainer_compiler_core.ChxVMProfile(capacity=1)
+    chxvm.run(inputs, profile=profile)
+    assert len(profile.take_events()) == 1
+    assert profile.num_dropped == len(events) // 2 - 1
+
+
+def test_numpy_interop():
+    graph = _chainer_compiler_core.load('out/ch2o_node_Linear/model.onnx')
+    params = graph.params()
+    input_names = graph.input_names()
+    output_names = graph.output_names()
+
+    chxvm = graph.compile()
+    chxvm.bind_inputs(params)
+
+    x = np.arange(35).reshape(5, 7).astype(np.float32)
+    v = _chainer_compiler_core.value_from_numpy(x)
+    assert np.shares_memory(x, v.numpy())
+    assert np.shares_memory(x, np.asarray(v))
+    assert np.asarray(v, dtype=np.float64).dtype == np.float64
+    np.testing.assert_array_equal(x, chainerx.to_numpy(v.array()))
+
+    # Non-contiguous arrays are wrapped as they are.
+    xt = np.asfortranarray(x)
+    vt = _chainer_compiler_core.value_from_numpy(xt)
+    assert np.shares_memory(xt, vt.numpy())
+    np.testing.assert_array_equal(x, vt.numpy())
+
+    outputs = chxvm.run({input_names[0]: v})
+    y1 = outputs[output_names[0]].numpy()
+    expected = x.dot(chainerx.to_numpy(params['/l1/W'].array()).T)
+    expected += chainerx.to_numpy(params['/l1/b'].array())
+    np.testing.assert_allclose(expected, y1, rtol=1e-5)
+    # The view keeps the output alive.
+    del outputs
+    np.testing.assert_allclose(expected, y1, rtol=1e-5)
+
+
+def test_numpy_view_owns_array():
+    x = np.arange(6).reshape(2, 3).astype(np.float32)
+    v = _chainer_compiler_core.value_from_numpy(x.copy())
+    y = v.numpy()
+    # The view does not refer to the ChxVMVar, whose value may be
+    # replaced by the runtime.
+    del v
+    np.testing.assert_array_equal(x, y)
+
+
+def test_dlpack_interop():
+    x = np.arange(12).reshape(3, 4).astype(np.float32)
+    v = _chainer_compiler_core.value_from_numpy(x[:, 1:3])
+    capsule = v.to_dlpack()
+    w = _chainer_compiler_core.value_from_dlpack(capsule)
+    assert np.shares_memory(x, w.numpy())
+    np.testing.assert_array_equal(x[:, 1:3], w.numpy())
+    # A capsule can be consumed only once.
+    with pytest.raises(Exception):
+        _chainer_compiler_core.value_from_dlpack(capsule)
+
+
+def test_dlpack_bool():
+    x = np.array([True, False, True])
+    v = _chainer_compiler_core.value_from_numpy(x)
+    # Bool is exported as 8-bit unsigned integers as CuPy and PyTorch do.
+    w = _chainer_compiler_core.value_from_dlpack(v.to_dlpack())
+    assert w.numpy().dtype == np.uint8
+    np.testing.assert_array_equal(x, w.numpy())
+
+
+def test_dlpack_torch():
+    torch = pytest.importorskip('torch')
+    import torch.utils.dlpack
+
+    x = np.arange(12).reshape(3, 4).astype(np.float32)
+    v = _chainer_compiler_core.value_from_numpy(x)
+    t = torch.utils.dlpack.from_dlpack(v.to_dlpack())
+    np.testing.assert_array_equal(x, t.numpy())
+    w = _chainer_compiler_core.value_from_dlpack(torch.utils.dlpack.to_dlpack(t))
+    assert np.shares_memory(x, w.numpy())
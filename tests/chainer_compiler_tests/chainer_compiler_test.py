@@ -35,7 +35,9 @@ sys.path.append(project_root)
 sys.path.append(os.path.join(project_root, 'build/chainer_compiler_cc'))
 sys.path.append(os.path.join(project_root, 'chainer_compiler'))
 
+from chainer_compiler import autotune  # noqa
 from chainer_compiler import chainer_compiler  # noqa
+from chainer_compiler import profiler  # noqa
 
 
 def aranges(xp, *shape):
@@ -59,6 +61,21 @@ def test_unflatten():
     assert i == len(flat)
 
 
+def test_structure_plan():
+    flat = [np.array(x) for x in [0, 1, 2, 3, 4, 5]]
+    nested = [flat[0], [flat[1]], [(flat[2], [flat[3], flat[4]])],
+              (flat[5],), []]
+    described = []
+    structure = chainer_compiler._describe(nested, described)
+    assert described == flat
+    plan = chainer_compiler._get_plan(structure)
+    assert plan is chainer_compiler._get_plan(structure)
+    assert plan.size == len(flat)
+    assert [(start, stop) for start, stop, _ in plan.items] == [
+        (0, 1), (1, 2), (2, 5), (5, 6), (6, 6)]
+    assert nested == plan.unflatten(tuple(flat))
+
+
 def _assert_allclose(e, a, **kwargs):
     if has_cupy and isinstance(e, cupy.ndarray):
         e = chainer.cuda.to_cpu(e)
@@ -94,6 +111,44 @@ def _run_fwd_bwd(model, inputs):
     return y, grads
 
 
+def test_strip_initializers():
+    from onnx import helper
+    from onnx import numpy_helper
+    from onnx import TensorProto
+
+    w = numpy_helper.from_array(np.ones((2, 3), dtype=np.float32), 'W')
+    c = numpy_helper.from_array(np.ones((3,), dtype=np.float32), 'C')
+    x = helper.make_tensor_value_info('x', TensorProto.FLOAT, [2])
+    xmodel = helper.make_model(
+        helper.make_graph([], 'g', [x], [], initializer=[w, c]))
+
+    stripped = chainer_compiler._strip_initializers(xmodel, {'W'})
+    assert stripped == {'W'}
+    assert [t.name for t in xmodel.graph.initializer] == ['C']
+    assert [i.name for i in xmodel.graph.input] == ['x', 'W']
+
+
+def test_copy_without_weights():
+    from onnx import helper
+    from onnx import numpy_helper
+    from onnx import TensorProto
+
+    w = numpy_helper.from_array(np.ones((2, 3), dtype=np.float32), 'W')
+    c = numpy_helper.from_array(np.ones((3,), dtype=np.float32), 'C')
+    x = helper.make_tensor_value_info('x', TensorProto.FLOAT, [2])
+    xmodel = helper.make_model(
+        helper.make_graph([], 'g', [x], [], initializer=[w, c]))
+    serialized = xmodel.SerializeToString()
+
+    copied = chainer_compiler._copy_without_weights(xmodel, {'W'})
+    assert chainer_compiler._strip_initializers(copied, {'W'}) == {'W'}
+    assert [t.name for t in copied.graph.initializer] == ['C']
+    assert [i.name for i in copied.graph.input] == ['x', 'W']
+    assert copied.graph.input[1].type.tensor_type.shape.dim[1].dim_value == 3
+    # The caller's model keeps its weights.
+    assert xmodel.SerializeToString() == serialized
+
+
 class MLP(chainer.Chain):
 
     def __init__(self, n_units, n_out):
@@ -449,3 +504,180 @@ def test_partially_differentiable(device_name, translator):
     #     assert e is not None
     #     assert a is not None
     #     _assert_allclose(e, a)
+
+
+@pytest.mark.parametrize('device_name', ['@numpy'])
+@pytest.mark.parametrize('translator', ['ch2o'])
+def test_compile_cache(device_name, translator, tmpdir):
+    np.random.seed(40)
+    device = chainer.get_device(device_name)
+    device.use()
+
+    mlp = MLP(4, 10)
+    mlp.to_device(device)
+    input = np.random.rand(3, 5).astype(np.float32)
+    expected_ys, expected_grads = _run_fwd_bwd(mlp, [input])
+
+    cache_dir = str(tmpdir)
+    for i in range(2):
+        model = chainer_compiler.compile(mlp, [input], translator=translator,
+                                         cache_dir=cache_dir)
+        model.to_device(device)
+        # The first compilation populates the cache and the second one
+        # should be served from it.
+        assert len(os.listdir(cache_dir)) == 1
+        actual_ys, actual_grads = _run_fwd_bwd(model, [input])
+
+        _assert_allclose(expected_ys, actual_ys, rtol=1e-5)
+        assert len(expected_grads) == len(actual_grads)
+        for (e_name, e_grad), (a_name, a_grad) in zip(
+                expected_grads, actual_grads):
+            assert e_name == a_name
+            _assert_allclose(e_grad, a_grad, rtol=1e-4)
+
+
+@pytest.mark.parametrize('device_name', all_device_names)
+@pytest.mark.parametrize('translator', ['ch2o'])
+def test_param_update(device_name, translator):
+    np.random.seed(40)
+    device = chainer.get_device(device_name)
+    device.use()
+
+    mlp = MLP(4, 10)
+    mlp.to_device(device)
+    input = device.xp.array(np.random.rand(3, 5).astype(np.float32))
+    mlp(input)
+
+    model = chainer_compiler.compile(mlp, [input], translator=translator)
+    model.to_device(device)
+    optimizer = chainer.optimizers.SGD(lr=0.1)
+    optimizer.setup(model)
+
+    # Parameters are bound to the compiled model only once so in-place
+    # updates by the optimizer must be visible in the next iteration.
+    for i in range(3):
+        model.cleargrads()
+        y = model(input)
+        expected = mlp(input)
+        _assert_allclose(_array(expected), _array(y), rtol=1e-5)
+        loss = F.sum(y)
+        loss.backward()
+        optimizer.update()
+
+
+@pytest.mark.parametrize('device_name', all_device_names)
+@pytest.mark.parametrize('translator', ['ch2o'])
+def test_program_cache(device_name, translator):
+    np.random.seed(40)
+    device = chainer.get_device(device_name)
+    device.use()
+
+    mlp = MLP(4, 10)
+    mlp.to_device(device)
+    input = np.random.rand(3, 5).astype(np.float32)
+    model = chainer_compiler.compile(mlp, [input], translator=translator,
+                                     program_cache_size=2,
+                                     async_specialization=False)
+    model.to_device(device)
+
+    # Programs are specialized for each batch size and the least
+    # recently used one is evicted.
+    for batch_size in [3, 2, 3, 1]:
+        input = device.xp.array(
+            np.random.rand(batch_size, 5).astype(np.float32))
+        expected_ys, expected_grads = _run_fwd_bwd(mlp, [input])
+        actual_ys, actual_grads = _run_fwd_bwd(model, [input])
+        _assert_allclose(expected_ys, actual_ys, rtol=1e-5)
+        assert len(expected_grads) == len(actual_grads)
+        for (e_name, e_grad), (a_name, a_grad) in zip(
+                expected_grads, actual_grads):
+            assert e_name == a_name
+            _assert_allclose(e_grad, a_grad, rtol=1e-4)
+
+    cache = model.program_cache
+    assert [shape for (shape, _), in cache.keys()] == [(3, 5), (1, 5)]
+    assert cache.hits == 1
+    assert cache.misses == 3
+
+
+@pytest.mark.parametrize('translator', ['ch2o'])
+def test_autotune_computation_order(translator, tmpdir):
+    np.random.seed(40)
+    device = chainer.get_device('@numpy')
+    device.use()
+
+    mlp = MLP(4, 10)
+    input = np.random.rand(3, 5).astype(np.float32)
+    expected_ys, expected_grads = _run_fwd_bwd(mlp, [input])
+
+    cache_dir = str(tmpdir)
+    memory_budget = 1000 * 1000 * 1000
+    schedule = autotune.autotune_computation_order(
+        mlp, [input], memory_budget, translator=translator,
+        cache_dir=cache_dir, max_trials=2, num_runs=1)
+    assert schedule['peak_memory'] <= memory_budget
+    assert len(os.listdir(cache_dir)) == 1
+
+    # The stored schedule is reused.
+    autotune._schedules.clear()
+    assert schedule == autotune.autotune_computation_order(
+        mlp, [input], memory_budget, translator=translator,
+        cache_dir=cache_dir)
+
+    model = chainer_compiler.compile(mlp, [input], translator=translator,
+                                     computation_order='auto',
+                                     memory_budget=memory_budget,
+                                     cache_dir=cache_dir)
+    assert model.computation_order == schedule['computation_order']
+    actual_ys, actual_grads = _run_fwd_bwd(model, [input])
+    _assert_allclose(expected_ys, actual_ys, rtol=1e-5)
+    for (e_name, e_grad), (a_name, a_grad) in zip(
+            expected_grads, actual_grads):
+        assert e_name == a_name
+        _assert_allclose(e_grad, a_grad, rtol=1e-4)
+
+
+@pytest.mark.parametrize('translator', ['ch2o'])
+def test_autotune_keeps_model(translator):
+    np.random.seed(40)
+    device = chainer.get_device('@numpy')
+    device.use()
+
+    bn = BN(5, 10)
+    input = np.random.rand(3, 5).astype(np.float32)
+    params = {name: p.array.copy() for name, p in bn.namedparams()}
+    avg_mean = bn.bn.avg_mean.copy()
+    avg_var = bn.bn.avg_var.copy()
+
+    autotune.autotune_computation_order(
+        bn, [input], 1000 * 1000 * 1000, translator=translator,
+        max_trials=2, num_runs=2)
+
+    # Timed training steps must not update the model.
+    for name, p in bn.namedparams():
+        np.testing.assert_array_equal(params[name], p.array)
+        assert p.grad is None
+    np.testing.assert_array_equal(avg_mean, bn.bn.avg_mean)
+    np.testing.assert_array_equal(avg_var, bn.bn.avg_var)
+
+
+@pytest.mark.parametrize('translator', ['ch2o'])
+def test_profiler(translator):
+    np.random.seed(40)
+    device = chainer.get_device('@numpy')
+    device.use()
+
+    mlp = MLP(4, 10)
+    input = np.random.rand(3, 5).astype(np.float32)
+    prof = profiler.Profiler(interval=2)
+    model = chainer_compiler.compile(mlp, [input], translator=translator,
+                                     profiler=prof)
+    for i in range(4):
+        _run_fwd_bwd(model, [input])
+
+    # Forward and backward runs of two calls are profiled.
+    summary = prof.summary()
+    assert summary.num_runs == 4
+    assert summary.total_time > 0
+    assert summary.by_op
+    assert prof.num_dropped == 0
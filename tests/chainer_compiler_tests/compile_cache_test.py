@@ -0,0 +1,58 @@
+import os
+import pickle
+
+import numpy as np
+
+from chainer_compiler import compile_cache
+
+
+def _entry():
+    return {
+        'fwd_program': b'\x00fwd',
+        'bwd_program': b'bwd\x01',
+        'fwd_input_names': ['x'],
+        'param_names': ['/l1/W', '/l1/b'],
+        'initializers': {'/l1/b': np.arange(3, dtype=np.float32)},
+    }
+
+
+def test_compile_cache_roundtrip(tmpdir):
+    cache_dir = os.path.join(str(tmpdir), 'cache')
+    cache = compile_cache.CompileCache(cache_dir)
+    assert cache.load('key') is None
+    cache.store('key', _entry())
+    assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+
+    entry = cache.load('key')
+    assert entry['fwd_program'] == b'\x00fwd'
+    assert entry['bwd_program'] == b'bwd\x01'
+    assert entry['fwd_input_names'] == ['x']
+    assert entry['param_names'] == ['/l1/W', '/l1/b']
+    assert list(entry['initializers']) == ['/l1/b']
+    np.testing.assert_array_equal(np.arange(3, dtype=np.float32),
+                                  entry['initializers']['/l1/b'])
+
+
+def test_compile_cache_broken_entries(tmpdir):
+    cache = compile_cache.CompileCache(str(tmpdir))
+    cache.store('key', _entry())
+    path = cache._path('key')
+
+    with open(path, 'r+b') as f:
+        f.truncate(10)
+    assert cache.load('key') is None
+
+    # Pickled entries are never loaded.
+    with open(path, 'wb') as f:
+        pickle.dump(_entry(), f)
+    assert cache.load('key') is None
+
+    with open(path, 'wb') as f:
+        f.write(b'garbage')
+    assert cache.load('key') is None
+
+
+def test_compile_cache_key_has_build_id(monkeypatch):
+    key = compile_cache.compute_key(b'model', None, None)
+    monkeypatch.setattr(compile_cache, '_build_id', 'another build')
+    assert compile_cache.compute_key(b'model', None, None) != key
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import onnx
+from onnx import helper
+from onnx import numpy_helper
+
+from chainer_compiler import compile_cache
+from chainer_compiler import external_data
+
+
+def _make_model(tensors):
+    xgraph = helper.make_graph(
+        [helper.make_node('Add', ['x', 'w'], ['y'])], 'graph',
+        [helper.make_tensor_value_info('x', onnx.TensorProto.FLOAT, [3])],
+        [helper.make_tensor_value_info('y', onnx.TensorProto.FLOAT, [3])],
+        [numpy_helper.from_array(t, n) for n, t in sorted(tensors.items())])
+    return helper.make_model(xgraph)
+
+
+def test_external_data(tmpdir):
+    tensors = {
+        'a': np.random.rand(100, 30).astype(np.float32),
+        'b': np.random.rand(7).astype(np.float64),
+        'c': np.random.rand(500).astype(np.float64),
+    }
+    path = os.path.join(str(tmpdir), 'model.onnx')
+    xmodel = _make_model(tensors)
+    external_data.save_model(xmodel, path, size_threshold=64, alignment=256)
+
+    offsets = []
+    for tensor in xmodel.graph.initializer:
+        if tensor.name == 'b':
+            assert tensor.data_location == onnx.TensorProto.DEFAULT
+            continue
+        assert tensor.data_location == onnx.TensorProto.EXTERNAL
+        assert not tensor.HasField('raw_data')
+        info = {e.key: e.value for e in tensor.external_data}
+        assert info['location'] == 'model.onnx.data'
+        offsets.append(int(info['offset']))
+    assert offsets == [0, 12032]
+    assert os.path.getsize(path + '.data') % 256 == 0
+
+    loaded = onnx.load(path)
+    for tensor in loaded.graph.initializer:
+        np.testing.assert_array_equal(tensors[tensor.name],
+                                      numpy_helper.to_array(tensor))
+
+
+def test_external_data_files(tmpdir):
+    tensors = {'a': np.random.rand(100, 30).astype(np.float32)}
+    path = os.path.join(str(tmpdir), 'model.onnx')
+    external_data.save_model(_make_model(tensors), path)
+    data_path = path + '.data'
+
+    xmodel = onnx.load(path, load_external_data=False)
+    files = external_data.external_data_files(xmodel, str(tmpdir))
+    assert files == [(data_path, os.path.getsize(data_path),
+                      os.stat(data_path).st_mtime_ns)]
+    key = compile_cache.compute_key(b'model', None, None, files)
+
+    # Rewriting the weights changes the key of the compile cache.
+    tensors['a'] += 1
+    external_data.save_model(_make_model(tensors), path)
+    st = os.stat(data_path)
+    os.utime(data_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    files = external_data.external_data_files(xmodel, str(tmpdir))
+    assert compile_cache.compute_key(b'model', None, None, files) != key
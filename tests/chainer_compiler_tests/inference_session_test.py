@@ -0,0 +1,90 @@
+import concurrent.futures
+import os
+import sys
+
+import chainerx
+import chainerx.testing
+import numpy as np
+import pytest
+
+project_root = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(project_root, 'build/chainer_compiler_cc'))
+sys.path.append(os.path.join(project_root, 'chainer_compiler'))
+
+import _chainer_compiler_core
+
+from chainer_compiler.inference_session import InferenceSession
+
+
+ONNX_FILE = 'out/ch2o_node_Linear/model.onnx'
+
+
+def test_inference_session():
+    graph = _chainer_compiler_core.load(ONNX_FILE)
+    params = graph.params()
+    input_names = graph.input_names()
+    output_names = graph.output_names()
+    W1 = params['/l1/W'].array()
+    b1 = params['/l1/b'].array()
+
+    xs = [np.random.rand(n, 7).astype(np.float32) for n in [1, 2, 3, 1, 5]]
+
+    with InferenceSession.from_onnx(ONNX_FILE, max_batch_size=5,
+                                    timeout=0.05) as session:
+        assert session.input_names == input_names
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(session.run, [x]) for x in xs]
+            results = [f.result() for f in futures]
+
+    assert len(results) == len(xs)
+    for x, result in zip(xs, results):
+        assert isinstance(result[output_names[0]], np.ndarray)
+        expected = chainerx.dot(chainerx.array(x), W1.T) + b1
+        chainerx.testing.assert_allclose(
+            expected, chainerx.array(result[output_names[0]]), rtol=1e-5)
+
+
+def test_inference_session_bad_request():
+    graph = _chainer_compiler_core.load(ONNX_FILE)
+    output_names = graph.output_names()
+
+    good = [np.random.rand(n, 7).astype(np.float32) for n in [1, 2]]
+    bad = np.random.rand(2, 6).astype(np.float32)
+
+    with InferenceSession.from_onnx(ONNX_FILE, max_batch_size=8,
+                                    timeout=0.05) as session:
+        with pytest.raises(ValueError):
+            session.submit([])
+        futures = [session.submit([good[0]]), session.submit([bad]),
+                   session.submit([good[1]])]
+        for x, future in zip(good, futures[::2]):
+            assert future.result()[output_names[0]].shape == (len(x), 3)
+        with pytest.raises(Exception):
+            futures[1].result()
+
+    with pytest.raises(RuntimeError):
+        session.submit([good[0]])
+
+
+def test_inference_session_output_batch_axes():
+    graph = _chainer_compiler_core.load(ONNX_FILE)
+    output_names = graph.output_names()
+    x = np.random.rand(2, 7).astype(np.float32)
+
+    # The second output is returned whole when it is not batched.
+    with InferenceSession.from_onnx(
+            ONNX_FILE, output_batch_axes={output_names[1]: None}) as session:
+        result = session.run([x])
+    assert result[output_names[0]].shape == (2, 3)
+    assert result[output_names[1]].shape == (2, 7)
+
+    # Outputs whose declared batch axes do not match fail.
+    with InferenceSession.from_onnx(
+            ONNX_FILE, output_batch_axes={output_names[1]: 1}) as session:
+        with pytest.raises(ValueError):
+            session.run([x])
+
+    with pytest.raises(ValueError):
+        InferenceSession.from_onnx(ONNX_FILE,
+                                   output_batch_axes={'unknown': None})
@@ -0,0 +1,68 @@
+from chainer_compiler import profiler
+
+
+def _event(run, pc, op, time, bytes=0, shape=(1,)):
+    return {'run': run, 'pc': pc, 'op': op, 'node': '%s@%d' % (op, pc),
+            'start': 0.0, 'time': time, 'bytes': bytes,
+            'output_shapes': [shape]}
+
+
+def _events(conv_time, num_runs=4):
+    events = []
+    for run in range(num_runs):
+        events.append(_event(run, 0, 'Conv', conv_time * (run + 1), 8))
+        events.append(_event(run, 1, 'Relu', 1e-6, 4))
+        events.append(_event(run, 2, 'Relu', 3e-6, 4, shape=(2,)))
+    return events
+
+
+def test_profile_summary():
+    summary = profiler.ProfileSummary(_events(1e-3))
+    assert summary.num_runs == 4
+    assert summary.by_op['Conv'].count == 4
+    assert summary.by_op['Relu'].count == 8
+    assert summary.by_op['Relu'].total_bytes == 32
+    assert summary.by_op['Relu'].output_shapes == {((1,),), ((2,),)}
+    assert abs(summary.by_op['Conv'].mean_time - 2.5e-3) < 1e-9
+    assert summary.by_op['Conv'].percentile(0) == 1e-3
+    assert summary.by_op['Conv'].percentile(100) == 4e-3
+    assert len(summary.by_node) == 3
+    assert summary.by_node[(2, 'Relu', 'Relu@2')].count == 4
+
+    table = summary.table().splitlines()
+    assert len(table) == 3
+    assert table[1].startswith('Conv')
+    assert len(summary.table(by='node', limit=2).splitlines()) == 3
+
+
+def test_profile_summary_samples():
+    summary = profiler.ProfileSummary(
+        _event(i, 0, 'Add', i) for i in range(profiler._MAX_SAMPLES * 3))
+    stats = summary.by_op['Add']
+    assert stats.count == profiler._MAX_SAMPLES * 3
+    assert len(stats.times) == profiler._MAX_SAMPLES
+    # The median of sampled times is close to the one of all times.
+    median = stats.percentile(50)
+    assert abs(median / (profiler._MAX_SAMPLES * 1.5) - 1) < 0.2
+
+
+def test_profile_summary_bounded():
+    num_events = profiler._MAX_OUTPUT_SHAPES * 3
+    summary = profiler.ProfileSummary()
+    for i in range(num_events):
+        summary.add_events([_event(i, 0, 'Add', 1e-6, shape=(i,))])
+    assert summary.num_runs == num_events
+    stats = summary.by_op['Add']
+    assert stats.count == num_events
+    assert len(stats.output_shapes) == profiler._MAX_OUTPUT_SHAPES
+
+
+def test_profile_summary_diff():
+    base = profiler.ProfileSummary(_events(1e-3))
+    new = profiler.ProfileSummary(_events(2e-3) + [_event(0, 3, 'Add', 1e-6)])
+    rows = new.diff(base)
+    assert [row[0] for row in rows] == ['Conv', 'Add', 'Relu']
+    assert abs(rows[0][3] - 2.0) < 1e-9
+    assert rows[1][1] == 0 and rows[1][3] is None
+    assert rows[2][3] == 1.0
+    assert len(new.diff_table(base, by='node').splitlines()) == 5
@@ -0,0 +1,142 @@
+import collections
+import concurrent.futures
+import threading
+import time
+
+import numpy as np
+
+from chainer_compiler import program_cache
+
+
+def _compiler(name, nbytes=1):
+    def compile_fn():
+        _compiler.count += 1
+        return name, nbytes
+    return compile_fn
+
+
+_compiler.count = 0
+
+
+def test_input_signature():
+    x = np.zeros((3, 4), dtype=np.float32)
+    i = np.zeros((3,), dtype=np.int32)
+    assert (program_cache.input_signature([x, i]) ==
+            (((3, 4), '<f4'), ((3,), '<i4')))
+    assert (program_cache.input_signature([[x, x], i]) ==
+            (None, ((3,), '<i4')))
+    assert program_cache.input_signature([[x, x]]) is None
+
+
+def test_program_cache_hit():
+    cache = program_cache.ProgramCache(max_entries=2)
+    _compiler.count = 0
+    assert cache.lookup('a', _compiler('A')) == 'A'
+    assert cache.lookup('a', _compiler('A')) == 'A'
+    assert _compiler.count == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_program_cache_max_entries():
+    cache = program_cache.ProgramCache(max_entries=2)
+    cache.lookup('a', _compiler('A'))
+    cache.lookup('b', _compiler('B'))
+    cache.lookup('a', _compiler('A'))
+    cache.lookup('c', _compiler('C'))
+    # 'b' is the least recently used one.
+    assert cache.keys() == ['a', 'c']
+
+
+def test_program_cache_max_bytes():
+    cache = program_cache.ProgramCache(max_entries=10, max_bytes=10)
+    cache.lookup('a', _compiler('A', 4))
+    cache.lookup('b', _compiler('B', 4))
+    cache.lookup('c', _compiler('C', 4))
+    assert cache.keys() == ['b', 'c']
+    assert cache.nbytes == 8
+
+    # A program larger than the limit is used once and never cached.
+    _compiler.count = 0
+    assert cache.lookup('d', _compiler('D', 11)) == 'D'
+    assert cache.lookup('d', _compiler('D', 11)) is None
+    assert _compiler.count == 1
+    assert cache.keys() == ['b', 'c']
+
+
+def test_program_cache_failure():
+    def fail():
+        raise RuntimeError('fail')
+
+    cache = program_cache.ProgramCache(max_entries=2)
+    assert cache.lookup('a', fail) is None
+    _compiler.count = 0
+    assert cache.lookup('a', _compiler('A')) is None
+    assert _compiler.count == 0
+    assert len(cache) == 0
+
+
+def test_program_cache_async():
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        cache = program_cache.ProgramCache(max_entries=2, executor=executor)
+        # The caller falls back to another program until it is compiled.
+        assert cache.lookup('a', _compiler('A')) is None
+        executor.shutdown(wait=True)
+        assert cache.lookup('a', _compiler('A')) == 'A'
+        assert 'a' in cache
+        assert cache.num_pending() == 0
+
+
+def test_program_cache_pending_resolves():
+    started = threading.Event()
+
+    def blocked(name):
+        def compile_fn():
+            started.wait()
+            return name, 1
+        return compile_fn
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        cache = program_cache.ProgramCache(max_entries=2, executor=executor)
+        # Signatures which are never looked up again do not stay pending.
+        for key in 'abc':
+            assert cache.lookup(key, blocked(key.upper())) is None
+        started.set()
+        executor.shutdown(wait=True)
+        assert cache.num_pending() == 0
+        assert cache.keys() == ['a', 'b']
+        # 'c' was not compiled as two programs were being compiled.
+        assert 'c' not in cache
+
+
+def test_program_cache_threads():
+    cache = program_cache.ProgramCache(max_entries=4)
+    counts = collections.Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(8)
+
+    def compile_fn(key):
+        def fn():
+            with lock:
+                counts[key] += 1
+            time.sleep(0.01)
+            return key.upper(), 1
+        return fn
+
+    def run(i):
+        barrier.wait()
+        for j in range(100):
+            key = 'abcdef'[(i + j) % 6]
+            program = cache.lookup(key, compile_fn(key))
+            assert program in (None, key.upper())
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(cache) == 4
+    assert cache.nbytes == 4
+    assert cache.num_pending() == 0
+    assert cache.hits + cache.misses == 800
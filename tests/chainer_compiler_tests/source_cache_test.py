@@ -0,0 +1,37 @@
+from chainer_compiler import source_cache
+
+
+def _func(x):
+    return x + 1
+
+
+def _other_func(x):
+    return x * 2
+
+
+def _parse(func):
+    _parse.count += 1
+    return func.__name__
+
+
+_parse.count = 0
+
+
+def test_source_cache_hit():
+    cache = source_cache.SourceCache()
+    _parse.count = 0
+    assert cache.get(_func, _parse) == '_func'
+    assert cache.get(_func, _parse) == '_func'
+    assert _parse.count == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_source_cache_max_size():
+    cache = source_cache.SourceCache(max_size=1)
+    _parse.count = 0
+    cache.get(_func, _parse)
+    cache.get(_other_func, _parse)
+    assert len(cache) == 1
+    cache.get(_func, _parse)
+    assert _parse.count == 3
@@ -0,0 +1,84 @@
+import numpy as np
+import onnx
+import unittest
+
+from chainer_compiler.elichika.chainer2onnx import compile_model
+
+from testcases.elichika_tests.utils.repeated_blocks import Blocks
+from testcases.elichika_tests.utils.repeated_blocks import Stateful2
+
+
+def normalize(onnx_model):
+    """Returns the model with values renamed by their first appearance
+
+    Names of values depend on the order they are allocated, which
+    differs when nodes of calls are copied.
+    """
+    xmodel = onnx.ModelProto()
+    xmodel.CopyFrom(onnx_model.model)
+    names = {}
+
+    def rename(name):
+        if name == '':
+            return name
+        if name not in names:
+            names[name] = 'v%d' % len(names)
+        return names[name]
+
+    def rename_values(values):
+        renamed = [rename(v) for v in values]
+        del values[:]
+        values.extend(renamed)
+
+    def visit(graph):
+        for v in graph.input:
+            v.name = rename(v.name)
+        for t in graph.initializer:
+            t.name = rename(t.name)
+        for node in graph.node:
+            node.name = ''
+            rename_values(node.input)
+            for attr in node.attribute:
+                if attr.HasField('g'):
+                    visit(attr.g)
+                for g in attr.graphs:
+                    visit(g)
+            rename_values(node.output)
+        for v in graph.output:
+            v.name = rename(v.name)
+        for v in graph.value_info:
+            v.name = rename(v.name)
+
+    visit(xmodel.graph)
+    return xmodel
+
+
+class TestCallMemo(unittest.TestCase):
+    def compile(self, model, memoize_calls):
+        x = np.random.RandomState(0).rand(3, 5).astype(np.float32)
+        return compile_model(model, [x], memoize_calls=memoize_calls)
+
+    def check_same_graph(self, model_class):
+        model = model_class()
+        expected = normalize(self.compile(model, False))
+        actual = normalize(self.compile(model, True))
+        # the wiring of nodes, attributes and initializer values are the
+        # same up to the names of values
+        self.assertEqual(expected, actual)
+        # outputs of each call must be distinct values
+        outputs = [o for n in actual.graph.node for o in n.output]
+        self.assertEqual(len(outputs), len(set(outputs)))
+
+    def test_repeated_blocks(self):
+        self.check_same_graph(Blocks)
+
+    def test_stateful(self):
+        self.check_same_graph(Stateful2)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
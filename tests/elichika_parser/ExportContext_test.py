@@ -0,0 +1,102 @@
+import chainer
+import chainer.functions as F
+import chainer.links as L
+import numpy as np
+import threading
+import unittest
+
+from chainer_compiler.elichika.chainer2onnx import compile_model
+
+
+class MLP(chainer.Chain):
+    def __init__(self):
+        super(MLP, self).__init__()
+        with self.init_scope():
+            self.l1 = L.Linear(5, 4)
+            self.l2 = L.Linear(4, 3)
+
+    def forward(self, x):
+        return F.softmax(self.l2(F.relu(self.l1(x))))
+
+
+class Loop(chainer.Chain):
+    def __init__(self):
+        super(Loop, self).__init__()
+        with self.init_scope():
+            self.l = L.Linear(5, 5)
+
+    def forward(self, x):
+        for i in range(3):
+            x = F.tanh(self.l(x))
+        return x
+
+
+class Branch(chainer.Chain):
+    def __init__(self):
+        super(Branch, self).__init__()
+        with self.init_scope():
+            self.l = L.Linear(5, 2)
+
+    def forward(self, x, flag):
+        y = self.l(x)
+        if flag:
+            y = y * 2
+        else:
+            y = F.relu(y)
+        return y
+
+
+def make_case(model_class, options):
+    # models are initialized by the global RNG of NumPy, which is not
+    # thread safe, so they are created before exports start
+    model = model_class()
+    x = np.random.rand(3, 5).astype(np.float32)
+    inputs = [x, True] if model_class is Branch else [x]
+    return model, inputs, options
+
+
+def export(model, inputs, options):
+    return compile_model(model, inputs, **options).model.SerializeToString()
+
+
+class TestExportContext(unittest.TestCase):
+    def test_parallel_exports(self):
+        cases = [make_case(c, o) for c, o in [
+            (MLP, {}), (Loop, {}), (Branch, {}),
+            (MLP, {'optimize_graph': False}),
+            (Loop, {'memoize_calls': False})] * 3]
+        expected = [export(*case) for case in cases]
+
+        actual = [None] * len(cases)
+        errors = []
+
+        def run(i):
+            try:
+                actual[i] = export(*cases[i])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in range(len(cases))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual([], errors)
+        for e, a in zip(expected, actual):
+            self.assertEqual(e, a)
+
+    def test_options_are_per_export(self):
+        from chainer_compiler.elichika.parser import config
+        saved = config.optimize_graph
+        export(*make_case(MLP, {'optimize_graph': not saved}))
+        self.assertEqual(saved, config.optimize_graph)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
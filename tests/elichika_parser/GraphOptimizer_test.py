@@ -0,0 +1,71 @@
+import chainer
+import chainer.functions as F
+import numpy as np
+import unittest
+
+from chainer_compiler.elichika.chainer2onnx import compile_model
+
+
+class Fold(chainer.Chain):
+    def forward(self, x):
+        return x * (2.0 * 3.0)
+
+
+class Dead(chainer.Chain):
+    def forward(self, x):
+        y = F.relu(x)
+        z = (y, x)
+        return x + 1.0
+
+
+class SkippedBranch(chainer.Chain):
+    def __init__(self):
+        super(SkippedBranch, self).__init__()
+        self.flag = True
+
+    def forward(self, x):
+        if self.flag:
+            x = x * 2.0
+        return x
+
+
+class Print(chainer.Chain):
+    def forward(self, x):
+        print('x', x)
+        return x + 1.0
+
+
+def op_types_of(onnx_model):
+    return [n.op_type for n in onnx_model.model.graph.node]
+
+
+class TestGraphOptimizer(unittest.TestCase):
+    def compile(self, model_class, optimize_graph):
+        model = model_class()
+        x = np.random.rand(3, 5).astype(np.float32)
+        return compile_model(model, [x], optimize_graph=optimize_graph)
+
+    def test_fold(self):
+        self.assertEqual(op_types_of(self.compile(Fold, False)).count('Mul'), 2)
+        self.assertEqual(op_types_of(self.compile(Fold, True)), ['Constant', 'Mul'])
+
+    def test_dead(self):
+        self.assertIn('Relu', op_types_of(self.compile(Dead, False)))
+        self.assertEqual(op_types_of(self.compile(Dead, True)), ['Constant', 'Add'])
+
+    def test_skipped_branch(self):
+        self.assertIn('If', op_types_of(self.compile(SkippedBranch, False)))
+        op_types = op_types_of(self.compile(SkippedBranch, True))
+        self.assertNotIn('If', op_types)
+        self.assertIn('Mul', op_types)
+
+    def test_side_effects(self):
+        self.assertIn('ChainerPrint', op_types_of(self.compile(Print, True)))
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
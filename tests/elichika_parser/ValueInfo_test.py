@@ -0,0 +1,112 @@
+import chainer
+import numpy as np
+import onnx
+import unittest
+from unittest import mock
+
+from chainer_compiler.elichika import chainer2onnx
+
+from chainer_compiler.elichika.chainer2onnx import BATCH_DIM_PARAM
+from chainer_compiler.elichika.chainer2onnx import compile_model
+
+from testcases.elichika_tests.model.MLP import MLP
+
+
+def tensor_type_of(value_info):
+    t = value_info.type.tensor_type
+    return t.elem_type, [d.dim_param or d.dim_value for d in t.shape.dim]
+
+
+class TestValueInfo(unittest.TestCase):
+    def test_MLP(self):
+        out_n = 4
+        batch_size = 100
+        model = MLP(8, out_n)
+        v = np.random.rand(batch_size, 3).astype(np.float32)
+        w = np.random.randint(out_n, size=batch_size)
+        model(v, w)
+
+        onnx_model = compile_model(model, [v, w])
+        graph = onnx_model.model.graph
+
+        self.assertEqual(tensor_type_of(graph.input[0]),
+                         (onnx.TensorProto.FLOAT, [BATCH_DIM_PARAM, 3]))
+        # labels are not derived from the first input
+        self.assertEqual(tensor_type_of(graph.input[1]),
+                         (onnx.TensorProto.INT64, [batch_size]))
+        self.assertEqual(tensor_type_of(graph.output[0]),
+                         (onnx.TensorProto.FLOAT, []))
+
+    def test_batch_size_1(self):
+        class Model(chainer.Chain):
+            def __init__(self):
+                super(Model, self).__init__()
+                with self.init_scope():
+                    self.l = chainer.links.Linear(3, 4)
+
+            def forward(self, x, y):
+                return self.l(x), y * 2
+
+        x = np.random.rand(1, 3).astype(np.float32)
+        y = np.random.rand(1, 1).astype(np.float32)
+        onnx_model = compile_model(Model(), [x, y])
+        graph = onnx_model.model.graph
+
+        self.assertEqual(tensor_type_of(graph.input[0]),
+                         (onnx.TensorProto.FLOAT, [BATCH_DIM_PARAM, 3]))
+        self.assertEqual(tensor_type_of(graph.input[1]),
+                         (onnx.TensorProto.FLOAT, [1, 1]))
+        self.assertEqual(tensor_type_of(graph.output[0]),
+                         (onnx.TensorProto.FLOAT, [BATCH_DIM_PARAM, 4]))
+        self.assertEqual(tensor_type_of(graph.output[1]),
+                         (onnx.TensorProto.FLOAT, [1, 1]))
+
+    def test_unsupported(self):
+        class Unsupported(chainer.Chain):
+            def forward(self, x):
+                with chainer.using_config('train', False):
+                    y = x * 2
+                return y
+
+        x = np.random.rand(3, 4).astype(np.float32)
+        onnx_model = compile_model(Unsupported(), [x], show_warnings=False)
+        graph = onnx_model.model.graph
+        self.assertFalse(graph.input[0].type.tensor_type.HasField('shape'))
+
+    def test_ignore_typing_errors(self):
+        class Model(chainer.Chain):
+            def forward(self, x):
+                return x * 2
+
+        def broken(model, inputs):
+            raise AssertionError('broken')
+
+        x = np.random.rand(3, 4).astype(np.float32)
+        with mock.patch.object(chainer2onnx, 'infer_forward_type', broken):
+            with self.assertRaises(AssertionError):
+                compile_model(Model(), [x])
+            onnx_model = compile_model(Model(), [x], show_warnings=False,
+                                       ignore_typing_errors=True)
+        graph = onnx_model.model.graph
+        self.assertFalse(graph.input[0].type.tensor_type.HasField('shape'))
+
+    def test_bug_in_typing_is_raised(self):
+        class Model(chainer.Chain):
+            def forward(self, x):
+                return x * 2
+
+        def broken(model, inputs):
+            raise RuntimeError('broken')
+
+        x = np.random.rand(3, 4).astype(np.float32)
+        with mock.patch.object(chainer2onnx, 'infer_forward_type', broken):
+            with self.assertRaises(RuntimeError):
+                compile_model(Model(), [x])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
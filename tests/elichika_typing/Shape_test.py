@@ -5,10 +5,12 @@ import chainer.functions as F
 import chainer.links as L
 import numpy as np
 
+import math
 import torch
 
 from   chainer_compiler.elichika.testtools import generate_id2type_from_forward
 from   chainer_compiler.elichika.typing import types
+from   chainer_compiler.elichika.typing.shape_elem import *
 
 class TestShape(unittest.TestCase):
     def test_shape_unify(self):
@@ -60,6 +62,26 @@ class TestShape(unittest.TestCase):
         self.assertEqual(str(id2type[33]), "(Variable(float32, (10 (a), 5 (b // 2))), Variable(float32, (10 (a), 5 (b // 2))))")	# Name h (line 3)
 
 
+    def test_symbolic_expr(self):
+        a, b = apply_subst_shape({'a' : 10, 'b' : 7},
+                [ShapeElem('a'), ShapeElem('b')])
+
+        self.assertEqual(str((a + 1) * 2 - a - 2), "10 (a)")
+        self.assertEqual(str(a * b - b * a), "0")
+        self.assertEqual(str((a // 2) // 3), "1 (a // 6)")
+        self.assertEqual(str(math.ceil((a - 1) / 2) + 1), "6 (ceil((a - 1) / 2) + 1)")
+        self.assertEqual(str((2 * a + b) // 2), "13 ((2 * a + b) // 2)")
+        self.assertIs(((a + 1) * b).expr, (b + a * b).expr)
+        self.assertEqual(size_of_ShapeElem(a * b + a), 3)
+
+
+    def test_join_symbolic_shape(self):
+        a, b = apply_subst_shape({'a' : 10, 'b' : 7},
+                [ShapeElem('a'), ShapeElem('b')])
+        shape = join_shape((a // 2, b + 1), (a // 2, ShapeElem(8)))
+        self.assertEqual(str(wrap_shape(shape)), "(5 (a // 2), 8)")
+
+
 def main():
     unittest.main()
 
@@ -0,0 +1,59 @@
+import unittest
+
+from chainer_compiler.elichika.typing.types import *
+from chainer_compiler.elichika.typing.type_inference import TypeEnvironment
+from chainer_compiler.elichika.typing.type_inference import join_tyenv
+from chainer_compiler.elichika.typing.type_inference import join_tyenvs
+
+
+class TestTypeEnvironment(unittest.TestCase):
+    def test_copy_on_access(self):
+        tyenv = TypeEnvironment()
+        tyenv['x'] = TyInt(1)
+        tyenv['y'] = TyList(TyFloat())
+
+        child = TypeEnvironment(tyenv)
+        self.assertEqual(set(child), {'x', 'y'})
+        self.assertEqual(list(child.changed_keys()), [])
+
+        child['x'].value = None
+        child['z'] = TyString()
+        self.assertEqual(list(child.changed_keys()), ['x', 'z'])
+        self.assertEqual(tyenv['x'].value, 1)
+        self.assertNotIn('z', tyenv)
+
+    def test_join(self):
+        tyenv = TypeEnvironment()
+        tyenv['x'] = TyInt(1)
+        y = tyenv['y'] = TyList(TyFloat())
+
+        child = TypeEnvironment(tyenv)
+        child['x'] = TyInt(2)
+        child['z'] = TyString()
+        join_tyenv(tyenv, child)
+        self.assertEqual(str(tyenv['x']), "int")
+        self.assertIsNone(tyenv['x'].value)
+        self.assertEqual(str(tyenv['z']), "string")
+        self.assertIs(tyenv['y'], y)
+
+    def test_join_branches(self):
+        tyenv = TypeEnvironment()
+        tyenv['x'] = TyInt(1)
+        y = tyenv['y'] = TyList(TyFloat())
+
+        child1 = TypeEnvironment(tyenv)
+        child2 = TypeEnvironment(tyenv)
+        child1['x'] = TyNone()
+        child2['z'] = TyString()
+        join_tyenvs(tyenv, child1, child2)
+        self.assertEqual(str(tyenv['x']), "optional(int)")
+        self.assertEqual(str(tyenv['z']), "string")
+        self.assertIs(tyenv['y'], y)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
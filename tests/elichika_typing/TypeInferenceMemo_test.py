@@ -0,0 +1,61 @@
+import ast, gast
+import inspect
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from chainer_compiler.elichika.parser import context
+from chainer_compiler.elichika.parser import utils
+from chainer_compiler.elichika.testtools import generate_id2type_from_forward
+from chainer_compiler.elichika.testtools import type_inference_tools
+from chainer_compiler.elichika.typing import summary
+from chainer_compiler.elichika.typing.type_inference import InferenceEngine
+
+from testcases.elichika_tests.utils.repeated_blocks import apply
+from testcases.elichika_tests.utils.repeated_blocks import Blocks
+
+
+def infer(model, args, memoize_type_inference):
+    with context.ExportContext(memoize_type_inference=memoize_type_inference):
+        type_inference_tools.reset_state()
+        id2type = generate_id2type_from_forward(model, args)
+    return {i: (str(t), getattr(t, 'instance', None))
+            for i, t in id2type.items()}
+
+
+class TestTypeInferenceMemo(unittest.TestCase):
+    def test_same_types(self):
+        model = Blocks()
+        x = np.random.rand(3, 5).astype(np.float32)
+        self.assertEqual(infer(model, (x,), False), infer(model, (x,), True))
+
+    def test_summaries(self):
+        model = Blocks()
+        x = np.random.rand(3, 5).astype(np.float32)
+        code = utils.clip_head(inspect.getsource(model.forward))
+        tree = gast.ast_to_gast(ast.parse(code))
+        tc = InferenceEngine(module=sys.modules[model.forward.__module__])
+        instantiate = summary.FunctionSummary.instantiate
+        with mock.patch.object(summary.FunctionSummary, 'instantiate',
+                autospec=True, side_effect=instantiate) as m:
+            tc.infer_function_value_args(tree.body[0], (model, x))
+
+        # Block(5, 2.0) is recorded at the third call and copied at the
+        # fourth call, and Stateful is never copied
+        summaries = [s for key, s in tc.summaries.summaries.items()
+                if key[0] is not apply.__code__]
+        self.assertEqual(len(summaries), 2)
+        self.assertIsInstance(summaries[0], summary.FunctionSummary)
+        self.assertIsNone(summaries[1])
+        self.assertEqual(len([c for c in m.call_args_list
+            if c[0][0] is summaries[0]]), 1)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
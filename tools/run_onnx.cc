@@ -367,6 +367,7 @@ void RunMain(const std::vector<std::string>& argv) {
     std::unique_ptr<Model> model;
     {
         onnx::ModelProto xmodel(LoadLargeProto<onnx::ModelProto>(onnx_path));
+        ResolveExternalData(onnx_path, &xmodel);
         model.reset(new Model(xmodel));
     }
 
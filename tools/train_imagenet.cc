@@ -98,6 +98,7 @@ void RunMain(const std::vector<std::string>& argv) {
     LOG() << "Constructing model..." << std::endl;
     RegisterCustomOnnxOperatorSetSchema();
     onnx::ModelProto xmodel(LoadLargeProto<onnx::ModelProto>(args.rest()[0]));
+    ResolveExternalData(args.rest()[0], &xmodel);
     Model model(xmodel);
     const bool expects_onehot = ExpectsOnehot(model);
     CHECK_EQ(1, model.graph().output_values().size());
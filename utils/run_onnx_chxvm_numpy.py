@@ -0,0 +1,104 @@
+"""Measures the per-call overhead of passing NumPy arrays to ChxVM.
+
+Inputs and outputs are converted either through ChainerX arrays
+(`chainerx.array` and `chainerx.to_numpy`) or directly between NumPy
+arrays and ChxVMVars (`value_from_numpy` and `ChxVMVar.numpy`), which
+share the memory without copying. The difference should dominate the
+time of small models. Example:
+
+$ python3 utils/run_onnx_chxvm_numpy.py out/ch2o_model_MLP_with_loss \\
+    --iterations 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import chainerx
+import numpy as np
+
+import run_onnx_util
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(project_root, 'build/chainer_compiler_cc'))
+
+import _chainer_compiler_core  # noqa
+
+
+def run_chainerx(chxvm, inputs, output_names):
+    xs = {name: _chainer_compiler_core.value(chainerx.array(value))
+          for name, value in inputs}
+    ys = chxvm.run(xs)
+    return [chainerx.to_numpy(ys[name].array()) for name in output_names]
+
+
+def run_numpy(chxvm, inputs, output_names):
+    xs = {name: _chainer_compiler_core.value_from_numpy(value)
+          for name, value in inputs}
+    ys = chxvm.run(xs)
+    return [ys[name].numpy() for name in output_names]
+
+
+def run_dlpack(chxvm, inputs, output_names):
+    xs = {name: _chainer_compiler_core.value_from_numpy(value)
+          for name, value in inputs}
+    ys = chxvm.run(xs)
+    return [_chainer_compiler_core.value_from_dlpack(
+        ys[name].to_dlpack()).numpy() for name in output_names]
+
+
+def run(args):
+    onnx_filename = run_onnx_util.onnx_model_file(args.test_dir, args.model_file)
+    graph = _chainer_compiler_core.load(onnx_filename)
+    input_names = graph.input_names()
+    output_names = graph.output_names()
+    test_data_dir = os.path.join(args.test_dir, 'test_data_set_0')
+    inputs, outputs = run_onnx_util.load_test_data(
+        test_data_dir, input_names, output_names)
+
+    chainerx.set_default_device('native')
+    params = graph.params()
+    chxvm = graph.compile()
+    chxvm.bind_inputs(params)
+
+    results = {}
+    for name, fn in [('chainerx', run_chainerx),
+                     ('numpy', run_numpy),
+                     ('dlpack', run_dlpack)]:
+        actual_outputs = fn(chxvm, inputs, output_names)
+        for (_, expected), actual in zip(outputs, actual_outputs):
+            np.testing.assert_allclose(expected, actual,
+                                       rtol=1e-3, atol=1e-4)
+
+        best = None
+        for _ in range(args.repeat):
+            start = time.time()
+            for _ in range(args.iterations):
+                fn(chxvm, inputs, output_names)
+            elapsed = (time.time() - start) / args.iterations
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = best
+        print('%s: %.1f usec/call (x%.2f)' %
+              (name, best * 1e6, results['chainerx'] / best))
+    return results
+
+
+def get_args(args=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark NumPy interchange of ChxVM')
+    parser.add_argument('test_dir')
+    parser.add_argument('--iterations', '-I', type=int, default=1000,
+                        help='The number of runs per measurement')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='The number of measurements')
+    parser.add_argument('--model_file', default=None)
+    return parser.parse_args(args=args)
+
+
+def main():
+    run(get_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Measures the throughput of ChxVM running from multiple threads.
+
+ChxVM releases the GIL during execution, so the throughput should scale
+almost linearly with the number of threads until the CPU cores are
+saturated. Example:
+
+$ python3 utils/run_onnx_chxvm_threads.py out/ch2o_model_MLP_with_loss \\
+    --threads 1,2,4,8 --iterations 100
+"""
+
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+import chainerx
+import numpy as np
+
+import run_onnx_util
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(project_root, 'build/chainer_compiler_cc'))
+
+import _chainer_compiler_core  # noqa
+
+
+def run(args):
+    onnx_filename = run_onnx_util.onnx_model_file(args.test_dir, args.model_file)
+    graph = _chainer_compiler_core.load(onnx_filename)
+    input_names = graph.input_names()
+    output_names = graph.output_names()
+    test_data_dir = os.path.join(args.test_dir, 'test_data_set_0')
+    inputs, outputs = run_onnx_util.load_test_data(
+        test_data_dir, input_names, output_names)
+
+    chainerx.set_default_device(args.device)
+    params = graph.params()
+    chxvm = graph.compile()
+    chxvm.bind_inputs(params)
+
+    inputs = {name: _chainer_compiler_core.value(chainerx.array(value))
+              for name, value in inputs}
+
+    def compute():
+        with chainerx.using_device(args.device):
+            actual = chxvm.run(inputs)
+        return actual
+
+    actual_outputs = compute()
+    for name, expected in outputs:
+        actual = chainerx.to_numpy(actual_outputs[name].array())
+        np.testing.assert_allclose(expected, actual, rtol=1e-3, atol=1e-4)
+    print('ALL OK')
+
+    results = []
+    for num_threads in [int(n) for n in args.threads.split(',')]:
+        num_runs = args.iterations * num_threads
+        with concurrent.futures.ThreadPoolExecutor(num_threads) as executor:
+            # Warm up all threads.
+            list(executor.map(lambda _: compute(), range(num_threads)))
+            start = time.time()
+            list(executor.map(lambda _: compute(), range(num_runs)))
+            elapsed = time.time() - start
+        throughput = num_runs / elapsed
+        if not results:
+            base = throughput
+        print('threads=%d: %.1f runs/sec (x%.2f)' %
+              (num_threads, throughput, throughput / base))
+        results.append((num_threads, throughput))
+    return results
+
+
+def get_args(args=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark ChxVM running from multiple threads')
+    parser.add_argument('test_dir')
+    parser.add_argument('--device', '-d', default='native')
+    parser.add_argument('--threads', default='1,2,4,8',
+                        help='Comma separated numbers of threads')
+    parser.add_argument('--iterations', '-I', type=int, default=100,
+                        help='The number of runs per thread')
+    parser.add_argument('--model_file', default=None)
+    return parser.parse_args(args=args)
+
+
+def main():
+    run(get_args())
+
+
+if __name__ == '__main__':
+    main()